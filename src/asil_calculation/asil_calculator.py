@@ -1,5 +1,6 @@
-from typing import Dict, Any
+from typing import Any, Dict, Tuple
 import logging
+import numpy as np
 
 class ASILCalculator:
     def __init__(self):
@@ -47,6 +48,34 @@ class ASILCalculator:
             }
         }
         
+        # 車間距離/車間時間のE値テーブル（上から順に判定、区間は[下限, 上限)でNoneは無制限）
+        self.exposure_bands = {
+            'stationary': [        # 停車時の車間距離[m]
+                (1, [(None, 0.6), (7.1, None)]),
+                (2, [(0.6, 0.7), (6.2, 7.1)]),
+                (3, [(0.7, 1.0), (4.3, 6.2)]),
+                (4, [(1.0, 4.3)])
+            ],
+            'low_speed': [         # 低速(1-10kph)時の車間時間[sec]
+                (1, [(None, 0.8), (6.9, None)]),
+                (2, [(6.1, 6.9)]),
+                (3, [(0.8, 2.0), (4.9, 6.1)]),
+                (4, [(2.0, 4.9)])
+            ],
+            'medium_speed': [      # 中速(10-70kph)時の車間時間[sec]
+                (1, [(None, 0.4), (4.2, None)]),
+                (2, [(3.7, 4.2)]),
+                (3, [(0.4, 1.0), (2.9, 3.7)]),
+                (4, [(1.0, 2.9)])
+            ],
+            'high_speed': [        # 高速(70kph-)時の車間時間[sec]
+                (1, [(None, 0.4), (2.3, None)]),
+                (2, [(2.0, 2.3)]),
+                (3, [(0.4, 0.7), (1.7, 2.0)]),
+                (4, [(0.7, 1.7)])
+            ]
+        }
+
         self.exposure_calculators = {
             'headway_time': self._get_headway_time_exposure,
             'runover': self._get_runover_exposure,
@@ -55,6 +84,14 @@ class ASILCalculator:
         self.active_exposure_calculators = set([
             'headway_time', 'runover', 'direction'
         ])
+        # calculate_columnsが読む文字列の列（数値の列はrequired_fields['ranges']の列）
+        self.text_fields = ['衝突タイプ', '進行方向', '衝突有無[C0]', '衝突有無[C1]', '衝突有無[C2]']
+        # calculate_columns用（exposure_calculatorsの列単位版）
+        self.exposure_column_calculators = {
+            'headway_time': self._headway_time_exposure_columns,
+            'runover': self._runover_exposure_columns,
+            'direction': self._direction_exposure_columns
+        }
 
     def validate_data(self, data: Dict[str, Any]) -> bool:
         """
@@ -131,6 +168,200 @@ class ASILCalculator:
         
         return simulation_results
 
+    def calculate_columns(self, columns: Dict[str, Any], context: Dict[str, Any] = None) -> Dict[str, np.ndarray]:
+        """
+        列ごとの配列に対してASILを一括計算する（calculateのベクトル化版）
+
+        数値列のNaNはシミュレーション結果の'N/A'（衝突なし）として0.0扱いにする。
+        無効な行はcalculateと同じくQM/S0/E4/C3になる。
+        判定に使う列（text_fieldsとrequired_fields['ranges']の列）だけを配列にし、それ以外の列は読まない。
+
+        Args:
+            columns: 列名→配列（またはリスト）の辞書
+            context: 列が無い場合に使う値（シナリオ種別ごとの'衝突タイプ'や'進行方向'など）
+
+        Returns:
+            Dict[str, np.ndarray]: 'ASIL', 'S', 'E', 'C'と、検証結果'valid'の配列
+        """
+        size = len(next(iter(columns.values())))
+        columns, nulls = self._typed_columns(columns)
+        for key, value in (context or {}).items():
+            if key not in columns:
+                columns[key] = np.broadcast_to(np.asarray(value, dtype=object), (size,))
+
+        valid = self.validate_columns(columns, size, nulls=nulls)
+        s_values = self._severity_columns(columns, size)
+        e_values = self._exposure_columns(columns, size)
+        c_values = self._controllability_columns(columns, size)
+        asil = self._determine_asil_columns(s_values, e_values, c_values)
+
+        # 無効な行はcalculateと同じデフォルト値
+        asil[~valid] = 'QM'
+        s_values[~valid] = 0
+        e_values[~valid] = 4
+        c_values[~valid] = 3
+        return {'ASIL': asil, 'S': s_values, 'E': e_values, 'C': c_values, 'valid': valid}
+
+    def _typed_columns(self, columns: Dict[str, Any]) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        判定に使う列だけを配列にする（文字列の列はobject配列、数値の列はsafe_float_arrayでfloat64）
+
+        Returns:
+            (列名→配列, 数値の列名→値がNoneの行のbool配列)
+        """
+        typed, nulls = {}, {}
+        for field in self.text_fields:
+            if field in columns:
+                typed[field] = np.asarray(columns[field], dtype=object)
+        for field in self.required_fields['ranges']:
+            if field not in columns:
+                continue
+            values = columns[field]
+            if not isinstance(values, np.ndarray) or values.dtype == object:
+                # Noneは数値にすると0.0になって検証を通ってしまうので、先に覚えておく
+                nulls[field] = np.fromiter((value is None for value in values), dtype=bool, count=len(values))
+            typed[field] = self.safe_float_array(values)
+        return typed, nulls
+
+    def validate_columns(self, columns: Dict[str, np.ndarray], size: int,
+                         report: Dict[str, np.ndarray] = None, nulls: Dict[str, np.ndarray] = None) -> np.ndarray:
+        """
+        validate_dataと同じ規則で全行を一括検証し、有効な行をTrueとするbool配列を返す
+
+        Args:
+            columns: 列名→配列の辞書
+            size: 行数
+            report: 指定した場合、フィールド名→そのフィールドで不正となった行番号の配列を書き込む
+            nulls: 数値に変換済みの列について、元の値がNoneだった行（_typed_columnsの戻り値）
+        """
+        failures = {}
+        missing = [field for field in self.required_fields['basic'] if field not in columns]
+        for field in missing:
+            failures[field] = np.ones(size, dtype=bool)
+
+        for field in self.required_fields['basic']:
+            values = columns.get(field)
+            if values is not None and values.dtype == object:
+                failures[field] = np.array([value is None for value in values], dtype=bool)
+        for field, null in (nulls or {}).items():
+            failures[field] = failures.get(field, False) | null
+
+        for field, (min_val, max_val) in self.required_fields['ranges'].items():
+            if field in columns:
+                values = self.safe_float_array(columns[field])
+                failures[field] = failures.get(field, False) | ~((min_val <= values) & (values <= max_val))
+
+        valid_collision_values = ['あり', 'なし', '不要']
+        for field in ['衝突有無[C0]', '衝突有無[C1]', '衝突有無[C2]']:
+            if field in columns:
+                values = np.asarray(columns[field], dtype=object)
+                allowed = np.zeros(size, dtype=bool)
+                for value in valid_collision_values:
+                    allowed |= values == value
+                failures[field] = failures.get(field, False) | ~allowed
+
+        valid = np.ones(size, dtype=bool)
+        for field, failed in failures.items():
+            if not failed.any():
+                continue
+            valid &= ~failed
+            rows = np.flatnonzero(failed)
+            if report is not None:
+                report[field] = rows
+            logging.error(f"フィールド '{field}' が {len(rows)} 行で無効です（先頭の行: {rows[:5].tolist()}）")
+        return valid
+
+    def _severity_columns(self, columns: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        """calculate_severityの列単位版"""
+        collision_type = self._column(columns, '衝突タイプ', size)
+        impact_velocity = self.safe_float_array(self._column(columns, '有効衝突速度[回避無し]', size, 0))
+
+        s_values = np.full(size, 3, dtype=np.int64)  # 不明な衝突タイプの場合は最大値
+        for type_name, thresholds in self.severity_thresholds.items():
+            mask = collision_type == type_name
+            if not mask.any():
+                continue
+            levels = sorted(thresholds.items())
+            bounds = np.array([threshold for _, threshold in levels])
+            level_values = np.array([level for level, _ in levels])
+            # 閾値以下となる最初のレベル（NaNなど超過した場合は最後のレベル）
+            index = np.minimum(np.searchsorted(bounds, impact_velocity[mask], side='left'), len(bounds) - 1)
+            s_values[mask] = np.where(impact_velocity[mask] == 0, 0, level_values[index])
+        return s_values
+
+    def _exposure_columns(self, columns: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        """calculate_exposureの列単位版"""
+        final_e = np.full(size, 4, dtype=np.int64)
+        for calculator_name in self.active_exposure_calculators:
+            if calculator_name in self.exposure_column_calculators:
+                e_values = self.exposure_column_calculators[calculator_name](columns, size)
+                # _combine_e_valuesと同じ掛け合わせ（低い方のE値の分だけ高い方を下げる）
+                base_e = np.minimum(final_e, e_values)
+                higher_e = np.maximum(final_e, e_values)
+                final_e = np.maximum(1, higher_e - (4 - base_e))
+        return final_e
+
+    def _headway_time_exposure_columns(self, columns: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        """_get_headway_time_exposureの列単位版"""
+        velocity = self.safe_float_array(self._column(columns, '後続車速度[km/h]', size, 0))
+        distance = self.safe_float_array(self._column(columns, '車間距離[m]', size, 0))
+        headway_time = self.safe_float_array(self._column(columns, '車間時間[sec]', size, 0))
+        return np.select(
+            [velocity == 0,
+             velocity <= 1.0,
+             (1.0 < velocity) & (velocity <= 10.0),
+             (10.0 < velocity) & (velocity <= 70.0)],
+            [self._exposure_band_columns('stationary', distance),
+             self._exposure_band_columns('stationary', headway_time),
+             self._exposure_band_columns('low_speed', headway_time),
+             self._exposure_band_columns('medium_speed', headway_time)],
+            default=self._exposure_band_columns('high_speed', headway_time)
+        )
+
+    def _exposure_band_columns(self, band: str, values: np.ndarray) -> np.ndarray:
+        """_lookup_exposure_bandの列単位版"""
+        conditions = []
+        choices = []
+        for e_value, intervals in self.exposure_bands[band]:
+            condition = np.zeros(values.shape, dtype=bool)
+            for lower, upper in intervals:
+                condition |= ((True if lower is None else values >= lower)
+                              & (True if upper is None else values < upper))
+            conditions.append(condition)
+            choices.append(e_value)
+        return np.select(conditions, choices, default=4)
+
+    def _runover_exposure_columns(self, columns: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        return np.where(self._column(columns, '衝突タイプ', size) == '歩行者RunOver', 3, 4)
+
+    def _direction_exposure_columns(self, columns: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        return np.where(self._column(columns, '進行方向', size) == '後進', 2, 4)
+
+    def _controllability_columns(self, columns: Dict[str, np.ndarray], size: int) -> np.ndarray:
+        """calculate_controllabilityの列単位版"""
+        return np.select(
+            [self._column(columns, f'衝突有無[{level}]', size) == 'なし' for level in ['C0', 'C1', 'C2']],
+            [0, 1, 2],
+            default=3
+        )
+
+    @staticmethod
+    def _determine_asil_columns(s: np.ndarray, e: np.ndarray, c: np.ndarray) -> np.ndarray:
+        """determine_asilの列単位版"""
+        total = s + e + c
+        return np.select(
+            [(s == 0) | (e == 0) | (c == 0), total >= 10, total == 9, total == 8, total == 7],
+            ['QM', 'D', 'C', 'B', 'A'],
+            default='QM'
+        ).astype(object)
+
+    @staticmethod
+    def _column(columns: Dict[str, np.ndarray], field: str, size: int, default: Any = None) -> np.ndarray:
+        """列を取り出す（無ければdefaultで埋めた配列）"""
+        if field in columns:
+            return columns[field]
+        return np.full(size, default, dtype=object)
+
     def calculate_severity(self, collision_data: Dict[str, Any]) -> int:
         """
         衝突の重大度（S値）を計算
@@ -242,15 +473,7 @@ class ASILCalculator:
         """
         停車時の車間距離に基づくE値を計算
         """
-        if distance < 0.6 or distance >= 7.1:
-            return 1
-        elif (0.6 <= distance < 0.7) or (6.2 <= distance < 7.1):
-            return 2
-        elif (0.7 <= distance < 1.0) or (4.3 <= distance < 6.2):
-            return 3
-        elif 1.0 <= distance < 4.3:
-            return 4
-        return 4  # 想定外の値の場合は最も緩い評価
+        return self._lookup_exposure_band('stationary', distance)
 
     def _get_moving_exposure(self, velocity: float, headway_time: float) -> int:
         """
@@ -269,42 +492,28 @@ class ASILCalculator:
         """
         低速(1-10kph)時の車間時間に基づくE値を計算
         """
-        if headway_time < 0.8 or headway_time >= 6.9:
-            return 1
-        elif 6.1 <= headway_time < 6.9:
-            return 2
-        elif (0.8 <= headway_time < 2.0) or (4.9 <= headway_time < 6.1):
-            return 3
-        elif 2.0 <= headway_time < 4.9:
-            return 4
-        return 4  # 想定外の値の場合は最も緩い評価
+        return self._lookup_exposure_band('low_speed', headway_time)
 
     def _get_medium_speed_exposure(self, headway_time: float) -> int:
         """
         中速(10-70kph)時の車間時間に基づくE値を計算
         """
-        if headway_time < 0.4 or headway_time >= 4.2:
-            return 1
-        elif 3.7 <= headway_time < 4.2:
-            return 2
-        elif (0.4 <= headway_time < 1.0) or (2.9 <= headway_time < 3.7):
-            return 3
-        elif 1.0 <= headway_time < 2.9:
-            return 4
-        return 4  # 想定外の値の場合は最も緩い評価
+        return self._lookup_exposure_band('medium_speed', headway_time)
 
     def _get_high_speed_exposure(self, headway_time: float) -> int:
         """
         高速(70kph-)時の車間時間に基づくE値を計算
         """
-        if headway_time < 0.4 or headway_time >= 2.3:
-            return 1
-        elif 2.0 <= headway_time < 2.3:
-            return 2
-        elif (0.4 <= headway_time < 0.7) or (1.7 <= headway_time < 2.0):
-            return 3
-        elif 0.7 <= headway_time < 1.7:
-            return 4
+        return self._lookup_exposure_band('high_speed', headway_time)
+
+    def _lookup_exposure_band(self, band: str, value: float) -> int:
+        """
+        E値テーブルを上から順に見て、valueが含まれる最初の区間のE値を返す
+        """
+        for e_value, intervals in self.exposure_bands[band]:
+            for lower, upper in intervals:
+                if (lower is None or value >= lower) and (upper is None or value < upper):
+                    return e_value
         return 4  # 想定外の値の場合は最も緩い評価
 
     ######################################################3
@@ -364,4 +573,18 @@ class ASILCalculator:
         try:
             return float(value)
         except (ValueError, TypeError):
-            return 0.0
\ No newline at end of file
+            return 0.0
+
+    @classmethod
+    def safe_float_array(cls, values: Any) -> np.ndarray:
+        """
+        配列（またはリスト）をfloat64に一括変換する（変換できない要素とNaNは0.0、safe_floatの配列版）
+
+        'N/A'が混ざったリストもnp.asarrayで文字列の配列にせず、そのまま要素ごとに変換する。
+        """
+        try:
+            result = np.asarray(values, dtype=np.float64)
+        except (ValueError, TypeError):
+            result = np.array([cls.safe_float(value) for value in np.ravel(np.asarray(values, dtype=object))],
+                              dtype=np.float64)
+        return np.where(np.isnan(result), 0.0, result)
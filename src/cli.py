@@ -0,0 +1,32 @@
+# src/cli.py
+
+import argparse
+import importlib
+import sys
+
+# サブコマンド → (処理するスクリプトのモジュール, 説明)
+# モジュールは選ばれたコマンドの分だけ読み込むので、tkinterやmatplotlibは要らない段階では読み込まれない
+COMMANDS = {
+    'generate': ('src.scripts.run_data_generation', 'スイープ条件から入力CSVを生成する'),
+    'simulate': ('src.scripts.run_simulation', '入力CSVの全行をシミュレーションする'),
+    'asil': ('src.scripts.run_asil_calculation', 'シミュレーション結果にASILを付ける'),
+    'map': ('src.scripts.run_map_export', 'ASIL計算済みの結果からASILマップを出力する'),
+    'trajectories': ('src.scripts.run_trajectory_archive', '軌跡アーカイブを作る・記録の軌跡を取り出す'),
+    'serve': ('src.scripts.run_server', 'シナリオのASILを問い合わせられるローカルHTTPサーバーを起動する'),
+}
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='python -m src.cli', description='GUIを使わずにデータ生成からASILマップまでを実行する',
+        epilog='\n'.join(f'  {name:12s} {summary}' for name, (_, summary) in COMMANDS.items())
+               + '\n各コマンドのオプションは python -m src.cli <コマンド> --help で表示',
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=list(COMMANDS), metavar='コマンド')
+    parser.add_argument('args', nargs=argparse.REMAINDER, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    module = importlib.import_module(COMMANDS[args.command][0])
+    return module.main(args.args) or 0
+
+if __name__ == "__main__":
+    sys.exit(main())
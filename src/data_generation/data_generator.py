@@ -1,9 +1,50 @@
 # src/data_generation/data_generator.py
 
 import os
+from decimal import Decimal
 from typing import Dict, Any, List
+import numpy as np
 from src.utils import functions
 
+# main()で使う標準のスイープ条件、ベンチマークでも同じものを使うよ
+DEFAULT_USER_INPUT = {
+    'weight': [50, 55, 2500],  # 歩行者と車両の重さ
+    'rtime': [1.2],  # 反応時間
+    'vset_start': 0.0, 'vset_end': 140, 'vset_step': 5.0,  # 速度の範囲
+    'tset_start': 0.6, 'tset_end': 6.0, 'tset_step': 0.2,  # 車間時間の範囲
+    'accset_start': 0.01, 'accset_end': 1.17, 'accset_step': 0.02,  # 加速度の範囲
+    'evasiveset': [0, 0.4, 0.8, 1.0]  # 回避行動のパラメータ
+}
+
+# 歩行者（100kg未満）の速度[km/h]ごとの最小車間時間[sec]
+PEDESTRIAN_MIN_TIME = {
+    0.0: 1.2, 5.0: 2.6, 10.0: 2.0, 15.0: 2.0, 20.0: 2.0,
+    25.0: 2.2, 30.0: 2.2, 35.0: 2.4, 40.0: 2.6, 45.0: 2.8,
+    50.0: 2.8, 55.0: 3.0, 60.0: 3.2
+}
+_PEDESTRIAN_SPEEDS = np.array(sorted(PEDESTRIAN_MIN_TIME))
+_PEDESTRIAN_TIMES = np.array([PEDESTRIAN_MIN_TIME[speed] for speed in _PEDESTRIAN_SPEEDS])
+
+def pedestrian_min_time(v):
+    """
+    歩行者の最小車間時間[sec]を速度[km/h]の区間から引くよ（配列もOK）
+
+    表は5km/h刻みだから、その間の速度は両隣の表の値の大きい方を使うの（QMC抽出用、格子のスイープは表の速度だけ見るよ）。
+    表の速度ぴったりなら表の値そのまま、表より外は端の値になるよ。
+    """
+    v = np.asarray(v, dtype=float)
+    last = len(_PEDESTRIAN_SPEEDS) - 1
+    lower = np.clip(np.searchsorted(_PEDESTRIAN_SPEEDS, v, side='right') - 1, 0, last)
+    upper = np.clip(np.searchsorted(_PEDESTRIAN_SPEEDS, v, side='left'), 0, last)
+    return np.maximum(_PEDESTRIAN_TIMES[lower], _PEDESTRIAN_TIMES[upper])
+
+# generate_arrayが返す構造化配列の列（generate_dataの数値列と同じ順番）
+SWEEP_DTYPE = np.dtype([(name, np.float64) for name in [
+    "No", "先行車質量[kg]", "先行車速度[km/h]", "先行車減速度[G]", "後続車質量[kg]", "後続車速度[km/h]",
+    "後続車加速度[G]", "後続車反応時間[sec]", "車間時間[sec]", "車間距離[m]",
+    "回避行動パラメータ[回避無し]", "回避行動パラメータ[C0]", "回避行動パラメータ[C1]", "回避行動パラメータ[C2]",
+]])
+
 class DataGenerator:
     def __init__(self):
         pass
@@ -16,39 +57,121 @@ class DataGenerator:
         :return: 作ったデータのリスト、全部まとめて返すよ！
         :raises ValueError: ユーザー入力がおかしかったらエラー出すよ～気をつけてね！
         """
-        self._validate_user_input(user_input)  # まずは入力チェック、間違ってたらダメだからね！
+        sweep = self.generate_array(user_input)
+        # 文字列とNoneの列は全行同じだから、create_data_pointのひな形をコピーして数値列だけ上書きするよ
+        # （dictのupdateはキーの位置を変えないから、列の並びもそのまま！）
+        template = self.create_data_point(0, 2500, 0.0, 0.0, 0.0, 0.0, user_input['evasiveset'])
+        names = SWEEP_DTYPE.names
+        data = []
+        for values in sweep.tolist():
+            row = dict(template)
+            row.update(zip(names, values))
+            data.append(row)
+        return data
+
+    def generate_array(self, user_input: Dict[str, Any]) -> np.ndarray:
+        """
+        スイープ全体をNumPyで一気に作っちゃうよ～（百万行でも一瞬！）
+
+        重さ・反応時間・速度・車間時間・加速度の全組み合わせのグリッドに、_is_valid_scenarioと
+        同じルールをブール配列のマスクとして当てて、残った行だけを構造化配列で返すの。
+        行の順番とNoはgenerate_dataと同じ（重さ→反応時間→速度→車間時間→加速度の入れ子の順）。
+
+        :param user_input: generate_dataと同じパラメータ
+        :return: SWEEP_DTYPEの構造化配列
+        :raises ValueError: ユーザー入力がおかしかったらエラー出すよ～
+        """
+        self.validate_user_input(user_input)
+
+        weight = np.asarray(user_input['weight'], dtype=float)
+        rtime = np.asarray(user_input['rtime'], dtype=float)
+        vset = np.asarray(self.generate_range(user_input['vset_start'], user_input['vset_end'], user_input['vset_step']))
+        tset = np.asarray(self.generate_range(user_input['tset_start'], user_input['tset_end'], user_input['tset_step']))
+        accset = np.asarray(self.generate_range(user_input['accset_start'], user_input['accset_end'], user_input['accset_step']))
+        evasiveset = [float(value) for value in user_input['evasiveset']]
+
+        # 加速度は有効判定に関係ないから、(重さ, 反応時間, 速度, 車間時間)のグリッドで判定してから加速度を掛け合わせるよ
+        kg, rt, v, t = (axis.ravel() for axis in np.meshgrid(weight, rtime, vset, tset, indexing='ij'))
+        valid = self.valid_mask(kg, v, t)
+        kg, rt, v, t = kg[valid], rt[valid], v[valid], t[valid]
+        distance = self.distance(v, t)
 
-        # パラメータをゲット、これでデータを作るよ～
-        weight = user_input['weight']
-        rtime = user_input['rtime']
-        vset = self._generate_range(user_input['vset_start'], user_input['vset_end'], user_input['vset_step'])
-        tset = self._generate_range(user_input['tset_start'], user_input['tset_end'], user_input['tset_step'])
-        accset = self._generate_range(user_input['accset_start'], user_input['accset_end'], user_input['accset_step'])
+        count = len(kg) * len(accset)
+        sweep = np.zeros(count, dtype=SWEEP_DTYPE)
+        sweep["No"] = np.arange(1, count + 1, dtype=float)
+        sweep["先行車質量[kg]"] = np.repeat(kg, len(accset))
+        sweep["先行車速度[km/h]"] = np.repeat(np.where(kg < 100, 0.0, v), len(accset))  # 歩行者なら速度0
+        sweep["後続車質量[kg]"] = 1500.0  # 後続車の質量は固定
+        sweep["後続車速度[km/h]"] = np.repeat(v, len(accset))
+        sweep["後続車加速度[G]"] = np.tile(accset, len(kg))
+        sweep["後続車反応時間[sec]"] = np.repeat(rt, len(accset))
+        sweep["車間時間[sec]"] = np.repeat(t, len(accset))
+        sweep["車間距離[m]"] = np.repeat(distance, len(accset))
+        for name, value in zip(functions.SCENARIO_NAMES, evasiveset):
+            sweep[f"回避行動パラメータ[{name}]"] = value
+        return sweep
 
-        evasiveset = user_input['evasiveset']
-        no = 1  # データのナンバリング、1から始まるよ～
+    def valid_mask(self, kg: np.ndarray, v: np.ndarray, t: np.ndarray, bracket: bool = False) -> np.ndarray:
+        """
+        _is_valid_scenarioと歩行者の速度上限を配列まとめて判定しちゃうよ～
+
+        bracket=Falseなら格子のスイープと同じく、最小車間時間の表にある速度だけ比べるの（表に無い速度はスルー）。
+        bracket=Trueなら表に無い速度もpedestrian_min_timeの区間で比べるよ（速度が連続値のQMC抽出用）。
 
-        data = []  # ここにデータを溜めていくよ～
+        :param kg: 先行車質量[kg]の配列（100kg未満は歩行者）
+        :param v: 後続車速度[km/h]の配列
+        :param t: 車間時間[sec]の配列
+        :param bracket: 表に無い速度も区間で比べるならTrue
+        :return: 有効な組み合わせならTrueのブール配列
+        """
+        pedestrian = kg < 100
+        distance = (v / 3.6) * t
+        bad_distance = (t <= 0.5) | ((v <= 25.0) & (t <= 0.9)) | ((distance < 6.25) & (v > 25.0))
 
-        # ここからがメインのループ、全パターンを網羅しちゃうよ！
-        for kg in weight:
-            for rt in rtime:
-                for v in vset:
-                    if float(kg) < 100 and float(v) > 60.0:
-                        continue  # この条件だとスキップ、現実的じゃないからね～
+        if bracket:
+            # 表に無い速度も、両隣の区間の最小車間時間で比べちゃう
+            min_time = pedestrian_min_time(v)
+        else:
+            # 最小車間時間の表にある速度だけ比べる（表に無い速度は-infにしてスルー）
+            index = np.clip(np.searchsorted(_PEDESTRIAN_SPEEDS, v), 0, len(_PEDESTRIAN_SPEEDS) - 1)
+            min_time = np.where(_PEDESTRIAN_SPEEDS[index] == v, _PEDESTRIAN_TIMES[index], -np.inf)
 
-                    for t in tset:
-                        if not self._is_valid_scenario(kg, v, t):
-                            continue  # 無効なシナリオはスキップ、変なデータは作らないよ！
+        invalid = (
+            (pedestrian & (v > 60.0))
+            | (~pedestrian & (v >= 10.0) & bad_distance)
+            | (pedestrian & (t < min_time))
+            | (~pedestrian & (v == 0.0) & (t < 1.8))
+        )
+        return ~invalid
 
-                        for acc in accset:
-                            data.append(self._create_data_point(no, kg, v, acc, rt, t, evasiveset))
-                            no += 1  # ナンバーを増やして次へ、どんどん作るよ～
+    @staticmethod
+    def distance(v: np.ndarray, t: np.ndarray) -> np.ndarray:
+        """
+        車間距離[m]を小数2桁に丸めるよ（停止時は6km/hで計算）
 
-        return data  # 作ったデータを全部まとめて返すよ～
+        np.roundは100倍してから丸めるから、ちょうど半分くらいの値だけは
+        create_data_pointと同じf'{:.2f}'で丸め直して、結果を完全に揃えるの！
 
-    def _validate_user_input(self, user_input: Dict[str, Any]) -> None:
-        """ユーザー入力をチェックしちゃうよ～間違ってたらダメだからね！"""
+        :param v: 後続車速度[km/h]の配列
+        :param t: 車間時間[sec]の配列
+        :return: 車間距離[m]の配列
+        """
+        raw = np.where(v > 0.0, v / 3.6, 6 / 3.6) * t
+        rounded = np.round(raw, 2)
+        fraction = raw * 100 - np.floor(raw * 100)
+        for index in np.flatnonzero(np.abs(fraction - 0.5) < 1e-6):
+            rounded[index] = float(f'{raw[index]:.2f}')
+        return rounded
+
+    def validate_user_input(self, user_input: Dict[str, Any]) -> None:
+        """
+        ユーザー入力をチェックしちゃうよ～間違ってたらダメだからね！
+
+        格子を自分で組み立てる側（AdaptiveSweepとか）も、generate_dataと同じ入力ならこれで確かめてね。
+
+        :param user_input: generate_dataと同じパラメータ
+        :raises ValueError: 必要なキーが足りなかったらエラー出すよ～
+        """
         required_keys = ['weight', 'rtime', 'vset_start', 'vset_end', 'vset_step',
                          'tset_start', 'tset_end', 'tset_step', 'accset_start',
                          'accset_end', 'accset_step', 'evasiveset']
@@ -56,9 +179,23 @@ class DataGenerator:
             if key not in user_input:
                 raise ValueError(f"ごめん！{key}が見つからないよ～入力してね！")
 
-    def _generate_range(self, start: float, end: float, step: float) -> List[float]:
-        """指定された範囲でリストを作っちゃうよ～超便利！"""
-        return [round(float(x), 2) for x in functions.set_data(start, end, step, [])]
+    def generate_range(self, start: float, end: float, step: float) -> List[float]:
+        """
+        指定された範囲でリストを作っちゃうよ～超便利！
+
+        floatを足し続けると誤差が溜まるから、Decimalで start + i * step をきっちり計算するの。
+        終点の判定はfunctions.set_dataと同じ（end + step / 2 未満まで）。
+        generate_dataの速度・車間時間・加速度の軸はこれで作るから、同じ格子が欲しいときもこれを使ってね。
+
+        :return: 小数2桁に丸めた値のリスト
+        """
+        start, end, step = (Decimal(str(value)) for value in (start, end, step))
+        values = []
+        i = 0
+        while start + i * step < end + step / 2:
+            values.append(round(float(start + i * step), 2))
+            i += 1
+        return values
 
     def _is_valid_scenario(self, kg: float, v: float, t: float) -> bool:
         """このシナリオ、大丈夫？チェックしちゃうよ～"""
@@ -66,11 +203,7 @@ class DataGenerator:
             return False  # 車間距離が不適切ならアウト！
 
         if float(kg) < 100:
-            min_time = {
-                0.0: 1.2, 5.0: 2.6, 10.0: 2.0, 15.0: 2.0, 20.0: 2.0,
-                25.0: 2.2, 30.0: 2.2, 35.0: 2.4, 40.0: 2.6, 45.0: 2.8,
-                50.0: 2.8, 55.0: 3.0, 60.0: 3.2
-            }
+            min_time = PEDESTRIAN_MIN_TIME
             if float(v) in min_time and float(t) < min_time[float(v)]:
                 return False  # 最小車間時間を下回ってたらアウト！
         elif float(v) == 0.0 and float(t) < 1.8:
@@ -78,8 +211,21 @@ class DataGenerator:
 
         return True  # 全部クリアしたらOK！
 
-    def _create_data_point(self, no: int, kg: float, v: float, acc: float, rt: float, t: float, evasiveset: List[float]) -> Dict[str, Any]:
-        """1つのデータポイントを作っちゃうよ～ここが肝心！"""
+    def create_data_point(self, no: int, kg: float, v: float, acc: float, rt: float, t: float, evasiveset: List[float]) -> Dict[str, Any]:
+        """
+        1つのデータポイントを作っちゃうよ～ここが肝心！
+
+        generate_dataの行と同じ列・同じ並び・同じ丸めの行になるから、格子の外で行を作るときもこれを使ってね。
+
+        :param no: 記録No
+        :param kg: 先行車質量[kg]（100kg未満は歩行者で、先行車速度は0）
+        :param v: 後続車速度[km/h]
+        :param acc: 後続車加速度[G]
+        :param rt: 後続車反応時間[sec]
+        :param t: 車間時間[sec]
+        :param evasiveset: 回避行動パラメータ（回避無し, C0, C1, C2）
+        :return: 入力行のdict
+        """
         return {
             "No": float(no),
             "先行車質量[kg]": float(kg),
@@ -107,17 +253,8 @@ class DataGenerator:
         DataGeneratorのメイン関数だよ～ここから全部始まるの！
         ユーザー入力を設定して、データを作って、CSVファイルに保存しちゃうよ～
         """
-        user_input = {
-            'weight': [50, 55, 2500],  # 歩行者と車両の重さ
-            'rtime': [1.2],  # 反応時間
-            'vset_start': 0.0, 'vset_end': 140, 'vset_step': 5.0,  # 速度の範囲
-            'tset_start': 0.6, 'tset_end': 6.0, 'tset_step': 0.2,  # 車間時間の範囲
-            'accset_start': 0.01, 'accset_end': 1.17, 'accset_step': 0.02,  # 加速度の範囲
-            'evasiveset': [0, 0.4, 0.8, 1.0]  # 回避行動のパラメータ
-        }
-        
         try:
-            data = self.generate_data(user_input)  # データを生成
+            data = self.generate_data(DEFAULT_USER_INPUT)  # データを生成
             
             output_dir = os.path.join('data', 'input')
             os.makedirs(output_dir, exist_ok=True)  # 出力ディレクトリを作成
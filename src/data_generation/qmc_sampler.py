@@ -0,0 +1,114 @@
+# src/data_generation/qmc_sampler.py
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from src.data_generation.data_generator import DataGenerator
+
+try:
+    from scipy.stats import qmc
+except ImportError:  # scipyが無ければラテン超方格だけ使える
+    qmc = None
+
+# 列名 → (下限, 上限) の連続値か、取りうる値のリスト（離散値）
+Range = Union[Tuple[float, float], Sequence[float]]
+
+# DataGeneratorの標準スイープと同じ範囲（重さは離散値）
+DEFAULT_RANGES: Dict[str, Range] = {
+    '先行車質量[kg]': [50.0, 55.0, 2500.0],
+    '後続車速度[km/h]': (0.0, 140.0),
+    '車間時間[sec]': (0.6, 6.0),
+    '後続車加速度[G]': (0.01, 1.17),
+    '後続車反応時間[sec]': [1.2],
+}
+
+METHODS = ('sobol', 'lhs')
+
+
+class QMCSampler:
+    """
+    Sobol列（scipyがある場合）かラテン超方格で、指定した範囲からシナリオの行を抽出する
+
+    抽出した行はDataGeneratorの行と同じ列を持つ。車間距離と先行車速度（歩行者は0）は
+    DataGeneratorと同じ規則で導出し、DataGeneratorの有効判定で除外される組み合わせは捨てる
+    （捨てた数はrejectedで分かる）。範囲に無い列はDataGeneratorの既定値のまま。
+    """
+
+    def __init__(self, ranges: Optional[Dict[str, Range]] = None, method: str = 'sobol', seed: int = 0,
+                 evasiveset: Sequence[float] = (0, 0.4, 0.8, 1.0)):
+        """
+        Args:
+            ranges: 列名 → (下限, 上限) またはリスト（離散値から等確率で選ぶ）。省略時はDEFAULT_RANGES
+            method: 'sobol'（scrambled Sobol列、scipyが必要）か'lhs'（ラテン超方格）
+            seed: 乱数シード（Sobolのスクランブルとラテン超方格の並べ替えに使う）
+            evasiveset: 範囲で指定しない回避行動パラメータ（回避無し, C0, C1, C2）
+        """
+        if method not in METHODS:
+            raise ValueError(f"未知のサンプリング方法です: {method}（{', '.join(METHODS)}）")
+        if method == 'sobol' and qmc is None:
+            raise ValueError("Sobol列にはscipyが必要です。method='lhs'を使ってください")
+        self.ranges = dict(ranges or DEFAULT_RANGES)
+        self.columns = list(self.ranges)
+        self.method = method
+        self.generator = DataGenerator()
+        self.template = self.generator.create_data_point(0, 2500, 0.0, 0.0, 1.2, 1.0, list(evasiveset))
+        unknown = [column for column in self.columns if column not in self.template]
+        if unknown:
+            raise ValueError(f"抽出できない列です: {unknown}")
+        self.rng = np.random.default_rng(seed)
+        self._sobol = qmc.Sobol(d=len(self.columns), scramble=True, seed=seed) if method == 'sobol' else None
+        self.drawn = 0
+        self.rejected = 0
+
+    def _unit_samples(self, count: int) -> np.ndarray:
+        """[0, 1)^d の点をcount個"""
+        if self._sobol is not None:
+            return self._sobol.random(count)
+        # ラテン超方格: 各次元をcount等分した区間に1点ずつ置いて、次元ごとに並べ替える
+        strata = np.column_stack([self.rng.permutation(count) for _ in self.columns])
+        return (strata + self.rng.random((count, len(self.columns)))) / count
+
+    def _scale(self, unit: np.ndarray) -> Dict[str, np.ndarray]:
+        values = {}
+        for position, column in enumerate(self.columns):
+            bounds = self.ranges[column]
+            if isinstance(bounds, tuple):
+                low, high = bounds
+                values[column] = low + unit[:, position] * (high - low)
+            else:
+                choices = np.asarray(bounds, dtype=float)
+                values[column] = choices[np.minimum((unit[:, position] * len(choices)).astype(int), len(choices) - 1)]
+        return values
+
+    def sample(self, count: int) -> List[Dict[str, Any]]:
+        """
+        次のcount点を抽出し、有効な組み合わせの行だけを返す（Noは通し番号）
+
+        Sobol列はcountが2の累乗のとき各区間に均等に点が入る。
+        """
+        unit = self._unit_samples(count)
+        values = self._scale(unit)
+        size = len(unit)
+        kg = values.get('先行車質量[kg]', np.full(size, self.template['先行車質量[kg]']))
+        v = values.get('後続車速度[km/h]', np.full(size, self.template['後続車速度[km/h]']))
+        t = values.get('車間時間[sec]', np.full(size, self.template['車間時間[sec]']))
+
+        valid = self.generator.valid_mask(kg, v, t, bracket=True)  # 速度は連続値だから表の区間で比べるの
+        values['先行車質量[kg]'] = kg
+        values['後続車速度[km/h]'] = v
+        values['車間時間[sec]'] = t
+        values['先行車速度[km/h]'] = np.where(kg < 100, 0.0, v)  # 歩行者なら速度0
+        values['車間距離[m]'] = self.generator.distance(v, t)
+        numbers = self.drawn + np.arange(1, size + 1, dtype=float)
+        self.drawn += size
+        self.rejected += int(size - valid.sum())
+
+        names = list(values)
+        rows = []
+        for number, sample in zip(numbers[valid].tolist(), zip(*(values[name][valid].tolist() for name in names))):
+            row = dict(self.template)
+            row.update(zip(names, sample))
+            row['No'] = number
+            rows.append(row)
+        return rows
@@ -3,14 +3,19 @@ from tkinter import ttk, filedialog, messagebox, simpledialog
 import sys
 import os
 import csv
-from tqdm import tqdm
-import pandas as pd
 
 from src.data_generation.data_generator import DataGenerator
-from src.simulation.simulation_engine import SimulationEngine
-from src.asil_calculation.asil_calculator import ASILCalculator
+from src.scripts.run_simulation import (process_chunk, build_output_rows, build_errors, get_result_fieldnames,
+                                        scenario_types_in)
+from src.scripts.run_asil_calculation import process_asil_chunk
 from src.utils import functions
-from src.visualization.asil_map_generator import ASILMapGenerator
+from src.utils.background_job import BackgroundJob, split_chunks, default_chunk_size
+from src.utils.row_errors import error_sidecar_path, write_error_sidecar
+# pandas・matplotlib・キューブ・プレビューは使うメソッドの中で読み込むよ。
+# Windowsのプロセスプールはワーカーごとにこのモジュールを読み直すから、ここで読むとワーカーが重くなっちゃうの
+
+# バックグラウンドジョブの進捗をポーリングする間隔（ミリ秒）
+JOB_POLL_INTERVAL_MS = 100
 
 class ADASSimulationApp:
     def __init__(self, root):
@@ -18,9 +23,16 @@ class ADASSimulationApp:
         self.data_generator = DataGenerator()
         self.generated_data = None
         self.output_path = None
+        from src.visualization.asil_map_generator import ASILMapGenerator  # matplotlibはGUI本体だけで読み込む
         self.asil_map_generator = ASILMapGenerator()
-        self.csv_data = None
+        self.csv_path = None
+        self.csv_cube = None
+        self.live_preview = None
+        self.live_preview_version = 0
+        self.live_preview_image = None
         self.csv_columns = []
+        self.current_job = None
+        self.cancel_buttons = []
         self.init_ui()
 
     def init_ui(self):
@@ -217,12 +229,19 @@ class ADASSimulationApp:
             entry.insert(0, default)
             setattr(self, attr, entry)
 
+        ttk.Label(sim_params_frame, text="Engine:").grid(column=0, row=len(sim_params), sticky=tk.W, pady=5)
+        self.engine_choice = ttk.Combobox(sim_params_frame, state="readonly", width=10,
+                                          values=['reference', 'batch'])
+        self.engine_choice.grid(column=1, row=len(sim_params), pady=5, padx=5)
+        self.engine_choice.set('reference')
+
         # ファイル選択と実行ボタン
         button_frame = ttk.Frame(frame)
         button_frame.grid(column=0, row=1, sticky=(tk.W, tk.E), pady=10)
 
         ttk.Button(button_frame, text="Select Input & Run Simulation", 
                    command=self.select_input_file).grid(column=0, row=0, padx=5)
+        self.add_cancel_button(button_frame, column=1)
 
         # プログレス表示
         progress_frame = ttk.LabelFrame(frame, text="Progress", padding="5")
@@ -249,6 +268,7 @@ class ADASSimulationApp:
         
         ttk.Button(buttons_frame, text="Run ASIL Calculation", 
                    command=self.run_asil_calculation).grid(column=0, row=0, padx=5)
+        self.add_cancel_button(buttons_frame, column=1)
 
         # プログレスバー
         progress_frame = ttk.LabelFrame(frame, text="Progress", padding="5")
@@ -304,7 +324,20 @@ class ADASSimulationApp:
 
         self.visual_result = tk.Text(results_frame, height=10, width=60)
         self.visual_result.grid(column=0, row=0, sticky=(tk.W, tk.E), pady=5, padx=5)
+
+        # シミュレーション実行中のASILマップのプレビュー（チャンクが終わるたびに描き直す）
+        preview_frame = ttk.LabelFrame(frame, text="Live Preview (during simulation)", padding="5")
+        preview_frame.grid(column=1, row=0, rowspan=4, sticky=(tk.N, tk.S), pady=5, padx=10)
+        self.live_preview_label = ttk.Label(preview_frame, text="No simulation running")
+        self.live_preview_label.grid(column=0, row=0)
     
+    def add_cancel_button(self, parent, column):
+        """実行中のジョブを止めるCancelボタン（ジョブが無い間は無効）"""
+        button = ttk.Button(parent, text="Cancel", command=self.cancel_job)
+        button.grid(column=column, row=0, padx=5)
+        button.state(['disabled'])
+        self.cancel_buttons.append(button)
+
     def add_weight_entry(self):
         """新しい重量入力フィールドを追加"""
         index = len(self.weight_entries)
@@ -372,66 +405,141 @@ class ADASSimulationApp:
             messagebox.showerror("Error", error_message)
 
     def run_simulations(self, input_file):
-        """シミュレーションを実行し、結果をCSVファイルに保存する"""
-        config = {
-            'time_step': float(self.time_step_entry.get()),
-            'max_simulation_time': float(self.max_sim_time_entry.get()),
-            'acceleration_jerk': float(self.acc_jerk_entry.get()) * 9.81,
-            'deceleration_jerk': float(self.dec_jerk_entry.get()) * 9.81,
-        }
+        """シミュレーションをバックグラウンドのプロセスプールで実行し、結果をCSVファイルに保存する"""
+        if self.is_job_running():
+            return
+        try:
+            config = {
+                'time_step': float(self.time_step_entry.get()),
+                'max_simulation_time': float(self.max_sim_time_entry.get()),
+                'acceleration_jerk': float(self.acc_jerk_entry.get()) * 9.81,
+                'deceleration_jerk': float(self.dec_jerk_entry.get()) * 9.81,
+                'engine': self.engine_choice.get(),
+            }
 
-        output_file = os.path.join('data', 'output', 'simulation_results.csv')
-        os.makedirs(os.path.dirname(output_file), exist_ok=True)
+            output_file = os.path.join('data', 'output', 'simulation_results.csv')
+            os.makedirs(os.path.dirname(output_file), exist_ok=True)
 
-        try:
             with open(input_file, 'r', encoding='utf-8-sig') as infile:
-                reader = csv.DictReader(infile)
-                total_rows = sum(1 for _ in infile) - 1  # ヘッダー行を除外
-                infile.seek(0)
-                data = list(reader)
+                data = list(csv.DictReader(infile))
+            if not data:
+                self.sim_result.insert(tk.END, f"警告: 入力ファイル {input_file} にデータがありません。\n")
+                return
 
-            self.sim_progress["maximum"] = total_rows
-            self.sim_progress["value"] = 0
-            
-            results = []
-            for i, row in enumerate(data):
-                sim_engine = SimulationEngine(config)
-                sim_engine.load_data(row)
-                sim_engine.run_simulation()
-                results.append((row, sim_engine.get_results()))
-                self.sim_progress["value"] = i + 1
-                self.root.update_idletasks()
-
-            # 結果をファイルに書き込み
-            with open(output_file, 'w', newline='', encoding='utf-8-sig') as outfile:
-                fieldnames = list(data[0].keys())
-                result_fieldnames = ['衝突有無', '衝突時刻', '衝突位置', '有効衝突速度']
-                scenario_fieldnames = ['回避無し', 'C0', 'C1', 'C2']
-                
-                for scenario in scenario_fieldnames:
-                    for result in result_fieldnames:
-                        fieldnames.append(f'{result}[{scenario}]')
-
-                writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-                writer.writeheader()
-
-                for original_row, sim_results in results:
-                    output_row = original_row.copy()
-                    for scenario in scenario_fieldnames:
-                        for result in result_fieldnames:
-                            output_row[f'{result}[{scenario}]'] = sim_results[scenario][result]
-                    writer.writerow(output_row)
-
-            message = f"Simulation completed. Results saved to {output_file}"
-            self.sim_result.insert(tk.END, message + "\n")
-            self.status_text.delete('1.0', tk.END)
-            self.status_text.insert('1.0', "Simulation completed")
+            # batchエンジンは行ごとのシナリオ種別で結果の列が変わるので、出てくる種別の列を全部並べる
+            result_fieldnames = get_result_fieldnames(config, scenario_types_in(data))
+            fieldnames = list(data[0].keys()) + [
+                f'{result}[{scenario}]' for scenario in functions.SCENARIO_NAMES
+                for result in result_fieldnames
+            ]
+
+            # 終わったチャンクからASILを集計して、Visualizationタブのプレビューを描き直す
+            from src.visualization.live_preview import LivePreview
+            preview = LivePreview(os.path.join('data', 'output', 'asil_maps', 'live_preview.png'),
+                                  total_rows=len(data), scenario_type=config.get('scenario_type'))
+            self.live_preview, self.live_preview_version = preview, 0
+
+            def update_preview(chunk, chunk_results):
+                # バックグラウンドスレッドで実行、失敗してもジョブは止めずに結果欄へ警告が出る
+                preview.update(build_output_rows(chunk, chunk_results, result_fieldnames, functions.SCENARIO_NAMES))
+
+            def save_results(results):
+                # 結果をファイルに書き込み（バックグラウンドスレッドで実行）
+                with open(output_file, 'w', newline='', encoding='utf-8-sig') as outfile:
+                    writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+                    writer.writeheader()
+                    writer.writerows(build_output_rows(data, results, result_fieldnames, functions.SCENARIO_NAMES))
+                # 失敗した行は結果から外して、エラーサイドカーに書き出す
+                failed = write_error_sidecar(error_sidecar_path(output_file), build_errors(data, results, 0))
+                message = f"Simulation completed. Results saved to {output_file}"
+                if failed:
+                    message += f"\n{failed} 行の処理に失敗しました（詳細: {error_sidecar_path(output_file)}）"
+                return message
+
+            chunks = split_chunks(data, default_chunk_size(len(data)))
+            # プレビューはキャンセル・失敗したときも最後まで描いてから閉じる
+            job = BackgroundJob(process_chunk, chunks, worker_args=(config,), finalize=save_results,
+                                on_chunk=update_preview, cleanup=preview.close)
+            self.start_job(job, self.sim_progress, self.sim_result, "Simulation",
+                           "シミュレーション中にエラーが発生しました")
 
         except Exception as e:
             error_message = f"シミュレーション中にエラーが発生しました: {e}"
             self.sim_result.insert(tk.END, error_message + "\n")
             messagebox.showerror("Error", error_message)
-    
+
+    def is_job_running(self):
+        """バックグラウンドジョブの実行中なら警告を出してTrueを返す"""
+        if self.current_job is not None:
+            messagebox.showwarning("Warning", "Another job is running. Cancel it or wait until it finishes.")
+            return True
+        return False
+
+    def start_job(self, job, progressbar, result_text, name, error_prefix):
+        """バックグラウンドジョブを開始し、after()で進捗のポーリングを始める"""
+        self.current_job = job
+        progressbar["maximum"] = max(job.total, 1)
+        progressbar["value"] = 0
+        for button in self.cancel_buttons:
+            button.state(['!disabled'])
+        self.status_text.delete('1.0', tk.END)
+        self.status_text.insert('1.0', f"{name} running...")
+        job.start()
+        self.root.after(JOB_POLL_INTERVAL_MS, self.poll_job, job, progressbar, result_text, name, error_prefix)
+
+    def poll_job(self, job, progressbar, result_text, name, error_prefix):
+        """ジョブのイベントをまとめて取り出してGUIに反映する（進捗は最新の値だけ使う）"""
+        for kind, payload in job.drain():
+            if kind == 'progress':
+                progressbar["value"] = payload
+                continue
+            if kind == 'warning':
+                result_text.insert(tk.END, f"{name}: {payload}\n")
+                continue
+            self.finish_job()
+            self.refresh_live_preview()
+            if kind == 'done':
+                result_text.insert(tk.END, payload + "\n")
+                status = f"{name} completed"
+            elif kind == 'cancelled':
+                result_text.insert(tk.END, f"{name} cancelled after {payload} of {job.total} rows.\n")
+                status = f"{name} cancelled"
+            else:
+                error_message = f"{error_prefix}: {payload}"
+                result_text.insert(tk.END, error_message + "\n")
+                messagebox.showerror("Error", error_message)
+                status = f"{name} failed"
+            self.status_text.delete('1.0', tk.END)
+            self.status_text.insert('1.0', status)
+            return
+        self.refresh_live_preview()
+        self.root.after(JOB_POLL_INTERVAL_MS, self.poll_job, job, progressbar, result_text, name, error_prefix)
+
+    def refresh_live_preview(self):
+        """ライブプレビューのPNGが描き直されていたら、Visualizationタブの画像を読み込み直す"""
+        preview = self.live_preview
+        if preview is None or preview.version == self.live_preview_version:
+            return
+        try:
+            # Tkの画像はPNGをそのまま読めるけど大きいので、半分に縮小して表示する
+            self.live_preview_image = tk.PhotoImage(file=preview.output_path).subsample(2)
+        except tk.TclError:
+            return
+        self.live_preview_version = preview.version
+        self.live_preview_label.configure(image=self.live_preview_image, text='')
+
+    def finish_job(self):
+        self.current_job = None
+        for button in self.cancel_buttons:
+            button.state(['disabled'])
+
+    def cancel_job(self):
+        """実行中のジョブにキャンセルを要求する（実行中のチャンクが終わり次第止まる）"""
+        if self.current_job is not None:
+            self.current_job.cancel()
+            self.status_text.delete('1.0', tk.END)
+            self.status_text.insert('1.0', "Cancelling...")
+
     def select_input_file(self):
         """入力ファイルを選択し、シミュレーションを実行する"""
         input_file = filedialog.askopenfilename(
@@ -460,9 +568,9 @@ class ADASSimulationApp:
             self.asil_result.insert(tk.END, "No file selected. ASIL calculation cancelled.\n")
 
     def calculate_and_save_asil(self, input_file: str, output_file: str):
-        """ASIL計算を実行し、結果をCSVファイルに保存する"""
-        asil_calculator = ASILCalculator()
-        
+        """ASIL計算をバックグラウンドのプロセスプールで実行し、結果をCSVファイルに保存する"""
+        if self.is_job_running():
+            return
         try:
             # CSVファイルからデータを読み込む
             with open(input_file, 'r', encoding='utf-8-sig') as infile:
@@ -473,32 +581,28 @@ class ADASSimulationApp:
                 self.asil_result.insert(tk.END, f"警告: 入力ファイル {input_file} にデータがありません。\n")
                 return
 
-            # ASIL計算を行う
-            total_rows = len(data)
-            self.asil_progress["maximum"] = total_rows
-            self.asil_progress["value"] = 0
-
-            for i, row in enumerate(data):
-                try:
-                    asil_results = asil_calculator.calculate(row)
-                    row.update(asil_results)
-                except Exception as e:
-                    self.asil_result.insert(tk.END, f"行 {i+1} の処理中にエラーが発生しました: {str(e)}\n")
-                    continue
-                self.asil_progress["value"] = i + 1
-                self.root.update_idletasks()
-            
-            # 結果を新しいCSVファイルに書き込む
-            os.makedirs(os.path.dirname(output_file), exist_ok=True)
-            with open(output_file, 'w', newline='', encoding='utf-8-sig') as outfile:
-                writer = csv.DictWriter(outfile, fieldnames=data[0].keys())
-                writer.writeheader()
-                writer.writerows(data)
-
-            message = f"ASIL calculation completed. Results saved to {output_file}"
-            self.asil_result.insert(tk.END, message + "\n")
-            self.status_text.delete('1.0', tk.END)
-            self.status_text.insert('1.0', "ASIL calculation completed")
+            def save_results(results):
+                # 結果を新しいCSVファイルに書き込む（バックグラウンドスレッドで実行）
+                rows = [row for row, _ in results]
+                errors = [f"行 {i+1} の処理中にエラーが発生しました: {error}"
+                          for i, (_, error) in enumerate(results) if error is not None]
+                os.makedirs(os.path.dirname(output_file), exist_ok=True)
+                with open(output_file, 'w', newline='', encoding='utf-8-sig') as outfile:
+                    writer = csv.DictWriter(outfile, fieldnames=list(dict.fromkeys(key for row in rows for key in row)))
+                    writer.writeheader()
+                    writer.writerows(rows)
+                # マップ用に集計済みのキューブも結果の隣に保存しておく（作れなければマップはCSVから集計する）
+                import pandas as pd
+                from src.visualization.asil_cube import save_cube_for_results
+                reason = save_cube_for_results(pd.DataFrame(rows), output_file)
+                if reason:
+                    errors.append(f"ASILキューブは作りませんでした: {reason}")
+                return "\n".join(errors + [f"ASIL calculation completed. Results saved to {output_file}"])
+
+            chunks = split_chunks(data, default_chunk_size(len(data)))
+            job = BackgroundJob(process_asil_chunk, chunks, finalize=save_results)
+            self.start_job(job, self.asil_progress, self.asil_result, "ASIL calculation",
+                           "ASIL計算中にエラーが発生しました")
         
         except Exception as e:
             error_message = f"ASIL計算中にエラーが発生しました: {str(e)}"
@@ -513,8 +617,17 @@ class ADASSimulationApp:
         )
         if file_path:
             try:
-                self.csv_data = pd.read_csv(file_path)
-                self.csv_columns = list(self.csv_data.columns)
+                import pandas as pd
+                from src.visualization.asil_cube import ASILCube
+                # 結果のCSVは大きいことがあるので、ここでは列名だけ読む（集計はチャンクごとに読みながら行う）
+                self.csv_columns = list(pd.read_csv(file_path, nrows=0, encoding='utf-8-sig').columns)
+                self.csv_path = file_path
+                try:
+                    # 入力列のX/Yならキューブから切り出すだけで済む（無ければ作って結果の隣に保存）
+                    self.csv_cube = ASILCube.for_results(file_path)
+                except (ValueError, OSError, MemoryError) as e:
+                    self.csv_cube = None
+                    self.visual_result.insert(tk.END, f"ASILキューブは使わずにCSVから集計します: {e}\n")
                 self.x_param['values'] = self.csv_columns
                 self.y_param['values'] = self.csv_columns
                 self.visual_result.insert(tk.END, f"CSV file loaded: {file_path}\n")
@@ -525,7 +638,7 @@ class ADASSimulationApp:
                 messagebox.showerror("Error", error_message)
 
     def generate_asil_map(self):
-        if self.csv_data is None:
+        if self.csv_path is None:
             messagebox.showwarning("Warning", "Please load a CSV file first")
             return
 
@@ -540,9 +653,13 @@ class ADASSimulationApp:
         output_dir = os.path.join('data', 'output', 'asil_maps')
         os.makedirs(output_dir, exist_ok=True)
 
+        data = self.csv_path
+        if self.csv_cube is not None and {x_param, y_param} <= set(self.csv_cube.dimensions):
+            data = self.csv_cube
+
         try:
             result = self.asil_map_generator.generate_asil_map(
-                data=self.csv_data,
+                data=data,
                 x_param=x_param,
                 y_param=y_param,
                 color_choice=color_choice,
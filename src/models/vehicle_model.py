@@ -1,6 +1,12 @@
 # src/models/vehicle_model.py
 
+import numpy as np
+
 class Vehicle:
+    # __slots__で属性を固定しちゃうよ～メモリも軽いし属性アクセスも速いの！
+    __slots__ = ('mass', 'initial_position', 'position', 'initial_velocity', 'velocity',
+                 'acceleration', 'deceleration', 'max_acceleration')
+
     def __init__(self, config: dict):
         # マジヤバイ！車の基本データをセットアップしちゃうよ～
         self.mass = config['mass']  # 車の重さ、重いと止まりにくいんだって！
@@ -23,4 +29,88 @@ class Vehicle:
         self.acceleration = 0.0  # 加速度をリセット、止まった状態から始めるの
         self.deceleration = 0.0  # 減速度もリセット、ブレーキかけてない状態
         self.velocity = self.initial_velocity  # 速度を初期値に戻す、スタート時点の速さに
-        self.position = self.initial_position  # 位置も初期値に戻す、スタート地点に戻るってこと！
\ No newline at end of file
+        self.position = self.initial_position  # 位置も初期値に戻す、スタート地点に戻るってこと！
+
+
+class VehicleBatch:
+    """
+    N台分の車両状態を連続した配列（Struct-of-Arrays）で保持する
+
+    各配列のi番目がi台目の車両を表し、update_state/resetはVehicleと同じ式を
+    全車両に対してベクトル演算で一括適用する（配列はその場で更新される）。
+    """
+
+    __slots__ = ('mass', 'initial_position', 'position', 'initial_velocity', 'velocity',
+                 'acceleration', 'deceleration', 'max_acceleration')
+
+    def __init__(self, mass, initial_position, initial_velocity, max_acceleration=0.0):
+        """
+        Args:
+            mass: 質量[kg]（配列またはスカラー）
+            initial_position: 初期位置[m]
+            initial_velocity: 初速[m/s]
+            max_acceleration: 最大加速度[m/s^2]
+        """
+        size = np.broadcast(*(np.array(value, ndmin=1) for value in
+                              (mass, initial_position, initial_velocity, max_acceleration))).shape[0]
+        self.mass = self._broadcast(mass, size)
+        self.initial_position = self._broadcast(initial_position, size)
+        self.initial_velocity = self._broadcast(initial_velocity, size)
+        self.max_acceleration = self._broadcast(max_acceleration, size)
+        self.position = self.initial_position.copy()
+        self.velocity = self.initial_velocity.copy()
+        self.acceleration = np.zeros(size)
+        self.deceleration = np.zeros(size)
+
+    @staticmethod
+    def _broadcast(value, size: int) -> np.ndarray:
+        """スカラーまたは配列を長さsizeのfloat64配列にそろえる"""
+        array = np.array(value, dtype=np.float64, ndmin=1)
+        if array.shape[0] == size:
+            return array
+        return np.broadcast_to(array, (size,)).copy()
+
+    @classmethod
+    def from_vehicles(cls, vehicles) -> 'VehicleBatch':
+        """Vehicleのリストから初期状態をまとめたVehicleBatchを作る"""
+        return cls(
+            mass=[vehicle.mass for vehicle in vehicles],
+            initial_position=[vehicle.initial_position for vehicle in vehicles],
+            initial_velocity=[vehicle.initial_velocity for vehicle in vehicles],
+            max_acceleration=[vehicle.max_acceleration for vehicle in vehicles]
+        )
+
+    def __len__(self) -> int:
+        return self.position.shape[0]
+
+    def update_state(self, time_step: float, mask: np.ndarray = None):
+        """
+        全車両（maskを指定した場合はmaskがTrueの車両のみ）の速度と位置を1ステップ進める
+
+        Args:
+            time_step: 時間刻み[s]
+            mask: 更新対象を表すbool配列。Noneなら全車両
+        """
+        if mask is None:
+            self.velocity += (self.acceleration - self.deceleration) * time_step
+            self.position += self.velocity * time_step
+        else:
+            velocity = self.velocity + (self.acceleration - self.deceleration) * time_step
+            np.copyto(self.velocity, velocity, where=mask)
+            np.copyto(self.position, self.position + self.velocity * time_step, where=mask)
+
+    def reset(self):
+        """全車両を初期状態に戻す"""
+        self.acceleration.fill(0.0)
+        self.deceleration.fill(0.0)
+        np.copyto(self.velocity, self.initial_velocity)
+        np.copyto(self.position, self.initial_position)
+
+    def vehicle(self, index: int) -> Vehicle:
+        """index番目の車両を、初期状態を持つスカラーのVehicleとして取り出す"""
+        return Vehicle({
+            'mass': float(self.mass[index]),
+            'initial_position': float(self.initial_position[index]),
+            'initial_velocity': float(self.initial_velocity[index]),
+            'max_acceleration': float(self.max_acceleration[index])
+        })
@@ -0,0 +1,107 @@
+# src/scripts/run_asil_calculation.py
+
+import argparse
+import csv
+import os
+import multiprocessing
+import sys
+from functools import partial
+from src.asil_calculation.asil_calculator import ASILCalculator
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.utils.profiling import ProfileSession, profile_report_path
+
+ASIL_COLUMNS = ('ASIL', 'S', 'E', 'C')
+
+def process_asil_chunk(chunk, scenario_type=None, with_context=False):
+    # チャンクの行にASILを付けちゃうよ～列ごとにまとめてcalculate_columnsで一括計算するの！
+    # 衝突タイプと進行方向は行のシナリオ種別（無ければscenario_type）の定義から補うよ
+    # with_context=Trueなら補った衝突タイプと進行方向も出力の行に残すの（結果ストアはこっち）
+    # 補えない無効な行はvalidate_columnsがcalculateと同じQM/S0/E4/C3にしてくれるよ
+    asil_calculator = ASILCalculator()
+    if not chunk:
+        return []
+    filled = fill_asil_context(chunk, scenario_type)
+    if with_context:
+        chunk = filled
+    try:
+        asil = asil_calculator.calculate_columns({key: [row.get(key) for row in filled] for key in filled[0]})
+    except Exception:
+        # まとめて計算できないときは1行ずつ、エラーの行は(元の行, エラーメッセージ)で返すの！
+        return [process_asil_row(asil_calculator, row, context_row) for row, context_row in zip(chunk, filled)]
+    values = [asil[key].tolist() for key in ASIL_COLUMNS]
+    return [(dict(row, **dict(zip(ASIL_COLUMNS, row_values))), None)
+            for row, row_values in zip(chunk, zip(*values))]
+
+def fill_asil_context(chunk, scenario_type=None):
+    # ASIL判定用に衝突タイプと進行方向を補ったコピーを作るよ、補えない行はそのまま使うの
+    engine = BatchSimulationEngine({}, scenario_type)
+    return [dict(row) if filled is None else filled
+            for row, filled in zip(chunk, engine.fill_asil_context(chunk, strict=False))]
+
+def process_asil_row(asil_calculator, row, context_row=None):
+    try:
+        asil = asil_calculator.calculate(dict(context_row if context_row is not None else row))
+        return dict(row, **{key: asil[key] for key in ASIL_COLUMNS}), None
+    except Exception as e:
+        return row, str(e)
+
+def run_asil_calculation(input_file: str, output_file: str, chunk_size: int = 1000, profile: bool = False,
+                         scenario_type: str = None):
+    # シミュレーション結果のCSVにASILを付けて保存するよ、マルチプロセスで爆速！
+    # scenario_type: 'シナリオ種別'列が無い行のシナリオ種別（シミュレーションの--scenario-typeと同じにしてね）
+    # pandas・tqdm・キューブはここでだけ使うから、ここで読み込むの（process_asil_chunkのワーカーは読まなくていい！）
+    import pandas as pd
+    from tqdm import tqdm
+    from src.visualization.asil_cube import save_cube_for_results
+
+    report_path = profile_report_path(output_file) if profile else None
+    with ProfileSession(report_path) as profiler:
+        with profiler.stage('csv_read'):
+            with open(input_file, 'r', encoding='utf-8-sig') as infile:
+                data = list(csv.DictReader(infile))
+        if not data:
+            print(f"警告: 入力ファイル {input_file} にデータがありません。")
+            return
+
+        chunks = [data[start:start + chunk_size] for start in range(0, len(data), chunk_size)]
+        rows = []
+        with profiler.stage('asil'), multiprocessing.Pool() as pool:
+            for results in tqdm(pool.imap(partial(process_asil_chunk, scenario_type=scenario_type), chunks), total=len(chunks), desc="ASIL", unit="chunk"):
+                for row, error in results:
+                    if error is not None:
+                        print(f"No {row.get('No')} の処理中にエラーが発生しました: {error}")
+                        profiler.count('failed_rows')
+                    rows.append(row)
+        profiler.count('rows', len(rows))
+
+        with profiler.stage('csv_write'):
+            os.makedirs(os.path.dirname(output_file) or '.', exist_ok=True)
+            with open(output_file, 'w', newline='', encoding='utf-8-sig') as outfile:
+                # エラーの行にはASIL列が無いから、全行のキーを集めてヘッダーにするの
+                fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+                writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+                writer.writeheader()
+                writer.writerows(rows)
+
+        # マップ用にASILを集計したキューブも結果の隣に置いとくよ（X/Yを変えても切り出すだけ！）
+        # 作れなくても（QMCの結果みたいに軸が格子じゃないとか）結果のCSVはもう書けてるから止めないの
+        with profiler.stage('asil_cube'):
+            reason = save_cube_for_results(pd.DataFrame(rows), output_file)
+        if reason:
+            print(f"ASILキューブは作りませんでした（マップはCSVから集計します）: {reason}")
+    print(f"ASIL計算完了。結果は {output_file} に保存されました。")
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='シミュレーション結果CSVにASILを付けて書き出す')
+    parser.add_argument('--input', default='data/output/simulation_results.csv')
+    parser.add_argument('--output', default='data/output/simulation_results_with_asil.csv')
+    parser.add_argument('--profile', action='store_true',
+                        help='ステージごとの実時間・CPU時間を <output>_profile.json に書き出す')
+    parser.add_argument('--scenario-type', default='unintended_acceleration',
+                        help="'シナリオ種別'列が無い行のシナリオ種別（衝突タイプと進行方向の判定に使う）")
+    args = parser.parse_args(argv)
+    run_asil_calculation(args.input, args.output, profile=args.profile, scenario_type=args.scenario_type)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+# src/scripts/run_benchmarks.py
+
+import argparse
+import gc
+import json
+import logging
+import math
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import cycle, islice
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data_generation.data_generator import DataGenerator, DEFAULT_USER_INPUT
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.asil_calculation.asil_calculator import ASILCalculator
+from src.visualization.asil_map_generator import ASILMapGenerator
+from src.scripts.run_simulation import build_config, process_rows
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+BASELINE_PATH = os.path.join(ROOT_DIR, 'tests', 'benchmark_baselines.json')
+DEFAULT_THRESHOLD = 1.5  # ベースラインの1.5倍より遅くなったら退行とみなすよ（共有マシンの揺れを見込んだ値）
+# 1回の計測がこれより短いと、CPU時間の刻み（10ms）や揺れだけで倍率が1.5を超えちゃうから、何回かまとめて測るの
+MIN_SAMPLE_SECONDS = 0.5
+
+CONFIG = dict(build_config(), write_log=False)  # ログ書き込みは測りたいものじゃないから切っておくの
+
+# ベンチマーク名 → (準備関数, 繰り返し回数)。準備関数は(計測する関数, 処理件数)を返す
+Workload = Callable[[], Tuple[Callable[[], Any], int]]
+_CACHE: Dict[str, Any] = {}
+
+
+def sweep_rows(count: int) -> List[Dict[str, Any]]:
+    """main()の標準スイープの行をcount件まで繰り返して並べる（Noは振り直す）"""
+    if 'sweep' not in _CACHE:
+        _CACHE['sweep'] = DataGenerator().generate_data(DEFAULT_USER_INPUT)
+    return [dict(row, No=float(no)) for no, row in enumerate(islice(cycle(_CACHE['sweep']), count), start=1)]
+
+
+def simulated_rows(count: int) -> List[Dict[str, Any]]:
+    """シミュレーション結果付きの行（ASIL計算の入力、ASIL列は含まない）"""
+    key = f'simulated_{count}'
+    if key not in _CACHE:
+        rows = without_logging(lambda: BatchSimulationEngine(CONFIG).evaluate_rows(sweep_rows(count)))()
+        _CACHE[key] = [{k: v for k, v in row.items() if k not in ('ASIL', 'S', 'E', 'C')} for row in rows]
+    return _CACHE[key]
+
+
+def without_logging(function: Callable[[], Any]) -> Callable[[], Any]:
+    """ログを止めてfunctionを実行する関数（無効な行ごとのlogging.errorは測りたいものじゃないの）"""
+    def run():
+        logging.disable(logging.CRITICAL)
+        try:
+            return function()
+        finally:
+            logging.disable(logging.NOTSET)
+    return run
+
+
+def bench_generator():
+    generator = DataGenerator()
+    rows = len(generator.generate_data(DEFAULT_USER_INPUT))
+    return (lambda: generator.generate_data(DEFAULT_USER_INPUT)), rows
+
+
+def bench_generator_array():
+    # 重さ・反応時間を増やして刻みを細かくした、160万行くらいのスイープ
+    user_input = dict(DEFAULT_USER_INPUT, weight=[50, 55, 60, 2500, 3000], rtime=[0.8, 1.2, 1.5],
+                      tset_step=0.1, accset_step=0.01)
+    generator = DataGenerator()
+    rows = len(generator.generate_array(user_input))
+    return (lambda: generator.generate_array(user_input)), rows
+
+
+def bench_engine_reference(count: int) -> Workload:
+    def setup():
+        rows = sweep_rows(count)
+        return (lambda: process_rows(rows, CONFIG)), count
+    return setup
+
+
+def bench_engine_reference_events(count: int) -> Workload:
+    # イベントのステップだけログに残すとき（log_mode='events'）
+    def setup():
+        rows = sweep_rows(count)
+        config = dict(CONFIG, log_mode='events')
+        return (lambda: process_rows(rows, config)), count
+    return setup
+
+
+def bench_engine_batch(count: int) -> Workload:
+    def setup():
+        rows = sweep_rows(count)
+        return (lambda: BatchSimulationEngine(CONFIG).run_rows(rows)), count
+    return setup
+
+
+def bench_asil_per_row(count: int) -> Workload:
+    def setup():
+        rows = simulated_rows(count)
+        calculator = ASILCalculator()
+        return without_logging(lambda: [calculator.calculate(row) for row in rows]), count
+    return setup
+
+
+def bench_asil_columns(count: int) -> Workload:
+    def setup():
+        rows = simulated_rows(count)
+        columns = {key: [row[key] for row in rows] for key in rows[0]}
+        calculator = ASILCalculator()
+        return without_logging(lambda: calculator.calculate_columns(columns)), count
+    return setup
+
+
+def bench_asil_map(size: int) -> Workload:
+    def setup():
+        # size x size の格子、各セルに2行（重複の集約も通る）
+        x, y = np.meshgrid(np.arange(size, dtype=float), np.arange(size, dtype=float))
+        x, y = np.tile(x.ravel(), 2), np.tile(y.ravel(), 2)
+        asil = np.array(['QM', 'A', 'B', 'C', 'D'], dtype=object)[(x.astype(int) + y.astype(int)) % 5]
+        data = pd.DataFrame({'x': x, 'y': y, 'ASIL': asil})
+        output_dir = tempfile.mkdtemp(prefix='asil_map_bench_')
+        generator = ASILMapGenerator()
+        return (lambda: generator.generate_asil_map(data.copy(), 'x', 'y', '1', output_dir)), len(data)
+    return setup
+
+
+def bench_import(module: str) -> Workload:
+    # 新しいインタプリタでモジュールを読み込むだけ（プールのワーカーやCLIの起動ごとに払う時間）
+    def setup():
+        command = [sys.executable, '-c', f'import {module}']
+        return (lambda: subprocess.run(command, cwd=ROOT_DIR, check=True)), 1
+    return setup
+
+
+BENCHMARKS: Dict[str, Tuple[Workload, int]] = {
+    'generator_main_sweep': (bench_generator, 5),
+    'generator_array_1m': (bench_generator_array, 3),
+    'engine_reference_10k': (bench_engine_reference(10_000), 1),
+    'engine_reference_100k': (bench_engine_reference(100_000), 1),
+    'engine_reference_events_10k': (bench_engine_reference_events(10_000), 1),
+    'engine_batch_10k': (bench_engine_batch(10_000), 10),
+    'engine_batch_100k': (bench_engine_batch(100_000), 1),
+    'asil_per_row_100k': (bench_asil_per_row(100_000), 1),
+    'asil_columns_100k': (bench_asil_columns(100_000), 3),
+    'asil_map_100x100': (bench_asil_map(100), 3),
+    'asil_map_1000x1000': (bench_asil_map(1000), 1),
+    'import_cli': (bench_import('src.cli'), 5),
+    'import_simulate': (bench_import('src.scripts.run_simulation'), 5),
+    'import_asil': (bench_import('src.scripts.run_asil_calculation'), 5),
+}
+
+
+def cpu_time() -> float:
+    """このプロセスと、終了を待った子プロセスのCPU時間の合計"""
+    times = os.times()
+    return times.user + times.system + times.children_user + times.children_system
+
+
+def measure(function: Callable[[], Any], repeats: int) -> Tuple[float, float]:
+    """
+    repeats回実行して最短の実時間とCPU時間（1回あたり）を返す（GCは計測の外で済ませておく）
+
+    退行の判定には他のプロセスの影響を受けにくいCPU時間を使う。
+    CPU時間には終了した子プロセスの分も含める（import_*は子プロセスで測る）。
+    repeats > 1 なら初回はウォームアップとして計測から外し、その時間がMIN_SAMPLE_SECONDSより短ければ
+    1回の計測でMIN_SAMPLE_SECONDSを超えるまで続けて実行して、回数で割る。
+    """
+    loops = 1
+    if repeats > 1:
+        start = time.perf_counter()
+        function()
+        loops = max(1, math.ceil(MIN_SAMPLE_SECONDS / max(time.perf_counter() - start, 1e-6)))
+    best_wall = best_cpu = float('inf')
+    for _ in range(repeats):
+        gc.collect()
+        wall, cpu = time.perf_counter(), cpu_time()
+        for _ in range(loops):
+            function()
+        best_wall = min(best_wall, (time.perf_counter() - wall) / loops)
+        best_cpu = min(best_cpu, (cpu_time() - cpu) / loops)
+    return best_wall, best_cpu
+
+
+def run_benchmarks(names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+    """
+    ベンチマークを実行する
+
+    Returns:
+        Dict[str, Dict[str, float]]: ベンチマーク名 → seconds（最短の実時間）, cpu_seconds（最短のCPU時間）,
+        rows, rows_per_second
+    """
+    results = {}
+    for name in names or list(BENCHMARKS):
+        setup, repeats = BENCHMARKS[name]
+        function, rows = setup()
+        seconds, cpu_seconds = measure(function, repeats)
+        results[name] = {'seconds': seconds, 'cpu_seconds': cpu_seconds, 'rows': rows,
+                         'rows_per_second': rows / seconds if seconds else None}
+    return results
+
+
+def load_baselines(path: str = BASELINE_PATH) -> Dict[str, Any]:
+    if not os.path.exists(path):
+        return {'benchmarks': {}}
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_baselines(results: Dict[str, Dict[str, float]], path: str = BASELINE_PATH):
+    """結果をベースラインとして保存する（指定したベンチマークだけ上書きする）"""
+    baselines = load_baselines(path)
+    baselines['benchmarks'].update(results)
+    baselines['machine'] = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(baselines, f, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def find_regressions(results: Dict[str, Dict[str, float]], baselines: Dict[str, Any],
+                     threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """
+    CPU時間がベースラインのthreshold倍より遅くなったベンチマークの説明のリスト
+    （ベースラインが無いものは比較しない）
+    """
+    regressions = []
+    for name, result in results.items():
+        baseline = baselines['benchmarks'].get(name)
+        if baseline and result['cpu_seconds'] > baseline['cpu_seconds'] * threshold:
+            regressions.append(f"{name}: CPU {result['cpu_seconds']:.3f}s（ベースライン {baseline['cpu_seconds']:.3f}s の "
+                               f"{result['cpu_seconds'] / baseline['cpu_seconds']:.2f} 倍、許容 {threshold:.2f} 倍）")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='代表的な処理のベンチマークを実行してベースラインと比較する')
+    parser.add_argument('names', nargs='*', help=f'実行するベンチマーク（省略時は全部）: {", ".join(BENCHMARKS)}')
+    parser.add_argument('--update', action='store_true', help='結果をベースラインとして保存する')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='退行とみなす倍率')
+    parser.add_argument('--baseline', default=BASELINE_PATH, help='ベースラインのJSONファイル')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"未知のベンチマークです: {unknown}")
+
+    results = run_benchmarks(args.names or None)
+    baselines = load_baselines(args.baseline)
+    for name, result in results.items():
+        baseline = baselines['benchmarks'].get(name)
+        ratio = f"{result['cpu_seconds'] / baseline['cpu_seconds']:.2f}x" if baseline else '-'
+        print(f"{name:28s} {result['seconds']:9.3f}s (CPU {result['cpu_seconds']:.3f}s) "
+              f"{result['rows_per_second'] or 0:12.0f} rows/s  {ratio}")
+
+    if args.update:
+        save_baselines(results, args.baseline)
+        print(f"ベースラインを {args.baseline} に保存しました。")
+        return 0
+    regressions = find_regressions(results, baselines, args.threshold)
+    for regression in regressions:
+        print(f"退行: {regression}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
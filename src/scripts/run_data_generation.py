@@ -0,0 +1,49 @@
+# src/scripts/run_data_generation.py
+
+import argparse
+import os
+import sys
+from src.data_generation.data_generator import DataGenerator, DEFAULT_USER_INPUT
+from src.utils import functions
+
+def build_user_input(args):
+    # 指定されたものだけ標準のスイープ条件を上書きしちゃうよ
+    user_input = dict(DEFAULT_USER_INPUT)
+    if args.weight:
+        user_input['weight'] = args.weight
+    if args.rtime:
+        user_input['rtime'] = args.rtime
+    if args.evasive:
+        user_input['evasiveset'] = args.evasive
+    for name, values in (('vset', args.vset), ('tset', args.tset), ('accset', args.accset)):
+        if values:
+            user_input[f'{name}_start'], user_input[f'{name}_end'], user_input[f'{name}_step'] = values
+    return user_input
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='スイープ条件から入力CSV（accel_in.csv）を生成する')
+    parser.add_argument('--output', default='data/input/accel_in.csv')
+    parser.add_argument('--weight', type=float, nargs='+', help='先行車質量[kg]の一覧')
+    parser.add_argument('--rtime', type=float, nargs='+', help='後続車反応時間[sec]の一覧')
+    parser.add_argument('--vset', type=float, nargs=3, metavar=('START', 'END', 'STEP'), help='後続車速度[km/h]の範囲')
+    parser.add_argument('--tset', type=float, nargs=3, metavar=('START', 'END', 'STEP'), help='車間時間[sec]の範囲')
+    parser.add_argument('--accset', type=float, nargs=3, metavar=('START', 'END', 'STEP'), help='後続車加速度[G]の範囲')
+    parser.add_argument('--evasive', type=float, nargs=4, metavar=('NONE', 'C0', 'C1', 'C2'),
+                        help='回避行動パラメータ')
+    args = parser.parse_args(argv)
+
+    try:
+        data = DataGenerator().generate_data(build_user_input(args))
+    except ValueError as e:
+        print(f"エラー: {e}")
+        return 1
+    if not data:
+        print("エラー: 条件に合う行がありません。")
+        return 1
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    functions.save_data_to_csv(data, args.output)
+    print(f"{len(data)} 行のデータを {args.output} に保存しました。")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,62 @@
+# src/scripts/run_differential.py
+
+import argparse
+import csv
+import json
+import os
+import sys
+from src.data_generation.data_generator import DataGenerator, DEFAULT_USER_INPUT
+from src.simulation.differential_harness import DifferentialHarness, registered_engines
+from src.scripts.run_simulation import build_config
+
+def load_rows(input_file=None):
+    # 入力CSVが無ければmain()の標準スイープをそのまま使っちゃうよ
+    if input_file is None:
+        return DataGenerator().generate_data(DEFAULT_USER_INPUT)
+    with open(input_file, 'r', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='高速エンジンの結果を基準エンジンと突き合わせる（差分があれば終了コード1）')
+    parser.add_argument('engines', nargs='*', help=f'比較するエンジン（省略時は全部）: {", ".join(registered_engines())}')
+    parser.add_argument('--input', help='入力CSV（省略時はDataGeneratorの標準スイープ）')
+    parser.add_argument('--output', help='差分レポートのJSONファイル')
+    parser.add_argument('--sample-size', type=int, default=500, help='抽出する行数（0なら全行）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-tolerance', type=float, default=0.0, help='衝突時刻の許容誤差[s]')
+    parser.add_argument('--position-tolerance', type=float, default=0.0, help='衝突位置の許容誤差[m]')
+    parser.add_argument('--speed-tolerance', type=float, default=0.0, help='有効衝突速度の許容誤差')
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.engines if name not in registered_engines()]
+    if unknown:
+        parser.error(f"未登録のエンジンです: {unknown}")
+
+    harness = DifferentialHarness(build_config(), tolerances={
+        '衝突時刻': args.time_tolerance,
+        '衝突位置': args.position_tolerance,
+        '有効衝突速度': args.speed_tolerance,
+    }, sample_size=args.sample_size, seed=args.seed)
+    report = harness.run(load_rows(args.input), args.engines or None)
+
+    print(f"{report['sample_size']}行 基準({report['reference']}): {report['reference_seconds']:.2f}s")
+    for name, result in report['engines'].items():
+        status = 'OK' if result['passed'] else 'NG'
+        print(f"{name:12s} {status} 反転:{len(result['flips']):>4} 数値:{len(result['numeric_mismatches']):>4} "
+              f"{result['seconds']:.2f}s")
+        # 反転は記録Noごとに全部出す、数値のずれは多いと埋もれるから先頭だけ
+        for flip in result['flips']:
+            print(f"  反転 No {flip['No']} {flip['field']}: {flip['reference']} → {flip['candidate']}")
+        for mismatch in result['numeric_mismatches'][:20]:
+            print(f"  数値 No {mismatch['No']} {mismatch['field']}: {mismatch['reference']} → "
+                  f"{mismatch['candidate']} (差 {mismatch['difference']:.6g})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=str)
+        print(f"レポートは {args.output} に保存されました。")
+    return 0 if report['passed'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
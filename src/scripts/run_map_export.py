@@ -0,0 +1,34 @@
+# src/scripts/run_map_export.py
+
+import argparse
+import sys
+from src.visualization.asil_map_generator import ASILMapGenerator
+from src.visualization.batch_export import export_maps
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='ASIL計算済みの結果から、軸の組とファセットの全組み合わせのASILマップを並列で一括出力する')
+    parser.add_argument('--input', default='data/output/simulation_results_with_asil.csv')
+    parser.add_argument('--output-dir', default='data/output/asil_maps/batch')
+    parser.add_argument('--pair', nargs=2, action='append', metavar=('X', 'Y'),
+                        help='出力する軸の組（複数指定可、省略時は値が2つ以上ある軸の全部の組）')
+    parser.add_argument('--facet', action='append', default=[], help='値ごとに別のマップにする軸（複数指定可）')
+    parser.add_argument('--color', choices=sorted(ASILMapGenerator().color_maps), default='1',
+                        help='カラーマップの番号（GUIと同じ）')
+    parser.add_argument('--annotate', action=argparse.BooleanOptionalAction, default=None,
+                        help='セルにASILの文字を書く（省略時はセルの数と大きさで自動）')
+    parser.add_argument('--workers', type=int, default=None, help='プロセス数（省略時はCPU数）')
+    args = parser.parse_args(argv)
+
+    try:
+        result = export_maps(args.input, args.output_dir, pairs=[tuple(pair) for pair in args.pair or []] or None,
+                             facets=args.facet, color_choice=args.color, annotate=args.annotate,
+                             workers=args.workers)
+    except (ValueError, OSError) as e:
+        print(f"エラー: {e}")
+        return 1
+    print(f"{len(result['maps'])} 枚のマップを {result['seconds']:.1f}s で出力しました。索引: {result['index']}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+# src/scripts/run_qmc_study.py
+
+import argparse
+import csv
+import json
+import os
+import sys
+from src.data_generation.qmc_sampler import DEFAULT_RANGES, METHODS, QMCSampler
+from src.simulation.qmc_study import QMCStudy
+from src.scripts.run_simulation import build_config
+
+def parse_ranges(ranges, choices):
+    # '--range 列名=下限:上限' と '--choices 列名=値,値' で標準の範囲を上書き・追加しちゃうよ
+    result = dict(DEFAULT_RANGES)
+    for item in ranges:
+        column, bounds = item.rsplit('=', 1)
+        low, high = (float(value) for value in bounds.split(':'))
+        result[column] = (low, high)
+    for item in choices:
+        column, values = item.rsplit('=', 1)
+        result[column] = [float(value) for value in values.split(',')]
+    return result
+
+class RowStreamWriter:
+    # 評価済みのバッチを来た順にCSVへ追記するの、メモリに全部溜めないから長い検討でも安心！
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.file = open(path, 'w', newline='', encoding='utf-8-sig')
+        self.writer = None
+
+    def __call__(self, rows):
+        if self.writer is None:
+            self.writer = csv.DictWriter(self.file, fieldnames=list(rows[0]), extrasaction='ignore')
+            self.writer.writeheader()
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='Sobol列/ラテン超方格でシナリオを抽出し、ASILの分布が収束するまでシミュレーションする')
+    parser.add_argument('--method', choices=METHODS, default='sobol')
+    parser.add_argument('--range', action='append', default=[], metavar='列名=下限:上限',
+                        help='連続値で振る列（例: 後続車反応時間[sec]=0.8:1.5）')
+    parser.add_argument('--choices', action='append', default=[], metavar='列名=値,値',
+                        help='離散値から選ぶ列（例: 先行車質量[kg]=50,2500）')
+    parser.add_argument('--tolerance', type=float, default=0.01, help='信頼区間の半幅がこれ以下で収束')
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--batch-size', type=int, default=1024)
+    parser.add_argument('--max-samples', type=int, default=1_000_000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', default='data/output/qmc_study.json', help='推定結果のJSON')
+    parser.add_argument('--rows-output', help='評価した行を逐次書き出すCSV')
+    args = parser.parse_args(argv)
+
+    sampler = QMCSampler(parse_ranges(args.range, args.choices), method=args.method, seed=args.seed)
+    study = QMCStudy(build_config(), sampler, batch_size=args.batch_size, tolerance=args.tolerance,
+                     confidence=args.confidence, max_samples=args.max_samples)
+    writer = RowStreamWriter(args.rows_output) if args.rows_output else None
+    try:
+        report = study.run(on_batch=writer)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    state = '収束' if report['converged'] else '未収束'
+    print(f"{report['samples']}件評価（除外 {report['rejected']}件, {report['seconds']:.1f}s）: {state} "
+          f"（半幅 {report['max_half_width']:.4f}）")
+    for level, estimate in report['estimates'].items():
+        print(f"  {level:3s} {estimate['proportion']:.4f}  [{estimate['low']:.4f}, {estimate['high']:.4f}]")
+
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"レポートは {args.output} に保存されました。")
+    return 0 if report['converged'] else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+# src/scripts/run_server.py
+
+import argparse
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.scripts.run_simulation import build_config
+from src.simulation.simulation_service import (DEFAULT_CACHE_SIZE, DEFAULT_MAX_BATCH, DEFAULT_MAX_WAIT,
+                                               ServiceError, SimulationService)
+
+def to_json(value) -> bytes:
+    # NumPyの値が混ざってても.item()でPythonの値にして書き出すよ
+    return json.dumps(value, ensure_ascii=False, default=lambda item: item.item()).encode('utf-8')
+
+class SimulationRequestHandler(BaseHTTPRequestHandler):
+    # POST /evaluate に1行（JSONオブジェクト）か複数行（配列）を送ると、同じ形で結果を返すよ
+    # GET /stats で集計、GET /health で生存確認！
+    protocol_version = 'HTTP/1.1'  # 接続を使い回せるから、1問ずつ聞くツールでも速いの
+    disable_nagle_algorithm = True  # ヘッダーと本文を別々に送るから、Nagleが効くと応答が40msくらい遅れちゃう
+
+    def do_GET(self):
+        if self.path == '/health':
+            self.send_json(200, {'status': 'ok'})
+        elif self.path == '/stats':
+            self.send_json(200, self.server.service.stats())
+        else:
+            self.send_json(404, {'error': f'{self.path} はありません'})
+
+    def do_POST(self):
+        if self.path != '/evaluate':
+            self.send_json(404, {'error': f'{self.path} はありません'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            payload = json.loads(self.rfile.read(length) or b'null')
+        except ValueError as e:
+            self.send_json(400, {'error': f'JSONを読めませんでした: {e}'})
+            return
+        rows = payload if isinstance(payload, list) else [payload]
+        if not all(isinstance(row, dict) for row in rows):
+            self.send_json(400, {'error': '行はJSONオブジェクト（列名: 値）で送ってください'})
+            return
+        try:
+            results = self.server.service.evaluate(rows, timeout=self.server.timeout_seconds)
+        except ServiceError as e:
+            self.send_json(503, {'error': str(e)})
+            return
+        self.send_json(200, results if isinstance(payload, list) else results[0])
+
+    def send_json(self, status, value):
+        body = to_json(value)
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def make_server(service, host='127.0.0.1', port=8765, timeout_seconds=30.0, verbose=False):
+    # サービスをくっつけたHTTPサーバーを作るよ（port=0なら空いてるポート）
+    server = ThreadingHTTPServer((host, port), SimulationRequestHandler)
+    server.daemon_threads = True
+    server.service = service
+    server.timeout_seconds = timeout_seconds
+    server.verbose = verbose
+    return server
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='エンジンを常駐させて、シナリオのASILを問い合わせられるローカルHTTPサーバーを起動する')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--scenario-type', default='unintended_acceleration')
+    parser.add_argument('--max-batch', type=int, default=DEFAULT_MAX_BATCH, help='1バッチにまとめる最大行数')
+    parser.add_argument('--max-wait-ms', type=float, default=DEFAULT_MAX_WAIT * 1000,
+                        help='同じバッチに相乗りする要求を待つ時間（ミリ秒）')
+    parser.add_argument('--cache-size', type=int, default=DEFAULT_CACHE_SIZE, help='キャッシュする結果の数（0で無効）')
+    parser.add_argument('--timeout', type=float, default=30.0, help='1要求の評価を待つ最長時間（秒）')
+    parser.add_argument('--verbose', action='store_true', help='要求ごとのアクセスログを出す')
+    args = parser.parse_args(argv)
+
+    service = SimulationService(build_config('batch', args.scenario_type), max_batch=args.max_batch,
+                                max_wait=args.max_wait_ms / 1000, cache_size=args.cache_size)
+    server = make_server(service, args.host, args.port, args.timeout, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"http://{host}:{port}/evaluate で待ち受けています（Ctrl+Cで終了）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,34 +1,257 @@
 # src/scripts/run_simulation.py
 
+import argparse
 import csv
 import os
 import multiprocessing
+import sys
+import traceback
 from functools import partial
-from tqdm import tqdm
-from src.simulation.simulation_engine import SimulationEngine
+from src.scripts.run_asil_calculation import process_asil_chunk
+from src.simulation.simulation_engine import ScenarioType, SimulationEngine
+from src.simulation.batch_engine import SCENARIO_TYPE_COLUMN, BatchSimulationEngine
+from src.simulation.scenario_registry import get_scenario
+from src.utils.checkpoint import ShardCheckpoint, config_hash, file_fingerprint
+from src.utils.input_schema import SchemaValidationError
+from src.utils.row_errors import RowFailure, error_sidecar_path, read_error_sidecar, write_error_sidecar
+from src.utils.background_job import split_chunks
+from src.utils import functions
+from src.utils.profiling import Profiler, ProfileSession, profile_report_path
+from src.utils.result_store import ResultStore, result_store_path
+from src.utils.trajectory_archive import TrajectoryArchive, trajectory_archive_path
+from src.visualization.live_preview import LivePreview, DEFAULT_X, DEFAULT_Y, DEFAULT_INTERVAL
 
-def process_row(row, config):
-    # マジヤバイ！1行分のデータを爆速で処理しちゃうよ～
-    sim_engine = SimulationEngine(config)  # シミュレーションエンジンを作成
-    sim_engine.load_data(row)  # データをロード
+# config['return_log']=Trueのとき、process_rowの結果にログ（軌跡）を入れるキー
+TRAJECTORY_KEY = '軌跡'
+# referenceエンジンの入力列（SimulationEngine.load_dataと同じ列と単位変換）
+REFERENCE_SCHEMA = get_scenario(ScenarioType.UNINTENDED_ACCELERATION.value).schema
+
+def parse_reference_inputs(rows, profiler=None):
+    # 行の文字列を列ごとにまとめてfloatにしちゃうよ、1行ずつfloat()するより速いの！
+    if profiler is None:
+        return REFERENCE_SCHEMA.parse_dicts(rows)
+    with profiler.stage('load_data'):
+        return REFERENCE_SCHEMA.parse_dicts(rows)
+
+def simulate_typed(inputs, index, row, config, profiler=None):
+    # パース済みの列のindex行目をシミュレーションするよ
+    sim_engine = SimulationEngine(config, profiler)  # シミュレーションエンジンを作成
+    sim_engine.load_typed(inputs, index, row.get('No', 'unknown'))  # データをロード
     sim_engine.run_simulation()  # シミュレーション実行
-    return sim_engine.get_results()  # 結果をゲット
+    results = sim_engine.get_results()  # 結果をゲット
+    if config.get('return_log'):
+        results[TRAJECTORY_KEY] = sim_engine.log_data  # 結果ストアに軌跡を入れるときは親プロセスに持って帰るよ
+    return results
+
+def process_row(row, config, profiler=None):
+    # マジヤバイ！1行分のデータを爆速で処理しちゃうよ～不正な値はSchemaValidationErrorで止めるの
+    typed = parse_reference_inputs([row], profiler)
+    typed.raise_for_errors()
+    return simulate_typed(typed.columns, 0, row, config, profiler)
+
+def process_row_safe(row, config, profiler=None):
+    # 1行だけ失敗してもバッチ全体は止めないよ！例外はRowFailureにして返すの
+    try:
+        return process_row(row, config, profiler)
+    except Exception as e:
+        return RowFailure(row.get('No'), f'{type(e).__name__}: {e}', traceback.format_exc())
+
+def process_rows(rows, config, profiler=None):
+    # チャンクの入力はスキーマで1回だけパースして、1行ずつload_typedで回しちゃう！
+    # 不正な値の行も計算で落ちた行もRowFailureで返すから、残りの行はちゃんと計算されるよ
+    try:
+        typed = parse_reference_inputs(rows, profiler)
+    except SchemaValidationError as e:
+        # 必須列が無いのは全行ダメなの
+        return [RowFailure(row.get('No'), f'{type(e).__name__}: {e}', traceback.format_exc()) for row in rows]
+    failures = {}
+    for error in typed.errors:
+        failures.setdefault(error.row, RowFailure(rows[error.row].get('No'), f'ValueError: {error.message}'))
+    results = []
+    for index, row in enumerate(rows):
+        if index in failures:
+            results.append(failures[index])
+            continue
+        try:
+            results.append(simulate_typed(typed.columns, index, row, config, profiler))
+        except Exception as e:
+            results.append(RowFailure(row.get('No'), f'{type(e).__name__}: {e}', traceback.format_exc()))
+    return results
 
-def process_batch(batch, config):
+def run_rows_one_by_one(engine, batch):
+    # 1行ずつ計算して、失敗した行だけRowFailureにするよ（原因の行がわからないときの切り分け用）
+    results = []
+    for row in batch:
+        try:
+            results.append(engine.run_rows([row])[0])
+        except Exception as e:
+            results.append(RowFailure(row.get('No'), f'{type(e).__name__}: {e}', traceback.format_exc()))
+    return results
+
+def process_batch_engine(batch, config):
+    # ベクトル化エンジンでも不正な行だけ外して、残りはまとめて計算しちゃう！
+    engine = BatchSimulationEngine(config)
+    try:
+        return engine.run_rows(batch)
+    except SchemaValidationError as e:
+        if e.missing_columns:
+            raise  # 列が無いのは全行ダメだから止めるよ
+        # エラーの行番号はbatchの中の位置（シナリオ種別が混ざっていてもエンジンが直してくれるの）
+        failures = {}
+        for error in e.errors:
+            failures.setdefault(error.row, RowFailure(error.record_id, f'ValueError: {error.message}'))
+    except Exception:
+        # どの行が原因かわからないときは1行ずつ計算して切り分けるの
+        return run_rows_one_by_one(engine, batch)
+    valid = [index for index in range(len(batch)) if index not in failures]
+    try:
+        results = dict(zip(valid, engine.run_rows([batch[index] for index in valid]) if valid else []))
+    except Exception:
+        # 不正な値を外してもダメなら、残りも1行ずつ切り分けちゃう
+        results = dict(zip(valid, run_rows_one_by_one(engine, [batch[index] for index in valid])))
+    return [failures[index] if index in failures else results[index] for index in range(len(batch))]
+
+def process_rows_profiled(rows, config):
+    # ワーカーの中で計測しながら処理して、結果と計測値を一緒に返すよ
+    profiler = Profiler()
+    results = process_rows(rows, config, profiler)
+    return results, profiler.state()
+
+def process_batch(batch, config, profiler=None):
     # 超ヤバイ！複数の行を同時に処理しちゃうよ～マルチプロセスで爆速！
+    # 失敗した行の結果はRowFailureになるから、呼び出し側で振り分けてね
+    profiling = profiler is not None and profiler.enabled
+    if config.get('engine') == 'batch':
+        # ベクトル化エンジンならシナリオ種別ごとに一括計算、プロセスプールもいらないの！
+        if not profiling:
+            return process_batch_engine(batch, config)
+        with profiler.stage('batch_engine'):
+            return process_batch_engine(batch, config)
     with multiprocessing.Pool() as pool:
-        # poolを使って複数のプロセスで同時に処理するの
-        return list(pool.map(partial(process_row, config=config), batch))
+        # poolを使って複数のプロセスで同時に処理するの、入力のパースはワーカーがチャンクごとにまとめてやるよ
+        if not profiling:
+            # pool.mapの既定と同じくワーカー1つあたり4チャンくらいに分けて、重い行が偏っても待たないの
+            chunks = split_chunks(batch, -(-len(batch) // (4 * (os.cpu_count() or 1))))
+            return [result for chunk_results in pool.map(partial(process_rows, config=config), chunks)
+                    for result in chunk_results]
+        # 計測するときはワーカーごとにまとめて渡して、計測値を親に集めるの
+        chunks = split_chunks(batch, -(-len(batch) // (os.cpu_count() or 1)))
+        results = []
+        for chunk_results, state in pool.map(partial(process_rows_profiled, config=config), chunks):
+            results.extend(chunk_results)
+            profiler.merge(state)
+        return results
+
+def process_chunk(chunk, config):
+    # GUIのプロセスプールから呼ばれる1チャンク分の処理、プールの中だからプールは作らないよ！
+    # 失敗した行はRowFailureで返すから、1行ダメでもジョブ全体は止まらないの
+    if config.get('engine') == 'batch':
+        return process_batch_engine(chunk, config)
+    return process_rows(chunk, config)
+
+def build_output_rows(batch, results, result_fieldnames, scenario_fieldnames):
+    # 元のフィールド + シミュレーション結果の出力行を作るよ（失敗した行は飛ばすの）
+    for original_row, result_row in zip(batch, results):
+        if isinstance(result_row, RowFailure):
+            continue
+        output_row = original_row.copy()
+        for scenario in scenario_fieldnames:
+            for result in result_fieldnames:
+                # シナリオ種別が混ざってると、その種別に無い結果の列もあるから'N/A'にしとくの
+                output_row[f'{result}[{scenario}]'] = result_row[scenario].get(result, 'N/A')
+        yield output_row
 
-def run_simulations(input_file: str, output_file: str, batch_size: int = 1000):
+def build_errors(batch, results, start):
+    # 失敗した行をエラーサイドカー用の辞書にするよ、行番号は入力のデータ部の0始まり
+    return [result.as_row(start + position) for position, result in enumerate(results)
+            if isinstance(result, RowFailure)]
+
+def build_config(engine: str = 'reference', scenario_type: str = 'unintended_acceleration'):
     # シミュレーションの設定をセットアップ、マジ重要！
-    config = {
+    return {
         'time_step': 0.1,  # 時間の刻み幅、0.1秒ごとにシミュレーション
         'max_simulation_time': 10.0,  # 最大シミュレーション時間、10秒で打ち切り
         'acceleration_jerk': 1.0 * 9.81,  # 加速度の変化率、重力加速度の1.0倍
         'deceleration_jerk': 2.5 * 9.81,  # 減速度の変化率、重力加速度の2.5倍
+        'engine': engine,  # 'reference'は1行ずつのSimulationEngine、'batch'はベクトル化エンジン
+        'scenario_type': scenario_type,  # batchエンジンの既定シナリオ種別（行の'シナリオ種別'列が優先）
     }
 
+# 結果を変える設定（--resumeのチェックポイントのハッシュに入れるのはこれだけ）
+# ログの記録方法や結果ストア・アーカイブへの出力の切り替えは結果を変えないから、付け外ししても再開できるよ
+RESULT_CONFIG_KEYS = ('time_step', 'max_simulation_time', 'acceleration_jerk', 'deceleration_jerk', 'engine',
+                      'scenario_type')
+
+def result_config(config):
+    # 設定のうち結果を変える項目だけ
+    return {key: config[key] for key in RESULT_CONFIG_KEYS if key in config}
+
+def get_result_fieldnames(config, scenario_types=()):
+    # 結果の列名、batchエンジンはシナリオ種別が決めるの
+    # 行ごとのシナリオ種別が混ざってたら、出てくる種別の結果の列を全部並べるよ（既定の種別の列が先）
+    if config.get('engine') != 'batch':
+        return list(functions.RESULT_NAMES)
+    names = []
+    default = config.get('scenario_type', ScenarioType.UNINTENDED_ACCELERATION.value)
+    for scenario_type in [default] + sorted(scenario_types):
+        names.extend(name for name in get_scenario(scenario_type).result_names if name not in names)
+    return names
+
+def scenario_types_in(rows):
+    # 行のシナリオ種別の列に出てくる種別を集めるよ（読めない種別はその行の計算で失敗するから飛ばす）
+    scenario_types = set()
+    for row in rows:
+        try:
+            scenario_types.add(ScenarioType(row[SCENARIO_TYPE_COLUMN]).value)
+        except (KeyError, ValueError):
+            pass
+    return scenario_types
+
+def scan_input(input_path, config):
+    # 入力の行数と、batchエンジンなら行ごとのシナリオ種別に出てくる種別を数えるよ
+    # シナリオ種別の列が無ければ行を数えるだけだから速いの
+    with open(input_path, 'r', encoding='utf-8-sig', newline='') as f:
+        header = next(csv.reader(f), [])
+        if config.get('engine') != 'batch' or SCENARIO_TYPE_COLUMN not in header:
+            return sum(1 for _ in f), set()
+        column = header.index(SCENARIO_TYPE_COLUMN)
+        total_rows = 0
+        values = set()
+        for record in csv.reader(f):
+            total_rows += 1
+            if column < len(record):
+                values.add(record[column])
+    return total_rows, scenario_types_in({SCENARIO_TYPE_COLUMN: value} for value in values)
+
+def timed_rows(reader, profiler):
+    # CSVの読み込み（1行ずつのパース）にかかった時間も測っちゃうよ
+    rows = iter(reader)
+    while True:
+        with profiler.stage('csv_read'):
+            row = next(rows, None)
+        if row is None:
+            return
+        yield row
+
+def run_simulations(input_file: str, output_file: str, batch_size: int = 1000,
+                    engine: str = 'reference', scenario_type: str = 'unintended_acceleration',
+                    resume: bool = False, retry_failed: bool = False,
+                    profile: bool = False, cprofile: bool = False, trace_memory: bool = False,
+                    preview: str = None, preview_axes=(DEFAULT_X, DEFAULT_Y),
+                    preview_interval: float = DEFAULT_INTERVAL, store: str = None,
+                    trajectory_archive: str = None, log_mode: str = 'full', log_every: int = 0):
+    # preview: PNGのパスを渡すと、チャンクが終わるたびにASILマップのプレビューを描き直すよ（間隔は間引くの）
+    # store: SQLiteのパスを渡すと、チャンクごとに結果とASIL（referenceエンジンなら軌跡も）を書き込むよ
+    # trajectory_archive: パスを渡すと、軌跡を記録ごとのCSVじゃなくて1つのバイナリアーカイブに追記するよ
+    # log_mode: 'events'ならイベントのステップ（＋log_everyステップごとの間引き）だけ、'none'なら軌跡を記録しないの
+    config = build_config(engine, scenario_type)
+    if log_mode != 'full':
+        # 既定の'full'は設定に入れないよ（ログの記録方法はチェックポイントのハッシュには入らないの）
+        config.update(log_mode=log_mode, log_every=log_every)
+    if (store or trajectory_archive) and engine != 'batch':
+        # 軌跡はCSVのログの代わりにストアやアーカイブに入れるの
+        config.update(return_log=True, write_log=False)
+
     # ファイルのパスを設定、超便利！
     root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
     input_path = os.path.join(root_dir, input_file)
@@ -37,53 +260,226 @@ def run_simulations(input_file: str, output_file: str, batch_size: int = 1000):
     
     os.makedirs(log_dir, exist_ok=True)  # ログディレクトリを作成
 
-    # 入力ファイルの行数をカウント、進捗バーのために必要なの！
-    with open(input_path, 'r', encoding='utf-8-sig') as f:
-        total_rows = sum(1 for _ in f) - 1  # ヘッダー行を除外
+    # profile=Trueならステージごとの時間とカウンターを <output>_profile.json に書き出すよ
+    report_path = profile_report_path(output_path) if profile else None
+    with ProfileSession(report_path, cprofile=cprofile, trace_memory=trace_memory) as profiler:
+        if retry_failed:
+            # 前回失敗した行だけやり直して、出力CSVの元の位置に差し込むよ
+            retry_failed_rows(input_path, output_path, config, profiler)
+        else:
+            sweep(input_path, output_path, config, batch_size, resume, profiler,
+                  preview and (os.path.join(root_dir, preview), preview_axes, preview_interval),
+                  store and os.path.join(root_dir, store),
+                  trajectory_archive and os.path.join(root_dir, trajectory_archive))
+    if report_path:
+        print(f"プロファイル結果は {report_path} に保存されました。")
 
-    with open(input_path, 'r', encoding='utf-8-sig') as infile, \
-         open(output_path, 'w', newline='', encoding='utf-8-sig') as outfile:
-        
-        reader = csv.DictReader(infile)
-        original_fieldnames = reader.fieldnames
-        result_fieldnames = [
-            '衝突有無', '衝突時刻', '衝突位置', '有効衝突速度'
-        ]
-        scenario_fieldnames = ['回避無し', 'C0', 'C1', 'C2']
+def sweep(input_path, output_path, config, batch_size, resume, profiler, preview=None, store_path=None,
+          archive_path=None):
+    # 入力ファイルの行数をカウント、進捗バーのために必要なの！結果の列を決めるシナリオ種別もここで集めちゃう
+    total_rows, scenario_types = scan_input(input_path, config)
+
+    # preview = (PNGのパス, (X軸, Y軸), 間隔)。再開でスキップしたチャンクはプレビューには入らないよ
+    live_preview = None
+    if preview:
+        path, (x_param, y_param), interval = preview
+        live_preview = LivePreview(path, x_param, y_param, total_rows=total_rows, interval=interval,
+                                   scenario_type=config.get('scenario_type'))
+
+    # 結果ストアは再開なら前回の続きに書き足して、そうじゃなければ作り直すよ
+    store = ResultStore(store_path, reset=not resume) if store_path else None
+    archive = TrajectoryArchive(archive_path, 'a' if resume else 'w') if archive_path else None
+
+    try:
+        # チャンクごとにシャードを書いてマニフェストに記録、落ちても--resumeで続きからできちゃう！
+        # 結果を変える設定・チャンクサイズ・入力ファイルが変わったら別の実行だから再開しないよ
+        run_hash = config_hash(result_config(config), batch_size, file_fingerprint(input_path))
+        checkpoint = ShardCheckpoint(output_path + '.shards', run_hash).open(resume=resume)
+        if checkpoint.completed:
+            print(f"{len(checkpoint.completed)} チャンク（{checkpoint.completed_rows} 行）は完了済みなのでスキップします。")
+
+        with open(input_path, 'r', encoding='utf-8-sig') as infile:
+            reader = csv.DictReader(infile)
+            original_fieldnames = reader.fieldnames
+            result_fieldnames = get_result_fieldnames(config, scenario_types)
+            scenario_fieldnames = ['回避無し', 'C0', 'C1', 'C2']
         
-        # 出力用のフィールド名を作成、元のフィールド + シミュレーション結果
-        fieldnames = original_fieldnames + [
-            f'{result}[{scenario}]' for scenario in scenario_fieldnames
-            for result in result_fieldnames
-        ]
-        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
-        writer.writeheader()  # ヘッダーを書き込み
-
-        batch = []
-        for row in tqdm(reader, total=total_rows, desc="Processing", unit="row"):
-            batch.append(row)
-            if len(batch) >= batch_size:
-                # バッチサイズに達したら処理開始！超効率的！
-                results = process_batch(batch, config)
-                for original_row, result_row in zip(batch, results):
-                    output_row = original_row.copy()
-                    for scenario in scenario_fieldnames:
-                        for result in result_fieldnames:
-                            output_row[f'{result}[{scenario}]'] = result_row[scenario][result]
-                    writer.writerow(output_row)
-                batch = []  # バッチをリセット
-
-        # 残りのデータを処理、最後までしっかりやるよ！
-        if batch:
-            results = process_batch(batch, config)
-            for original_row, result_row in zip(batch, results):
-                output_row = original_row.copy()
-                for scenario in scenario_fieldnames:
-                    for result in result_fieldnames:
-                        output_row[f'{result}[{scenario}]'] = result_row[scenario][result]
-                writer.writerow(output_row)
+            # 出力用のフィールド名を作成、元のフィールド + シミュレーション結果
+            fieldnames = original_fieldnames + [
+                f'{result}[{scenario}]' for scenario in scenario_fieldnames
+                for result in result_fieldnames
+            ]
+
+            def store_rows(output_rows):
+                # ASILの付け方はrun_asil_calculationと同じprocess_asil_chunkにお任せ、CSVの段とずれないの！
+                # 補った衝突タイプと進行方向も絞り込みに使えるようにストアに入れておくよ
+                store.insert_rows(row for row, _ in process_asil_chunk(output_rows, config.get('scenario_type'),
+                                                                       with_context=True))
 
+            def flush(index, start, batch):
+                # 終わったチャンクは読み飛ばすだけ、計算し直さないの！
+                if checkpoint.is_done(index):
+                    profiler.count('checkpoint_hits')
+                    if store is not None:
+                        # 再開で初めて--storeを付けたときのために、結果の行はシャードから入れ直すよ
+                        # （同じNoは置き換えだから重複しないの。軌跡はシャードに無いから入らないよ）
+                        with profiler.stage('result_store'):
+                            store_rows(checkpoint.read_shard(index, fieldnames))
+                    return
+                results = process_batch(batch, config, profiler)
+                errors = build_errors(batch, results, start)
+                output_rows = list(build_output_rows(batch, results, result_fieldnames, scenario_fieldnames))
+                trajectories = [(row.get('No'), result[TRAJECTORY_KEY]) for row, result in zip(batch, results)
+                                if isinstance(result, dict) and TRAJECTORY_KEY in result]
+                # 結果ストアとアーカイブはシャードより先に書くよ。シャードが完了になってから止まっても軌跡は失くさないの
+                # （シャードの前に止まったら再開でチャンクごと計算し直して、同じNoの行も軌跡も置き換えるだけ）
+                if store is not None:
+                    with profiler.stage('result_store'):
+                        store_rows(output_rows)
+                        store.insert_trajectories(trajectories)
+                if archive is not None:
+                    with profiler.stage('trajectory_archive'):
+                        archive.extend(trajectories)
+                        archive.flush()
+                with profiler.stage('write_shard'):
+                    checkpoint.write_shard(index, start, start + len(batch), fieldnames, output_rows, errors)
+                profiler.count('rows', len(batch))
+                profiler.count('failed_rows', len(errors))
+                if live_preview is not None:
+                    with profiler.stage('live_preview'):
+                        live_preview.update(output_rows)
+
+            from tqdm import tqdm  # 進捗バーはスイープするときだけ要るから、ここで読み込むよ（ワーカーは読まなくていいの）
+
+            batch = []
+            index = 0
+            for row in tqdm(timed_rows(reader, profiler), total=total_rows, desc="Processing", unit="row"):
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    # バッチサイズに達したら処理開始！超効率的！
+                    flush(index, index * batch_size, batch)
+                    batch = []  # バッチをリセット
+                    index += 1
+
+            # 残りのデータを処理、最後までしっかりやるよ！
+            if batch:
+                flush(index, index * batch_size, batch)
+            if live_preview is not None:
+                live_preview.close()
+                print(f"ASILマップのプレビューは {live_preview.output_path} に保存されました。")
+    finally:
+        # 途中で止まっても結果ストアとアーカイブは閉じるよ（書き込んだ分はそのまま見られて、--resumeで続きを書き足せるの）
+        if store is not None:
+            with profiler.stage('result_store_index'):
+                store.close()
+        if archive is not None:
+            archive.close()
+    if store is not None:
+        print(f"結果ストアは {store.path} に保存されました。")
+    if archive is not None:
+        print(f"軌跡アーカイブ（{len(archive)} 件）は {archive.path} に保存されました。")
+
+    # 全チャンクが揃ったらシャードを順番通りにくっつけて1つのCSVにするよ
+    with profiler.stage('merge'):
+        checkpoint.merge(output_path, fieldnames)
+    failed = write_error_sidecar(error_sidecar_path(output_path), checkpoint.errors)
+    checkpoint.cleanup()
     print(f"シミュレーション完了。結果は {output_path} に保存されました。")
-    
+    report_failures(output_path, failed)
+
+def report_failures(output_path, failed):
+    if failed:
+        print(f"{failed} 行の処理に失敗しました。詳細は {error_sidecar_path(output_path)} を見てね。"
+              "入力を直したら --retry-failed で失敗した行だけやり直せます。")
+
+def retry_failed_rows(input_path, output_path, config, profiler=None):
+    # エラーサイドカーに載っている行だけ計算し直して、成功した行を出力CSVの元の位置に入れるの！
+    errors_path = error_sidecar_path(output_path)
+    failed = {error['行番号'] for error in read_error_sidecar(errors_path)}
+    if not failed:
+        print(f"{errors_path} に失敗した行はありません。")
+        return
+
+    with open(input_path, 'r', encoding='utf-8-sig') as infile:
+        retry_rows = {index: row for index, row in enumerate(csv.DictReader(infile)) if index in failed}
+    indices = sorted(retry_rows)
+    results = process_batch([retry_rows[index] for index in indices], config, profiler)
+    # 前回の出力と同じ列にするから、シナリオ種別は入力全体から集めるの
+    result_fieldnames = get_result_fieldnames(config, scan_input(input_path, config)[1])
+    scenario_fieldnames = ['回避無し', 'C0', 'C1', 'C2']
+
+    retried = {}
+    errors = []
+    for index, result in zip(indices, results):
+        if isinstance(result, RowFailure):
+            errors.append(result.as_row(index))
+        else:
+            retried[index] = next(build_output_rows([retry_rows[index]], [result],
+                                                    result_fieldnames, scenario_fieldnames))
+
+    # 入力の順番で、前回の出力行と今回成功した行を並べ直して書き直すよ
+    with open(input_path, 'r', encoding='utf-8-sig') as infile, \
+         open(output_path, 'r', newline='', encoding='utf-8-sig') as previous, \
+         open(output_path + '.tmp', 'w', newline='', encoding='utf-8-sig') as outfile:
+        previous_rows = csv.DictReader(previous)
+        writer = csv.DictWriter(outfile, fieldnames=previous_rows.fieldnames)
+        writer.writeheader()
+        for index, _ in enumerate(csv.DictReader(infile)):
+            if index in retried:
+                writer.writerow(retried[index])
+            elif index not in failed:
+                writer.writerow(next(previous_rows))
+    os.replace(output_path + '.tmp', output_path)
+    write_error_sidecar(errors_path, errors)
+    print(f"{len(retried)} 行をやり直して {output_path} に追加しました。")
+    report_failures(output_path, len(errors))
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='CSVの全行をシミュレーションして結果CSVを書き出す')
+    parser.add_argument('--input', default='data/input/accel_in.csv', help='入力CSV（リポジトリルートからの相対パス）')
+    parser.add_argument('--output', default='data/output/simulation_results.csv', help='出力CSV')
+    parser.add_argument('--batch-size', type=int, default=1000, help='1チャンク（1シャード）の行数')
+    parser.add_argument('--engine', choices=['reference', 'batch'], default='reference')
+    parser.add_argument('--scenario-type', default='unintended_acceleration')
+    parser.add_argument('--resume', action='store_true', help='前回の実行で完了したチャンクをスキップして続きから実行する')
+    parser.add_argument('--retry-failed', action='store_true',
+                        help='エラーサイドカー（<output>_errors.csv）の行だけやり直して出力CSVに差し込む')
+    parser.add_argument('--profile', action='store_true',
+                        help='ステージごとの実時間・CPU時間とカウンターを <output>_profile.json に書き出す')
+    parser.add_argument('--cprofile', action='store_true', help='--profileにcProfileの結果も含める（親プロセスのみ）')
+    parser.add_argument('--tracemalloc', action='store_true', help='--profileにtracemallocのピークメモリも含める')
+    parser.add_argument('--preview', metavar='PNG',
+                        help='実行中にチャンクごとのASILを集計して、このPNGにマップのプレビューを描き直す')
+    parser.add_argument('--preview-axes', nargs=2, metavar=('X', 'Y'), default=[DEFAULT_X, DEFAULT_Y],
+                        help='プレビューの軸の列')
+    parser.add_argument('--preview-interval', type=float, default=DEFAULT_INTERVAL,
+                        help='プレビューを描き直す最短間隔（秒）')
+    parser.add_argument('--store', nargs='?', const='', metavar='SQLITE',
+                        help='結果とASIL（referenceエンジンなら軌跡も）をSQLiteにも書き込む（パス省略時は <output>.sqlite）')
+    parser.add_argument('--trajectory-archive', nargs='?', const='', metavar='TRAJ',
+                        help='軌跡を記録ごとのCSVの代わりに1つのバイナリアーカイブに書き込む'
+                             '（referenceエンジンのみ。パス省略時は <output>_trajectories.traj）')
+    parser.add_argument('--log-mode', choices=['full', 'events', 'none'], default='full',
+                        help='軌跡の記録方法（referenceエンジンのみ）: full=全ステップ、'
+                             'events=加速度飽和・反応時間経過・最大減速度到達・衝突・安全状態などのステップだけ、none=記録しない')
+    parser.add_argument('--log-every', type=int, default=0, metavar='N',
+                        help='--log-mode eventsで、イベントに加えてNステップごとにも記録する（0なら記録しない）')
+    return parser.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.store == '':
+        args.store = result_store_path(args.output)
+    if args.trajectory_archive == '':
+        args.trajectory_archive = trajectory_archive_path(args.output)
+    run_simulations(args.input, args.output, batch_size=args.batch_size, engine=args.engine,
+                    scenario_type=args.scenario_type, resume=args.resume, retry_failed=args.retry_failed,
+                    profile=args.profile or args.cprofile or args.tracemalloc,
+                    cprofile=args.cprofile, trace_memory=args.tracemalloc, preview=args.preview,
+                    preview_axes=tuple(args.preview_axes), preview_interval=args.preview_interval,
+                    store=args.store, trajectory_archive=args.trajectory_archive,
+                    log_mode=args.log_mode, log_every=args.log_every)
+    return 0
+
 if __name__ == "__main__":
-    run_simulations('data/input/accel_in.csv', 'data/output/simulation_results.csv')
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,39 @@
+# src/scripts/run_surrogate_sweep.py
+
+import argparse
+import csv
+import sys
+from src.simulation.adaptive_sweep import METHOD_COLUMN
+from src.simulation.differential_harness import get_engine, registered_engines
+from src.simulation.surrogate import SurrogateSweep
+from src.scripts.run_simulation import build_config
+from src.utils.functions import save_rows_to_csv
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description='スイープの一部だけシミュレーションして、残りは近傍の結果から予測する（信頼度が低い点はシミュレーション）')
+    parser.add_argument('--input', default='data/input/accel_in.csv')
+    parser.add_argument('--output', default='data/output/surrogate_results_with_asil.csv')
+    parser.add_argument('--threshold', type=float, default=1.0, help='この信頼度未満の予測はシミュレーションに回す')
+    parser.add_argument('--initial-fraction', type=float, default=0.1, help='最初にシミュレーションする行の割合')
+    parser.add_argument('--batch-size', type=int, default=2000, help='1ラウンドで追加シミュレーションする行数')
+    parser.add_argument('--k', type=int, default=8, help='近傍の数')
+    parser.add_argument('--engine', choices=registered_engines(), default='reference')
+    args = parser.parse_args(argv)
+
+    with open(args.input, 'r', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+    sweep = SurrogateSweep(build_config(), threshold=args.threshold, initial_fraction=args.initial_fraction,
+                           batch_size=args.batch_size, k=args.k, evaluate=get_engine(args.engine))
+    result = sweep.run(rows)
+    stats = result['stats']
+    print(f"{stats['rows']} 行のうち {stats['simulated']} 行をシミュレーション、{stats['predicted']} 行を予測 "
+          f"({stats['simulated_fraction']:.1%}, {stats['rounds']} ラウンド, {stats['seconds']:.1f}s)")
+    if stats['uncertain_predicted']:
+        print(f"警告: 信頼度が閾値未満のまま予測した行が {stats['uncertain_predicted']} 行あります。")
+    save_rows_to_csv(result['rows'], args.output, last_columns=(METHOD_COLUMN,))
+    print(f"結果は {args.output} に保存されました。")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+# src/scripts/run_time_step_study.py
+
+import csv
+import json
+import os
+from src.simulation.time_step_study import TimeStepStudy
+
+def run_time_step_study(input_file: str, output_file: str, sample_size: int = 200):
+    # run_simulation.py と同じ設定で、time_stepだけを振って収束を確認するよ～
+    config = {
+        'time_step': 0.1,  # 今使ってる時間の刻み幅、短縮時間の見積りの基準
+        'max_simulation_time': 10.0,
+        'acceleration_jerk': 1.0 * 9.81,
+        'deceleration_jerk': 2.5 * 9.81,
+    }
+
+    root_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+    input_path = os.path.join(root_dir, input_file)
+    output_path = os.path.join(root_dir, output_file)
+
+    with open(input_path, 'r', encoding='utf-8-sig') as f:
+        rows = list(csv.DictReader(f))
+
+    study = TimeStepStudy(config, sample_size=sample_size)
+    report = study.run(rows)
+
+    # 刻み幅ごとの不一致数をざっくり表示
+    for step in report['steps']:
+        mismatches = step['mismatches']
+        print(f"time_step={step['time_step']:<6} 衝突有無:{mismatches['collision']:>4} "
+              f"C:{mismatches['C']:>4} ASIL:{mismatches['ASIL']:>4} "
+              f"全体見積り:{step['estimated_full_sweep_seconds']:.1f}s")
+    print(f"収束点: {report['converged_at']}")
+    print(f"推奨time_step: {report['recommended_time_step']} "
+          f"(短縮見込み: {report['estimated_savings_seconds']:.1f}s)")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"レポートは {output_path} に保存されました。")
+
+if __name__ == "__main__":
+    run_time_step_study('data/input/accel_in.csv', 'data/output/time_step_study.json')
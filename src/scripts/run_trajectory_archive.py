@@ -0,0 +1,66 @@
+# src/scripts/run_trajectory_archive.py
+
+import argparse
+import csv
+import os
+import sys
+import numpy as np
+from src.simulation.simulation_engine import EVENT_COLUMN, EVENT_LOG_COLUMNS, LOG_COLUMNS
+from src.utils.functions import SCENARIO_NAMES
+from src.utils.trajectory_archive import ARCHIVE_COLUMNS, TrajectoryArchive, pack_log_directory
+
+# ログCSV（write_log_to_csv）で整数の列。アーカイブはfloat32だから、書き出すときに整数に戻すの
+INTEGER_COLUMNS = ['反応時間経過', EVENT_COLUMN]
+
+def format_steps(steps: np.ndarray) -> list:
+    # float32のまま文字列にすると、0.1が0.10000000149…にならずに済むの
+    text = steps.astype(str).astype(object)
+    for column in INTEGER_COLUMNS:
+        index = ARCHIVE_COLUMNS.index(column)
+        if index < steps.shape[1]:
+            text[:, index] = steps[:, index].astype(np.int64).astype(str)
+    return text.tolist()
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='軌跡アーカイブを作る・中身を取り出す')
+    parser.add_argument('archive', help='軌跡アーカイブのパス')
+    parser.add_argument('--pack', metavar='LOG_DIR',
+                        help='記録ごとのログCSV（simulation_log_record<No>.csv）をまとめてアーカイブを作り直す')
+    parser.add_argument('--no-compress', action='store_true', help='--packで差分+zlibの圧縮をしない')
+    parser.add_argument('--show', type=float, metavar='NO', help='記録Noの軌跡をCSVで標準出力に書く')
+    parser.add_argument('--scenario', choices=SCENARIO_NAMES, help='--showで出すシナリオ（省略時は全シナリオ）')
+    args = parser.parse_args(argv)
+
+    if args.pack:
+        result = pack_log_directory(args.pack, args.archive, compress=not args.no_compress)
+        ratio = result['archive_bytes'] / result['csv_bytes'] if result['csv_bytes'] else 0.0
+        print(f"{result['records']} 記録（{result['steps']} ステップ）を {args.archive} にまとめました。"
+              f" {result['csv_bytes']:,} → {result['archive_bytes']:,} バイト（{ratio:.0%}）")
+    with TrajectoryArchive(args.archive) as archive:
+        if args.show is None:
+            if not args.pack:
+                print(f"{args.archive}: {len(archive)} 件の軌跡")
+            return 0
+        # 軌跡をログCSVと同じ列の並び（シナリオ入り）で書き出すよ
+        scenarios = [args.scenario] if args.scenario else archive.scenarios(args.show)
+        if not scenarios or (args.show, scenarios[0]) not in archive:
+            print(f"エラー: No {args.show} の軌跡はありません。", file=sys.stderr)
+            return 1
+        position = LOG_COLUMNS.index('シナリオ')
+        trajectories = [(scenario, archive.read(args.show, scenario)) for scenario in scenarios]
+        writer = csv.writer(sys.stdout)
+        try:
+            # イベント列は--log-mode eventsの軌跡だけにあるから、見出しは列数に合わせるの
+            writer.writerow(EVENT_LOG_COLUMNS[:trajectories[0][1].shape[1] + 1])
+            for scenario, steps in trajectories:
+                for values in format_steps(steps):
+                    writer.writerow(values[:position] + [scenario] + values[position:])
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # `--show 5 | head` みたいに読む側が先に閉じたら、そこで静かにおしまい
+            # （残りの出力を捨てる先に差し替えないと、終了時のflushでまたエラーになっちゃう）
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
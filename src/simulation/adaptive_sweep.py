@@ -0,0 +1,220 @@
+# src/simulation/adaptive_sweep.py
+
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.asil_calculation.asil_calculator import ASILCalculator
+from src.data_generation.data_generator import DataGenerator
+from src.simulation.differential_harness import evaluate_batch
+from src.utils import functions
+
+# シミュレーションで決まる判定項目。セルの角で全部一致すれば内側を補間する
+# （EとASILは入力だけで決まるEを格子点ごとに計算し、補間したS/Cと組み合わせて求める）
+SIGNATURE_FIELDS = [f'衝突有無[{scenario}]' for scenario in functions.SCENARIO_NAMES] + ['S', 'C']
+# 各行がシミュレーションで求めたものか、角の判定から補間したものかを示す列
+METHOD_COLUMN = '判定方法'
+SIMULATED = 'シミュレーション'
+INTERPOLATED = '補間'
+
+_UNKNOWN = -1
+_INVALID = -2  # DataGeneratorの有効判定で除外される格子点（シミュレーションしない）
+
+# 格子のセル: (重さの番号, 反応時間の番号, (速度の範囲), (車間時間の範囲), (加速度の範囲))。範囲は両端を含む番号
+Cell = Tuple[int, int, Tuple[int, int], Tuple[int, int], Tuple[int, int]]
+
+
+class AdaptiveSweep:
+    """
+    粗い格子から始めて、判定が分かれるセルだけを細かくしていくスイープ
+
+    DataGeneratorと同じ速度×車間時間×加速度の格子（重さ・反応時間ごと）を、まずcoarse_stride
+    おきの粗い格子でシミュレーションする。セルの角の判定（SIGNATURE_FIELDSとASILの入力検証の
+    結果）が全部一致すれば内側の格子点はその判定で埋め、分かれていれば各軸を半分に割って角を
+    追加でシミュレーションする。これを元の刻みまで繰り返すので、衝突有無・S・Cの境界付近だけが
+    細かく計算される。Eは入力だけで決まるので、補間した点でも格子点ごとに正確に計算してASILを出す。
+
+    角が全部一致するセルの内側に小さな別の領域がある場合は見逃すため、結果は密な格子の近似になる。
+    精度はverify()で密な格子と比べて確認できる。
+    """
+
+    def __init__(self, config: Dict[str, Any], user_input: Dict[str, Any], coarse_stride: int = 8,
+                 evaluate: Optional[Callable[[List[Dict[str, Any]], Dict[str, Any]], List[Dict[str, Any]]]] = None):
+        """
+        Args:
+            config: シミュレーションの設定（ログは書き出さない）
+            user_input: DataGenerator.generate_dataと同じスイープ条件（この刻みが最終的な解像度）
+            coarse_stride: 最初の粗い格子の間隔（格子点の数）。2の累乗にすると全セルが均等に割れる
+            evaluate: 行のリストを評価する関数（既定はBatchSimulationEngine.evaluate_rows）
+        """
+        if coarse_stride < 1:
+            raise ValueError("coarse_strideは1以上にしてください")
+        self.config = dict(config, write_log=False)
+        self.user_input = user_input
+        self.coarse_stride = coarse_stride
+        self.evaluate = evaluate or evaluate_batch
+        self.generator = DataGenerator()
+        self.generator.validate_user_input(user_input)
+
+        self.weight = [float(value) for value in user_input['weight']]
+        self.rtime = [float(value) for value in user_input['rtime']]
+        self.axes = [self.generator.generate_range(user_input[f'{name}_start'], user_input[f'{name}_end'],
+                                                   user_input[f'{name}_step'])
+                     for name in ('vset', 'tset', 'accset')]
+        self.shape = (len(self.weight), len(self.rtime)) + tuple(len(axis) for axis in self.axes)
+
+        # 有効判定は加速度に依存しないので(重さ, 反応時間, 速度, 車間時間)で判定して加速度方向に広げる
+        kg, _, v, t = np.meshgrid(self.weight, self.rtime, self.axes[0], self.axes[1], indexing='ij')
+        valid = self.generator.valid_mask(kg.ravel(), v.ravel(), t.ravel()).reshape(kg.shape)
+        self.valid = np.broadcast_to(valid[..., np.newaxis], self.shape)
+        # 密な格子を作った場合のNo（generate_dataと同じ番号）
+        self.numbers = np.cumsum(self.valid.ravel()).reshape(self.shape).astype(float)
+        self.asil_calculator = ASILCalculator()
+        self.exposure, self.asil_valid = self._input_exposure(kg, v, t)
+
+    def _input_exposure(self, kg: np.ndarray, v: np.ndarray, t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        入力だけで決まるE値と、ASILCalculatorの入力検証（速度・車間距離・車間時間の範囲）の結果を
+        格子全体で求める（加速度方向に広げた配列で返す）
+        """
+        size = kg.size
+        columns = {
+            '後続車速度[km/h]': v.ravel(),
+            '車間距離[m]': self.generator.distance(v.ravel(), t.ravel()),
+            '車間時間[sec]': t.ravel(),
+            # functions.fill_asil_contextと同じ規約（100kg未満は歩行者）
+            '衝突タイプ': np.where(kg.ravel() < 100, '歩行者衝突', '車両衝突_前進').astype(object),
+            '進行方向': np.full(size, '前進', dtype=object),
+            '有効衝突速度[回避無し]': np.zeros(size),  # シミュレーション結果の列は範囲内のダミー
+        }
+        columns.update({f'衝突有無[{level}]': np.full(size, 'あり', dtype=object) for level in ('C0', 'C1', 'C2')})
+        asil = self.asil_calculator.calculate_columns(columns)
+        shape = kg.shape + (1,)
+        return (np.broadcast_to(asil['E'].reshape(shape), self.shape),
+                np.broadcast_to(asil['valid'].reshape(shape), self.shape))
+
+    def _row(self, index: Tuple[int, ...]) -> Dict[str, Any]:
+        """格子点の入力行（generate_dataの同じ格子点の行と同じ内容）"""
+        w, r, i, j, k = index
+        return self.generator.create_data_point(
+            int(self.numbers[index]), self.weight[w], self.axes[0][i], self.axes[2][k], self.rtime[r],
+            self.axes[1][j], self.user_input['evasiveset'])
+
+    def _coarse_cells(self) -> List[Cell]:
+        """
+        最初の粗い格子のセル（最後のセルは端数で短くなることがある）
+
+        速度0は停止扱い（車間距離を6km/hで計算する）で、走行中と連続しないから、
+        速度0と最初の正の速度の間では必ずセルを区切るよ。
+        """
+        def intervals(length, breaks=()):
+            nodes = sorted(set(range(0, length, self.coarse_stride)) | {length - 1} | set(breaks))
+            return list(zip(nodes[:-1], nodes[1:])) or [(0, 0)]
+        speed_breaks = [index for index, value in enumerate(self.axes[0]) if value > 0.0][:1]
+        return [(w, r, v, t, a)
+                for w in range(self.shape[0]) for r in range(self.shape[1])
+                for v in intervals(self.shape[2], speed_breaks)
+                for t in intervals(self.shape[3]) for a in intervals(self.shape[4])]
+
+    @staticmethod
+    def _corners(cell: Cell) -> List[Tuple[int, ...]]:
+        w, r, *ranges = cell
+        return [(w, r) + corner for corner in itertools.product(*[sorted(set(bounds)) for bounds in ranges])]
+
+    @staticmethod
+    def _split(cell: Cell) -> List[Cell]:
+        """長さが2以上の軸を真ん中で割る（全軸の長さが1以下ならもう割れない）"""
+        w, r, *ranges = cell
+        halves = [[(low, (low + high) // 2), ((low + high) // 2, high)] if high - low > 1 else [(low, high)]
+                  for low, high in ranges]
+        if all(len(half) == 1 for half in halves):
+            return []
+        return [(w, r) + child for child in itertools.product(*halves)]
+
+    def run(self) -> Dict[str, Any]:
+        """
+        適応的にスイープを実行する
+
+        Returns:
+            Dict[str, Any]: 'rows'（密な格子と同じ順番・Noの有効な行。SIGNATURE_FIELDSの判定と
+            METHOD_COLUMNを持ち、シミュレーションした行は衝突時刻などの結果も持つ）と'stats'
+        """
+        start = time.perf_counter()
+        signature_ids = np.where(self.valid, _UNKNOWN, _INVALID)
+        simulated = np.zeros(self.shape, dtype=bool)
+        signatures: List[Tuple[Any, ...]] = []
+        signature_lookup: Dict[Tuple[Any, ...], int] = {}
+        results: Dict[Tuple[int, ...], Dict[str, Any]] = {}
+
+        cells = self._coarse_cells()
+        passes = 0
+        while cells:
+            passes += 1
+            # このパスで必要な角をまとめて1回で評価する
+            pending = sorted({corner for cell in cells for corner in self._corners(cell)
+                              if self.valid[corner] and not simulated[corner]})
+            if pending:
+                for index, output in zip(pending, self.evaluate([self._row(index) for index in pending], self.config)):
+                    signature = tuple(output.get(field) for field in SIGNATURE_FIELDS) + (bool(self.asil_valid[index]),)
+                    if signature not in signature_lookup:
+                        signature_lookup[signature] = len(signatures)
+                        signatures.append(signature)
+                    signature_ids[index] = signature_lookup[signature]
+                    simulated[index] = True
+                    results[index] = output
+
+            next_cells = []
+            for cell in cells:
+                corner_ids = {int(signature_ids[corner]) for corner in self._corners(cell)}
+                if len(corner_ids) == 1 and _INVALID not in corner_ids:
+                    # 角が全部同じ判定なら、まだ決まってない内側の点をその判定で埋める
+                    w, r, (v0, v1), (t0, t1), (a0, a1) = cell
+                    box = (w, r, slice(v0, v1 + 1), slice(t0, t1 + 1), slice(a0, a1 + 1))
+                    fill = (~simulated[box]) & self.valid[box]
+                    signature_ids[box] = np.where(fill, corner_ids.pop(), signature_ids[box])
+                else:
+                    next_cells.extend(self._split(cell))
+            cells = next_cells
+
+        rows = []
+        for index in zip(*np.nonzero(self.valid)):
+            if simulated[index]:
+                row = dict(results[index])
+                row[METHOD_COLUMN] = SIMULATED
+            else:
+                row = functions.fill_asil_context(self._row(index))
+                row.update(zip(SIGNATURE_FIELDS, signatures[signature_ids[index]]))
+                if self.asil_valid[index]:
+                    row['E'] = int(self.exposure[index])
+                    row['ASIL'] = self.asil_calculator.determine_asil(row['S'], row['E'], row['C'])
+                else:
+                    row.update({'ASIL': 'QM', 'S': 0, 'E': 4, 'C': 3})  # ASILCalculator.calculateの無効な行と同じ
+                row[METHOD_COLUMN] = INTERPOLATED
+            rows.append(row)
+
+        dense_points = int(self.valid.sum())
+        stats = {
+            'dense_points': dense_points,
+            'simulated': int(simulated.sum()),
+            'interpolated': dense_points - int(simulated.sum()),
+            'simulated_fraction': int(simulated.sum()) / dense_points if dense_points else None,
+            'passes': passes,
+            'seconds': time.perf_counter() - start,
+        }
+        return {'rows': rows, 'stats': stats}
+
+    def verify(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        run()の結果を密な格子の全点シミュレーションと比べ、補間で判定が違った点を返す
+        （確認用。密な格子と同じだけ時間がかかる）
+        """
+        dense = self.evaluate(self.generator.generate_data(self.user_input), self.config)
+        mismatches = []
+        for row, expected in zip(rows, dense):
+            for field in SIGNATURE_FIELDS + ['E', 'ASIL']:
+                if row.get(field) != expected.get(field):
+                    mismatches.append({'No': expected['No'], 'field': field,
+                                       'dense': expected.get(field), 'adaptive': row.get(field)})
+        return mismatches
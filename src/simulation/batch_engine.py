@@ -0,0 +1,182 @@
+# src/simulation/batch_engine.py
+
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from src.simulation.simulation_engine import ScenarioType
+from src.simulation.scenario_registry import ScenarioDefinition, get_scenario
+from src.asil_calculation.asil_calculator import ASILCalculator
+from src.utils.input_schema import FieldError, SchemaValidationError
+
+# 行ごとにシナリオ種別を指定する列（ScenarioTypeの値）。無い行はエンジンの既定種別で計算する
+SCENARIO_TYPE_COLUMN = 'シナリオ種別'
+
+
+class BatchSimulationEngine:
+    """
+    シナリオ登録簿のベクトル化ソルバーで、複数行をまとめてシミュレーションする
+
+    SimulationEngineを1行ずつ回す代わりに、シナリオ種別ごとに行をまとめて
+    ソルバーを1回だけ呼ぶ。結果はSimulationEngine.get_results()と同じ形式で返す。
+    """
+
+    def __init__(self, config: Dict[str, Any], scenario_type: Union[ScenarioType, str, None] = None):
+        """
+        Args:
+            config: SimulationEngineと同じ設定（time_step, max_simulation_time, jerk）
+            scenario_type: 既定のシナリオ種別。省略時はconfig['scenario_type']、それも無ければ意図しない加速
+        """
+        self.config = config
+        self.scenario_type = ScenarioType(
+            scenario_type or config.get('scenario_type', ScenarioType.UNINTENDED_ACCELERATION.value))
+        self.asil_calculator = ASILCalculator()
+
+    def read_inputs(self, rows: List[Dict[str, Any]], definition: ScenarioDefinition) -> Dict[str, np.ndarray]:
+        """
+        入力行からシナリオ定義の入力列を列単位で一括パースし、単位変換済みの配列にする
+
+        Raises:
+            SchemaValidationError: 数値に変換できない値がある場合（全ての不正な行をerrorsに持つ）
+        """
+        typed = definition.schema.parse_dicts(rows)
+        typed.raise_for_errors()
+        return typed.columns
+
+    def run_columns(self, inputs: Dict[str, np.ndarray],
+                    scenario_type: Union[ScenarioType, str, None] = None) -> Dict[str, np.ndarray]:
+        """
+        単位変換済みの入力配列からシミュレーションを実行し、結果列を返す
+
+        Returns:
+            Dict[str, np.ndarray]: '結果名[レベル名]'の列と、ASIL判定用の'衝突タイプ'/'進行方向'の列。
+            衝突が無い行の数値はNaN
+        """
+        definition = get_scenario(scenario_type or self.scenario_type)
+        results = definition.solve(inputs, self.config)
+        columns = {f'{result}[{level}]': results[level][result]
+                   for level in definition.levels for result in definition.result_names}
+        columns.update(definition.asil_context(inputs))
+        return columns
+
+    def _group_rows(self, rows: List[Dict[str, Any]]) -> Dict[ScenarioType, List[int]]:
+        """行をシナリオ種別ごとの行番号リストにまとめる"""
+        groups: Dict[ScenarioType, List[int]] = {}
+        for index, row in enumerate(rows):
+            scenario_type = ScenarioType(row.get(SCENARIO_TYPE_COLUMN) or self.scenario_type)
+            groups.setdefault(scenario_type, []).append(index)
+        return groups
+
+    def _read_groups(self, rows: List[Dict[str, Any]]) -> List[Tuple[ScenarioType, List[int], Dict[str, np.ndarray]]]:
+        """
+        行をシナリオ種別ごとにまとめて入力をパースし、(シナリオ種別, 行番号リスト, 入力配列)のリストを返す
+
+        Raises:
+            SchemaValidationError: どれかの種別に不正な値や欠けた列がある場合。全ての種別のエラーをまとめて持ち、
+                errorsの行番号はグループ内ではなくrowsの中の位置
+        """
+        groups, errors, missing_columns = [], [], []
+        for scenario_type, indices in self._group_rows(rows).items():
+            definition = get_scenario(scenario_type)
+            try:
+                inputs = self.read_inputs([rows[index] for index in indices], definition)
+            except SchemaValidationError as e:
+                missing_columns.extend(column for column in e.missing_columns if column not in missing_columns)
+                errors.extend(FieldError(indices[error.row], error.record_id, error.column, error.value, error.message)
+                              for error in e.errors)
+                continue
+            groups.append((scenario_type, indices, inputs))
+        if errors or missing_columns:
+            raise SchemaValidationError(sorted(errors, key=lambda error: error.row), missing_columns)
+        return groups
+
+    def run_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Dict[str, Any]]]:
+        """
+        入力行をまとめてシミュレーションし、行ごとにSimulationEngine.get_results()と同じ形式の結果を返す
+        （衝突が無い項目は'N/A'）
+
+        Raises:
+            SchemaValidationError: 不正な値がある場合（errorsの行番号はrowsの中の位置）
+        """
+        outputs: List[Optional[Dict[str, Dict[str, Any]]]] = [None] * len(rows)
+        for scenario_type, indices, inputs in self._read_groups(rows):
+            definition = get_scenario(scenario_type)
+            results = definition.solve(inputs, self.config)
+            per_level = {
+                level: {result: self._to_python(results[level][result]) for result in definition.result_names}
+                for level in definition.levels
+            }
+            for position, index in enumerate(indices):
+                outputs[index] = {
+                    level: {result: values[position] for result, values in level_results.items()}
+                    for level, level_results in per_level.items()
+                }
+        return outputs
+
+    def evaluate_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        シミュレーションとASIL計算をまとめて行い、入力行に結果列とASIL/S/E/Cを追加した行を返す
+        （ASIL判定の衝突タイプ・進行方向は、行に無ければシナリオ種別の定義から補う）
+
+        Raises:
+            SchemaValidationError: 不正な値がある場合（errorsの行番号はrowsの中の位置）
+        """
+        outputs: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        for scenario_type, indices, inputs in self._read_groups(rows):
+            group = [rows[index] for index in indices]
+            columns = self.run_columns(inputs, scenario_type)
+            context = {key: columns.pop(key) for key in ('衝突タイプ', '進行方向')}
+            input_columns = {key: [row.get(key) for row in group]
+                             for key in self.asil_calculator.required_fields['basic'] if key in group[0]}
+            asil = self.asil_calculator.calculate_columns(
+                dict(input_columns, **columns),
+                context={key: value for key, value in context.items() if key not in input_columns})
+            converted = {key: self._to_python(values) for key, values in columns.items()}
+            converted.update({key: asil[key].tolist() for key in ('ASIL', 'S', 'E', 'C')})
+            for position, index in enumerate(indices):
+                output_row = dict(group[position])
+                for key in context:
+                    output_row.setdefault(key, context[key][position])
+                for key, values in converted.items():
+                    output_row[key] = values[position]
+                outputs[index] = output_row
+        return outputs
+
+    def fill_asil_context(self, rows: List[Dict[str, Any]], strict: bool = True) -> List[Optional[Dict[str, Any]]]:
+        """
+        結果行のコピーに、ASIL判定用の'衝突タイプ'/'進行方向'を行のシナリオ種別の定義から補って返す
+        （functions.fill_asil_contextと違い、後進なら後進の衝突タイプと進行方向になる。行にあればそのまま）
+
+        Args:
+            rows: 結果行のリスト
+            strict: Falseなら補えない行があっても例外にせず、その行だけNoneにする
+
+        Raises:
+            SchemaValidationError: strict=Trueで不正な値がある場合（errorsの行番号はrowsの中の位置）
+        """
+        if not strict:
+            try:
+                return self.fill_asil_context(rows)
+            except Exception:  # 不正な行（未登録のシナリオ種別も）が混ざっていたら1行ずつ補って、補えない行だけNone
+                filled: List[Optional[Dict[str, Any]]] = []
+                for row in rows:
+                    try:
+                        filled.append(self.fill_asil_context([row])[0])
+                    except Exception:
+                        filled.append(None)
+                return filled
+        outputs = [dict(row) for row in rows]
+        for scenario_type, indices, inputs in self._read_groups(rows):
+            context = get_scenario(scenario_type).asil_context(inputs)
+            for position, index in enumerate(indices):
+                for key, values in context.items():
+                    outputs[index].setdefault(key, values[position])
+        return outputs
+
+    @staticmethod
+    def _to_python(values: np.ndarray) -> List[Any]:
+        """結果配列をPythonの値のリストにする（数値のNaNは'N/A'）"""
+        values = np.asarray(values)
+        if values.dtype.kind == 'f':
+            return [('N/A' if value != value else value) for value in values.tolist()]
+        return values.tolist()
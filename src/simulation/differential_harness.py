@@ -0,0 +1,186 @@
+# src/simulation/differential_harness.py
+
+import math
+import random
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from src.simulation.simulation_engine import SimulationEngine
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.asil_calculation.asil_calculator import ASILCalculator
+from src.utils import functions
+
+# エンジン名 → evaluate(rows, config)。入力行に結果列（'結果名[レベル名]'）とASIL/S/E/Cを追加した行のリストを返す
+EngineEvaluator = Callable[[List[Dict[str, Any]], Dict[str, Any]], List[Dict[str, Any]]]
+
+# 数値として許容誤差つきで比較する結果（既定の許容誤差は完全一致）
+DEFAULT_TOLERANCES = {'衝突時刻': 0.0, '衝突位置': 0.0, '有効衝突速度': 0.0}
+# 1つでも違えば判定の反転として扱う項目
+CLASSIFICATION_FIELDS = [f'衝突有無[{scenario}]' for scenario in functions.SCENARIO_NAMES] + ['ASIL', 'S', 'E', 'C']
+
+_ENGINES: Dict[str, EngineEvaluator] = {}
+
+
+def register_engine(name: str, evaluate: EngineEvaluator) -> EngineEvaluator:
+    """比較対象のエンジンを登録する（解析解・可変刻みなど新しいエンジンはここに足す）"""
+    _ENGINES[name] = evaluate
+    return evaluate
+
+
+def unregister_engine(name: str) -> Optional[EngineEvaluator]:
+    """登録したエンジンを外す（テスト用のエンジンの後片付けなど）。未登録ならNoneを返す"""
+    return _ENGINES.pop(name, None)
+
+
+def registered_engines() -> List[str]:
+    return list(_ENGINES)
+
+
+def get_engine(name: str) -> EngineEvaluator:
+    """登録済みエンジンの評価関数を返す（未登録ならValueError）"""
+    if name not in _ENGINES:
+        raise ValueError(f"未登録のエンジンです: {name}")
+    return _ENGINES[name]
+
+
+def evaluate_reference(rows: List[Dict[str, Any]], config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """基準解: 1行ずつSimulationEngineで積分し、ASILCalculator.calculateで判定する"""
+    calculator = ASILCalculator()
+    outputs = []
+    for row in rows:
+        sim_engine = SimulationEngine(config)
+        sim_engine.load_data(row)
+        sim_engine.run_simulation()
+        result_row = functions.merge_simulation_results(row, sim_engine.get_results())
+        outputs.append(calculator.calculate(functions.fill_asil_context(result_row)))
+    return outputs
+
+
+def evaluate_batch(rows: List[Dict[str, Any]], config: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """ベクトル化エンジン（シミュレーションとASILの一括計算）"""
+    return BatchSimulationEngine(config).evaluate_rows(rows)
+
+
+register_engine('reference', evaluate_reference)
+register_engine('batch', evaluate_batch)
+
+
+class DifferentialHarness:
+    """
+    高速なエンジンの結果を基準エンジン（SimulationEngine + ASILCalculator）と突き合わせる
+
+    DataGeneratorのスイープから再現可能に行を抽出し、各エンジンで評価して、
+    衝突有無・ASIL/S/E/Cの反転と、衝突時刻などの数値の許容誤差超えを記録Noつきで列挙する。
+    """
+
+    def __init__(self, config: Dict[str, Any], tolerances: Optional[Dict[str, float]] = None,
+                 sample_size: int = 500, seed: int = 0, reference: str = 'reference'):
+        """
+        Args:
+            config: SimulationEngineの設定（ログは書き出さない）
+            tolerances: 結果名 → 許容する絶対誤差（'衝突時刻'などの'[レベル名]'無しの名前）
+            sample_size: スイープから抽出する行数（0以下なら全行）
+            seed: 抽出用の乱数シード
+            reference: 基準にするエンジン名
+        """
+        self.config = dict(config, write_log=False, log_mode='none')
+        self.tolerances = dict(DEFAULT_TOLERANCES, **(tolerances or {}))
+        self.sample_size = sample_size
+        self.seed = seed
+        self.reference = reference
+
+    def sample_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """スイープから評価用の行を再現可能な形で抽出する（元の順番を保つ）"""
+        if self.sample_size <= 0 or len(rows) <= self.sample_size:
+            return list(rows)
+        indices = sorted(random.Random(self.seed).sample(range(len(rows)), self.sample_size))
+        return [rows[index] for index in indices]
+
+    def compare(self, candidate: List[Dict[str, Any]], reference: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        2つのエンジンの出力を行ごとに比較する
+
+        Returns:
+            Dict[str, Any]: 'flips'（判定の反転）、'numeric_mismatches'（許容誤差超え）、
+            'max_abs_difference'（結果名ごとの最大絶対誤差、両方に数値がある行のみ）
+        """
+        flips = []
+        numeric_mismatches = []
+        max_difference = {name: 0.0 for name in self.tolerances}
+        for output, expected in zip(candidate, reference):
+            record_id = expected.get('No', 'unknown')
+            for field in CLASSIFICATION_FIELDS:
+                if output.get(field) != expected.get(field):
+                    flips.append({'No': record_id, 'field': field,
+                                  'reference': expected.get(field), 'candidate': output.get(field)})
+            for name, tolerance in self.tolerances.items():
+                for scenario in functions.SCENARIO_NAMES:
+                    field = f'{name}[{scenario}]'
+                    if field not in expected:
+                        continue
+                    difference = self._difference(output.get(field), expected[field])
+                    if difference is None:
+                        continue
+                    if math.isfinite(difference):
+                        max_difference[name] = max(max_difference[name], difference)
+                    if difference > tolerance:
+                        numeric_mismatches.append({'No': record_id, 'field': field, 'reference': expected[field],
+                                                   'candidate': output.get(field), 'difference': difference})
+        return {'flips': flips, 'numeric_mismatches': numeric_mismatches, 'max_abs_difference': max_difference}
+
+    @staticmethod
+    def _difference(value: Any, expected: Any) -> Optional[float]:
+        """数値同士なら絶対誤差、どちらも'N/A'ならNone、片方だけ数値なら無限大"""
+        def to_float(item):
+            try:
+                result = float(item)
+            except (TypeError, ValueError):
+                return None
+            return None if math.isnan(result) else result
+        value, expected = to_float(value), to_float(expected)
+        if value is None and expected is None:
+            return None
+        if value is None or expected is None:
+            return math.inf
+        return abs(value - expected)
+
+    def run(self, rows: List[Dict[str, Any]], engines: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """
+        抽出した行を基準エンジンと各エンジンで評価し、差分レポートを作る
+
+        Args:
+            rows: スイープ全体（またはその一部）の入力行
+            engines: 比較するエンジン名。省略時は基準以外の登録済みエンジン全部
+
+        Returns:
+            Dict[str, Any]: エンジンごとの差分と所要時間、全エンジンが一致したかの'passed'
+        """
+        sample = self.sample_rows(rows)
+        if not sample:
+            raise ValueError("評価する行がありません")
+        engines = [name for name in (engines or registered_engines()) if name != self.reference]
+        unknown = [name for name in [self.reference] + engines if name not in _ENGINES]
+        if unknown:
+            raise ValueError(f"未登録のエンジンです: {unknown}")
+
+        start = time.perf_counter()
+        reference = _ENGINES[self.reference](sample, self.config)
+        report = {
+            'sample_size': len(sample),
+            'reference': self.reference,
+            'reference_seconds': time.perf_counter() - start,
+            'tolerances': self.tolerances,
+            'engines': {},
+        }
+        for name in engines:
+            start = time.perf_counter()
+            outputs = _ENGINES[name](sample, self.config)
+            seconds = time.perf_counter() - start
+            if len(outputs) != len(sample):
+                raise ValueError(f"エンジン {name} の出力行数が入力と一致しません")
+            result = self.compare(outputs, reference)
+            result['seconds'] = seconds
+            result['passed'] = not result['flips'] and not result['numeric_mismatches']
+            report['engines'][name] = result
+        report['passed'] = all(result['passed'] for result in report['engines'].values())
+        return report
@@ -0,0 +1,132 @@
+# src/simulation/qmc_study.py
+
+import math
+import time
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from src.data_generation.qmc_sampler import QMCSampler
+from src.simulation.differential_harness import evaluate_batch
+
+ASIL_LEVELS = ['QM', 'A', 'B', 'C', 'D']
+
+
+def wilson_interval(successes: int, total: int, z: float) -> Tuple[float, float]:
+    """二項比率のWilsonスコア信頼区間（total=0なら(0, 1)）"""
+    if total == 0:
+        return 0.0, 1.0
+    p = successes / total
+    denominator = 1 + z * z / total
+    center = (p + z * z / (2 * total)) / denominator
+    half = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, center - half), min(1.0, center + half)
+
+
+class ASILStatistics:
+    """
+    ASILの分布（各レベルの割合）を行を流しながら集計し、Wilsonの信頼区間を出す
+
+    QMCの点は独立な乱数ではないので、区間は独立抽出とみなした近似（通常は保守的）になる。
+    """
+
+    def __init__(self, confidence: float = 0.95, levels: Sequence[str] = ASIL_LEVELS, field: str = 'ASIL'):
+        self.confidence = confidence
+        self.z = NormalDist().inv_cdf((1 + confidence) / 2)
+        self.field = field
+        self.counts = {level: 0 for level in levels}
+        self.total = 0
+
+    def update(self, rows: List[Dict[str, Any]]):
+        for row in rows:
+            level = row.get(self.field)
+            self.counts[level] = self.counts.get(level, 0) + 1
+        self.total += len(rows)
+
+    def estimates(self) -> Dict[str, Dict[str, float]]:
+        """レベル → 'proportion', 'low', 'high'（信頼区間）, 'count'"""
+        result = {}
+        for level, count in self.counts.items():
+            low, high = wilson_interval(count, self.total, self.z)
+            result[level] = {'count': count, 'proportion': count / self.total if self.total else None,
+                             'low': low, 'high': high}
+        return result
+
+    def max_half_width(self) -> float:
+        """全レベルの信頼区間の半幅の最大値（収束判定に使う）"""
+        return max((estimate['high'] - estimate['low']) / 2 for estimate in self.estimates().values())
+
+
+class QMCStudy:
+    """
+    QMCSamplerで抽出したシナリオをバッチごとにシミュレーションとASIL計算に流し、
+    ASILの分布の推定が収束したら自動で止める
+
+    格子と違って次元を増やしても点の数は増えないので、反応時間・質量・回避行動パラメータなどを
+    同時に振る高次元の検討でも、必要な精度に見合った数だけシミュレーションすれば済む。
+    """
+
+    def __init__(self, config: Dict[str, Any], sampler: QMCSampler, batch_size: int = 1024,
+                 tolerance: float = 0.01, confidence: float = 0.95, min_samples: int = 4096,
+                 max_samples: int = 1_000_000,
+                 evaluate: Optional[Callable[[List[Dict[str, Any]], Dict[str, Any]], List[Dict[str, Any]]]] = None):
+        """
+        Args:
+            config: シミュレーションの設定（ログは書き出さない）
+            sampler: シナリオの抽出器
+            batch_size: 1回に抽出する点の数（Sobol列なら2の累乗にする）
+            tolerance: 全レベルの信頼区間の半幅がこれ以下になったら収束とみなす
+            confidence: 信頼区間の信頼水準
+            min_samples: 収束判定を始める最小の評価件数
+            max_samples: 収束しなくても止める抽出数（有効判定で捨てた点も含む）
+            evaluate: 行のリストを評価する関数（既定はBatchSimulationEngine.evaluate_rows）
+        """
+        self.config = dict(config, write_log=False)
+        self.sampler = sampler
+        self.batch_size = batch_size
+        self.tolerance = tolerance
+        self.confidence = confidence
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.evaluate = evaluate or evaluate_batch
+
+    def run(self, on_batch: Optional[Callable[[List[Dict[str, Any]]], None]] = None) -> Dict[str, Any]:
+        """
+        収束するかmax_samplesに達するまで抽出と評価を繰り返す
+
+        Args:
+            on_batch: 評価済みのバッチを受け取るコールバック（CSVに逐次書き出す場合など）
+
+        Returns:
+            Dict[str, Any]: 'samples'（評価件数）, 'rejected'（有効判定で捨てた数）, 'converged',
+            'estimates'（ASILStatistics.estimates()）, 'max_half_width', 'history'（バッチごとの推移）, 'seconds'
+        """
+        statistics = ASILStatistics(self.confidence)
+        history = []
+        start = time.perf_counter()
+        converged = False
+        first_drawn = self.sampler.drawn
+        while self.sampler.drawn - first_drawn < self.max_samples:
+            rows = self.sampler.sample(self.batch_size)
+            if rows:
+                outputs = self.evaluate(rows, self.config)
+                statistics.update(outputs)
+                if on_batch is not None:
+                    on_batch(outputs)
+            half_width = statistics.max_half_width()
+            history.append({'samples': statistics.total, 'max_half_width': half_width})
+            if statistics.total >= self.min_samples and half_width <= self.tolerance:
+                converged = True
+                break
+
+        return {
+            'method': self.sampler.method,
+            'samples': statistics.total,
+            'rejected': self.sampler.rejected,
+            'converged': converged,
+            'tolerance': self.tolerance,
+            'confidence': self.confidence,
+            'max_half_width': statistics.max_half_width(),
+            'estimates': statistics.estimates(),
+            'history': history,
+            'seconds': time.perf_counter() - start,
+        }
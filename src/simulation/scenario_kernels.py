@@ -0,0 +1,255 @@
+# src/simulation/scenario_kernels.py
+
+from typing import Any, Dict
+
+import numpy as np
+
+from src.models.vehicle_model import VehicleBatch
+from src.utils import functions
+
+
+def run_following_kernel(leading: VehicleBatch, following: VehicleBatch, reaction_time,
+                         max_deceleration, config: Dict[str, Any], lead_deceleration=0.0,
+                         stop_on_safe_state: bool = True, active: np.ndarray = None) -> Dict[str, np.ndarray]:
+    """
+    先行車・後続車の2台シナリオをN件まとめて1ステップずつ進める
+
+    SimulationEngine.run_single_scenarioと同じ順序・同じ式で計算するため、
+    各行の結果はスカラー版と一致する。後続車は反応時間まで最大加速度に向けて加速し、
+    その後max_decelerationに向けて減速する。先行車はlead_decelerationでブレーキする
+    （後続車のmax_accelerationを0にすれば「先行車減速」シナリオになる）。
+
+    Args:
+        leading: 先行車N台分の状態
+        following: 後続車N台分の状態
+        reaction_time: 反応時間[s]（スカラーまたは長さNの配列）
+        max_deceleration: 回避行動の最大減速度[m/s^2]
+        config: time_step, max_simulation_time, acceleration_jerk, deceleration_jerk
+        lead_deceleration: 先行車の減速度[m/s^2]
+        stop_on_safe_state: 回避後の安全状態で打ち切るか（「回避無し」ではFalse）
+        active: 計算対象の行を表すbool配列。Noneなら全行
+
+    Returns:
+        Dict[str, np.ndarray]: collision（衝突有無）, time（終了時刻）, position（後続車位置[m]）,
+        relative_velocity（有効衝突速度[km/h]）
+    """
+    time_step = config['time_step']
+    max_simulation_time = config['max_simulation_time']
+    acceleration_step = config['acceleration_jerk'] * time_step
+    deceleration_step = config['deceleration_jerk'] * time_step
+
+    size = len(following)
+    reaction_time = np.broadcast_to(np.asarray(reaction_time, dtype=np.float64), (size,))
+    max_deceleration = np.broadcast_to(np.asarray(max_deceleration, dtype=np.float64), (size,))
+    lead_deceleration = np.broadcast_to(np.asarray(lead_deceleration, dtype=np.float64), (size,))
+    active = np.ones(size, dtype=bool) if active is None else np.array(active, dtype=bool)
+
+    leading.reset()
+    following.reset()
+    collision = np.zeros(size, dtype=bool)
+    reacted = np.zeros(size, dtype=bool)
+    end_time = np.zeros(size)
+    time = 0.0
+
+    while True:
+        # is_simulation_completeと同じ終了判定（衝突・最大時間・回避後の安全状態）
+        done = collision | (time >= max_simulation_time)
+        if stop_on_safe_state:
+            done |= ((time > reaction_time)
+                     & (following.velocity < leading.velocity)
+                     & (leading.deceleration <= following.deceleration))
+        finished = active & done
+        end_time[finished] = time
+        active &= ~done
+        if not active.any():
+            break
+
+        accelerating = active & ~reacted
+        braking = active & reacted
+        np.copyto(following.acceleration,
+                  np.minimum(following.acceleration + acceleration_step, following.max_acceleration),
+                  where=accelerating)
+        reacted |= accelerating & (time >= reaction_time)
+        np.copyto(following.deceleration,
+                  np.minimum(following.deceleration + deceleration_step, max_deceleration),
+                  where=braking)
+        np.copyto(leading.deceleration,
+                  np.maximum(0.0, np.minimum(lead_deceleration, leading.velocity / time_step)),
+                  where=active)
+
+        leading.update_state(time_step, active)
+        following.update_state(time_step, active)
+        collision |= active & (following.position >= leading.position)
+        time += time_step
+
+    return {
+        'collision': collision,
+        'time': end_time,
+        'position': following.position.copy(),
+        'relative_velocity': np.abs(following.velocity - leading.velocity) * 3.6,
+    }
+
+
+def solve_following_scenarios(leading: VehicleBatch, following: VehicleBatch, reaction_time,
+                              evasive_decelerations: Dict[str, Any], config: Dict[str, Any],
+                              lead_deceleration=0.0) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    回避無し→C0→C1→C2の順にカーネルを実行し、SimulationEngine.run_simulationと同じく
+    衝突を回避できたレベルより後ろのシナリオは「不要」として計算を省く
+
+    Args:
+        evasive_decelerations: シナリオ名→最大減速度[m/s^2]（スカラーまたは配列）
+
+    Returns:
+        Dict[str, Dict[str, np.ndarray]]: シナリオ名ごとの結果配列。
+        '衝突有無'は'あり'/'なし'/'不要'、数値は衝突が無い行でNaN
+    """
+    size = len(following)
+    remaining = np.ones(size, dtype=bool)  # 前のCレベルで衝突した（次を試す必要がある）行
+    results = {}
+    for scenario in functions.SCENARIO_NAMES:
+        is_baseline = scenario == '回避無し'
+        active = np.ones(size, dtype=bool) if is_baseline else remaining.copy()
+        outcome = run_following_kernel(
+            leading, following, reaction_time, evasive_decelerations[scenario], config,
+            lead_deceleration=lead_deceleration, stop_on_safe_state=not is_baseline, active=active)
+
+        collided = outcome['collision'] & active
+        status = np.where(collided, 'あり', 'なし').astype(object)
+        status[~active] = '不要'
+        results[scenario] = {
+            '衝突有無': status,
+            '衝突時刻': np.where(collided, outcome['time'], np.nan),
+            '衝突位置': np.where(collided, outcome['position'], np.nan),
+            '有効衝突速度': np.where(collided, outcome['relative_velocity'], np.nan),
+        }
+        if not is_baseline:
+            remaining &= collided
+    return results
+
+
+def build_platoon(velocity, gap, size: int, mass=1500.0) -> VehicleBatch:
+    """
+    N組の隊列（各size台、等速・等間隔）の初期状態を作る
+
+    並びは行優先で、組iのj台目がi*size+j番目になる（j=0が先頭車）。
+
+    Args:
+        velocity: 各組の速度[m/s]（長さN）
+        gap: 各組の車間距離[m]（長さN）
+        size: 1組あたりの台数
+        mass: 質量[kg]（スカラー、長さN、または長さN*size）
+    """
+    velocity = np.atleast_1d(np.asarray(velocity, dtype=np.float64))
+    gap = np.broadcast_to(np.asarray(gap, dtype=np.float64), velocity.shape)
+    rank = np.arange(size - 1, -1, -1, dtype=np.float64)  # 先頭車が一番前（最大位置）
+    positions = gap[:, None] * rank[None, :]
+    mass = np.asarray(mass, dtype=np.float64)
+    if mass.ndim == 1 and mass.shape[0] == velocity.shape[0]:
+        mass = np.repeat(mass, size)
+    return VehicleBatch(
+        mass=mass,
+        initial_position=positions.ravel(),
+        initial_velocity=np.repeat(velocity, size)
+    )
+
+
+def run_platoon_kernel(platoon: VehicleBatch, size: int, reaction_time, max_deceleration,
+                       lead_deceleration, config: Dict[str, Any]) -> Dict[str, np.ndarray]:
+    """
+    N組の隊列で先頭車が急ブレーキしたときの玉突き衝突を計算する
+
+    先頭車はlead_decelerationで減速し、j台目のドライバーは前の車の制動開始から
+    reaction_time遅れて（つまりj*reaction_timeで）deceleration_jerkに従い
+    max_decelerationまでブレーキを強める。車両は後退しない。
+    前後の車が接触したら完全非弾性衝突として運動量保存の共通速度にそろえ、
+    各ペアの最初の衝突時刻と有効衝突速度を記録する。
+    接触処理は偶数ペア・奇数ペアの2回に分けて配列演算で行うため、
+    1ステップあたりのPython側の処理は台数に依存しない。
+
+    Args:
+        platoon: build_platoonで作ったN*size台分の状態
+        size: 1組あたりの台数
+        reaction_time: 反応時間[s]（スカラーまたは長さN）
+        max_deceleration: 後続車の最大減速度[m/s^2]（スカラーまたは長さN）
+        lead_deceleration: 先頭車の減速度[m/s^2]（スカラーまたは長さN）
+        config: time_step, max_simulation_time, deceleration_jerk
+
+    Returns:
+        Dict[str, np.ndarray]: collision（(N, size-1)のペアごとの衝突有無）, time（衝突時刻、無ければNaN）,
+        relative_velocity（有効衝突速度[km/h]、無ければNaN）, collision_count（組ごとの衝突数）, end_time
+    """
+    time_step = config['time_step']
+    max_simulation_time = config['max_simulation_time']
+    deceleration_step = config['deceleration_jerk'] * time_step
+
+    platoon.reset()
+    groups = len(platoon) // size
+    shape = (groups, size)
+    mass = platoon.mass.reshape(shape)
+    position = platoon.position.reshape(shape)  # ビューなのでplatoonの配列がその場で更新される
+    velocity = platoon.velocity.reshape(shape)
+    deceleration = platoon.deceleration.reshape(shape)
+
+    reaction_time = np.broadcast_to(np.asarray(reaction_time, dtype=np.float64), (groups,))
+    target = np.empty(shape)
+    target[:, 0] = np.broadcast_to(np.asarray(lead_deceleration, dtype=np.float64), (groups,))
+    target[:, 1:] = np.broadcast_to(np.asarray(max_deceleration, dtype=np.float64), (groups,))[:, None]
+    brake_start = reaction_time[:, None] * np.arange(size)[None, :]
+    is_lead = np.zeros(shape, dtype=bool)
+    is_lead[:, 0] = True
+
+    collision = np.zeros((groups, size - 1), dtype=bool)
+    collision_time = np.full((groups, size - 1), np.nan)
+    impact_velocity = np.full((groups, size - 1), np.nan)
+    end_time = np.zeros(groups)
+    active = np.ones(groups, dtype=bool)
+    time = 0.0
+
+    while True:
+        done = (time >= max_simulation_time) | np.all(velocity <= 0.0, axis=1)
+        end_time[active & done] = time
+        active &= ~done
+        if not active.any():
+            break
+
+        # ブレーキ：先頭車は一定の減速度、後続車は制動開始からジャークで立ち上げる
+        braking = (time >= brake_start) & active[:, None]
+        ramped = np.where(is_lead, target, np.minimum(deceleration + deceleration_step, target))
+        deceleration[...] = np.where(braking, ramped, deceleration)
+        # 止まりきれる分だけ減速して後退はしない
+        deceleration[...] = np.maximum(0.0, np.minimum(deceleration, velocity / time_step))
+
+        velocity -= deceleration * time_step * active[:, None]
+        position += velocity * time_step * active[:, None]
+
+        for first in (0, 1):  # 偶数ペア→奇数ペアの順で接触を解決
+            front = slice(first, size - 1, 2)
+            rear = slice(first + 1, size, 2)
+            contact = (position[:, rear] >= position[:, front]) & active[:, None]
+            if not contact.any():
+                continue
+            pair = collision[:, front]
+            new_contact = contact & ~pair
+            relative = (velocity[:, rear] - velocity[:, front]) * 3.6
+            collision_time[:, front] = np.where(new_contact, time + time_step, collision_time[:, front])
+            impact_velocity[:, front] = np.where(new_contact, relative, impact_velocity[:, front])
+            collision[:, front] = pair | contact
+
+            front_mass = mass[:, front]
+            rear_mass = mass[:, rear]
+            common = ((front_mass * velocity[:, front] + rear_mass * velocity[:, rear])
+                      / (front_mass + rear_mass))
+            velocity[:, front] = np.where(contact, common, velocity[:, front])
+            velocity[:, rear] = np.where(contact, common, velocity[:, rear])
+            position[:, rear] = np.where(contact, position[:, front], position[:, rear])
+
+        time += time_step
+
+    return {
+        'collision': collision,
+        'time': collision_time,
+        'relative_velocity': impact_velocity,
+        'collision_count': collision.sum(axis=1),
+        'end_time': end_time,
+    }
@@ -0,0 +1,193 @@
+# src/simulation/scenario_registry.py
+
+from typing import Any, Callable, Dict, List, Union
+
+import numpy as np
+
+from src.models.vehicle_model import VehicleBatch
+from src.simulation.simulation_engine import ScenarioType
+from src.simulation.scenario_kernels import solve_following_scenarios, build_platoon, run_platoon_kernel
+from src.utils import functions
+from src.utils.input_schema import InputField, InputSchema
+
+GRAVITY = 9.81
+
+
+def g_to_mps2(value):
+    """G単位からm/s^2に変換する（SimulationEngine.load_dataと同じ * 9.81）"""
+    return value * GRAVITY
+
+
+class ScenarioDefinition:
+    """
+    シナリオ種別ごとの入力スキーマ・ベクトル化ソルバー・結果列の定義
+
+    Args:
+        scenario_type: シナリオ種別
+        input_fields: 入力列の定義（schemaとして列単位の一括パースに使う）
+        solver: solver(inputs, config)でレベル名→結果名→配列の辞書を返す関数
+        result_names: 回避レベルごとに出力する結果名（'衝突有無'など）
+        asil_context: asil_context(inputs)で'衝突タイプ'と'進行方向'の配列を返す関数
+        levels: 回避レベル名（出力列は'結果名[レベル名]'になる）
+    """
+
+    def __init__(self, scenario_type: ScenarioType, input_fields: List[InputField],
+                 solver: Callable[[Dict[str, np.ndarray], Dict[str, Any]], Dict[str, Dict[str, np.ndarray]]],
+                 result_names: List[str], asil_context: Callable[[Dict[str, np.ndarray]], Dict[str, np.ndarray]],
+                 levels: List[str] = None):
+        self.scenario_type = scenario_type
+        self.input_fields = input_fields
+        self.schema = InputSchema(input_fields)
+        self.solver = solver
+        self.result_names = result_names
+        self.asil_context = asil_context
+        self.levels = levels or list(functions.SCENARIO_NAMES)
+
+    @property
+    def result_columns(self) -> List[str]:
+        """出力する結果列名（run_simulation.pyと同じ'結果名[レベル名]'の並び）"""
+        return [f'{result}[{level}]' for level in self.levels for result in self.result_names]
+
+    def solve(self, inputs: Dict[str, np.ndarray], config: Dict[str, Any]) -> Dict[str, Dict[str, np.ndarray]]:
+        return self.solver(inputs, config)
+
+
+_REGISTRY: Dict[ScenarioType, ScenarioDefinition] = {}
+
+
+def register_scenario(definition: ScenarioDefinition) -> ScenarioDefinition:
+    """シナリオ定義を登録する（同じ種別が登録済みなら置き換える）"""
+    _REGISTRY[definition.scenario_type] = definition
+    return definition
+
+
+def get_scenario(scenario_type: Union[ScenarioType, str]) -> ScenarioDefinition:
+    """シナリオ種別（またはその値の文字列）から定義を取得する"""
+    try:
+        return _REGISTRY[ScenarioType(scenario_type)]
+    except (KeyError, ValueError):
+        raise ValueError(f"未登録のシナリオ種別です: {scenario_type}")
+
+
+def registered_scenarios() -> List[ScenarioType]:
+    return list(_REGISTRY)
+
+
+def _evasive_fields() -> List[InputField]:
+    return [InputField(f'回避行動パラメータ[{level}]', f'evasive_{level}', g_to_mps2)
+            for level in functions.SCENARIO_NAMES]
+
+
+# 先行車・後続車の2台シナリオ（SimulationEngine.load_dataと同じ列と単位変換）
+FOLLOWING_FIELDS = [
+    InputField('先行車質量[kg]', 'lead_mass'),
+    InputField('先行車速度[km/h]', 'lead_velocity', functions.kph_to_mps),
+    InputField('先行車減速度[G]', 'lead_deceleration', g_to_mps2, default=0.0),
+    InputField('後続車質量[kg]', 'mass'),
+    InputField('後続車速度[km/h]', 'velocity', functions.kph_to_mps),
+    InputField('後続車加速度[G]', 'max_acceleration', g_to_mps2),
+    InputField('後続車反応時間[sec]', 'reaction_time'),
+    InputField('車間距離[m]', 'gap'),
+] + _evasive_fields()
+
+PLATOON_FIELDS = [
+    InputField('隊列台数', 'size', default=2.0),
+    InputField('先行車減速度[G]', 'lead_deceleration', g_to_mps2),
+    InputField('後続車質量[kg]', 'mass'),
+    InputField('後続車速度[km/h]', 'velocity', functions.kph_to_mps),
+    InputField('後続車反応時間[sec]', 'reaction_time'),
+    InputField('車間距離[m]', 'gap'),
+] + _evasive_fields()
+
+
+def _evasive_decelerations(inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {level: inputs[f'evasive_{level}'] for level in functions.SCENARIO_NAMES}
+
+
+def solve_following(inputs: Dict[str, np.ndarray], config: Dict[str, Any],
+                    accelerate: bool = True) -> Dict[str, Dict[str, np.ndarray]]:
+    """2台シナリオのソルバー。accelerate=Falseなら後続車は加速しない（先行車減速シナリオ）"""
+    leading = VehicleBatch(inputs['lead_mass'], inputs['gap'], inputs['lead_velocity'])
+    following = VehicleBatch(inputs['mass'], 0.0, inputs['velocity'],
+                             inputs['max_acceleration'] if accelerate else 0.0)
+    return solve_following_scenarios(leading, following, inputs['reaction_time'],
+                                     _evasive_decelerations(inputs), config,
+                                     lead_deceleration=inputs['lead_deceleration'])
+
+
+def solve_platoon(inputs: Dict[str, np.ndarray], config: Dict[str, Any]) -> Dict[str, Dict[str, np.ndarray]]:
+    """
+    隊列シナリオのソルバー。各回避レベルで玉突き衝突を計算し、
+    最初の衝突時刻・最大の有効衝突速度・衝突台数をまとめる
+    """
+    count = len(inputs['velocity'])
+    sizes = inputs['size'].astype(int)
+    results = {level: {'衝突有無': np.full(count, '不要', dtype=object),
+                       '衝突時刻': np.full(count, np.nan),
+                       '有効衝突速度': np.full(count, np.nan),
+                       '衝突台数': np.zeros(count, dtype=int)}
+               for level in functions.SCENARIO_NAMES}
+
+    for size in np.unique(sizes):  # 台数ごとにまとめてカーネルを回す
+        rows = np.flatnonzero(sizes == size)
+        remaining = np.ones(len(rows), dtype=bool)
+        for level in functions.SCENARIO_NAMES:
+            is_baseline = level == '回避無し'
+            target = rows if is_baseline else rows[remaining]
+            if len(target) == 0:
+                continue
+            platoon = build_platoon(inputs['velocity'][target], inputs['gap'][target], size,
+                                    inputs['mass'][target])
+            outcome = run_platoon_kernel(platoon, size, inputs['reaction_time'][target],
+                                         inputs[f'evasive_{level}'][target],
+                                         inputs['lead_deceleration'][target], config)
+            collided = outcome['collision_count'] > 0
+            first_time = np.where(np.isnan(outcome['time']), np.inf, outcome['time']).min(axis=1)
+            max_velocity = np.where(np.isnan(outcome['relative_velocity']), -np.inf,
+                                    outcome['relative_velocity']).max(axis=1)
+            level_results = results[level]
+            level_results['衝突有無'][target] = np.where(collided, 'あり', 'なし')
+            level_results['衝突時刻'][target] = np.where(collided, first_time, np.nan)
+            level_results['有効衝突速度'][target] = np.where(collided, max_velocity, np.nan)
+            level_results['衝突台数'][target] = outcome['collision_count']
+            if not is_baseline:
+                remaining[remaining] = collided
+    return results
+
+
+def forward_context(inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """前進時のASIL判定用の衝突タイプ（先行車質量100kg未満は歩行者）"""
+    pedestrian = inputs['lead_mass'] < 100 if 'lead_mass' in inputs else np.zeros(len(inputs['velocity']), bool)
+    return {
+        '衝突タイプ': np.where(pedestrian, '歩行者衝突', '車両衝突_前進').astype(object),
+        '進行方向': np.full(len(pedestrian), '前進', dtype=object),
+    }
+
+
+def reverse_context(inputs: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """後進時のASIL判定用の衝突タイプ（後方の障害物が100kg未満なら歩行者）"""
+    pedestrian = inputs['lead_mass'] < 100
+    return {
+        '衝突タイプ': np.where(pedestrian, '歩行者衝突', '車両衝突_後進').astype(object),
+        '進行方向': np.full(len(pedestrian), '後進', dtype=object),
+    }
+
+
+register_scenario(ScenarioDefinition(
+    ScenarioType.UNINTENDED_ACCELERATION, FOLLOWING_FIELDS, solve_following,
+    list(functions.RESULT_NAMES), forward_context))
+
+register_scenario(ScenarioDefinition(
+    ScenarioType.LEAD_VEHICLE_BRAKING, FOLLOWING_FIELDS,
+    lambda inputs, config: solve_following(inputs, config, accelerate=False),
+    list(functions.RESULT_NAMES), forward_context))
+
+# 後進は自車の進行方向を正とした座標系で見れば前進と同じ運動方程式になる
+# （'先行車'の列は自車後方の障害物、'車間距離[m]'は後方距離として読む）
+register_scenario(ScenarioDefinition(
+    ScenarioType.UNINTENDED_REVERSE_ACCELERATION, FOLLOWING_FIELDS, solve_following,
+    list(functions.RESULT_NAMES), reverse_context))
+
+register_scenario(ScenarioDefinition(
+    ScenarioType.PLATOON, PLATOON_FIELDS, solve_platoon,
+    ['衝突有無', '衝突時刻', '有効衝突速度', '衝突台数'], forward_context))
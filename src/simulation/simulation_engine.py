@@ -2,17 +2,53 @@
 
 import csv
 import os
-from typing import Dict, List, Any
+import time
+from typing import Dict, List, Any, Optional
 from enum import Enum
 from src.models.vehicle_model import Vehicle
 from src.utils import functions
-from src.asil_calculation.asil_calculator import ASILCalculator
+from src.utils.profiling import Profiler
+
+# ログ（軌跡）の列、log_stateの1行と同じ並び
+LOG_COLUMNS = [
+    '時間[s]', 'シナリオ', '反応時間経過', '先行車位置[m]', '先行車速度[km/h]',
+    '後続車位置[m]', '後続車速度[km/h]', '後続車加速度[m/s^2]', '後続車減速度[m/s^2]',
+    '車間距離[m]', '相対速度[km/h]'
+]
+# log_mode='events'のログだけ、最後にイベント列が付くよ（'full'のログCSVの形式は今まで通り）
+EVENT_COLUMN = 'イベント'
+EVENT_LOG_COLUMNS = LOG_COLUMNS + [EVENT_COLUMN]
+# ログのイベント列のビット（1つのステップに複数のイベントが重なることもある）
+LOG_EVENTS = {
+    '開始': 1,  # 最初のステップ
+    '加速度飽和': 2,  # 意図しない加速が最大加速度に達した
+    '反応時間経過': 4,  # ドライバーが反応した（ここから回避行動）
+    '最大減速度到達': 8,  # 回避行動の減速度が最大減速度に達した
+    '衝突': 16,
+    '安全状態': 32,  # 回避後に安全状態になって終了
+    '打ち切り': 64,  # 最大シミュレーション時間で終了
+}
+# ログの記録方法: 'full'は全ステップ、'events'はイベントのステップ（＋log_everyステップごとの間引き）だけ、'none'は記録しない
+LOG_MODES = ('full', 'events', 'none')
+# 終了理由（termination_reason）→ 最後のステップに付けるイベント
+TERMINATION_EVENTS = {'collision': LOG_EVENTS['衝突'], 'safe_state': LOG_EVENTS['安全状態'],
+                      'max_time': LOG_EVENTS['打ち切り']}
+
+
+def event_names(flags: Any) -> List[str]:
+    """イベント列の値（ビットの和）をイベント名のリストにする"""
+    flags = int(flags)
+    return [name for name, bit in LOG_EVENTS.items() if flags & bit]
+
 
 class ScenarioType(Enum):
     UNINTENDED_ACCELERATION = "unintended_acceleration"
+    LEAD_VEHICLE_BRAKING = "lead_vehicle_braking"
+    PLATOON = "platoon"
+    UNINTENDED_REVERSE_ACCELERATION = "unintended_reverse_acceleration"
 
 class SimulationEngine:
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], profiler: Optional[Profiler] = None):
         # マジヤバイね！ここでシミュレーションの初期設定をバリバリやっちゃうよ～
         # 車両データ、時間設定、加速度設定とかをゲットして、シミュレーションの準備を整えちゃう！
         # configには時間刻み、最大シミュレーション時間、加速度変化率（jerk）とかが入ってるんだって～超細かい！
@@ -30,7 +66,22 @@ class SimulationEngine:
         self.record_id: str = ""  # シミュレーションの記録ID、これで結果を識別するの
         self.reaction_time: float = 0.0  # ドライバーの反応時間、リアルな感じを出すためにあるんだって
         self.evasive_actions: Dict[str, float] = {}  # 回避行動のパラメータ、いろんなパターンを試すよ
-        self.asil_calculator = ASILCalculator()
+        self.lead_deceleration: float = 0.0  # 先行車の減速度（m/s^2）、先行車がブレーキを踏むシナリオ用
+        self.profiler = profiler  # 計測用、Noneなら何も測らないからループは今まで通り速いの
+        self.log_mode = config.get('log_mode', 'full')  # ログの記録方法、LOG_MODESのどれか
+        if self.log_mode not in LOG_MODES:
+            raise ValueError(f"log_mode は {LOG_MODES} のどれかにしてください: {self.log_mode}")
+        self.log_every = int(config.get('log_every', 0))  # 'events'のとき、このステップごとにも記録しちゃう（0なら間引きサンプル無し）
+        self.steps = 0  # 今のシナリオで進めたステップ数
+        self.pending_state = None  # 'events'で記録しなかった最後のステップ（時間, 反応時間経過）、終了時に記録するの
+        self.log_columns = EVENT_LOG_COLUMNS if self.log_mode == 'events' else LOG_COLUMNS  # ログCSVの見出し
+        if self.log_mode == 'events':
+            self.log_state = self.log_event_state  # イベントのステップだけ整形するから、ほとんどのステップはタダ同然！
+        elif self.log_mode == 'none':
+            self.log_state = self.skip_log_state
+        if profiler is not None:
+            self.untimed_log_state = self.log_state
+            self.log_state = self.timed_log_state  # 計測中だけ、ログの整形時間も測るよ
 
     def load_data(self, data: Dict[str, Any]):
         # ウェーイ！車のデータをゲットして、シミュレーションの準備をしちゃうよ～
@@ -48,6 +99,7 @@ class SimulationEngine:
             'initial_position': 0  # 後続車の初期位置は0m地点
         })
         self.reaction_time = float(data['後続車反応時間[sec]'])  # ドライバーの反応時間
+        self.lead_deceleration = float(data.get('先行車減速度[G]', 0.0)) * 9.81  # 先行車の減速度、無ければ0（等速）
         # 回避行動のパラメータをセット、G単位からm/s^2に変換
         self.evasive_actions = {
             '回避無し': float(data['回避行動パラメータ[回避無し]']) * 9.81,
@@ -57,6 +109,28 @@ class SimulationEngine:
         }
         self.log_data = {key: [] for key in self.evasive_actions.keys()}  # ログデータの初期化
 
+    def load_typed(self, inputs: Dict[str, Any], index: int, record_id: str = 'unknown'):
+        # パース済みの列からindex行目をロードしちゃうよ～文字列を毎回floatにしないから速いの！
+        # inputsはscenario_registryのFOLLOWING_FIELDSでパースした単位変換済みの列（m/s, m/s^2）
+        self.record_id = record_id
+        self.leading_vehicle = Vehicle({
+            'mass': float(inputs['lead_mass'][index]),
+            'initial_velocity': float(inputs['lead_velocity'][index]),
+            'initial_position': float(inputs['gap'][index])
+        })
+        self.following_vehicle = Vehicle({
+            'mass': float(inputs['mass'][index]),
+            'initial_velocity': float(inputs['velocity'][index]),
+            'max_acceleration': float(inputs['max_acceleration'][index]),
+            'initial_position': 0
+        })
+        self.reaction_time = float(inputs['reaction_time'][index])
+        self.lead_deceleration = float(inputs['lead_deceleration'][index])
+        self.evasive_actions = {
+            scenario: float(inputs[f'evasive_{scenario}'][index]) for scenario in ['回避無し', 'C0', 'C1', 'C2']
+        }
+        self.log_data = {key: [] for key in self.evasive_actions.keys()}
+
     def run_simulation(self):
         # ヤバイ！シミュレーションを全力で回しちゃうよ～
         # 4つのシナリオ（回避無し、C0, C1, C2）を順番に実行するの
@@ -66,12 +140,12 @@ class SimulationEngine:
 
         # まずは「回避無し」のシナリオをバリバリやっちゃうよ
         # これは基準になるシナリオだから、必ず実行するの
-        self.results['回避無し'] = self.run_single_scenario(
+        self.results['回避無し'] = self.run_timed_scenario(
             self.evasive_actions['回避無し'], '回避無し')
 
         # C0, C1, C2の順番でシミュレーションするよ～超クール！
         for scenario in scenarios[1:]:  # '回避無し'はスキップ
-            self.results[scenario] = self.run_single_scenario(
+            self.results[scenario] = self.run_timed_scenario(
                 self.evasive_actions[scenario], scenario)
             if self.results[scenario]['衝突有無'] == 'なし':
                 # マジ卍！衝突回避できたら残りはスキップしちゃうよ
@@ -84,10 +158,27 @@ class SimulationEngine:
                         '有効衝突速度': 'N/A'
                     }
                     # スキップしたシナリオもログに残すよ～超親切！
-                    self.log_data[remaining_scenario].append(['不要'] * 11)  # ログの列数に合わせて調整
+                    if self.log_mode != 'none':
+                        self.log_data[remaining_scenario].append(['不要'] * len(self.log_columns))  # ログの列数に合わせて調整
                 break  # このbreakで残りのシナリオをスキップ
 
-        self.write_log_to_csv()  # シミュレーション後にログを書き込むよ～超忘れずに！
+        if self.config.get('write_log', True) and self.log_mode != 'none':
+            if self.profiler is None:
+                self.write_log_to_csv()  # シミュレーション後にログを書き込むよ～超忘れずに！
+            else:
+                with self.profiler.stage('write_log'):
+                    self.write_log_to_csv()
+
+    def run_timed_scenario(self, max_deceleration: float, scenario_name: str):
+        # 計測中ならステップループの時間・ステップ数・終了理由を記録しちゃうよ
+        if self.profiler is None:
+            return self.run_single_scenario(max_deceleration, scenario_name)
+        with self.profiler.stage('step_loop'):
+            result = self.run_single_scenario(max_deceleration, scenario_name)
+        self.profiler.count(f'steps[{scenario_name}]', self.steps)
+        self.profiler.count(f'scenarios[{scenario_name}]')
+        self.profiler.count(f'termination[{self.termination_reason(result["衝突有無"] == "あり", scenario_name)}]')
+        return result
 
     def run_single_scenario(self, max_deceleration: float, scenario_name: str):
         # 個別のシナリオをガンガン走らせちゃうよ～
@@ -95,19 +186,34 @@ class SimulationEngine:
         self.reset_simulation()  # シミュレーションをリセット、新鮮な状態からスタート！
         collision_detected = False  # 衝突検出フラグ、最初はFalseだよ
         reaction_time_passed = False  # 反応時間経過フラグ、最初はFalseだよ
+        # 加速度飽和と最大減速度到達は最初の1回だけイベントにするよ（減速しない回避行動は到達も無し）
+        acceleration_saturated = False
+        deceleration_reached = max_deceleration <= 0
         while not self.is_simulation_complete(collision_detected, scenario_name):
+            events = LOG_EVENTS['開始'] if self.steps == 0 else 0
             if not reaction_time_passed:
                 self.apply_unintended_acceleration()  # 意図しない加速を適用
+                if not acceleration_saturated and \
+                        self.following_vehicle.acceleration >= self.following_vehicle.max_acceleration:
+                    acceleration_saturated = True
+                    events |= LOG_EVENTS['加速度飽和']
                 if self.time >= self.reaction_time:
                     reaction_time_passed = True  # 反応時間が過ぎたらフラグをTrueに
+                    events |= LOG_EVENTS['反応時間経過']
             else:
                 self.apply_evasive_action(max_deceleration)  # 回避行動を適用
+                if not deceleration_reached and self.following_vehicle.deceleration >= max_deceleration:
+                    deceleration_reached = True
+                    events |= LOG_EVENTS['最大減速度到達']
+            self.apply_lead_braking()  # 先行車のブレーキを適用
             
             self.update_vehicle_states()  # 車両の状態を更新
             collision_detected = self.check_collision()  # 衝突チェック
-            self.log_state(scenario_name, reaction_time_passed)  # 状態をログに記録
+            self.log_state(scenario_name, reaction_time_passed, events)  # 状態をログに記録
+            self.steps += 1
             self.time += self.time_step  # 時間を進める
-        
+
+        self.finish_log(scenario_name, collision_detected)  # 終わったステップに終了理由のイベントを付けるよ
         return self.get_scenario_results(collision_detected)  # シナリオの結果を返す
 
     def apply_unintended_acceleration(self):
@@ -128,24 +234,63 @@ class SimulationEngine:
         )
         self.following_vehicle.deceleration = new_deceleration
 
+    def apply_lead_braking(self):
+        # 先行車もブレーキ踏んじゃうよ～でもバックはしないの！
+        # 今の速度で止まりきれる分だけ減速度を使うから、速度はマイナスにならないよ
+        self.leading_vehicle.deceleration = max(0.0, min(
+            self.lead_deceleration,
+            self.leading_vehicle.velocity / self.time_step
+        ))
+
     def update_vehicle_states(self):
         # 車の状態をアップデートしちゃうよ～超リアルタイム！
         # 位置と速度を更新するの。先行車と後続車、両方ね！
         self.leading_vehicle.update_state(self.time_step)
-        net_acceleration = self.following_vehicle.acceleration - self.following_vehicle.deceleration
-        self.following_vehicle.velocity += net_acceleration * self.time_step
-        self.following_vehicle.position += self.following_vehicle.velocity * self.time_step
+        self.following_vehicle.update_state(self.time_step)
 
     def check_collision(self) -> bool:
         # ヤバイ！衝突してないかチェックしちゃうよ～
         # 後続車の位置が先行車の位置を追い越したら衝突ってこと！
         return self.following_vehicle.position >= self.leading_vehicle.position
 
-    def log_state(self, scenario_name: str, reaction_time_passed: bool):
+    def log_state(self, scenario_name: str, reaction_time_passed: bool, events: int = 0):
         # 超細かく状態をログに残しちゃうよ～後で見返すの超便利！
-        # 時間、シナリオ名、反応時間経過フラグ、両車の位置と速度、加減速度、車間距離、相対速度をログに記録
-        log_entry = [
-            f"{self.time:.3f}",  # 時間（秒）
+        self.log_data[scenario_name].append(self.state_entry(self.time, scenario_name, reaction_time_passed, events))
+
+    def log_event_state(self, scenario_name: str, reaction_time_passed: bool, events: int = 0):
+        # 'events'モード：イベントのステップと間引きサンプルだけ記録、それ以外は時間とフラグを覚えておくだけ！
+        # 車両の状態はそのステップのそのものだから、イベントの瞬間の値がそのまま残るよ
+        if events or (self.log_every and self.steps % self.log_every == 0):
+            self.log_data[scenario_name].append(self.state_entry(self.time, scenario_name, reaction_time_passed, events))
+            self.pending_state = None
+        else:
+            self.pending_state = (self.time, reaction_time_passed)
+
+    def skip_log_state(self, scenario_name: str, reaction_time_passed: bool, events: int = 0):
+        # 'none'モード：何も記録しないよ
+        pass
+
+    def finish_log(self, scenario_name: str, collision_detected: bool):
+        # 最後のステップに終了理由（衝突・安全状態・打ち切り）のイベントを付けるの
+        # 'events'で最後のステップを記録してなかったら、ここで記録しちゃう（車両の状態は最後のステップのまま）
+        # イベント列があるのは'events'だけだから、それ以外は何もしないよ
+        if self.log_mode != 'events':
+            return
+        events = TERMINATION_EVENTS.get(self.termination_reason(collision_detected, scenario_name), 0)
+        entries = self.log_data[scenario_name]
+        if self.pending_state is not None:
+            time_at_step, reaction_time_passed = self.pending_state
+            entries.append(self.state_entry(time_at_step, scenario_name, reaction_time_passed, events))
+            self.pending_state = None
+        elif entries:
+            entries[-1][-1] = str(int(entries[-1][-1]) | events)
+
+    def state_entry(self, time_at_step: float, scenario_name: str, reaction_time_passed: bool,
+                    events: int) -> List[str]:
+        # 時間、シナリオ名、反応時間経過フラグ、両車の位置と速度、加減速度、車間距離、相対速度を1行にするよ
+        # 'events'のときは最後にイベントも付けるの
+        entry = [
+            f"{time_at_step:.3f}",  # 時間（秒）
             scenario_name,  # シナリオ名
             "1" if reaction_time_passed else "0",  # 反応時間経過フラグ
             f"{self.leading_vehicle.position:.2f}",  # 先行車の位置（m）
@@ -155,9 +300,17 @@ class SimulationEngine:
             f"{self.following_vehicle.acceleration:.2f}",  # 後続車の加速度（m/s^2）
             f"{self.following_vehicle.deceleration:.2f}",  # 後続車の減速度（m/s^2）
             f"{self.leading_vehicle.position - self.following_vehicle.position:.2f}",  # 車間距離（m）
-            f"{(self.following_vehicle.velocity - self.leading_vehicle.velocity) * 3.6:.2f}"  # 相対速度（km/h）
+            f"{(self.following_vehicle.velocity - self.leading_vehicle.velocity) * 3.6:.2f}",  # 相対速度（km/h）
         ]
-        self.log_data[scenario_name].append(log_entry)
+        if self.log_mode == 'events':
+            entry.append(str(events))  # イベント（LOG_EVENTSのビットの和）
+        return entry
+
+    def timed_log_state(self, scenario_name: str, reaction_time_passed: bool, events: int = 0):
+        # log_stateの文字列整形にかかった時間を測っちゃう（step_loopの内訳）
+        wall, cpu = time.perf_counter(), time.process_time()
+        self.untimed_log_state(scenario_name, reaction_time_passed, events)
+        self.profiler.add_time('log_state', time.perf_counter() - wall, time.process_time() - cpu)
 
     def write_log_to_csv(self):
         # ログをCSVファイルに書き込んじゃうよ～超便利！
@@ -168,11 +321,7 @@ class SimulationEngine:
 
         with open(output_file, 'w', newline='', encoding='utf-8-sig') as f:
             writer = csv.writer(f)
-            writer.writerow([
-                '時間[s]', 'シナリオ', '反応時間経過', '先行車位置[m]', '先行車速度[km/h]',
-                '後続車位置[m]', '後続車速度[km/h]', '後続車加速度[m/s^2]', '後続車減速度[m/s^2]',
-                '車間距離[m]', '相対速度[km/h]'
-            ])
+            writer.writerow(self.log_columns)
             for scenario in self.evasive_actions.keys():
                 writer.writerows(self.log_data[scenario])
 
@@ -201,16 +350,30 @@ class SimulationEngine:
                 self.time >= self.max_simulation_time or  # 最大シミュレーション時間に達したら終了
                 (scenario_name != '回避無し' and self.is_safe_state_after_evasion()))  # 回避行動後に安全状態になったら終了（ただし「回避無し」シナリオ以外）
 
+    def termination_reason(self, collision_detected: bool, scenario_name: str) -> str:
+        # is_simulation_completeのどの条件で終わったか（計測用）
+        if collision_detected:
+            return 'collision'
+        if self.time >= self.max_simulation_time:
+            return 'max_time'
+        if scenario_name != '回避無し' and self.is_safe_state_after_evasion():
+            return 'safe_state'
+        return 'running'
+
     def is_safe_state_after_evasion(self):
         # 回避後に安全な状態になったかチェックするよ～超安心！
         # 反応時間が過ぎていて、かつ後続車の速度が先行車より遅くなっていれば安全と判断
+        # 先行車がブレーキ中なら、後続車も同じ以上の減速度じゃないと車間が縮むからまだダメ！
         return (self.time > self.reaction_time and 
-                self.following_vehicle.velocity < self.leading_vehicle.velocity)
+                self.following_vehicle.velocity < self.leading_vehicle.velocity and
+                self.leading_vehicle.deceleration <= self.following_vehicle.deceleration)
 
     def reset_simulation(self):
         # シミュレーションをリセットしちゃうよ～新鮮な気分で再スタート！
         # 時間をゼロに戻して、車両の状態も初期状態に戻すの
         self.time = 0.0
+        self.steps = 0
+        self.pending_state = None
         self.following_vehicle.reset()
         self.leading_vehicle.reset()
 
@@ -0,0 +1,248 @@
+# src/simulation/simulation_service.py
+
+import queue
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.utils.input_schema import SchemaValidationError
+
+DEFAULT_MAX_BATCH = 256
+DEFAULT_MAX_WAIT = 0.002  # 最初の要求が来てから、同じバッチに相乗りする要求を待つ時間（秒）
+DEFAULT_CACHE_SIZE = 100_000
+# キャッシュのキーに含めない列（同じシナリオでも要求ごとに変わる記録ID）
+KEY_EXCLUDED_COLUMNS = ('No',)
+
+CacheKey = Tuple[Tuple[str, Any], ...]
+
+
+class ServiceError(Exception):
+    """要求した行を評価できなかった場合のエラー"""
+
+
+def cache_key(row: Dict[str, Any]) -> CacheKey:
+    """
+    行のキャッシュキー（No以外の列と値の組）
+
+    数値に変換できる値は数値にするので、'60'と60.0は同じシナリオとみなす。
+    """
+    items = []
+    for column, value in row.items():
+        if column in KEY_EXCLUDED_COLUMNS:
+            continue
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = str(value)
+        items.append((column, value))
+    return tuple(sorted(items))
+
+
+class _Pending:
+    """評価待ちの1行（結果はワーカースレッドが入れてdoneをセットする）"""
+
+    __slots__ = ('row', 'key', 'done', 'result', 'error')
+
+    def __init__(self, row: Dict[str, Any], key: CacheKey):
+        self.row = row
+        self.key = key
+        self.done = threading.Event()
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+
+
+class SimulationService:
+    """
+    BatchSimulationEngineを常駐させ、同時に来た要求をまとめて評価するサービス
+
+    evaluate()は複数のスレッドから呼んでよい。キャッシュに無い行はキューに入り、
+    ワーカースレッドが最初の行からmax_wait秒（またはmax_batch行）の間に来た行を
+    1つのバッチにまとめてベクトル化エンジンで評価する。結果（評価済みの行）は
+    LRUキャッシュに入れ、同じシナリオの要求はシミュレーションせずに返す。
+    """
+
+    def __init__(self, config: Dict[str, Any], max_batch: int = DEFAULT_MAX_BATCH,
+                 max_wait: float = DEFAULT_MAX_WAIT, cache_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            config: BatchSimulationEngineの設定（scenario_typeで既定のシナリオ種別）
+            max_batch: 1バッチの最大行数
+            max_wait: バッチに相乗りする要求を待つ最長時間（秒）
+            cache_size: キャッシュする結果の最大数（0ならキャッシュしない）
+        """
+        self.engine = BatchSimulationEngine(config)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[CacheKey, Dict[str, Any]]' = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._queue: queue.Queue = queue.Queue()
+        # キューに入れるのと止めるのを排他にする（止めた後に入った行は誰も処理しないので待ち続けてしまう）
+        self._queue_lock = threading.Lock()
+        self._counters = {'requests': 0, 'rows': 0, 'cache_hits': 0, 'batches': 0, 'simulated_rows': 0,
+                          'failed_rows': 0}
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def evaluate(self, rows: Sequence[Dict[str, Any]], timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        行を評価して、入力行に結果列とASIL/S/E/Cを追加した行のリストを返す
+
+        評価できなかった行は {'No': ..., 'error': メッセージ} になる。
+
+        Raises:
+            ServiceError: サービスが停止している場合、またはtimeout秒以内に結果が出なかった場合
+        """
+        if self._stopped.is_set():
+            raise ServiceError('サービスは停止しています')
+        outputs: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        pending: List[Tuple[int, _Pending]] = []
+        with self._cache_lock:
+            self._counters['requests'] += 1
+            self._counters['rows'] += len(rows)
+            for index, row in enumerate(rows):
+                key = cache_key(row)
+                cached = self._cache.get(key)
+                if cached is None:
+                    pending.append((index, _Pending(dict(row), key)))
+                    continue
+                self._cache.move_to_end(key)
+                self._counters['cache_hits'] += 1
+                outputs[index] = self._with_record_id(cached, row)
+        with self._queue_lock:
+            if pending and self._stopped.is_set():  # キャッシュを見ている間に止められた
+                raise ServiceError('サービスは停止しています')
+            for _, item in pending:
+                self._queue.put(item)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for index, item in pending:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            if not item.done.wait(remaining):
+                raise ServiceError(f'{timeout}秒以内に評価が終わりませんでした')
+            if item.error is not None:
+                outputs[index] = {'No': item.row.get('No'), 'error': item.error}
+            else:
+                outputs[index] = self._with_record_id(item.result, item.row)
+        return outputs
+
+    def stats(self) -> Dict[str, Any]:
+        """要求数・キャッシュヒット数・バッチ数などの集計"""
+        with self._cache_lock:
+            stats = dict(self._counters, cache_entries=len(self._cache))
+        stats['mean_batch_rows'] = stats['simulated_rows'] / stats['batches'] if stats['batches'] else 0.0
+        return stats
+
+    def close(self, timeout: Optional[float] = None):
+        """ワーカースレッドを止める（キューに残った行はエラーで返す）"""
+        with self._queue_lock:
+            self._stopped.set()
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def __enter__(self) -> 'SimulationService':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _with_record_id(result: Dict[str, Any], row: Dict[str, Any]) -> Dict[str, Any]:
+        """キャッシュの結果を、要求した行のNoに付け替えたコピー"""
+        output = dict(result)
+        if 'No' in row:
+            output['No'] = row['No']
+        return output
+
+    def _run(self):
+        while not self._stopped.is_set():
+            item = self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    self._stopped.set()
+                    break
+                batch.append(item)
+            self._process(batch)
+        # 止めたときにキューに残っていた行も、待っている呼び出し側に返す
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None:
+                item.error = 'サービスは停止しています'
+                item.done.set()
+
+    def _process(self, batch: List[_Pending]):
+        # 同じシナリオは1回だけ評価して、列の組が同じ行ごとにまとめてエンジンに渡す
+        unique: Dict[CacheKey, List[_Pending]] = {}
+        for item in batch:
+            unique.setdefault(item.key, []).append(item)
+        groups: Dict[Tuple[str, ...], List[Tuple[CacheKey, Dict[str, Any]]]] = {}
+        for key, items in unique.items():
+            groups.setdefault(tuple(items[0].row), []).append((key, items[0].row))
+
+        results: Dict[CacheKey, Tuple[Optional[Dict[str, Any]], Optional[str]]] = {}
+        for members in groups.values():
+            rows = [row for _, row in members]
+            for (key, _), outcome in zip(members, self._evaluate_rows(rows)):
+                results[key] = outcome
+
+        with self._cache_lock:
+            self._counters['batches'] += 1
+            self._counters['simulated_rows'] += len(unique)
+            for key, (result, error) in results.items():
+                if error is not None:
+                    self._counters['failed_rows'] += 1
+                elif self.cache_size:
+                    self._cache[key] = result
+                    self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        for key, items in unique.items():
+            result, error = results[key]
+            for item in items:
+                item.result, item.error = result, error
+                item.done.set()
+
+    def _evaluate_rows(self, rows: List[Dict[str, Any]]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """行をまとめて評価し、行ごとに(結果, エラーメッセージ)を返す（不正な行だけ外して残りを評価する）"""
+        try:
+            return [(result, None) for result in self.engine.evaluate_rows(rows)]
+        except SchemaValidationError as e:
+            if e.missing_columns:
+                return [(None, str(e))] * len(rows)
+            # エラーの行番号はrowsの中の位置（シナリオ種別が混ざっていてもエンジンが直す）
+            failures = {}
+            for error in e.errors:
+                failures.setdefault(error.row, f'{error.column}: {error.message}')
+        except Exception:
+            return self._evaluate_one_by_one(rows)
+        valid = [index for index in range(len(rows)) if index not in failures]
+        try:
+            evaluated = dict(zip(valid, [(result, None) for result in
+                                         self.engine.evaluate_rows([rows[index] for index in valid])]))
+        except Exception:
+            evaluated = dict(zip(valid, self._evaluate_one_by_one([rows[index] for index in valid])))
+        return [(None, failures[index]) if index in failures else evaluated[index] for index in range(len(rows))]
+
+    def _evaluate_one_by_one(self, rows: List[Dict[str, Any]]) -> List[Tuple[Optional[Dict[str, Any]], Optional[str]]]:
+        """どの行が原因かわからないときは1行ずつ評価して切り分ける"""
+        outcomes = []
+        for row in rows:
+            try:
+                outcomes.append((self.engine.evaluate_rows([row])[0], None))
+            except Exception as e:
+                outcomes.append((None, f'{type(e).__name__}: {e}'))
+        return outcomes
@@ -0,0 +1,208 @@
+# src/simulation/surrogate.py
+
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.simulation.adaptive_sweep import METHOD_COLUMN, SIMULATED
+from src.simulation.differential_harness import evaluate_reference
+from src.utils import functions
+
+try:
+    from scipy.spatial import cKDTree
+except ImportError:  # scipyが無ければ総当たりで近傍を探す
+    cKDTree = None
+
+# 近傍探索に使う入力列（行に無い列は0として扱う）
+FEATURE_COLUMNS = [
+    '先行車質量[kg]', '先行車速度[km/h]', '先行車減速度[G]', '後続車速度[km/h]', '後続車加速度[G]',
+    '後続車反応時間[sec]', '車間時間[sec]',
+    '回避行動パラメータ[C0]', '回避行動パラメータ[C1]', '回避行動パラメータ[C2]',
+]
+# 予測する判定項目（この組をひとまとまりのラベルとして多数決する）
+LABEL_FIELDS = [f'衝突有無[{scenario}]' for scenario in functions.SCENARIO_NAMES] + ['S', 'E', 'C', 'ASIL']
+PREDICTED = '予測'
+CONFIDENCE_COLUMN = '予測信頼度'
+
+
+class NearestNeighbourSurrogate:
+    """
+    シミュレーション済みの行から、k近傍の多数決で判定（LABEL_FIELDSの組）を予測する
+
+    入力列は学習データの範囲で0〜1に正規化して距離を測る。信頼度はk個の近傍のうち
+    多数派のラベルを持つ割合（距離0の点がある場合はその点のラベルで信頼度1）。
+    add()で学習データを追加するたびに近傍探索の木を作り直す。
+    """
+
+    def __init__(self, k: int = 8, feature_columns: Sequence[str] = FEATURE_COLUMNS):
+        self.k = k
+        self.feature_columns = list(feature_columns)
+        self.features = np.empty((0, len(self.feature_columns)))
+        self.labels: List[Tuple[Any, ...]] = []
+        self._label_ids = np.empty(0, dtype=np.int64)
+        self._label_lookup: Dict[Tuple[Any, ...], int] = {}
+        self._tree = None
+        self._scale = None
+
+    def __len__(self) -> int:
+        return len(self._label_ids)
+
+    def features_of(self, rows: List[Dict[str, Any]]) -> np.ndarray:
+        """行から入力列の配列（行数, 列数）を作る"""
+        return np.array([[float(row.get(column) or 0.0) for column in self.feature_columns] for row in rows],
+                        dtype=float).reshape(len(rows), len(self.feature_columns))
+
+    def add(self, rows: List[Dict[str, Any]], outputs: List[Dict[str, Any]]):
+        """シミュレーション済みの行（入力とその評価結果）を学習データに追加する"""
+        self.add_features(self.features_of(rows), outputs)
+
+    def add_features(self, features: np.ndarray, outputs: List[Dict[str, Any]]):
+        """add()の入力列の配列版（同じ行を何度も予測する場合は配列を作り置きすると速い）"""
+        label_ids = []
+        for output in outputs:
+            label = tuple(output.get(field) for field in LABEL_FIELDS)
+            if label not in self._label_lookup:
+                self._label_lookup[label] = len(self.labels)
+                self.labels.append(label)
+            label_ids.append(self._label_lookup[label])
+        self.features = np.vstack([self.features, features])
+        self._label_ids = np.concatenate([self._label_ids, np.asarray(label_ids, dtype=np.int64)])
+
+        low, high = self.features.min(axis=0), self.features.max(axis=0)
+        self._offset = low
+        self._scale = np.where(high > low, high - low, 1.0)
+        normalized = (self.features - self._offset) / self._scale
+        self._tree = cKDTree(normalized) if cKDTree is not None else normalized
+
+    def _neighbours(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """(距離, 学習データの番号) をそれぞれ (行数, k) の配列で返す"""
+        if cKDTree is not None:
+            distances, indices = self._tree.query(queries, k=k)
+            return distances.reshape(len(queries), k), indices.reshape(len(queries), k)
+        distances = np.empty((len(queries), k))
+        indices = np.empty((len(queries), k), dtype=np.int64)
+        for start in range(0, len(queries), 1024):  # 距離行列が大きくなりすぎないように分けて探す
+            block = np.linalg.norm(queries[start:start + 1024, np.newaxis, :] - self._tree[np.newaxis], axis=2)
+            nearest = np.argsort(block, axis=1)[:, :k]
+            indices[start:start + 1024] = nearest
+            distances[start:start + 1024] = np.take_along_axis(block, nearest, axis=1)
+        return distances, indices
+
+    def predict(self, rows: List[Dict[str, Any]]) -> Tuple[List[Tuple[Any, ...]], np.ndarray]:
+        """
+        行ごとの予測ラベルと信頼度（0〜1）を返す
+
+        Raises:
+            ValueError: 学習データが無い場合
+        """
+        return self.predict_features(self.features_of(rows))
+
+    def predict_features(self, features: np.ndarray) -> Tuple[List[Tuple[Any, ...]], np.ndarray]:
+        """predict()の入力列の配列版"""
+        if not len(self):
+            raise ValueError("学習データがありません")
+        if not len(features):
+            return [], np.empty(0)
+        queries = (features - self._offset) / self._scale
+        distances, indices = self._neighbours(queries, min(self.k, len(self)))
+        neighbour_labels = self._label_ids[indices]
+
+        # 各近傍と同じラベルを持つ近傍の数を数えて、一番多いもの（同数なら近い方）を多数派にする
+        votes = (neighbour_labels[:, :, np.newaxis] == neighbour_labels[:, np.newaxis, :]).sum(axis=2)
+        winner = np.argmax(votes, axis=1)
+        label_ids = np.take_along_axis(neighbour_labels, winner[:, np.newaxis], axis=1)[:, 0]
+        confidence = np.take_along_axis(votes, winner[:, np.newaxis], axis=1)[:, 0] / neighbour_labels.shape[1]
+        exact = distances[:, 0] == 0.0  # 学習データと同じ点ならそのラベルをそのまま使う
+        label_ids[exact] = neighbour_labels[exact, 0]
+        confidence[exact] = 1.0
+        predictions = [self.labels[label_id] for label_id in label_ids.tolist()]
+        return predictions, confidence
+
+
+class SurrogateSweep:
+    """
+    スイープの一部だけをシミュレーションし、残りを近傍の結果から予測する
+
+    最初にinitial_fractionの行を抽出してシミュレーションし、残りの行を予測する。信頼度が
+    thresholdより低い行は、低い順にbatch_sizeずつシミュレーションして学習データに加え、
+    予測し直す。低信頼度の行が無くなるかmax_roundsに達したら、残りを予測で埋める。
+    """
+
+    def __init__(self, config: Dict[str, Any], threshold: float = 1.0, initial_fraction: float = 0.1,
+                 batch_size: int = 2000, max_rounds: int = 50, k: int = 8, seed: int = 0,
+                 evaluate: Optional[Callable[[List[Dict[str, Any]], Dict[str, Any]], List[Dict[str, Any]]]] = None):
+        """
+        Args:
+            config: シミュレーションの設定（ログは書き出さない）
+            threshold: この信頼度未満の予測はシミュレーションに回す（1.0なら近傍が全員一致した点だけ予測）
+            initial_fraction: 最初にシミュレーションする行の割合
+            batch_size: 1ラウンドで追加シミュレーションする最大の行数
+            max_rounds: 追加シミュレーションのラウンド数の上限
+            k: 近傍の数
+            seed: 最初の抽出の乱数シード
+            evaluate: 行のリストを評価する関数（既定はSimulationEngine + ASILCalculator）
+        """
+        self.config = dict(config, write_log=False, log_mode='none')
+        self.threshold = threshold
+        self.initial_fraction = initial_fraction
+        self.batch_size = batch_size
+        self.max_rounds = max_rounds
+        self.k = k
+        self.seed = seed
+        self.evaluate = evaluate or evaluate_reference
+
+    def run(self, rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns:
+            Dict[str, Any]: 'rows'（入力と同じ順番。シミュレーションした行は評価結果、予測した行は
+            LABEL_FIELDSの予測とCONFIDENCE_COLUMNを持ち、どちらもMETHOD_COLUMNで区別できる）と'stats'
+        """
+        start = time.perf_counter()
+        surrogate = NearestNeighbourSurrogate(self.k)
+        features = surrogate.features_of(rows)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+
+        def simulate(indices):
+            outputs = self.evaluate([rows[index] for index in indices], self.config)
+            surrogate.add_features(features[indices], outputs)
+            for index, output in zip(indices, outputs):
+                results[index] = dict(output, **{METHOD_COLUMN: SIMULATED})
+
+        if not rows:
+            return {'rows': [], 'stats': {'rows': 0, 'simulated': 0, 'predicted': 0, 'simulated_fraction': None,
+                                          'rounds': 0, 'uncertain_predicted': 0, 'seconds': 0.0}}
+        rng = np.random.default_rng(self.seed)
+        initial = max(min(len(rows), self.k), int(len(rows) * self.initial_fraction))
+        simulate(sorted(rng.choice(len(rows), size=initial, replace=False).tolist()))
+
+        rounds = 0
+        predictions, confidence, remaining = [], np.empty(0), []
+        while True:
+            remaining = [index for index, result in enumerate(results) if result is None]
+            predictions, confidence = surrogate.predict_features(features[remaining])
+            uncertain = np.flatnonzero(confidence < self.threshold)
+            if not len(uncertain) or rounds >= self.max_rounds:
+                break
+            rounds += 1
+            order = uncertain[np.argsort(confidence[uncertain], kind='stable')][:self.batch_size]
+            simulate(sorted(remaining[position] for position in order))
+
+        for index, label, score in zip(remaining, predictions, confidence.tolist()):
+            row = functions.fill_asil_context(dict(rows[index]))
+            row.update(zip(LABEL_FIELDS, label))
+            row[METHOD_COLUMN] = PREDICTED
+            row[CONFIDENCE_COLUMN] = score
+            results[index] = row
+
+        simulated = sum(row[METHOD_COLUMN] == SIMULATED for row in results)
+        stats = {
+            'rows': len(rows),
+            'simulated': simulated,
+            'predicted': len(rows) - simulated,
+            'simulated_fraction': simulated / len(rows) if rows else None,
+            'rounds': rounds,
+            'uncertain_predicted': int((confidence < self.threshold).sum()),
+            'seconds': time.perf_counter() - start,
+        }
+        return {'rows': results, 'stats': stats}
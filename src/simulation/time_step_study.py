@@ -0,0 +1,156 @@
+# src/simulation/time_step_study.py
+
+import random
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from src.simulation.simulation_engine import SimulationEngine
+from src.asil_calculation.asil_calculator import ASILCalculator
+from src.utils import functions
+
+DEFAULT_TIME_STEPS = [0.2, 0.1, 0.05, 0.02, 0.01]
+
+
+class TimeStepStudy:
+    """
+    時間刻み（time_step）の収束性を調べ、ASIL判定が変わらない最大の刻み幅を推奨する
+    """
+
+    def __init__(self, config: Dict[str, Any], time_steps: Optional[Sequence[float]] = None,
+                 sample_size: int = 200, seed: int = 0):
+        """
+        Args:
+            config: SimulationEngineの設定（time_stepは現在値として見積りに使う）
+            time_steps: 試す時間刻みのリスト。最も細かい値を基準解とする
+            sample_size: スイープから抽出する行数
+            seed: 抽出用の乱数シード
+        """
+        self.config = config
+        self.time_steps = sorted(set(time_steps or DEFAULT_TIME_STEPS), reverse=True)
+        self.sample_size = sample_size
+        self.seed = seed
+        self.asil_calculator = ASILCalculator()
+
+    def sample_rows(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """スイープから評価用の行を再現可能な形で抽出する"""
+        if len(rows) <= self.sample_size:
+            return list(rows)
+        return random.Random(self.seed).sample(rows, self.sample_size)
+
+    def evaluate(self, rows: List[Dict[str, Any]], time_step: float) -> Dict[str, Any]:
+        """
+        1つの時間刻みで全行をシミュレーションし、判定結果と所要時間を返す
+
+        Returns:
+            Dict[str, Any]: 'outcomes'（行ごとの衝突有無・C・ASIL）と'seconds'
+        """
+        config = dict(self.config, time_step=time_step, write_log=False, log_mode='none')
+        outcomes = []
+        start = time.perf_counter()
+        for row in rows:
+            sim_engine = SimulationEngine(config)
+            sim_engine.load_data(row)
+            sim_engine.run_simulation()
+            result_row = functions.merge_simulation_results(row, sim_engine.get_results())
+            asil_row = self.asil_calculator.calculate(functions.fill_asil_context(result_row))
+            outcomes.append({
+                'No': row.get('No', 'unknown'),
+                'collisions': tuple(asil_row[f'衝突有無[{scenario}]'] for scenario in functions.SCENARIO_NAMES),
+                'C': asil_row['C'],
+                'ASIL': asil_row['ASIL']
+            })
+        return {'outcomes': outcomes, 'seconds': time.perf_counter() - start}
+
+    @staticmethod
+    def _compare(outcomes: List[Dict[str, Any]], reference: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """2つの判定結果を行ごとに比較し、不一致件数とASILが変わった記録Noを返す"""
+        mismatches = {'collision': 0, 'C': 0, 'ASIL': 0}
+        asil_flips = []
+        for outcome, ref in zip(outcomes, reference):
+            if outcome['collisions'] != ref['collisions']:
+                mismatches['collision'] += 1
+            if outcome['C'] != ref['C']:
+                mismatches['C'] += 1
+            if outcome['ASIL'] != ref['ASIL']:
+                mismatches['ASIL'] += 1
+                asil_flips.append({'No': outcome['No'], 'ASIL': outcome['ASIL'], 'reference': ref['ASIL']})
+        return {'mismatches': mismatches, 'asil_flips': asil_flips}
+
+    def run(self, rows: List[Dict[str, Any]], total_rows: Optional[int] = None) -> Dict[str, Any]:
+        """
+        抽出した行を粗い刻みから細かい刻みまで順に実行し、収束レポートを作成する
+
+        Args:
+            rows: スイープ全体（またはその一部）の入力行
+            total_rows: 全スイープの行数。省略時はrowsの行数
+
+        Returns:
+            Dict[str, Any]: 刻み幅ごとの不一致数・収束点・推奨刻み幅・所要時間の見積り
+        """
+        sample = self.sample_rows(rows)
+        if not sample:
+            raise ValueError("評価する行がありません")
+        total_rows = total_rows if total_rows is not None else len(rows)
+
+        evaluations = {dt: self.evaluate(sample, dt) for dt in self.time_steps}
+        reference_step = self.time_steps[-1]
+        reference = evaluations[reference_step]['outcomes']
+
+        steps = []
+        previous = None
+        for dt in reversed(self.time_steps):  # 細かい刻みから順に前の刻みとの差分を取る
+            evaluation = evaluations[dt]
+            versus_reference = self._compare(evaluation['outcomes'], reference)
+            versus_finer = self._compare(evaluation['outcomes'], previous) if previous else None
+            seconds_per_row = evaluation['seconds'] / len(sample)
+            steps.append({
+                'time_step': dt,
+                'seconds': evaluation['seconds'],
+                'seconds_per_row': seconds_per_row,
+                'estimated_full_sweep_seconds': seconds_per_row * total_rows,
+                'mismatches': versus_reference['mismatches'],
+                'changes_from_finer': versus_finer['mismatches'] if versus_finer else None,
+                'asil_flips': versus_reference['asil_flips'],
+            })
+            previous = evaluation['outcomes']
+        steps.reverse()  # 粗い刻みから順に並べ直す
+
+        converged_at = {key: self._converged_step(steps, [key]) for key in ('collision', 'C', 'ASIL')}
+        recommended = self._converged_step(steps, ['C', 'ASIL'])
+        return {
+            'sample_size': len(sample),
+            'total_rows': total_rows,
+            'reference_time_step': reference_step,
+            'current_time_step': self.config.get('time_step'),
+            'steps': steps,
+            'converged_at': converged_at,
+            'recommended_time_step': recommended,
+            'estimated_savings_seconds': self._estimate_savings(steps, recommended, total_rows),
+        }
+
+    @staticmethod
+    def _converged_step(steps: List[Dict[str, Any]], keys: List[str]) -> float:
+        """
+        指定した判定がその刻み以下の全ての刻みで基準解と一致する、最大の刻み幅を返す
+        （粗い刻みで偶然一致しただけのケースを推奨しないため）
+        """
+        converged = steps[-1]['time_step']
+        for step in reversed(steps):
+            if any(step['mismatches'][key] for key in keys):
+                break
+            converged = step['time_step']
+        return converged
+
+    def _estimate_savings(self, steps: List[Dict[str, Any]], recommended: float, total_rows: int) -> Optional[float]:
+        """現在の刻み幅に対して、推奨刻み幅でスイープ全体を回した場合の短縮時間（秒）を見積もる"""
+        per_row = {step['time_step']: step['seconds_per_row'] for step in steps}
+        current = self.config.get('time_step')
+        if current in per_row:
+            current_per_row = per_row[current]
+        elif current:
+            # 未評価の刻み幅は、ステップ数が刻み幅に反比例するとして最も近い測定値から換算する
+            nearest = min(per_row, key=lambda dt: abs(dt - current))
+            current_per_row = per_row[nearest] * nearest / current
+        else:
+            return None
+        return (current_per_row - per_row[recommended]) * total_rows
@@ -0,0 +1,131 @@
+# src/utils/background_job.py
+
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+
+def split_chunks(items: Sequence[Any], chunk_size: int) -> List[Sequence[Any]]:
+    """リストをchunk_size件ずつに分割する"""
+    chunk_size = max(1, int(chunk_size))
+    return [items[start:start + chunk_size] for start in range(0, len(items), chunk_size)]
+
+
+def default_chunk_size(total: int, workers: Optional[int] = None, max_size: int = 2000) -> int:
+    """ワーカー1つあたり20チャンク程度になるチャンクサイズ（進捗表示とキャンセルの粒度用）"""
+    workers = workers or os.cpu_count() or 1
+    return max(1, min(max_size, total // (workers * 20) or 1))
+
+
+class BackgroundJob:
+    """
+    GUIのイベントスレッドをブロックせずに、チャンク単位の処理をプロセスプールで実行する
+
+    バックグラウンドスレッドがチャンクをプロセスプールに投入し、完了ごとに
+    ('progress', 処理済み件数) をキューに積む。全チャンクの完了後はfinalizeを
+    同じバックグラウンドスレッドで実行し、('done', finalizeの戻り値) を積む。
+    キャンセル時は ('cancelled', 処理済み件数)、例外時は ('error', 例外) を積む。
+    on_chunkの例外ではジョブを止めず、メッセージごとに1回だけ ('warning', メッセージ) を積む。
+    cleanupは終わり方（完了・キャンセル・例外）によらず、最後のイベントを積む前に呼ぶ。
+    GUI側はdrain()でイベントを取り出す（Tkならafter()で定期的に呼ぶ）。
+    """
+
+    def __init__(self, worker: Callable[..., List[Any]], chunks: List[Sequence[Any]],
+                 worker_args: Tuple[Any, ...] = (), finalize: Callable[[List[Any]], Any] = None,
+                 max_workers: Optional[int] = None,
+                 on_chunk: Optional[Callable[[Sequence[Any], List[Any]], None]] = None,
+                 cleanup: Optional[Callable[[], None]] = None):
+        """
+        Args:
+            worker: worker(chunk, *worker_args)でチャンクの結果リストを返す関数（pickle可能なモジュール関数）
+            chunks: 入力のチャンク
+            worker_args: workerに渡す追加の引数
+            finalize: 全チャンクの結果を順番通りに連結したリストを受け取る後処理（ファイル書き込みなど）
+            max_workers: プロセス数。Noneならos.cpu_count()
+            on_chunk: チャンクが終わるたびに(チャンク, 結果)で呼ぶ関数（完了順。途中経過の集計など）
+            cleanup: ジョブの終わりに必ず呼ぶ後片付け（途中経過の出力を閉じるなど）
+        """
+        self.worker = worker
+        self.chunks = chunks
+        self.worker_args = worker_args
+        self.finalize = finalize
+        self.max_workers = max_workers
+        self.on_chunk = on_chunk
+        self.cleanup = cleanup
+        self.total = sum(len(chunk) for chunk in chunks)
+        self.events: queue.Queue = queue.Queue()
+        self._cancel_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._warnings = set()
+
+    def start(self) -> 'BackgroundJob':
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def cancel(self):
+        """キャンセルを要求する（実行中のチャンクの完了を待って止まる）"""
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel_event.is_set()
+
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def drain(self) -> List[Tuple[str, Any]]:
+        """溜まっているイベントを全て取り出す"""
+        events = []
+        while True:
+            try:
+                events.append(self.events.get_nowait())
+            except queue.Empty:
+                return events
+
+    def warn(self, message: str):
+        """('warning', メッセージ) を積む（同じメッセージは1回だけ）"""
+        if message not in self._warnings:
+            self._warnings.add(message)
+            self.events.put(('warning', message))
+
+    def _run(self):
+        try:
+            event = self._process()
+        except Exception as e:
+            event = ('error', e)
+        if self.cleanup is not None:
+            try:
+                self.cleanup()
+            except Exception as e:
+                self.warn(f"後片付けに失敗しました: {type(e).__name__}: {e}")
+        self.events.put(event)
+
+    def _process(self) -> Tuple[str, Any]:
+        """チャンクを処理して、最後のイベント（'done'か'cancelled'）を返す"""
+        results: List[Optional[List[Any]]] = [None] * len(self.chunks)
+        processed = 0
+        executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        try:
+            futures = {executor.submit(self.worker, chunk, *self.worker_args): index
+                       for index, chunk in enumerate(self.chunks)}
+            for future in as_completed(futures):
+                if self._cancel_event.is_set():
+                    return 'cancelled', processed
+                index = futures[future]
+                results[index] = future.result()
+                if self.on_chunk is not None:
+                    try:
+                        self.on_chunk(self.chunks[index], results[index])
+                    except Exception as e:
+                        self.warn(f"途中経過の更新に失敗しました: {type(e).__name__}: {e}")
+                processed += len(self.chunks[index])
+                self.events.put(('progress', processed))
+        finally:
+            # キャンセル・例外時は未着手のチャンクを捨てて、実行中のものだけ待たずに閉じる
+            executor.shutdown(wait=not self._cancel_event.is_set(), cancel_futures=True)
+
+        merged = [item for chunk_results in results for item in chunk_results]
+        return 'done', self.finalize(merged) if self.finalize else merged
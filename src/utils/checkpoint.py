@@ -0,0 +1,128 @@
+# src/utils/checkpoint.py
+
+import csv
+import hashlib
+import json
+import os
+import shutil
+from typing import Any, Dict, Iterable, List, Sequence
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def config_hash(*items: Any) -> str:
+    """設定などJSONにできる値からハッシュを作る（キーの順番に依存しない）"""
+    text = json.dumps(items, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def file_fingerprint(path: str) -> Dict[str, Any]:
+    """入力ファイルが差し替えられていないか確認するためのサイズと更新時刻"""
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ShardCheckpoint:
+    """
+    チャンクごとの出力シャードとマニフェストで、長時間のスイープを途中から再開できるようにする
+
+    シャードはヘッダー無しのCSV（part_000000.csv, ...）として書き、書き終えてから
+    マニフェストの completed に [チャンク番号, 開始行, 終了行, ファイル名, エラー行] を追加する。
+    エラー行（処理に失敗した行のサイドカー用の辞書）もマニフェストに残すので、再開しても失われない。
+    どちらも一時ファイルに書いてからos.replaceするので、途中で止まっても
+    マニフェストに載っているシャードは完全な内容になっている。
+    """
+
+    def __init__(self, directory: str, run_hash: str):
+        """
+        Args:
+            directory: シャードとマニフェストを置くディレクトリ
+            run_hash: 設定・入力ファイルから作ったハッシュ（再開時に一致を確認する）
+        """
+        self.directory = directory
+        self.run_hash = run_hash
+        self.completed: Dict[int, List[Any]] = {}
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, MANIFEST_NAME)
+
+    def open(self, resume: bool = False) -> 'ShardCheckpoint':
+        """
+        チェックポイントを開く。resume=Falseなら既存のシャードを消して最初からやり直す
+
+        Raises:
+            ValueError: resume=Trueで、マニフェストのハッシュが今回の設定と一致しない場合
+        """
+        if resume and os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('config_hash') != self.run_hash:
+                raise ValueError(
+                    f"{self.manifest_path} は別の設定・入力ファイルで作られたチェックポイントです。"
+                    "--resume を付けずに最初から実行してください")
+            self.completed = {
+                entry[0]: entry for entry in manifest.get('completed', [])
+                if os.path.exists(os.path.join(self.directory, entry[3]))
+            }
+        else:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.completed = {}
+        os.makedirs(self.directory, exist_ok=True)
+        self._write_manifest()
+        return self
+
+    def is_done(self, index: int) -> bool:
+        return index in self.completed
+
+    @property
+    def completed_rows(self) -> int:
+        return sum(entry[2] - entry[1] for entry in self.completed.values())
+
+    @property
+    def errors(self) -> List[Dict[str, Any]]:
+        """完了したチャンクのエラー行（チャンク番号順）"""
+        return [error for index in sorted(self.completed) for error in self.completed[index][4]]
+
+    def write_shard(self, index: int, start: int, end: int, fieldnames: Sequence[str],
+                    rows: Iterable[Dict[str, Any]], errors: Iterable[Dict[str, Any]] = ()):
+        """
+        チャンクindex（入力の[start, end)行）の出力行をシャードに書き、完了として記録する
+
+        Args:
+            errors: 処理に失敗した行（シャードには書かず、マニフェストに残す）
+        """
+        name = f'part_{index:06d}.csv'
+        path = os.path.join(self.directory, name)
+        with open(path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=fieldnames)
+            writer.writerows(rows)
+        os.replace(path + '.tmp', path)
+        self.completed[index] = [index, start, end, name, list(errors)]
+        self._write_manifest()
+
+    def read_shard(self, index: int, fieldnames: Sequence[str]) -> List[Dict[str, str]]:
+        """完了したチャンクindexのシャードの行を読む（値はCSVの文字列のまま）"""
+        with open(os.path.join(self.directory, self.completed[index][3]), 'r', newline='', encoding='utf-8') as f:
+            return list(csv.DictReader(f, fieldnames=fieldnames))
+
+    def merge(self, output_path: str, fieldnames: Sequence[str]):
+        """完了したシャードをチャンク番号順に連結して、ヘッダー付きの1つのCSVにする"""
+        with open(output_path, 'w', newline='', encoding='utf-8-sig') as outfile:
+            csv.DictWriter(outfile, fieldnames=fieldnames).writeheader()
+            for index in sorted(self.completed):
+                with open(os.path.join(self.directory, self.completed[index][3]), 'r',
+                          newline='', encoding='utf-8') as shard:
+                    shutil.copyfileobj(shard, outfile)
+
+    def cleanup(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_manifest(self):
+        manifest = {
+            'config_hash': self.run_hash,
+            'completed': [self.completed[index] for index in sorted(self.completed)],
+        }
+        with open(self.manifest_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        os.replace(self.manifest_path + '.tmp', self.manifest_path)
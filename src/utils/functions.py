@@ -65,6 +65,26 @@ def save_data_to_csv(data: list, filename: str = "output.csv"):
         writer.writeheader()
         writer.writerows(data)
 
+def save_rows_to_csv(rows: list, filename: str, last_columns: tuple = ()):
+    """
+    列が揃っていない行（補間・予測した行など）をCSVファイルに保存します。
+    全行のキーを出てきた順に集めてヘッダーにし、行に無い列は空欄にします。
+
+    :param rows: 保存する行のリスト
+    :param filename: 出力ファイル名（ディレクトリが無ければ作成します）
+    :param last_columns: ヘッダーの末尾に移す列名
+    """
+    import csv
+    import os
+    os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+    fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+    fieldnames = ([key for key in fieldnames if key not in last_columns]
+                  + [key for key in last_columns if key in fieldnames])
+    with open(filename, "w", encoding="utf-8-sig", newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames, restval='')
+        writer.writeheader()
+        writer.writerows(rows)
+
 def detect_collision(vehicle1_position: float, vehicle2_position: float, collision_threshold: float = 0.1) -> bool:
     """
     二つの車両の位置に基づいて衝突を検出します。
@@ -74,4 +94,40 @@ def detect_collision(vehicle1_position: float, vehicle2_position: float, collisi
     :param collision_threshold: 衝突とみなす距離のしきい値（デフォルト: 0.1メートル）
     :return: 衝突が検出された場合はTrue、そうでない場合はFalse
     """
-    return abs(vehicle1_position - vehicle2_position) < collision_threshold
\ No newline at end of file
+    return abs(vehicle1_position - vehicle2_position) < collision_threshold
+
+SCENARIO_NAMES = ['回避無し', 'C0', 'C1', 'C2']
+RESULT_NAMES = ['衝突有無', '衝突時刻', '衝突位置', '有効衝突速度']
+
+
+def merge_simulation_results(row: dict, results: dict) -> dict:
+    """
+    入力行にシミュレーション結果を `結果名[シナリオ]` 形式の列として追加した新しい行を返します。
+
+    :param row: 入力データの1行
+    :param results: SimulationEngine.get_results() の戻り値
+    :return: 入力行とシミュレーション結果をまとめた辞書
+    """
+    output_row = dict(row)
+    for scenario in SCENARIO_NAMES:
+        for result in RESULT_NAMES:
+            output_row[f'{result}[{scenario}]'] = results[scenario][result]
+    return output_row
+
+
+def fill_asil_context(row: dict) -> dict:
+    """
+    ASIL計算に必要な衝突タイプと進行方向が無い行に、DataGeneratorの規約に沿った値を補います。
+    先行車質量が100kg未満の行は歩行者、それ以外は前進中の車両衝突として扱います。
+
+    :param row: シミュレーション結果を含む1行
+    :return: 補完後の行（引数と同じオブジェクト）
+    """
+    if '衝突タイプ' not in row:
+        try:
+            is_pedestrian = float(row.get('先行車質量[kg]', 0)) < 100
+        except (TypeError, ValueError):
+            is_pedestrian = False
+        row['衝突タイプ'] = '歩行者衝突' if is_pedestrian else '車両衝突_前進'
+    row.setdefault('進行方向', '前進')
+    return row
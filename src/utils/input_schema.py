@@ -0,0 +1,184 @@
+# src/utils/input_schema.py
+
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class InputField:
+    """
+    入力列の定義
+
+    Args:
+        column: CSVの列名
+        name: パース後の列名（ソルバーに渡すときの名前）
+        convert: パース後に適用する単位変換（例: functions.kph_to_mps）。Noneなら変換しない
+        default: 列が無い場合の値。Noneなら必須列
+    """
+
+    def __init__(self, column: str, name: str, convert: Callable[[np.ndarray], np.ndarray] = None,
+                 default: Optional[float] = None):
+        self.column = column
+        self.name = name
+        self.convert = convert
+        self.default = default
+
+    @property
+    def required(self) -> bool:
+        return self.default is None
+
+
+class FieldError:
+    """1つの値のパースエラー（行番号はデータ部の0始まり）"""
+
+    __slots__ = ('row', 'record_id', 'column', 'value', 'message')
+
+    def __init__(self, row: int, record_id: Any, column: str, value: Any, message: str):
+        self.row = row
+        self.record_id = record_id
+        self.column = column
+        self.value = value
+        self.message = message
+
+    def __repr__(self) -> str:
+        return f"FieldError(row={self.row}, No={self.record_id!r}, column={self.column!r}, value={self.value!r})"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {'row': self.row, 'No': self.record_id, 'column': self.column,
+                'value': self.value, 'message': self.message}
+
+
+class SchemaValidationError(ValueError):
+    """入力に必須列の欠落や数値に変換できない値がある場合のエラー（全件分のerrorsを持つ）"""
+
+    def __init__(self, errors: List[FieldError], missing_columns: List[str] = None):
+        self.errors = errors
+        self.missing_columns = missing_columns or []
+        if self.missing_columns:
+            message = f"必須列 {self.missing_columns} が見つかりません"
+        else:
+            rows = sorted({error.row for error in errors})
+            message = f"{len(rows)} 行に不正な値があります（最初の行: {errors[0]!r}）" if errors else "不正な入力です"
+        super().__init__(message)
+
+
+class TypedColumns:
+    """
+    パース済みの型付き列
+
+    Attributes:
+        columns: パース後の列名→float64配列（単位変換済み、不正な値はNaN）
+        valid: 全ての列が正しくパースできた行をTrueとするbool配列
+        errors: パースエラーの一覧
+        record_ids: 'No'列の値（無ければ行番号）
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], valid: np.ndarray,
+                 errors: List[FieldError], record_ids: List[Any]):
+        self.columns = columns
+        self.valid = valid
+        self.errors = errors
+        self.record_ids = record_ids
+
+    def __len__(self) -> int:
+        return len(self.valid)
+
+    @property
+    def invalid_rows(self) -> List[int]:
+        return np.flatnonzero(~self.valid).tolist()
+
+    def select(self, rows) -> 'TypedColumns':
+        """指定した行（bool配列または行番号の配列）だけを取り出す"""
+        rows = np.flatnonzero(rows) if np.asarray(rows).dtype == bool else np.asarray(rows, dtype=int)
+        position = {row: index for index, row in enumerate(rows.tolist())}
+        errors = [FieldError(position[error.row], error.record_id, error.column, error.value, error.message)
+                  for error in self.errors if error.row in position]
+        return TypedColumns({name: values[rows] for name, values in self.columns.items()},
+                            self.valid[rows], errors, [self.record_ids[row] for row in rows.tolist()])
+
+    def raise_for_errors(self):
+        if self.errors:
+            raise SchemaValidationError(self.errors)
+
+
+class CompiledSchema:
+    """
+    ヘッダーに対して列位置を解決済みのスキーマ（1ファイルにつき1回だけ作る）
+    """
+
+    def __init__(self, fields: List[InputField], header: Sequence[str], id_column: str = 'No'):
+        positions = {column: index for index, column in enumerate(header)}
+        missing = [field.column for field in fields if field.required and field.column not in positions]
+        if missing:
+            raise SchemaValidationError([], missing_columns=missing)
+        self.fields = fields
+        self.header = list(header)
+        self.indices = {field.name: positions.get(field.column) for field in fields}
+        self.id_index = positions.get(id_column)
+
+    def parse(self, records: Sequence[Sequence[Any]]) -> TypedColumns:
+        """
+        レコード（ヘッダー順の値のリスト）を列ごとに一括で型付き配列へ変換する
+        """
+        count = len(records)
+        valid = np.ones(count, dtype=bool)
+        if self.id_index is None:
+            record_ids = list(range(count))
+        else:
+            record_ids = [record[self.id_index] if len(record) > self.id_index else None for record in records]
+
+        errors = []
+        columns = {}
+        for field in self.fields:
+            index = self.indices[field.name]
+            if index is None:
+                values = np.full(count, field.default, dtype=np.float64)
+            else:
+                raw = [record[index] if len(record) > index else '' for record in records]
+                values, bad = self._parse_column(raw)
+                if bad.any():
+                    valid &= ~bad
+                    errors.extend(FieldError(row, record_ids[row], field.column, raw[row],
+                                             f"'{field.column}' の値 {raw[row]!r} を数値に変換できません")
+                                  for row in np.flatnonzero(bad).tolist())
+            columns[field.name] = field.convert(values) if field.convert else values
+        errors.sort(key=lambda error: error.row)
+        return TypedColumns(columns, valid, errors, record_ids)
+
+    @staticmethod
+    def _parse_column(raw: List[Any]):
+        """文字列の列をfloat64配列に変換し、(値, 不正な要素のbool配列)を返す"""
+        try:
+            values = np.array(raw, dtype=np.float64)
+        except (ValueError, TypeError):
+            # 変換できない要素がある列だけ1要素ずつ調べる
+            values = np.empty(len(raw), dtype=np.float64)
+            for row, value in enumerate(raw):
+                try:
+                    values[row] = float(value)
+                except (ValueError, TypeError):
+                    values[row] = np.nan
+        return values, np.isnan(values)
+
+
+class InputSchema:
+    """
+    入力列の定義の集まり。ヘッダーに対してcompileし、列単位で一括パースする
+    """
+
+    def __init__(self, fields: List[InputField]):
+        self.fields = fields
+
+    @property
+    def columns(self) -> List[str]:
+        return [field.column for field in self.fields]
+
+    def compile(self, header: Sequence[str]) -> CompiledSchema:
+        return CompiledSchema(self.fields, header)
+
+    def parse_dicts(self, rows: List[Dict[str, Any]]) -> TypedColumns:
+        """辞書の行（csv.DictReaderの出力など）をパースする。列の有無は先頭行のキーで判定する"""
+        present = rows[0].keys() if rows else ()
+        header = [column for column in ['No'] + self.columns if column in present]  # 必要な列だけ取り出す
+        compiled = self.compile(header)
+        return compiled.parse([[row.get(column) for column in header] for row in rows])
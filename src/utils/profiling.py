@@ -0,0 +1,159 @@
+# src/utils/profiling.py
+
+import cProfile
+import io
+import json
+import os
+import pstats
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from typing import Any, Dict, Optional
+
+_NULL_CONTEXT = nullcontext()
+
+
+class Profiler:
+    """
+    ステージごとの実時間・CPU時間と、件数のカウンターを集計する
+
+    stage()はネストしてよい（例: 'step_loop'の中の'log_state'）。その場合、外側の
+    ステージの時間には内側の時間も含まれる。ワーカープロセスで集計した分は
+    state()で取り出してmerge()で親に足し込む（実時間はプロセスごとの合計になる）。
+    enabled=Falseならstage()/count()は何もしない。
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.stages: Dict[str, list] = {}  # ステージ名 → [実時間, CPU時間, 呼び出し回数]
+        self.counters: Dict[str, int] = {}
+        self.started = time.perf_counter()
+
+    def stage(self, name: str):
+        """withで囲んだ区間の実時間とCPU時間をステージnameに加算する"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name: str):
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add_time(self, name: str, wall: float, cpu: float, calls: int = 1):
+        if not self.enabled:
+            return
+        totals = self.stages.setdefault(name, [0.0, 0.0, 0])
+        totals[0] += wall
+        totals[1] += cpu
+        totals[2] += calls
+
+    def count(self, name: str, value: int = 1):
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def state(self) -> Dict[str, Any]:
+        """プロセス間で受け渡せる集計値"""
+        return {'stages': {name: list(totals) for name, totals in self.stages.items()},
+                'counters': dict(self.counters)}
+
+    def merge(self, state: Dict[str, Any]):
+        """別のProfilerのstate()を足し込む"""
+        for name, (wall, cpu, calls) in state['stages'].items():
+            self.add_time(name, wall, cpu, calls)
+        for name, value in state['counters'].items():
+            self.count(name, value)
+
+    def report(self) -> Dict[str, Any]:
+        """
+        集計結果をJSONにできる辞書で返す
+
+        Returns:
+            Dict[str, Any]: elapsed_seconds（開始からの実時間）、stages（ステージごとの
+            wall_seconds, cpu_seconds, calls）、counters、rows_per_second（'rows'カウンター÷経過時間）
+        """
+        elapsed = time.perf_counter() - self.started
+        rows = self.counters.get('rows', 0)
+        return {
+            'elapsed_seconds': elapsed,
+            'rows_per_second': rows / elapsed if elapsed > 0 else None,
+            'stages': {
+                name: {'wall_seconds': wall, 'cpu_seconds': cpu, 'calls': calls}
+                for name, (wall, cpu, calls) in sorted(self.stages.items(), key=lambda item: -item[1][0])
+            },
+            'counters': dict(sorted(self.counters.items())),
+        }
+
+
+class ProfileSession:
+    """
+    Profilerに、必要ならcProfileとtracemallocのフックを付けて実行を計測し、JSONレポートを書き出す
+
+    cProfileとtracemallocはこのプロセスだけを対象にする（プロセスプールのワーカーは含まない）。
+
+    使い方:
+        with ProfileSession('results_profile.json', cprofile=True) as profiler:
+            with profiler.stage('csv_read'):
+                ...
+    """
+
+    def __init__(self, report_path: Optional[str], cprofile: bool = False, trace_memory: bool = False,
+                 top: int = 20):
+        """
+        Args:
+            report_path: JSONレポートの出力先。Noneなら計測しない（無効なProfilerを返す）
+            cprofile: cProfileで関数ごとの時間も取る（<report>.pstatsも書き出す）
+            trace_memory: tracemallocでピークメモリと確保量の多い行を取る
+            top: レポートに載せる関数・行の数
+        """
+        self.report_path = report_path
+        self.profiler = Profiler(enabled=report_path is not None)
+        self.cprofile = cprofile and self.profiler.enabled
+        self.trace_memory = trace_memory and self.profiler.enabled
+        self.top = top
+        self._cprofile: Optional[cProfile.Profile] = None
+        self.extra: Dict[str, Any] = {}
+
+    def __enter__(self) -> Profiler:
+        if self.trace_memory:
+            tracemalloc.start()
+        if self.cprofile:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+        return self.profiler
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self.profiler.enabled:
+            return False
+        report = self.profiler.report()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+            stats_path = os.path.splitext(self.report_path)[0] + '.pstats'
+            self._cprofile.dump_stats(stats_path)
+            stream = io.StringIO()
+            pstats.Stats(self._cprofile, stream=stream).sort_stats('cumulative').print_stats(self.top)
+            report['cprofile'] = {'stats_file': stats_path, 'top_cumulative': stream.getvalue().splitlines()}
+        if self.trace_memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report['tracemalloc'] = {
+                'current_bytes': current,
+                'peak_bytes': peak,
+                'top_lines': [str(stat) for stat in snapshot.statistics('lineno')[:self.top]],
+            }
+        if exc_type is not None:
+            report['aborted'] = f'{exc_type.__name__}: {exc}'
+        report.update(self.extra)
+        os.makedirs(os.path.dirname(os.path.abspath(self.report_path)), exist_ok=True)
+        with open(self.report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        return False
+
+
+def profile_report_path(output_path: str) -> str:
+    """出力ファイルに対応するプロファイルレポートのパス（results.csv → results_profile.json）"""
+    return os.path.splitext(output_path)[0] + '_profile.json'
@@ -0,0 +1,241 @@
+# src/utils/result_store.py
+
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.simulation.simulation_engine import EVENT_LOG_COLUMNS
+
+RESULTS_TABLE = 'results'
+TRAJECTORIES_TABLE = 'trajectories'
+# インデックスを張る列（スイープの軸と判定結果）。表に無い列は飛ばす
+INDEX_COLUMNS = [
+    '後続車速度[km/h]', '車間時間[sec]', '後続車加速度[G]', '先行車質量[kg]', '後続車反応時間[sec]',
+    '回避行動パラメータ[C0]', '回避行動パラメータ[C1]', '回避行動パラメータ[C2]',
+    'ASIL', 'S', 'E', 'C',
+]
+ASIL_ORDER = ['QM', 'A', 'B', 'C', 'D']
+# 値が無いことを表す文字列（NULLで保存するので、数値の列の比較で邪魔にならない）
+NULL_VALUE = 'N/A'
+OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'in', 'between')
+
+
+def result_store_path(output_path: str) -> str:
+    """出力CSVに対応する結果ストアのパス（results.csv → results.sqlite）"""
+    return os.path.splitext(output_path)[0] + '.sqlite'
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _value(value: Any) -> Any:
+    return None if value == NULL_VALUE else value
+
+
+class ResultStore:
+    """
+    シミュレーション結果とASILをSQLiteに保存し、スイープの軸や判定で絞り込んで取り出す
+
+    結果の表（results）は最初に書き込んだ行の列で作り、列の型はNUMERIC
+    （数値に見える文字列は数値として保存される）。'N/A'はNULLにする。
+    記録Noが同じ行は置き換えるので、同じチャンクを書き直しても行は重複しない。
+    軌跡（SimulationEngineのログ）は記録Noをキーにした別の表（trajectories）に入れる
+    （イベント列はlog_mode='events'のログだけにあるので、それ以外の軌跡ではNULL）。
+    一括で書き込むときはインデックスを張らずに入れて、close()（またはcreate_indexes()）で
+    INDEX_COLUMNSにインデックスを張り、プランナー用の統計を取る。
+    """
+
+    def __init__(self, path: str, reset: bool = False):
+        """
+        Args:
+            path: SQLiteファイルのパス
+            reset: Trueなら既存の表を消して作り直す
+        """
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        if reset:
+            with self.connection:
+                self.connection.execute(f'DROP TABLE IF EXISTS {RESULTS_TABLE}')
+                self.connection.execute(f'DROP TABLE IF EXISTS {TRAJECTORIES_TABLE}')
+        with self.connection:
+            self.connection.execute(
+                f'CREATE TABLE IF NOT EXISTS {TRAJECTORIES_TABLE} ("No" NUMERIC, "ステップ" INTEGER, '
+                + ', '.join(f'{_quote(column)} NUMERIC' for column in EVENT_LOG_COLUMNS)
+                + ', PRIMARY KEY ("No", "シナリオ", "ステップ")) WITHOUT ROWID')
+            # イベント列が無かった頃に作ったストアに続きを書くときは、足りない列を追加するよ
+            trajectory_columns = self._table_columns(TRAJECTORIES_TABLE)
+            for column in EVENT_LOG_COLUMNS:
+                if column not in trajectory_columns:
+                    self.connection.execute(f'ALTER TABLE {TRAJECTORIES_TABLE} ADD COLUMN {_quote(column)} NUMERIC')
+        self.columns = self._table_columns()
+
+    def _table_columns(self, table: str = RESULTS_TABLE) -> List[str]:
+        return [row[1] for row in self.connection.execute(f'PRAGMA table_info({table})')]
+
+    def _ensure_columns(self, columns: Sequence[str]):
+        """結果の表が無ければ作り、足りない列があれば追加する"""
+        if not self.columns:
+            definitions = ', '.join(f'{_quote(column)} NUMERIC' + (' PRIMARY KEY' if column == 'No' else '')
+                                    for column in columns)
+            self.connection.execute(f'CREATE TABLE {RESULTS_TABLE} ({definitions})')
+        else:
+            for column in columns:
+                if column not in self.columns:
+                    self.connection.execute(f'ALTER TABLE {RESULTS_TABLE} ADD COLUMN {_quote(column)} NUMERIC')
+        self.columns = self._table_columns()
+
+    def insert_rows(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """
+        結果の行をまとめて書き込む（1回のトランザクション）
+
+        Returns:
+            int: 書き込んだ行数
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        columns = list(dict.fromkeys(column for row in rows for column in row))
+        # 'N/A'→NULLはSQLite側（NULLIF）でやると、Pythonで値を1つずつ見るより速い
+        values = ', '.join([f"NULLIF(?, '{NULL_VALUE}')"] * len(columns))
+        with self.connection:
+            self._ensure_columns(columns)
+            self.connection.executemany(
+                f'INSERT OR REPLACE INTO {RESULTS_TABLE} ({", ".join(map(_quote, columns))}) VALUES ({values})',
+                (tuple(map(row.get, columns)) for row in rows))
+        return len(rows)
+
+    def insert_trajectories(self, trajectories: Iterable[Tuple[Any, Dict[str, List[List[Any]]]]]) -> int:
+        """
+        軌跡をまとめて書き込む
+
+        Args:
+            trajectories: (記録No, SimulationEngine.log_data)の組。スキップしたシナリオの'不要'の行は入れない
+                （イベント列が無いログはイベントをNULLにする）
+
+        Returns:
+            int: 書き込んだステップ数
+        """
+        records = []
+        width = len(EVENT_LOG_COLUMNS)
+        for record_id, log_data in trajectories:
+            for entries in log_data.values():
+                records.extend([record_id, step] + [_value(value) for value in entry] + [None] * (width - len(entry))
+                               for step, entry in enumerate(entries) if entry[0] != '不要')
+        if records:
+            columns = ', '.join(map(_quote, ['No', 'ステップ'] + EVENT_LOG_COLUMNS))
+            with self.connection:
+                self.connection.executemany(
+                    f'INSERT OR REPLACE INTO {TRAJECTORIES_TABLE} ({columns}) VALUES ({", ".join("?" * (width + 2))})',
+                    records)
+        return len(records)
+
+    def create_indexes(self):
+        """INDEX_COLUMNSのうち結果の表にある列にインデックスを張り、統計を更新する"""
+        with self.connection:
+            for position, column in enumerate(INDEX_COLUMNS):
+                if column in self.columns:
+                    self.connection.execute(
+                        f'CREATE INDEX IF NOT EXISTS idx_{RESULTS_TABLE}_{position} ON {RESULTS_TABLE} ({_quote(column)})')
+            self.connection.execute('ANALYZE')
+
+    def _where(self, filters: Optional[Dict[str, Any]], asil_at_least: Optional[str]) -> Tuple[str, List[Any]]:
+        """
+        絞り込み条件をWHERE句と引数にする
+
+        filtersの値は、値そのもの（等しい）、(演算子, 値)、('in', [値, ...])、('between', (下限, 上限))。
+        asil_at_leastは指定したASIL以上（'C'ならCとD）。
+        """
+        clauses, parameters = [], []
+        for column, condition in (filters or {}).items():
+            if column not in self.columns:
+                raise ValueError(f"列 {column} は結果にありません")
+            operator, operand = condition if isinstance(condition, tuple) else ('=', condition)
+            if operator not in OPERATORS:
+                raise ValueError(f"演算子 {operator} は使えません（{', '.join(OPERATORS)}）")
+            if operator == 'in':
+                operand = list(operand)
+                clauses.append(f'{_quote(column)} IN ({", ".join("?" * len(operand))})')
+                parameters.extend(operand)
+            elif operator == 'between':
+                clauses.append(f'{_quote(column)} BETWEEN ? AND ?')
+                parameters.extend(operand)
+            else:
+                clauses.append(f'{_quote(column)} {operator} ?')
+                parameters.append(operand)
+        if asil_at_least is not None:
+            if asil_at_least not in ASIL_ORDER:
+                raise ValueError(f"ASIL {asil_at_least} は {ASIL_ORDER} のどれかにしてください")
+            levels = ASIL_ORDER[ASIL_ORDER.index(asil_at_least):]
+            clauses.append(f'"ASIL" IN ({", ".join("?" * len(levels))})')
+            parameters.extend(levels)
+        return (' WHERE ' + ' AND '.join(clauses) if clauses else ''), parameters
+
+    def query(self, filters: Optional[Dict[str, Any]] = None, asil_at_least: Optional[str] = None,
+              columns: Optional[Sequence[str]] = None, order_by: Optional[Sequence[str]] = None,
+              limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        条件に合う結果の行を返す
+
+        例: 60km/h・車間時間1.2秒未満・ASIL C以上
+            store.query({'後続車速度[km/h]': 60, '車間時間[sec]': ('<', 1.2)}, asil_at_least='C')
+
+        Args:
+            filters: 列名→条件（_whereを参照）
+            asil_at_least: このASIL以上の行だけ
+            columns: 返す列（省略時は全列）
+            order_by: 並べ替える列
+            limit: 最大行数
+
+        Raises:
+            ValueError: 無い列や使えない演算子を指定した場合
+        """
+        if not self.columns:
+            return []
+        columns = list(columns or self.columns)
+        where, parameters = self._where(filters, asil_at_least)
+        sql = f'SELECT {", ".join(map(_quote, columns))} FROM {RESULTS_TABLE}{where}'
+        if order_by:
+            sql += ' ORDER BY ' + ', '.join(map(_quote, order_by))
+        if limit is not None:
+            sql += f' LIMIT {int(limit)}'
+        return [dict(zip(columns, row)) for row in self.connection.execute(sql, parameters)]
+
+    def count(self, filters: Optional[Dict[str, Any]] = None, asil_at_least: Optional[str] = None) -> int:
+        """条件に合う結果の行数"""
+        if not self.columns:
+            return 0
+        where, parameters = self._where(filters, asil_at_least)
+        return self.connection.execute(f'SELECT COUNT(*) FROM {RESULTS_TABLE}{where}', parameters).fetchone()[0]
+
+    def explain(self, filters: Optional[Dict[str, Any]] = None, asil_at_least: Optional[str] = None) -> List[str]:
+        """query()の実行計画（'SEARCH ... USING INDEX ...'なら全件走査していない）"""
+        where, parameters = self._where(filters, asil_at_least)
+        return [row[-1] for row in self.connection.execute(
+            f'EXPLAIN QUERY PLAN SELECT * FROM {RESULTS_TABLE}{where}', parameters)]
+
+    def trajectory(self, record_id: Any, scenario: Optional[str] = None) -> List[Dict[str, Any]]:
+        """記録Noの軌跡（シナリオ・ステップ順）"""
+        sql = f'SELECT * FROM {TRAJECTORIES_TABLE} WHERE "No" = ?'
+        parameters = [record_id]
+        if scenario is not None:
+            sql += ' AND "シナリオ" = ?'
+            parameters.append(scenario)
+        cursor = self.connection.execute(sql + ' ORDER BY "シナリオ", "ステップ"', parameters)
+        names = [description[0] for description in cursor.description]
+        return [dict(zip(names, row)) for row in cursor]
+
+    def close(self, create_indexes: bool = True):
+        """インデックスを張って（create_indexes=Trueなら）閉じる"""
+        if create_indexes:
+            self.create_indexes()
+        self.connection.close()
+
+    def __enter__(self) -> 'ResultStore':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,62 @@
+# src/utils/row_errors.py
+
+import csv
+import os
+from typing import Any, Dict, Iterable, List
+
+# エラーサイドカーファイルの列（行番号は入力CSVのデータ部の0始まり）
+ERROR_FIELDNAMES = ['行番号', 'No', 'エラー', 'トレースバック']
+
+
+class RowFailure:
+    """
+    1行の処理に失敗したことを表す結果（ワーカープロセスから返せるようにpickle可能）
+
+    Args:
+        record_id: 入力行の'No'
+        error: 例外の1行の説明
+        traceback: トレースバックの全文
+    """
+
+    __slots__ = ('record_id', 'error', 'traceback')
+
+    def __init__(self, record_id: Any, error: str, traceback: str = ''):
+        self.record_id = record_id
+        self.error = error
+        self.traceback = traceback
+
+    def __repr__(self) -> str:
+        return f"RowFailure(No={self.record_id!r}, error={self.error!r})"
+
+    def as_row(self, row_index: int) -> Dict[str, Any]:
+        return {'行番号': row_index, 'No': self.record_id, 'エラー': self.error, 'トレースバック': self.traceback}
+
+
+def error_sidecar_path(output_path: str) -> str:
+    """出力CSVに対応するエラーサイドカーのパス（results.csv → results_errors.csv）"""
+    root, ext = os.path.splitext(output_path)
+    return f'{root}_errors{ext or ".csv"}'
+
+
+def write_error_sidecar(path: str, errors: Iterable[Dict[str, Any]]) -> int:
+    """
+    エラー行をサイドカーに書き出し、件数を返す。エラーが無ければ古いサイドカーを消す
+    """
+    errors = list(errors)
+    if not errors:
+        if os.path.exists(path):
+            os.remove(path)
+        return 0
+    with open(path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.DictWriter(f, fieldnames=ERROR_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(errors)
+    return len(errors)
+
+
+def read_error_sidecar(path: str) -> List[Dict[str, Any]]:
+    """エラーサイドカーを読み込む（行番号はintに戻す）"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', newline='', encoding='utf-8-sig') as f:
+        return [dict(row, 行番号=int(row['行番号'])) for row in csv.DictReader(f)]
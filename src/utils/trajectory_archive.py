@@ -0,0 +1,255 @@
+# src/utils/trajectory_archive.py
+
+import csv
+import os
+import struct
+import zlib
+from typing import Any, Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from src.simulation.simulation_engine import EVENT_LOG_COLUMNS, LOG_COLUMNS
+from src.utils.functions import SCENARIO_NAMES
+
+MAGIC = b'ADASTRJ1'
+# アーカイブに入れる列（ログの列からシナリオを除いたもの。シナリオはブロックのヘッダーに持つ）
+# イベント列はlog_mode='events'のログだけにあるので、それ以外のブロックは1列少ない
+ARCHIVE_COLUMNS = [column for column in EVENT_LOG_COLUMNS if column != 'シナリオ']
+# ブロックのヘッダー: 記録No(f8), シナリオ番号(u1), フラグ(u1), 列数(u2), ステップ数(u4), 本体のバイト数(u4)
+BLOCK_HEADER = struct.Struct('<dBBHII')
+FLAG_DELTA_ZLIB = 1
+INDEX_DTYPE = np.dtype([('no', '<f8'), ('scenario', 'u1'), ('offset', '<u8')])
+
+
+def trajectory_archive_path(output_path: str) -> str:
+    """出力CSVに対応する軌跡アーカイブのパス（results.csv → results_trajectories.traj）"""
+    return os.path.splitext(output_path)[0] + '_trajectories.traj'
+
+
+def index_path(path: str) -> str:
+    """アーカイブのオフセット索引のパス（trajectories.traj → trajectories.traj.idx.npz）"""
+    return path + '.idx.npz'
+
+
+def _encode(values: np.ndarray, compress: bool) -> Tuple[int, bytes]:
+    """
+    (ステップ数, 列数)のfloat32配列を列ごとに並べたバイト列にする
+
+    compress=Trueなら、float32のビット列をint32として列ごとに差分を取ってからzlibで圧縮する
+    （整数の差分なので元の値に完全に戻せる。なめらかな軌跡は差分の上位ビットがほぼ0になって縮む）。
+    """
+    columns = np.ascontiguousarray(values.T, dtype='<f4')
+    if not compress:
+        return 0, columns.tobytes()
+    bits = columns.view('<i4')
+    deltas = np.diff(bits, axis=1, prepend=np.zeros((bits.shape[0], 1), dtype='<i4'))
+    return FLAG_DELTA_ZLIB, zlib.compress(deltas.astype('<i4').tobytes(), 6)
+
+
+def _decode(payload: bytes, flags: int, steps: int, columns: int) -> np.ndarray:
+    if flags & FLAG_DELTA_ZLIB:
+        deltas = np.frombuffer(zlib.decompress(payload), dtype='<i4').reshape(columns, steps)
+        values = np.cumsum(deltas, axis=1, dtype='<i4').view('<f4')
+    else:
+        values = np.frombuffer(payload, dtype='<f4').reshape(columns, steps)
+    return values.T.copy()
+
+
+class TrajectoryArchive:
+    """
+    軌跡（SimulationEngineのログ）を1つのバイナリファイルに追記していくアーカイブ
+
+    1ブロック = 1記録の1シナリオで、ヘッダーの後にARCHIVE_COLUMNSの値をfloat32で列ごとに並べる
+    （compress=Trueなら差分+zlib）。(記録No, シナリオ)→ブロックの位置の索引はメモリに持ち、
+    close()で index_path(path) に保存する。読むときは索引で位置を引いて1回シークして読むだけ。
+    索引が無いか古い（保存後に追記された）場合は、ブロックのヘッダーだけを辿って作り直す。
+    同じ(記録No, シナリオ)を追記し直した場合は後のブロックが有効になる。
+    """
+
+    def __init__(self, path: str, mode: str = 'r', compress: bool = True):
+        """
+        Args:
+            path: アーカイブのパス
+            mode: 'r'（読み込み）、'a'（追記、無ければ作る）、'w'（作り直す）
+            compress: 追記するブロックを差分+zlibで圧縮する
+
+        Raises:
+            ValueError: modeが不正、またはファイルがアーカイブではない場合
+        """
+        if mode not in ('r', 'a', 'w'):
+            raise ValueError(f"mode は 'r', 'a', 'w' のどれかにしてください: {mode}")
+        self.path = path
+        self.mode = mode
+        self.compress = compress
+        if mode == 'w' or (mode == 'a' and not os.path.exists(path)):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(MAGIC)
+            if os.path.exists(index_path(path)):
+                os.remove(index_path(path))
+        self.file = open(path, 'rb' if mode == 'r' else 'r+b')
+        if self.file.read(len(MAGIC)) != MAGIC:
+            self.file.close()
+            raise ValueError(f"{path} は軌跡アーカイブではありません")
+        self.index: Dict[Tuple[float, int], int] = {}
+        self._load_index()
+        if mode != 'r':
+            # 追記中に止まった書きかけのブロックを切り捨てる（残すと後から追記したブロックの後ろにゴミが残る）
+            self.file.truncate(self._end)
+        self._dirty = False
+
+    def _load_index(self):
+        """保存した索引を読み、その後に追記されたブロックはヘッダーを辿って足す"""
+        size = os.path.getsize(self.path)
+        position = len(MAGIC)
+        if os.path.exists(index_path(self.path)):
+            with np.load(index_path(self.path)) as saved:
+                if int(saved['size']) <= size:
+                    entries = saved['entries']
+                    self.index = dict(zip(zip(entries['no'].tolist(), entries['scenario'].tolist()),
+                                          entries['offset'].tolist()))
+                    position = int(saved['size'])
+        while position + BLOCK_HEADER.size <= size:
+            self.file.seek(position)
+            no, scenario, _, _, _, length = BLOCK_HEADER.unpack(self.file.read(BLOCK_HEADER.size))
+            if position + BLOCK_HEADER.size + length > size:
+                break  # 書きかけのブロック（追記中に止まった）は無視する
+            self.index[(no, scenario)] = position
+            position += BLOCK_HEADER.size + length
+        self._end = position
+
+    def append(self, record_id: Any, scenario: str, values: np.ndarray):
+        """
+        1記録の1シナリオの軌跡を追記する
+
+        Args:
+            record_id: 記録No
+            scenario: シナリオ名（SCENARIO_NAMESのどれか）
+            values: (ステップ数, 列数)の配列。列はARCHIVE_COLUMNSの並び（イベント列が無いログなら1列少ない）
+        """
+        if self.mode == 'r':
+            raise ValueError('読み込み専用で開いたアーカイブには追記できません')
+        values = np.asarray(values, dtype=np.float32)
+        if values.ndim == 1:
+            values = values.reshape(1, -1)
+        flags, payload = _encode(values, self.compress)
+        code = SCENARIO_NAMES.index(scenario)
+        header = BLOCK_HEADER.pack(float(record_id), code, flags, values.shape[1], values.shape[0], len(payload))
+        self.file.seek(self._end)
+        self.file.write(header + payload)
+        self.index[(float(record_id), code)] = self._end
+        self._end += len(header) + len(payload)
+        self._dirty = True
+
+    def append_log(self, record_id: Any, log_data: Dict[str, List[List[Any]]]) -> int:
+        """
+        SimulationEngine.log_data（シナリオ→ログの行）を追記する（スキップした'不要'のシナリオは入れない）
+
+        Returns:
+            int: 追記したステップ数
+        """
+        steps = 0
+        scenario_position = LOG_COLUMNS.index('シナリオ')
+        for scenario, entries in log_data.items():
+            entries = [entry[:scenario_position] + entry[scenario_position + 1:]
+                       for entry in entries if entry[0] != '不要']
+            if entries:
+                self.append(record_id, scenario, np.array(entries, dtype=np.float32))
+                steps += len(entries)
+        return steps
+
+    def extend(self, trajectories: Iterable[Tuple[Any, Dict[str, List[List[Any]]]]]) -> int:
+        """(記録No, log_data)の組をまとめて追記する"""
+        return sum(self.append_log(record_id, log_data) for record_id, log_data in trajectories)
+
+    def read(self, record_id: Any, scenario: str) -> np.ndarray:
+        """
+        1記録の1シナリオの軌跡を(ステップ数, 列数)のfloat32配列で返す（列数はイベント列の有無で変わる）
+
+        Raises:
+            KeyError: その記録・シナリオの軌跡が無い場合
+        """
+        position = self.index.get((float(record_id), SCENARIO_NAMES.index(scenario)))
+        if position is None:
+            raise KeyError(f"No {record_id} の {scenario} の軌跡はありません")
+        self.file.seek(position)
+        _, _, flags, columns, steps, length = BLOCK_HEADER.unpack(self.file.read(BLOCK_HEADER.size))
+        return _decode(self.file.read(length), flags, steps, columns)
+
+    def read_columns(self, record_id: Any, scenario: str) -> Dict[str, np.ndarray]:
+        """read()の結果を列名→配列の辞書にする"""
+        values = self.read(record_id, scenario)
+        return dict(zip(ARCHIVE_COLUMNS, values.T))
+
+    def scenarios(self, record_id: Any) -> List[str]:
+        """記録Noの軌跡があるシナリオ"""
+        return [name for code, name in enumerate(SCENARIO_NAMES) if (float(record_id), code) in self.index]
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __contains__(self, key: Tuple[Any, str]) -> bool:
+        record_id, scenario = key
+        return (float(record_id), SCENARIO_NAMES.index(scenario)) in self.index
+
+    def flush(self):
+        """追記したブロックをファイルに書き出す（索引は保存しなくても、開き直せばヘッダーから作り直せる）"""
+        self.file.flush()
+
+    def save_index(self):
+        """索引を保存する（一時ファイルに書いてから置き換える）"""
+        self.file.flush()
+        entries = np.empty(len(self.index), dtype=INDEX_DTYPE)
+        if self.index:
+            keys = list(self.index)
+            entries['no'] = [no for no, _ in keys]
+            entries['scenario'] = [scenario for _, scenario in keys]
+            entries['offset'] = list(self.index.values())
+        temporary = index_path(self.path) + '.tmp.npz'
+        np.savez(temporary, entries=entries, size=np.int64(self._end))
+        os.replace(temporary, index_path(self.path))
+        self._dirty = False
+
+    def close(self):
+        if self._dirty:
+            self.save_index()
+        self.file.close()
+
+    def __enter__(self) -> 'TrajectoryArchive':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def pack_log_directory(log_dir: str, path: str, compress: bool = True) -> Dict[str, int]:
+    """
+    write_log_to_csvが書いた記録ごとのCSV（simulation_log_record<No>.csv）を1つのアーカイブにまとめる
+
+    Returns:
+        Dict[str, int]: records（記録数）, steps（ステップ数）, csv_bytes, archive_bytes
+    """
+    prefix = 'simulation_log_record'
+    records = steps = csv_bytes = 0
+    scenario_position = LOG_COLUMNS.index('シナリオ')
+    with TrajectoryArchive(path, 'w', compress) as archive:
+        for name in sorted(os.listdir(log_dir)):
+            if not (name.startswith(prefix) and name.endswith('.csv')):
+                continue
+            try:
+                record_id = float(name[len(prefix):-len('.csv')])
+            except ValueError:
+                continue  # 記録Noが数値じゃないログ（'unknown'など）は索引に入れられない
+            file_path = os.path.join(log_dir, name)
+            csv_bytes += os.path.getsize(file_path)
+            log_data: Dict[str, List[List[str]]] = {}
+            with open(file_path, newline='', encoding='utf-8-sig') as f:
+                reader = csv.reader(f)
+                next(reader, None)
+                for entry in reader:
+                    if entry and entry[0] != '不要':
+                        log_data.setdefault(entry[scenario_position], []).append(entry)
+            steps += archive.append_log(record_id, log_data)
+            records += 1
+    return {'records': records, 'steps': steps, 'csv_bytes': csv_bytes,
+            'archive_bytes': os.path.getsize(path) + os.path.getsize(index_path(path))}
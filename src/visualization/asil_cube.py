@@ -0,0 +1,338 @@
+# src/visualization/asil_cube.py
+
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+ASIL_ORDER = ['QM', 'A', 'B', 'C', 'D']
+MISSING = -1  # 組み合わせのデータが無いセル
+# スイープで振る入力列（結果に無い列は使わない）
+CUBE_DIMENSIONS = [
+    '後続車速度[km/h]', '車間時間[sec]', '後続車加速度[G]', '先行車質量[kg]', '後続車反応時間[sec]',
+    '回避行動パラメータ[C0]', '回避行動パラメータ[C1]', '回避行動パラメータ[C2]',
+]
+REDUCTIONS = ('max', 'min', 'count')
+DEFAULT_CHUNK_ROWS = 200_000  # from_csvで一度に読む行数
+_NO_MIN = np.iinfo(np.int8).max  # minを取るときのデータ無しの代わり
+# キューブの大きさの上限。セルは6バイト（max/min: int8、count: int32）なので5000万セルで300MB。
+# 格子のスイープならセル数は行数と同じくらいだが、QMCのような連続値の軸では行数の何乗にもなるので、
+# MIN_CELL_LIMITを超えたら行数のMAX_CELLS_PER_ROW倍までに抑える
+MAX_CELLS = 50_000_000
+MAX_CELLS_PER_ROW = 64
+MIN_CELL_LIMIT = 1_000_000
+
+
+def encode_asil(values) -> np.ndarray:
+    """ASILの列をint8のコード（QM=0 … D=4、不明な値はMISSING）にする"""
+    return pd.Categorical(values, categories=ASIL_ORDER, ordered=True).codes.astype(np.int8)
+
+
+def check_cube_size(shape: Sequence[int], rows: int):
+    """
+    キューブにしてよい大きさか確かめる
+
+    Raises:
+        ValueError: セル数がMAX_CELLSか、行数に対して多すぎる（軸が連続値で格子になっていない）場合
+    """
+    cells = int(np.prod(shape, dtype=np.float64))
+    if cells > MAX_CELLS or (cells > MIN_CELL_LIMIT and cells > MAX_CELLS_PER_ROW * rows):
+        raise ValueError(f"キューブが大きすぎます（軸の値の数 {tuple(shape)}、{cells:,} セル、{rows:,} 行）。"
+                         "軸が格子になっていない（QMCなどの連続値）結果はCSVから集計してください")
+
+
+def save_cube_for_results(df: pd.DataFrame, results_path: str) -> Optional[str]:
+    """
+    結果の隣にキューブを保存する（できなくても結果の保存は失敗させない）
+
+    Returns:
+        Optional[str]: 保存できなかった理由（保存できたらNone）。古いキューブは消しておく
+    """
+    path = cube_path(results_path)
+    try:
+        ASILCube.from_frame(df).save(path)
+        return None
+    except (ValueError, MemoryError) as e:
+        if os.path.exists(path):
+            os.remove(path)
+        return f'{type(e).__name__}: {e}'
+
+
+def cube_path(results_path: str) -> str:
+    """結果ファイルの隣に置くキューブのパス（results_with_asil.csv → results_with_asil_asil_cube.npz）"""
+    return os.path.splitext(results_path)[0] + '_asil_cube.npz'
+
+
+class ASILCube:
+    """
+    スイープの入力列を軸にした、ASILコード（int8）の密なN次元配列
+
+    軸ごとの値の組み合わせ（セル）について、ASILの最大（max）・最小（min）・行数（count）を
+    持つ。データが無いセルはmax/minがMISSING、countが0。任意の2軸のマップは、残りの軸を
+    固定するか（fixed）配列のreductionで畳み込むだけで作れる。
+    """
+
+    def __init__(self, dimensions: Sequence[str], axes: Sequence[np.ndarray],
+                 max_codes: np.ndarray, min_codes: np.ndarray, counts: np.ndarray):
+        self.dimensions = list(dimensions)
+        self.axes = [np.asarray(axis) for axis in axes]
+        self.max_codes = max_codes
+        self.min_codes = min_codes
+        self.counts = counts
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        return self.counts.shape
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame, dimensions: Optional[Sequence[str]] = None) -> 'ASILCube':
+        """
+        ASIL列を持つ結果のDataFrameからキューブを作る
+
+        数値の列は数値の軸、文字列の列（衝突有無など）は文字列の軸になる。文字列でも全部の値が
+        数値として読めれば数値の軸にする。
+
+        Args:
+            df: ASIL計算済みの結果
+            dimensions: 軸にする列（既定はCUBE_DIMENSIONSのうちdfにある列）
+
+        Raises:
+            ValueError: ASIL列や軸にする列が無い場合、キューブが大きすぎる場合（check_cube_size）
+        """
+        if 'ASIL' not in df.columns:
+            raise ValueError("ASIL列がありません")
+        dimensions = [name for name in (dimensions or CUBE_DIMENSIONS) if name in df.columns]
+        if not dimensions:
+            raise ValueError("キューブの軸にする列がありません")
+
+        codes = encode_asil(df['ASIL'])
+        usable = codes >= 0  # ASILが無い行（エラー行など）と軸の値が無い行は数えない
+        values = []
+        for name in dimensions:
+            column = df[name]
+            if pd.api.types.is_numeric_dtype(column):
+                column = column.to_numpy(dtype=float)
+                usable &= ~np.isnan(column)
+            else:
+                usable &= column.notna().to_numpy() & (column.astype(str) != '').to_numpy()
+                column = column.astype(str).to_numpy(dtype=str)
+            values.append(column)
+        codes = codes[usable]
+
+        axes, indices = [], []
+        for column in values:
+            axis, index = np.unique(column[usable], return_inverse=True)
+            axes.append(axis)
+            indices.append(index)
+        shape = tuple(len(axis) for axis in axes)
+        check_cube_size(shape, len(codes))
+        flat = np.ravel_multi_index(indices, shape) if len(codes) else np.empty(0, dtype=np.int64)
+
+        size = int(np.prod(shape))
+        counts = np.bincount(flat, minlength=size)
+        max_codes = np.full(size, MISSING, dtype=np.int8)
+        np.maximum.at(max_codes, flat, codes)
+        min_codes = np.full(size, _NO_MIN, dtype=np.int8)
+        np.minimum.at(min_codes, flat, codes)
+        min_codes[counts == 0] = MISSING
+        cube = cls(dimensions, axes, max_codes.reshape(shape), min_codes.reshape(shape),
+                   counts.astype(np.int32).reshape(shape))
+        return cube._numeric_axes()
+
+    @classmethod
+    def from_csv(cls, path: str, dimensions: Optional[Sequence[str]] = None,
+                 chunksize: int = DEFAULT_CHUNK_ROWS) -> 'ASILCube':
+        """
+        結果のCSVをchunksize行ずつ読んでキューブに畳み込む（ファイル全体はメモリに載せない）
+
+        読むのは軸の列とASIL列だけで、使うメモリは行数ではなくキューブの大きさで決まる。
+
+        Raises:
+            ValueError: ASIL列や軸にする列が無い場合、キューブが大きすぎる場合（check_cube_size）
+        """
+        header = pd.read_csv(path, nrows=0, encoding='utf-8-sig').columns
+        if 'ASIL' not in header:
+            raise ValueError("ASIL列がありません")
+        dimensions = [name for name in (dimensions or CUBE_DIMENSIONS) if name in header]
+        if not dimensions:
+            raise ValueError("キューブの軸にする列がありません")
+
+        # 'N/A'などの欠損値はpd.read_csvの既定どおり値無しとして扱う
+        cube = None
+        for chunk in pd.read_csv(path, usecols=list(dict.fromkeys(dimensions + ['ASIL'])),
+                                 chunksize=chunksize, encoding='utf-8-sig'):
+            part = cls.from_frame(chunk, dimensions)
+            cube = part if cube is None else cube.combine(part)
+        if cube is None:
+            cube = cls.from_frame(pd.DataFrame(columns=dimensions + ['ASIL'], dtype=float), dimensions)
+        return cube
+
+    def combine(self, other: 'ASILCube') -> 'ASILCube':
+        """
+        2つのキューブ（同じ軸の列で、別の行から作ったもの）を合わせたキューブを返す
+
+        Raises:
+            ValueError: 軸の列が違う場合
+        """
+        if self.dimensions != other.dimensions:
+            raise ValueError("軸の列が違うキューブは合わせられません")
+        first, second = self, other
+        # チャンクによって同じ列が数値だったり文字列だったりするので、その軸は両方文字列にしてから合わせる
+        for dimension, (mine, theirs) in enumerate(zip(self.axes, other.axes)):
+            if (mine.dtype.kind == 'U') != (theirs.dtype.kind == 'U'):
+                first, second = first._as_text(dimension), second._as_text(dimension)
+        axes = [np.union1d(mine, theirs) for mine, theirs in zip(first.axes, second.axes)]
+        check_cube_size([len(axis) for axis in axes], int(first.counts.sum() + second.counts.sum()))
+        first, second = first._expand(axes), second._expand(axes)
+        min_codes = np.minimum(np.where(first.min_codes == MISSING, _NO_MIN, first.min_codes),
+                               np.where(second.min_codes == MISSING, _NO_MIN, second.min_codes))
+        min_codes[min_codes == _NO_MIN] = MISSING
+        return ASILCube(self.dimensions, axes, np.maximum(first.max_codes, second.max_codes), min_codes,
+                        first.counts + second.counts)._numeric_axes()
+
+    def _as_text(self, dimension: int) -> 'ASILCube':
+        """軸dimensionを文字列の軸にしたキューブ（数値はreprで文字列にするので、数値に戻しても同じ値）"""
+        axis = self.axes[dimension]
+        if axis.dtype.kind == 'U':
+            return self
+        text = np.array([repr(float(value)) for value in axis], dtype=str)
+        order = np.argsort(text, kind='stable')
+        axes = list(self.axes)
+        axes[dimension] = text[order]
+        return ASILCube(self.dimensions, axes, *(np.take(array, order, axis=dimension)
+                                                 for array in (self.max_codes, self.min_codes, self.counts)))
+
+    def _expand(self, axes: Sequence[np.ndarray]) -> 'ASILCube':
+        """今の軸の値を全部含むaxesに広げる（増えたセルはデータ無し）"""
+        if all(len(axis) == len(mine) for axis, mine in zip(axes, self.axes)):
+            return self
+        shape = tuple(len(axis) for axis in axes)
+        target = np.ix_(*[np.searchsorted(axis, mine) for axis, mine in zip(axes, self.axes)])
+        arrays = []
+        for array, fill in ((self.max_codes, MISSING), (self.min_codes, MISSING), (self.counts, 0)):
+            expanded = np.full(shape, fill, dtype=array.dtype)
+            expanded[target] = array
+            arrays.append(expanded)
+        return ASILCube(self.dimensions, axes, *arrays)
+
+    def _numeric_axes(self) -> 'ASILCube':
+        """全部の値が数値として読める文字列の軸を数値の軸に直す（'20'と'20.0'のようなセルはまとめる）"""
+        for dimension, axis in enumerate(self.axes):
+            if axis.dtype.kind != 'U':
+                continue
+            try:
+                numbers = axis.astype(float)
+            except ValueError:
+                continue
+            new_axis, inverse = np.unique(numbers, return_inverse=True)
+            self._regroup(dimension, new_axis, inverse)
+        return self
+
+    def _regroup(self, dimension: int, new_axis: np.ndarray, inverse: np.ndarray):
+        """軸dimensionの値をnew_axisに置き換える（元のi番目の値はnew_axisのinverse[i]番目）"""
+        def regroup(array, fill, ufunc):
+            moved = np.moveaxis(array, dimension, 0)
+            result = np.full((len(new_axis),) + moved.shape[1:], fill, dtype=array.dtype)
+            ufunc.at(result, inverse, moved)
+            return np.moveaxis(result, 0, dimension)
+
+        self.max_codes = regroup(self.max_codes, MISSING, np.maximum)
+        min_codes = regroup(np.where(self.min_codes == MISSING, _NO_MIN, self.min_codes).astype(np.int8),
+                            _NO_MIN, np.minimum)
+        min_codes[min_codes == _NO_MIN] = MISSING
+        self.min_codes = min_codes
+        self.counts = regroup(self.counts, 0, np.add)
+        self.axes[dimension] = new_axis
+
+    def _axis(self, name: str) -> int:
+        if name not in self.dimensions:
+            raise ValueError(f"キューブに軸 {name} がありません（軸: {', '.join(self.dimensions)}）")
+        return self.dimensions.index(name)
+
+    def _position(self, name: str, value: float) -> int:
+        axis = self.axes[self._axis(name)]
+        if axis.dtype.kind == 'U':
+            matches = np.flatnonzero(axis == str(value))
+        else:
+            matches = np.flatnonzero(np.isclose(axis, float(value)))
+        if not len(matches):
+            raise ValueError(f"軸 {name} に値 {value} がありません")
+        return int(matches[0])
+
+    def reduce(self, keep: Sequence[str], reduction: str = 'max',
+               fixed: Optional[Dict[str, float]] = None) -> np.ndarray:
+        """
+        fixedの軸を指定の値で切り出し、keep以外の残りの軸をreductionで畳み込む
+
+        Returns:
+            np.ndarray: keepの順番の軸を持つ配列（max/minはint8でデータ無しはMISSING、countはint64）
+        """
+        if reduction not in REDUCTIONS:
+            raise ValueError(f"reductionは {', '.join(REDUCTIONS)} のどれかです: {reduction}")
+        fixed = fixed or {}
+        if set(keep) & set(fixed):
+            raise ValueError("残す軸と固定する軸が重なっています")
+        if len(set(keep)) != len(keep):
+            raise ValueError("同じ軸が2回指定されています")
+
+        for name in keep:
+            self._axis(name)
+        selector = [slice(None)] * len(self.dimensions)
+        for name, value in fixed.items():
+            selector[self._axis(name)] = self._position(name, value)
+        remaining = [name for index, name in enumerate(self.dimensions) if not isinstance(selector[index], int)]
+        keep_axes = [remaining.index(name) for name in keep]
+        other_axes = tuple(index for index in range(len(remaining)) if index not in keep_axes)
+
+        if reduction == 'count':
+            result = self.counts[tuple(selector)].sum(axis=other_axes, dtype=np.int64)
+        elif reduction == 'max':
+            result = self.max_codes[tuple(selector)].max(axis=other_axes)
+        else:
+            codes = self.min_codes[tuple(selector)]
+            result = np.where(codes == MISSING, _NO_MIN, codes).min(axis=other_axes)
+            result[result == _NO_MIN] = MISSING
+        # 畳み込んだ後の軸はremainingの順番で残るので、keepの順番に並べ替える
+        order = sorted(keep_axes)
+        return np.transpose(result, [order.index(axis) for axis in keep_axes])
+
+    def slice(self, x: str, y: str, reduction: str = 'max',
+              fixed: Optional[Dict[str, float]] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        ASILMapGenerator.aggregateと同じ形の2次元マップ
+
+        Returns:
+            (x の値, y の値（降順）, 配列[y, x])
+        """
+        grid = self.reduce([y, x], reduction, fixed)
+        return self.axes[self._axis(x)], self.axes[self._axis(y)][::-1], grid[::-1]
+
+    def save(self, path: str):
+        """npzで保存する（軸の値はaxis_0, axis_1, ...）"""
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        np.savez_compressed(path, dimensions=np.array(self.dimensions), max=self.max_codes, min=self.min_codes,
+                            count=self.counts, **{f'axis_{index}': axis for index, axis in enumerate(self.axes)})
+
+    @classmethod
+    def load(cls, path: str) -> 'ASILCube':
+        with np.load(path) as data:
+            dimensions: List[str] = data['dimensions'].tolist()
+            axes = [data[f'axis_{index}'] for index in range(len(dimensions))]
+            return cls(dimensions, axes, data['max'], data['min'], data['count'])
+
+    @classmethod
+    def for_results(cls, results_path: str, df: Optional[pd.DataFrame] = None) -> 'ASILCube':
+        """
+        結果ファイルの隣のキューブを読む。無いか結果ファイルより古ければ作り直して保存する
+
+        Args:
+            results_path: ASIL計算済みの結果のCSV
+            df: 読み込み済みの結果（省略時はresults_pathをチャンクごとに読む）
+        """
+        path = cube_path(results_path)
+        if os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(results_path):
+            return cls.load(path)
+        cube = cls.from_frame(df) if df is not None else cls.from_csv(results_path)
+        cube.save(path)
+        return cube
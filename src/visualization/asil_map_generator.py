@@ -1,11 +1,26 @@
 # src/visualization/asil_map_generator.py
 
+import numpy as np
 import pandas as pd
 import matplotlib
 matplotlib.use('Agg')  # グラフィカルなバックエンドを使用しない
 import matplotlib.pyplot as plt
-import seaborn as sns
+from matplotlib.figure import Figure
 import os
+from src.utils.profiling import Profiler
+from src.visualization.asil_cube import ASIL_ORDER, ASILCube, encode_asil
+
+# セルにASILの文字を書くのは、セル数がこれ以下で、1セルが十分な大きさ（ピクセル）のときだけ
+ANNOTATION_CELL_LIMIT = 2500
+ANNOTATION_MIN_CELL_PIXELS = 14
+# 散布図の点がこれより多ければ、点を打たずに格子に区切って各区画の最大ASILを塗る
+SCATTER_POINT_LIMIT = 20000
+SCATTER_BINS = 400
+# 軸の目盛りラベルの最大数（多い場合は間引く）
+MAX_TICK_LABELS = 30
+
+FIGURE_SIZE = (12, 8)
+FIGURE_DPI = 100
 
 class ASILMapGenerator:
     def __init__(self):
@@ -17,83 +32,175 @@ class ASILMapGenerator:
             '5': 'Purples',  # 紫のグラデーション
             '6': 'coolwarm', # 寒色-暖色
         }
-        self.asil_order = ['QM', 'A', 'B', 'C', 'D']
+        self.asil_order = list(ASIL_ORDER)
+
+    def encode_asil(self, values) -> np.ndarray:
+        """ASILの列をint8のコード（QM=0 … D=4、不明な値は-1）にする"""
+        return encode_asil(values)
+
+    def aggregate(self, df: pd.DataFrame, x_param: str, y_param: str, fixed=None):
+        """
+        (x, y)ごとに最も厳しいASILを集めた格子を作る
+
+        fixed（列名 → 値）を渡すと、その値の行だけで集める。
+
+        Returns:
+            (x の値, y の値（降順）, ASILコードの2次元配列[y, x]（データが無いセルは-1）)
+        """
+        for name, value in (fixed or {}).items():
+            df = df[np.isclose(pd.to_numeric(df[name], errors='coerce'), float(value))]
+        df = df[df[x_param].notna() & df[y_param].notna()]  # 値が無い行（衝突しなかった行の衝突速度など）は除く
+        codes = self.encode_asil(df['ASIL'])
+        x_values, x_index = np.unique(df[x_param].to_numpy(), return_inverse=True)
+        y_values, y_index = np.unique(df[y_param].to_numpy(), return_inverse=True)
+        grid = np.full((len(y_values), len(x_values)), -1, dtype=np.int8)
+        np.maximum.at(grid, (y_index, x_index), codes)
+        return x_values, y_values[::-1], grid[::-1]  # Y軸は上が大きい値になるように逆順
+
+    def _cmap(self, cmap_name: str):
+        """ASILの5段階に区切ったカラーマップ（データが無いセルは透明）"""
+        return plt.get_cmap(cmap_name, len(self.asil_order)).with_extremes(bad=(0.0, 0.0, 0.0, 0.0))
+
+    def _set_ticks(self, axis, values, set_ticks, set_labels):
+        """目盛りラベルはMAX_TICK_LABELS個までに間引く（ラベルの文字数も描画時間に効くから）"""
+        step = max(1, int(np.ceil(len(values) / MAX_TICK_LABELS)))
+        positions = np.arange(0, len(values), step)
+        set_ticks(positions)
+        set_labels([f'{value:g}' if isinstance(value, (int, float, np.number)) else str(value)
+                    for value in np.asarray(values)[positions]])
 
-    def generate_asil_map(self, data, x_param, y_param, color_choice, output_dir):
+    def _colorbar(self, image):
+        cbar = image.figure.colorbar(image, ax=image.axes, ticks=range(len(self.asil_order)), label='ASIL')
+        cbar.set_ticklabels(self.asil_order)
+
+    def _should_annotate(self, annotate, grid: np.ndarray) -> bool:
+        """annotate=Noneなら、セル数とセルの大きさ（ピクセル）から文字を書くか決める"""
+        if annotate is not None:
+            return bool(annotate)
+        rows, columns = grid.shape
+        cell_pixels = min(FIGURE_SIZE[0] * FIGURE_DPI * 0.8 / columns, FIGURE_SIZE[1] * FIGURE_DPI * 0.8 / rows)
+        return grid.size <= ANNOTATION_CELL_LIMIT and cell_pixels >= ANNOTATION_MIN_CELL_PIXELS
+
+    def render_heatmap(self, x_values, y_values, grid, cmap_name, x_param, y_param, annotate=None):
+        """集約済みの格子をimshowで1枚の画像として描く（描画時間はセル数ではなくピクセル数で決まる）"""
+        return HeatmapFigure(self, cmap_name).draw(x_values, y_values, grid, x_param, y_param, annotate)
+
+    def write_map_data(self, x_values, y_values, grid, y_param, output_csv):
+        """マップのCSV（ASILの文字の表、Y軸は逆順、最後の行が列名）を書き出す"""
+        labels = np.array(self.asil_order + [''], dtype=object)[grid]  # -1（データ無し）は空欄
+        csv_data = pd.DataFrame(labels, index=pd.Index(y_values, name=y_param), columns=x_values)
+        with open(output_csv, 'w', newline='') as f:
+            csv_data.to_csv(f, header=False)
+            f.write(f"{y_param},{','.join(map(str, csv_data.columns))}\n")
+
+    def _scatter_positions(self, values):
+        """散布図の座標（文字列の列は値の並び順の番号にして、番号 → 値のラベルも返す）"""
+        values = np.asarray(values)
+        if values.dtype.kind in 'biuf':
+            return values.astype(float), None
+        labels, positions = np.unique(values.astype(str), return_inverse=True)
+        return positions.astype(float), labels
+
+    def render_scatter(self, x, y, codes, cmap_name, x_param, y_param):
+        """
+        (x, y)ごとの最大ASILの散布図
+
+        点がSCATTER_POINT_LIMITより多ければ、SCATTER_BINS×SCATTER_BINSの区画に分けて
+        区画ごとの最大ASILを画像で描く（点を打つよりずっと速い）。少なければ点をラスタライズして描く。
+        """
+        fig, ax = plt.subplots(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        cmap = self._cmap(cmap_name)
+        vmin, vmax = -0.5, len(self.asil_order) - 0.5
+        x, x_labels = self._scatter_positions(x)
+        y, y_labels = self._scatter_positions(y)
+        if len(x) > SCATTER_POINT_LIMIT:
+            x_edges = np.linspace(x.min() - 0.5 * (x.min() == x.max()), x.max() + 0.5 * (x.min() == x.max()),
+                                  SCATTER_BINS + 1)
+            y_edges = np.linspace(y.min() - 0.5 * (y.min() == y.max()), y.max() + 0.5 * (y.min() == y.max()),
+                                  SCATTER_BINS + 1)
+            x_bin = np.clip(np.searchsorted(x_edges, x, side='right') - 1, 0, SCATTER_BINS - 1)
+            y_bin = np.clip(np.searchsorted(y_edges, y, side='right') - 1, 0, SCATTER_BINS - 1)
+            binned = np.full((SCATTER_BINS, SCATTER_BINS), -1, dtype=np.int8)
+            np.maximum.at(binned, (y_bin, x_bin), codes)
+            image = ax.imshow(np.ma.masked_less(binned, 0), cmap=cmap, vmin=vmin, vmax=vmax, aspect='auto',
+                              interpolation='nearest', origin='lower',
+                              extent=(x_edges[0], x_edges[-1], y_edges[0], y_edges[-1]))
+        else:
+            size = float(np.clip(50 * 2000 / max(len(x), 1), 2, 50))  # 点が多いほど小さく
+            image = ax.scatter(x, y, c=codes, cmap=cmap, vmin=vmin, vmax=vmax, s=size, rasterized=True)
+        self._colorbar(image)
+        if x_labels is None:
+            ax.get_xaxis().get_major_formatter().set_useOffset(False)
+        else:
+            self._set_ticks(ax, x_labels, ax.set_xticks, ax.set_xticklabels)
+        if y_labels is not None:
+            self._set_ticks(ax, y_labels, ax.set_yticks, ax.set_yticklabels)
+        ax.invert_yaxis()
+        ax.set_title(f'ASIL Scatter Plot (Colormap: {cmap_name})')
+        ax.set_xlabel(x_param)
+        ax.set_ylabel(y_param)
+        fig.tight_layout()
+        return fig
+
+    def generate_asil_map(self, data, x_param, y_param, color_choice, output_dir, profiler=None, annotate=None,
+                          fixed=None):
+        # data: CSVのパス、DataFrame、またはASILCube（キューブなら集計済みの配列から切り出すだけ）
+        #       CSVのパスならファイル全体は読み込まず、使う列だけをチャンクごとに読んで集計する
+        # profiler（src.utils.profiling.Profiler）を渡すと集計・描画・保存の時間を測る
+        # annotate: セルにASILの文字を書くか（Noneならセルの数と大きさで自動で決める）
+        # fixed: 列名 → 値。その値で切り出したマップにする（省略時は他の列について最大のASIL）
+        stage = (profiler or Profiler(enabled=False)).stage
         try:
             if isinstance(data, str):
-                df = pd.read_csv(data)
+                columns = pd.read_csv(data, nrows=0, encoding='utf-8-sig').columns
+            elif isinstance(data, ASILCube):
+                columns = data.dimensions
             elif isinstance(data, pd.DataFrame):
-                df = data
+                columns = data.columns
             else:
-                raise ValueError("Invalid data type. Expected string (file path) or DataFrame.")
+                raise ValueError("Invalid data type. Expected string (file path), DataFrame or ASILCube.")
         except Exception as e:
             return f"データの読み込み中にエラーが発生しました: {e}"
 
-        if x_param not in df.columns or y_param not in df.columns:
+        if x_param not in columns or y_param not in columns:
             return f"エラー: 指定されたパラメータ ({x_param}, {y_param}) がデータに存在しません。"
 
-        # 重複の確認と処理
-        duplicates = df.duplicated(subset=[x_param, y_param])
-        if duplicates.any():
-            df['ASIL_num'] = pd.Categorical(df['ASIL'], categories=self.asil_order, ordered=True).codes
-            df_agg = df.groupby([x_param, y_param])['ASIL_num'].max().reset_index()
-            df_agg['ASIL'] = pd.Categorical.from_codes(df_agg['ASIL_num'], categories=self.asil_order, ordered=True)
-        else:
-            df_agg = df
-
         cmap = self.color_maps.get(color_choice, 'YlOrRd')
 
         try:
-            # ピボットテーブルの作成
-            pivot = df_agg.pivot(index=y_param, columns=x_param, values='ASIL')
-            pivot_numeric = pivot.apply(lambda x: pd.Categorical(x, categories=self.asil_order).codes)
-
-            # Y軸を逆順にする
-            pivot = pivot.sort_index(ascending=False)
-            pivot_numeric = pivot_numeric.sort_index(ascending=False)
+            # (x, y)ごとに最も厳しいASILへ集約（重複が無ければそのまま）
+            with stage('map_aggregate'):
+                if isinstance(data, str):
+                    data = ASILCube.from_csv(data, [x_param, y_param, *(fixed or {})])
+                if isinstance(data, ASILCube):
+                    x_values, y_values, grid = data.slice(x_param, y_param, fixed=fixed)
+                else:
+                    x_values, y_values, grid = self.aggregate(data, x_param, y_param, fixed)
 
             # ヒートマップを描画
-            plt.figure(figsize=(12, 8))
-            heatmap = sns.heatmap(pivot_numeric, cmap=cmap, annot=pivot.values, fmt='', cbar=False)
-
-            # カラーバーをカスタマイズ
-            cbar = plt.colorbar(heatmap.collections[0], ticks=range(len(self.asil_order)))
-            cbar.set_ticklabels(self.asil_order)
-
-            plt.title(f'ASIL Map (Colormap: {cmap})')
-            plt.xlabel(x_param)
-            plt.ylabel(y_param)
-            plt.tight_layout()
+            with stage('map_heatmap'):
+                fig = self.render_heatmap(x_values, y_values, grid, cmap, x_param, y_param, annotate)
 
             # 結果を保存
-            output_image = os.path.join(output_dir, f'asil_map_{cmap}.png')
-            plt.savefig(output_image)
-            plt.close()
+            with stage('map_save'):
+                output_image = os.path.join(output_dir, f'asil_map_{cmap}.png')
+                fig.savefig(output_image)
+                plt.close(fig)
 
             # CSVファイルの作成
-            csv_data = pivot
-            csv_data.index.name = y_param
             output_csv = os.path.join(output_dir, 'asil_map_data.csv')
-            
-            with open(output_csv, 'w', newline='') as f:
-                csv_data.to_csv(f, header=False)
-                f.write(f"{y_param},{','.join(map(str, csv_data.columns))}\n")
-
-            # 散布図の作成
-            plt.figure(figsize=(12, 8))
-            scatter = plt.scatter(df_agg[x_param], df_agg[y_param], c=df_agg['ASIL_num'], cmap=cmap, s=50)
-            plt.colorbar(scatter, ticks=range(len(self.asil_order)), label='ASIL')
-            plt.gca().get_xaxis().get_major_formatter().set_useOffset(False)
-            plt.gca().invert_yaxis()
-            plt.title(f'ASIL Scatter Plot (Colormap: {cmap})')
-            plt.xlabel(x_param)
-            plt.ylabel(y_param)
-            plt.tight_layout()
-
-            scatter_output = os.path.join(output_dir, f'asil_scatter_plot_{cmap}.png')
-            plt.savefig(scatter_output)
-            plt.close()
+            self.write_map_data(x_values, y_values, grid, y_param, output_csv)
+
+            # 散布図の作成（集約後の点）
+            with stage('map_scatter'):
+                y_grid, x_grid = np.nonzero(grid >= 0)
+                fig = self.render_scatter(np.asarray(x_values)[x_grid], np.asarray(y_values)[y_grid],
+                                          grid[y_grid, x_grid], cmap, x_param, y_param)
+
+            with stage('map_save'):
+                scatter_output = os.path.join(output_dir, f'asil_scatter_plot_{cmap}.png')
+                fig.savefig(scatter_output)
+                plt.close(fig)
 
             return f"ASILマップが '{output_image}' として、\n" \
                    f"データが '{output_csv}' として、\n" \
@@ -102,14 +209,66 @@ class ASILMapGenerator:
         except Exception as e:
             return f"グラフの生成中にエラーが発生しました: {e}"
 
+class HeatmapFigure:
+    """
+    ASILマップの図のひな形
+
+    図・画像・カラーバーは最初に1回だけ作り、draw()では格子のデータ・目盛り・文字だけを
+    差し替える。同じカラーマップで何枚も描く場合（一括出力など）は使い回すと速い。
+    pyplotを通さずに図を作るので、GUIとは別のスレッド（ライブプレビューなど）からも使える。
+    """
+
+    def __init__(self, generator: ASILMapGenerator, cmap_name: str):
+        self.generator = generator
+        self.cmap_name = cmap_name
+        self.fig = Figure(figsize=FIGURE_SIZE, dpi=FIGURE_DPI)
+        self.ax = self.fig.add_subplot()
+        self.image = self.ax.imshow(np.ma.masked_all((1, 1)), cmap=generator._cmap(cmap_name), vmin=-0.5,
+                                    vmax=len(generator.asil_order) - 0.5, aspect='auto', interpolation='nearest')
+        generator._colorbar(self.image)
+        self._texts = []
+
+    def draw(self, x_values, y_values, grid, x_param, y_param, annotate=None, title=None):
+        """
+        格子[y, x]（yは降順、データが無いセルは-1）を描いた図を返す
+
+        Args:
+            annotate: セルにASILの文字を書くか（Noneならセルの数と大きさで自動で決める）
+            title: 図のタイトル（省略時は 'ASIL Map (Colormap: ...)'）
+        """
+        ax = self.ax
+        for text in self._texts:
+            text.remove()
+        self._texts = []
+
+        rows, columns = grid.shape
+        self.image.set_data(np.ma.masked_less(grid, 0))
+        self.image.set_extent((-0.5, columns - 0.5, rows - 0.5, -0.5))
+        ax.set_xlim(-0.5, columns - 0.5)
+        ax.set_ylim(rows - 0.5, -0.5)
+        if self.generator._should_annotate(annotate, grid):
+            labels = np.array(self.generator.asil_order)
+            self._texts = [ax.text(column, row, labels[grid[row, column]], ha='center', va='center', fontsize=8)
+                           for row, column in zip(*np.nonzero(grid >= 0))]
+        self.generator._set_ticks(ax, x_values, ax.set_xticks, ax.set_xticklabels)
+        self.generator._set_ticks(ax, y_values, ax.set_yticks, ax.set_yticklabels)
+        ax.set_title(title or f'ASIL Map (Colormap: {self.cmap_name})')
+        ax.set_xlabel(x_param)
+        ax.set_ylabel(y_param)
+        self.fig.tight_layout()
+        return self.fig
+
+    def close(self):
+        self.fig.clear()
+
 # 使用例（main.pyから呼び出される場合は不要）
 if __name__ == "__main__":
     generator = ASILMapGenerator()
     result = generator.generate_asil_map(
-        file_path="path/to/your/csv",
+        data="path/to/your/csv",
         x_param="横軸パラメータ",
         y_param="縦軸パラメータ",
         color_choice="1",
         output_dir="path/to/output/directory"
     )
-    print(result)
\ No newline at end of file
+    print(result)
@@ -0,0 +1,151 @@
+# src/visualization/batch_export.py
+
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.visualization.asil_cube import ASILCube, ASIL_ORDER, cube_path
+from src.visualization.asil_map_generator import ASILMapGenerator, HeatmapFigure
+
+INDEX_NAME = 'asil_map_index.csv'
+
+# ワーカープロセスごとのキューブとカラーマップごとの図のひな形（_init_workerで用意する）
+_WORKER: Dict[str, Any] = {}
+
+
+def map_jobs(cube: ASILCube, pairs: Optional[Sequence[Tuple[str, str]]] = None,
+             facets: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """
+    出力するマップの一覧を作る
+
+    Args:
+        cube: マップを切り出すキューブ
+        pairs: (X軸, Y軸) のリスト（省略時は値が2つ以上ある軸のすべての組。Xは軸の並びで先の方）
+        facets: 値ごとに別のマップにする軸（複数なら値の全組み合わせ）。X/Yと同じ軸の組は飛ばす
+
+    Returns:
+        List[Dict[str, Any]]: 'No'・'x'・'y'・'fixed'（ファセットの軸 → 値）を持つジョブ
+
+    Raises:
+        ValueError: キューブに無い軸を指定した場合
+    """
+    for name in list(itertools.chain.from_iterable(pairs or [])) + list(facets):
+        if name not in cube.dimensions:
+            raise ValueError(f"キューブに軸 {name} がありません（軸: {', '.join(cube.dimensions)}）")
+    if pairs is None:
+        varying = [name for name, axis in zip(cube.dimensions, cube.axes) if len(axis) > 1]
+        pairs = list(itertools.combinations(varying, 2))
+
+    facet_values = [cube.axes[cube.dimensions.index(name)].tolist() for name in facets]
+    jobs = []
+    for x, y in pairs:
+        if x in facets or y in facets:
+            continue
+        for values in itertools.product(*facet_values):
+            jobs.append({'No': len(jobs) + 1, 'x': x, 'y': y, 'fixed': dict(zip(facets, values))})
+    return jobs
+
+
+def _init_worker(cube_file: str, cube: Optional[ASILCube] = None):
+    _WORKER.clear()
+    _WORKER['cube'] = cube if cube is not None else ASILCube.load(cube_file)
+    _WORKER['generator'] = ASILMapGenerator()
+    _WORKER['figures'] = {}
+
+
+def _format_value(value: Any) -> str:
+    """タイトルに出すファセットの値（数値の軸は:g、文字列の軸はそのまま）"""
+    return f'{value:g}' if isinstance(value, (int, float)) else str(value)
+
+
+def _render(job: Dict[str, Any], cmap_name: str, output_dir: str, annotate: Optional[bool]) -> Dict[str, Any]:
+    """ジョブ1つ分の画像とCSVを書き出して、索引の1行を返す（ワーカープロセスで実行）"""
+    cube, generator = _WORKER['cube'], _WORKER['generator']
+    if cmap_name not in _WORKER['figures']:
+        _WORKER['figures'][cmap_name] = HeatmapFigure(generator, cmap_name)
+    figure = _WORKER['figures'][cmap_name]
+
+    x, y, fixed = job['x'], job['y'], job['fixed']
+    x_values, y_values, grid = cube.slice(x, y, fixed=fixed)
+    facet_text = ', '.join(f'{name}={_format_value(value)}' for name, value in fixed.items())
+    title = f'ASIL Map: {y} vs {x}' + (f' ({facet_text})' if facet_text else '')
+
+    stem = f"asil_map_{job['No']:04d}"
+    image = os.path.join(output_dir, f'{stem}_{cmap_name}.png')
+    data = os.path.join(output_dir, f'{stem}_data.csv')
+    figure.draw(x_values, y_values, grid, x, y, annotate, title).savefig(image)
+    generator.write_map_data(x_values, y_values, grid, y, data)
+
+    present = grid[grid >= 0]
+    return dict({'No': job['No'], 'X': x, 'Y': y}, **fixed, **{
+        '最大ASIL': ASIL_ORDER[present.max()] if present.size else '',
+        'データ有りセル数': int(present.size),
+        '画像': os.path.basename(image),
+        'データ': os.path.basename(data),
+    })
+
+
+def _render_chunk(jobs: List[Dict[str, Any]], cmap_name: str, output_dir: str,
+                  annotate: Optional[bool]) -> List[Dict[str, Any]]:
+    return [_render(job, cmap_name, output_dir, annotate) for job in jobs]
+
+
+def export_maps(results_path: str, output_dir: str, pairs: Optional[Sequence[Tuple[str, str]]] = None,
+                facets: Sequence[str] = (), color_choice: str = '1', annotate: Optional[bool] = None,
+                workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    ASIL計算済みの結果から、(X, Y, ファセット)の組み合わせごとのマップをまとめて書き出す
+
+    結果の隣のキューブ（無ければ作成）から切り出して、プロセスプールで描画する。各ワーカーは
+    キューブを1回だけ読み込み、カラーマップごとの図のひな形を使い回す。画像とCSVは
+    asil_map_0001_<cmap>.png / asil_map_0001_data.csv のように番号で名前を付け、
+    どの番号がどの組み合わせかは索引（asil_map_index.csv）に書く。
+
+    Args:
+        results_path: ASIL計算済みの結果のCSV
+        output_dir: 出力先のディレクトリ
+        pairs: (X軸, Y軸) のリスト（map_jobsを参照）
+        facets: 値ごとに別のマップにする軸
+        color_choice: ASILMapGenerator.color_mapsのキー
+        annotate: セルにASILの文字を書くか（Noneなら自動）
+        workers: プロセス数（Noneならos.cpu_count()、1ならこのプロセスで描く）
+
+    Returns:
+        Dict[str, Any]: 'index'（索引のパス）・'maps'（索引の行）・'seconds'
+    """
+    start = time.perf_counter()
+    cube = ASILCube.for_results(results_path)
+    jobs = map_jobs(cube, pairs, facets)
+    cmap_name = ASILMapGenerator().color_maps.get(color_choice, 'YlOrRd')
+    os.makedirs(output_dir, exist_ok=True)
+
+    workers = workers or os.cpu_count() or 1
+    # ひな形を使い回せるように、ワーカーごとにある程度まとまった数のマップを渡す
+    chunk_size = max(1, -(-len(jobs) // (workers * 4)))
+    chunks = [jobs[index:index + chunk_size] for index in range(0, len(jobs), chunk_size)]
+    render = partial(_render_chunk, cmap_name=cmap_name, output_dir=output_dir, annotate=annotate)
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker('', cube)
+        try:
+            results = [render(chunk) for chunk in chunks]
+        finally:
+            for figure in _WORKER['figures'].values():
+                figure.close()
+            _WORKER.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(cube_path(results_path),)) as pool:
+            results = list(pool.map(render, chunks))
+    maps = [row for chunk in results for row in chunk]
+
+    index_path = os.path.join(output_dir, INDEX_NAME)
+    with open(index_path, 'w', newline='', encoding='utf-8-sig') as f:
+        fieldnames = list(dict.fromkeys(key for row in maps for key in row)) or ['No']
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(maps)
+    return {'index': index_path, 'maps': maps, 'seconds': time.perf_counter() - start}
@@ -0,0 +1,147 @@
+# src/visualization/live_preview.py
+
+import math
+import os
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.asil_calculation.asil_calculator import ASILCalculator
+
+DEFAULT_X = '後続車速度[km/h]'
+DEFAULT_Y = '車間時間[sec]'
+DEFAULT_INTERVAL = 2.0  # 描き直しの最短間隔（秒）
+
+
+class LivePreview:
+    """
+    スイープの実行中に、終わったチャンクのASILをセルごとに集計してマップのPNGを描き直す
+
+    add_rows()でチャンクの行（シミュレーション結果。ASIL列が無ければ行のシナリオ種別
+    （無ければscenario_type）の定義から衝突タイプと進行方向を補ってここで計算する）を
+    (x, y)のキューブに畳み込み、render()で前回の描画からinterval秒以上経っていれば描き直す。
+    PNGは一時ファイルに書いてからos.replaceするので、外から見ても書きかけのファイルにはならない。
+    描き直すたびにversionが増える（GUIはこれを見て画像を読み込み直す）。
+    add_rows()とrender()は別のスレッドから呼んでよい。
+    pandasとmatplotlibは使うときに読み込むので、プレビューを使わない実行ではこのモジュールの読み込みは軽い。
+    """
+
+    def __init__(self, output_path: str, x_param: str = DEFAULT_X, y_param: str = DEFAULT_Y,
+                 total_rows: Optional[int] = None, interval: float = DEFAULT_INTERVAL, color_choice: str = '1',
+                 scenario_type: Optional[str] = None):
+        """
+        Args:
+            output_path: プレビューのPNGのパス
+            x_param: X軸の列
+            y_param: Y軸の列
+            total_rows: スイープ全体の行数（タイトルに進捗として出す）
+            interval: 描き直しの最短間隔（秒）
+            color_choice: ASILMapGenerator.color_mapsのキー
+            scenario_type: 'シナリオ種別'列が無い行のシナリオ種別（省略時は意図しない加速）
+        """
+        self.output_path = output_path
+        self.x_param = x_param
+        self.y_param = y_param
+        self.total_rows = total_rows
+        self.interval = interval
+        self.rows = 0
+        self.version = 0
+        self.color_choice = color_choice
+        self.scenario_type = scenario_type
+        self.cube = None  # ASILCube（最初のチャンクが来るまではNone）
+        self._calculator = ASILCalculator()
+        self._figure = None  # HeatmapFigure（最初に描くときに作る）
+        self._lock = threading.Lock()  # 集計の状態用
+        self._render_lock = threading.Lock()  # 図のひな形は1つなので、描画は1スレッドずつ
+        self._dirty = False
+        self._last_render = -math.inf
+
+    def add_rows(self, rows: Iterable[Dict[str, Any]]):
+        """チャンクの行をキューブに畳み込む（ASILを計算できない行は飛ばす）"""
+        import pandas as pd
+        from src.visualization.asil_cube import ASILCube
+
+        rows = list(rows)
+        records = []
+        for row, context_row in zip(rows, self._fill_context(rows)):
+            try:
+                if 'ASIL' in row:
+                    asil = row['ASIL']
+                elif context_row is None:
+                    continue
+                else:
+                    asil = self._calculator.calculate(context_row)['ASIL']
+            except Exception:
+                continue
+            records.append((row.get(self.x_param), row.get(self.y_param), asil))
+        frame = pd.DataFrame(records, columns=[self.x_param, self.y_param, 'ASIL'])
+        for name in (self.x_param, self.y_param):
+            frame[name] = pd.to_numeric(frame[name], errors='coerce')
+        part = ASILCube.from_frame(frame, [self.x_param, self.y_param])
+        with self._lock:
+            self.cube = part if self.cube is None else self.cube.combine(part)
+            self.rows += len(rows)
+            self._dirty = True
+
+    def _fill_context(self, rows: List[Dict[str, Any]]) -> List[Optional[Dict[str, Any]]]:
+        """ASIL列が無い行に衝突タイプと進行方向を補ったコピー（補えない行はNone）"""
+        from src.simulation.batch_engine import BatchSimulationEngine
+
+        pending = [index for index, row in enumerate(rows) if 'ASIL' not in row]
+        filled: List[Optional[Dict[str, Any]]] = [None] * len(rows)
+        if not pending:
+            return filled
+        engine = BatchSimulationEngine({}, self.scenario_type)
+        for index, row in zip(pending, engine.fill_asil_context([rows[index] for index in pending], strict=False)):
+            filled[index] = row
+        return filled
+
+    def render(self, force: bool = False) -> bool:
+        """
+        新しいデータがあり、前回からinterval秒以上経っていれば（force=Trueなら常に）描き直す
+
+        Returns:
+            bool: 描き直した場合True
+        """
+        with self._render_lock:
+            with self._lock:
+                now = time.monotonic()
+                if not self._dirty or self.cube is None or (not force and now - self._last_render < self.interval):
+                    return False
+                self._dirty = False
+                if not self.cube.counts.any():  # まだASILが付いた行が無い
+                    return False
+                x_values, y_values, grid = self.cube.slice(self.x_param, self.y_param)
+                rows = self.rows
+                self._last_render = now
+            self._draw(x_values, y_values, grid, rows)
+            with self._lock:
+                self.version += 1
+            return True
+
+    def _draw(self, x_values, y_values, grid, rows: int):
+        if self._figure is None:
+            from src.visualization.asil_map_generator import ASILMapGenerator, HeatmapFigure
+            generator = ASILMapGenerator()
+            self._figure = HeatmapFigure(generator, generator.color_maps.get(self.color_choice, 'YlOrRd'))
+        progress = f'{rows} / {self.total_rows}' if self.total_rows else f'{rows}'
+        figure = self._figure.draw(x_values, y_values, grid, self.x_param, self.y_param, annotate=False,
+                                   title=f'ASIL Live Preview ({progress} rows)')
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        temporary = self.output_path + '.tmp.png'
+        figure.savefig(temporary)
+        os.replace(temporary, self.output_path)
+
+    def update(self, rows: Iterable[Dict[str, Any]]) -> bool:
+        """add_rows()してから、間隔が空いていればrender()する"""
+        self.add_rows(rows)
+        return self.render()
+
+    def close(self) -> bool:
+        """最後の状態を描いて（まだ描いていない分があれば）図を片付ける"""
+        rendered = self.render(force=True)
+        with self._render_lock:
+            if self._figure is not None:
+                self._figure.close()
+                self._figure = None
+        return rendered
@@ -0,0 +1,18 @@
+from src.data_generation.data_generator import DataGenerator
+from src.scripts.run_simulation import build_config
+
+# テストで使うエンジンの設定（スクリプトと同じbuild_config、ログCSVは書かない）
+CONFIG = dict(build_config(), write_log=False)
+
+# テスト用の小さなスイープ条件、モジュールごとに違うところだけsweep_rowsで上書きする
+SWEEP = {
+    'weight': [50, 2500], 'rtime': [1.2],
+    'vset_start': 20.0, 'vset_end': 60.0, 'vset_step': 20.0,
+    'tset_start': 1.0, 'tset_end': 2.0, 'tset_step': 0.5,
+    'accset_start': 0.1, 'accset_end': 0.5, 'accset_step': 0.2,
+    'evasiveset': [0, 0.4, 0.8, 1.0]
+}
+
+
+def sweep_rows(**sweep):
+    return DataGenerator().generate_data(dict(SWEEP, **sweep))
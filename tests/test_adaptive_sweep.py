@@ -0,0 +1,35 @@
+import unittest
+from src.data_generation.data_generator import DataGenerator
+from src.simulation.adaptive_sweep import AdaptiveSweep, METHOD_COLUMN, SIMULATED, INTERPOLATED
+from tests.helpers import CONFIG, SWEEP
+
+USER_INPUT = dict(SWEEP, vset_start=0.0, vset_end=80.0, vset_step=5.0, tset_end=4.0, tset_step=0.2,
+                  accset_start=0.05, accset_end=0.65, accset_step=0.05)
+
+
+class TestAdaptiveSweep(unittest.TestCase):
+    def test_matches_dense_grid_with_fewer_simulations(self):
+        sweep = AdaptiveSweep(CONFIG, USER_INPUT, coarse_stride=4)
+        result = sweep.run()
+        rows, stats = result['rows'], result['stats']
+
+        dense = DataGenerator().generate_data(USER_INPUT)
+        self.assertEqual([row['No'] for row in rows], [row['No'] for row in dense])
+        self.assertEqual(stats['dense_points'], len(dense))
+        self.assertLess(stats['simulated'], len(dense))
+        self.assertEqual(stats['simulated'] + stats['interpolated'], len(dense))
+        self.assertEqual(sum(row[METHOD_COLUMN] == INTERPOLATED for row in rows), stats['interpolated'])
+        self.assertEqual(sweep.verify(rows), [])
+
+    def test_stride_one_simulates_everything(self):
+        result = AdaptiveSweep(CONFIG, dict(USER_INPUT, weight=[2500]), coarse_stride=1).run()
+        self.assertEqual(result['stats']['interpolated'], 0)
+        self.assertTrue(all(row[METHOD_COLUMN] == SIMULATED for row in result['rows']))
+
+    def test_invalid_stride(self):
+        with self.assertRaises(ValueError):
+            AdaptiveSweep(CONFIG, USER_INPUT, coarse_stride=0)
+
+
+if __name__ == '__main__':
+    unittest.main()
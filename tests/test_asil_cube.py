@@ -0,0 +1,124 @@
+import itertools
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.visualization.asil_cube import ASILCube, MISSING, cube_path, save_cube_for_results
+from src.visualization.asil_map_generator import ASILMapGenerator
+
+
+def make_frame():
+    rng = np.random.default_rng(0)
+    v, t, acc = (axis.ravel() for axis in np.meshgrid([20.0, 40.0, 60.0], [1.0, 1.5], [0.1, 0.3, 0.5], indexing='ij'))
+    df = pd.DataFrame({'後続車速度[km/h]': v, '車間時間[sec]': t, '後続車加速度[G]': acc,
+                       'ASIL': rng.choice(['QM', 'A', 'B', 'C', 'D'], len(v))})
+    df = pd.concat([df, df.assign(ASIL='QM')], ignore_index=True)  # 同じセルに2行
+    return df.drop(index=[0, 18])  # 速度20・車間時間1.0・加速度0.1のセルはデータ無し
+
+
+class TestASILCube(unittest.TestCase):
+    def setUp(self):
+        self.df = make_frame()
+        self.cube = ASILCube.from_frame(self.df)
+
+    def test_reductions(self):
+        self.assertEqual(self.cube.dimensions, ['後続車速度[km/h]', '車間時間[sec]', '後続車加速度[G]'])
+        self.assertEqual(self.cube.shape, (3, 2, 3))
+        self.assertEqual(self.cube.max_codes[0, 0, 0], MISSING)
+        self.assertEqual(self.cube.min_codes[0, 0, 0], MISSING)
+        self.assertEqual(self.cube.counts[0, 0, 0], 0)
+        self.assertTrue((self.cube.min_codes[self.cube.counts > 0] == 0).all())
+        self.assertEqual(int(self.cube.reduce(['後続車速度[km/h]', '車間時間[sec]'], 'count').sum()), len(self.df))
+
+    def test_slices_match_dataframe_aggregation(self):
+        generator = ASILMapGenerator()
+        for x, y in itertools.permutations(self.cube.dimensions, 2):
+            expected = generator.aggregate(self.df, x, y)
+            for actual, wanted in zip(self.cube.slice(x, y), expected):
+                np.testing.assert_array_equal(actual, wanted)
+
+        fixed = {'後続車加速度[G]': 0.1}
+        expected = generator.aggregate(self.df, '後続車速度[km/h]', '車間時間[sec]', fixed)
+        _, _, grid = self.cube.slice('後続車速度[km/h]', '車間時間[sec]', fixed=fixed)
+        np.testing.assert_array_equal(grid, expected[2])
+        self.assertEqual(grid[-1, 0], MISSING)  # y は降順なので車間時間1.0は最後の行
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            self.cube.slice('後続車速度[km/h]', '先行車質量[kg]')
+        with self.assertRaises(ValueError):
+            self.cube.slice('後続車速度[km/h]', '車間時間[sec]', fixed={'後続車加速度[G]': 0.2})
+        with self.assertRaises(ValueError):
+            self.cube.slice('後続車速度[km/h]', '車間時間[sec]', reduction='mean')
+
+    def test_from_csv_streams_in_chunks(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'results_with_asil.csv')
+            df = self.df.assign(**{'衝突有無[C0]': ['あり', 'なし'] * (len(self.df) // 2)})
+            df['有効衝突速度[C0]'] = np.where(np.arange(len(df)) < 20, np.arange(len(df)) * 1.5, np.nan)
+            df.to_csv(path, index=False, encoding='utf-8-sig', na_rep='N/A')
+
+            cube = ASILCube.from_csv(path, chunksize=7)
+            self.assertEqual(cube.dimensions, self.cube.dimensions)
+            for name in ('max_codes', 'min_codes', 'counts'):
+                np.testing.assert_array_equal(getattr(cube, name), getattr(self.cube, name))
+
+            # 前のチャンクでは数値、後のチャンクで文字列が混ざる列も1つの軸になる
+            mixed = df.assign(**{'車間時間[sec]': df['車間時間[sec]'].astype(object)})
+            mixed.loc[mixed.index[-3:], '車間時間[sec]'] = 'long'
+            mixed.to_csv(path, index=False, encoding='utf-8-sig', na_rep='N/A')
+            cube = ASILCube.from_csv(path, ['後続車速度[km/h]', '車間時間[sec]'], chunksize=7)
+            self.assertEqual(cube.axes[1].tolist(), ['1.0', '1.5', 'long'])
+            self.assertEqual(int(cube.counts.sum()), len(df))
+
+            # 文字列の列や、値が無い行（N/A）がある列でもマップを作れる
+            cube = ASILCube.from_csv(path, ['衝突有無[C0]', '有効衝突速度[C0]'], chunksize=7)
+            self.assertEqual(cube.axes[0].tolist(), ['あり', 'なし'])
+            self.assertEqual(int(cube.counts.sum()), 20)
+            message = ASILMapGenerator().generate_asil_map(path, '衝突有無[C0]', '後続車速度[km/h]', '1', directory)
+            self.assertIn('保存されました', message)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_persisted_next_to_results(self):
+        directory = tempfile.mkdtemp()
+        try:
+            results = os.path.join(directory, 'results_with_asil.csv')
+            self.df.to_csv(results, index=False, encoding='utf-8-sig')
+            cube = ASILCube.for_results(results)
+            self.assertTrue(os.path.exists(cube_path(results)))
+            loaded = ASILCube.load(cube_path(results))
+            self.assertEqual(loaded.dimensions, cube.dimensions)
+            np.testing.assert_array_equal(loaded.max_codes, self.cube.max_codes)
+            np.testing.assert_array_equal(loaded.counts, self.cube.counts)
+
+            message = ASILMapGenerator().generate_asil_map(loaded, '後続車速度[km/h]', '車間時間[sec]', '1', directory)
+            self.assertIn('保存されました', message)
+        finally:
+            shutil.rmtree(directory)
+
+    def test_off_grid_results_are_not_cubed(self):
+        # QMCのように軸が連続値だと、密なキューブは行数の何乗にもなるので作らない
+        rng = np.random.default_rng(1)
+        rows = 4096
+        df = pd.DataFrame({'後続車速度[km/h]': rng.uniform(0, 140, rows), '車間時間[sec]': rng.uniform(0.5, 3, rows),
+                           '後続車加速度[G]': rng.uniform(0.05, 0.65, rows), 'ASIL': rng.choice(['QM', 'D'], rows)})
+        with self.assertRaises(ValueError):
+            ASILCube.from_frame(df)
+        directory = tempfile.mkdtemp()
+        try:
+            results = os.path.join(directory, 'results_with_asil.csv')
+            self.cube.save(cube_path(results))  # 前の結果の古いキューブは消える
+            self.assertIn('大きすぎます', save_cube_for_results(df, results))
+            self.assertFalse(os.path.exists(cube_path(results)))
+            self.assertIsNone(save_cube_for_results(self.df, results))
+            self.assertTrue(os.path.exists(cube_path(results)))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.visualization.asil_map_generator import ASILMapGenerator
+
+
+class TestASILMapGenerator(unittest.TestCase):
+    def setUp(self):
+        self.generator = ASILMapGenerator()
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def test_aggregate_takes_most_severe_asil(self):
+        df = pd.DataFrame({'x': [1.0, 1.0, 2.0, 2.0], 'y': [10.0, 10.0, 10.0, 20.0],
+                           'ASIL': ['A', 'C', 'QM', 'D']})
+        x_values, y_values, grid = self.generator.aggregate(df, 'x', 'y')
+        self.assertEqual(list(x_values), [1.0, 2.0])
+        self.assertEqual(list(y_values), [20.0, 10.0])  # 上が大きい値
+        np.testing.assert_array_equal(grid, [[-1, 4], [3, 0]])
+
+    def test_map_without_duplicates(self):
+        df = pd.DataFrame({'v': [20.0, 20.0, 30.0, 30.0], 't': [1.0, 2.0, 1.0, 2.0], 'ASIL': ['QM', 'A', 'B', 'D']})
+        result = self.generator.generate_asil_map(df, 'v', 't', '1', self.output_dir)
+        self.assertIn('保存されました', result)
+        self.assertNotIn('ASIL_num', df.columns)  # 入力のDataFrameは書き換えない
+        for name in ('asil_map_YlOrRd.png', 'asil_scatter_plot_YlOrRd.png'):
+            self.assertTrue(os.path.exists(os.path.join(self.output_dir, name)))
+        with open(os.path.join(self.output_dir, 'asil_map_data.csv')) as f:
+            self.assertEqual(f.read().splitlines(), ['2.0,A,D', '1.0,QM,B', 't,20.0,30.0'])
+
+    def test_large_grid_skips_annotations_and_bins_scatter(self):
+        x, y = np.meshgrid(np.arange(300, dtype=float), np.arange(300, dtype=float))
+        df = pd.DataFrame({'x': x.ravel(), 'y': y.ravel(), 'ASIL': 'B'})
+        _, _, grid = self.generator.aggregate(df, 'x', 'y')
+        self.assertFalse(self.generator._should_annotate(None, grid))
+        self.assertTrue(self.generator._should_annotate(True, grid))
+        result = self.generator.generate_asil_map(df, 'x', 'y', '2', self.output_dir)
+        self.assertIn('保存されました', result)
+
+    def test_missing_parameter(self):
+        df = pd.DataFrame({'v': [20.0], 't': [1.0], 'ASIL': ['QM']})
+        result = self.generator.generate_asil_map(df, 'v', 'missing', '1', self.output_dir)
+        self.assertIn('エラー', result)
+
+
+if __name__ == '__main__':
+    unittest.main()
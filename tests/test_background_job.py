@@ -0,0 +1,90 @@
+import time
+import unittest
+from src.utils.background_job import BackgroundJob, split_chunks, default_chunk_size
+
+
+def square_chunk(chunk):
+    return [value * value for value in chunk]
+
+
+def slow_chunk(chunk):
+    time.sleep(0.05)
+    return list(chunk)
+
+
+def failing_chunk(chunk):
+    raise ValueError('broken chunk')
+
+
+def wait_for_events(job, timeout=30.0):
+    events = []
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        events.extend(job.drain())
+        if events and events[-1][0] in ('done', 'cancelled', 'error'):
+            return events
+        time.sleep(0.01)
+    raise AssertionError('job did not finish')
+
+
+class TestBackgroundJob(unittest.TestCase):
+    def test_split_chunks(self):
+        self.assertEqual(split_chunks(list(range(5)), 2), [[0, 1], [2, 3], [4]])
+        self.assertEqual(default_chunk_size(10, workers=4), 1)
+        self.assertEqual(default_chunk_size(10**7, workers=4), 2000)
+
+    def test_results_keep_order(self):
+        job = BackgroundJob(square_chunk, split_chunks(list(range(100)), 7), max_workers=2,
+                            finalize=lambda results: results).start()
+        events = wait_for_events(job)
+        self.assertEqual(events[-1], ('done', [value * value for value in range(100)]))
+        progress = [payload for kind, payload in events if kind == 'progress']
+        self.assertEqual(progress[-1], 100)
+        self.assertEqual(progress, sorted(progress))
+
+    def test_on_chunk_sees_each_chunk(self):
+        seen = []
+        job = BackgroundJob(square_chunk, split_chunks(list(range(20)), 6), max_workers=2,
+                            on_chunk=lambda chunk, results: seen.append((list(chunk), results))).start()
+        self.assertEqual(wait_for_events(job)[-1][0], 'done')
+        self.assertEqual(sorted(seen), [(chunk, [value * value for value in chunk])
+                                        for chunk in split_chunks(list(range(20)), 6)])
+
+    def test_on_chunk_error_is_a_warning(self):
+        def broken_preview(chunk, results):
+            raise RuntimeError('no display')
+        job = BackgroundJob(square_chunk, split_chunks(list(range(20)), 5), max_workers=2,
+                            on_chunk=broken_preview).start()
+        events = wait_for_events(job)
+        self.assertEqual(events[-1][0], 'done')
+        warnings = [payload for kind, payload in events if kind == 'warning']
+        self.assertEqual(len(warnings), 1)
+        self.assertIn('no display', warnings[0])
+
+    def test_cleanup_runs_however_the_job_ends(self):
+        for worker, chunks, cancel, last in ((square_chunk, [[1, 2]], False, 'done'),
+                                             (slow_chunk, split_chunks(list(range(200)), 1), True, 'cancelled'),
+                                             (failing_chunk, [[1]], False, 'error')):
+            closed = []
+            job = BackgroundJob(worker, chunks, max_workers=1, cleanup=lambda: closed.append(True)).start()
+            if cancel:
+                job.cancel()
+            self.assertEqual(wait_for_events(job)[-1][0], last)
+            self.assertEqual(closed, [True])
+
+    def test_cancel(self):
+        job = BackgroundJob(slow_chunk, split_chunks(list(range(200)), 1), max_workers=1).start()
+        job.cancel()
+        kind, processed = wait_for_events(job)[-1]
+        self.assertEqual(kind, 'cancelled')
+        self.assertLess(processed, 200)
+
+    def test_error(self):
+        job = BackgroundJob(failing_chunk, [[1]], max_workers=1).start()
+        kind, error = wait_for_events(job)[-1]
+        self.assertEqual(kind, 'error')
+        self.assertIsInstance(error, ValueError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+from src.simulation.simulation_engine import SimulationEngine, ScenarioType
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.simulation.scenario_registry import get_scenario, registered_scenarios
+from src.asil_calculation.asil_calculator import ASILCalculator
+from src.utils import functions
+from tests.helpers import CONFIG, sweep_rows
+
+
+def make_rows():
+    return sweep_rows(vset_start=0.0, vset_end=100.0, tset_start=0.6, tset_end=3.0, tset_step=0.6,
+                      accset_start=0.05, accset_end=0.65, accset_step=0.3)
+
+
+class TestScenarioRegistry(unittest.TestCase):
+    def test_all_types_registered(self):
+        self.assertEqual(set(registered_scenarios()), set(ScenarioType))
+        self.assertEqual(get_scenario('platoon').scenario_type, ScenarioType.PLATOON)
+        with self.assertRaises(ValueError):
+            get_scenario('unknown')
+
+    def test_result_columns(self):
+        definition = get_scenario(ScenarioType.UNINTENDED_ACCELERATION)
+        self.assertEqual(definition.result_columns[:4],
+                         ['衝突有無[回避無し]', '衝突時刻[回避無し]', '衝突位置[回避無し]', '有効衝突速度[回避無し]'])
+
+
+class TestBatchSimulationEngine(unittest.TestCase):
+    def test_run_rows_matches_engine(self):
+        rows = make_rows()
+        outputs = BatchSimulationEngine(CONFIG).run_rows(rows)
+        for row, output in zip(rows, outputs):
+            engine = SimulationEngine(CONFIG)
+            engine.load_data(row)
+            engine.run_simulation()
+            self.assertEqual(output, engine.get_results())
+
+    def test_evaluate_rows_matches_asil_calculator(self):
+        rows = make_rows()
+        calculator = ASILCalculator()
+        outputs = BatchSimulationEngine(CONFIG).evaluate_rows(rows)
+        for row, output in zip(rows, outputs):
+            engine = SimulationEngine(CONFIG)
+            engine.load_data(row)
+            engine.run_simulation()
+            expected = calculator.calculate(functions.fill_asil_context(
+                functions.merge_simulation_results(row, engine.get_results())))
+            self.assertEqual(output, expected)
+
+    def test_reverse_acceleration_uses_reverse_context(self):
+        rows = [dict(row, シナリオ種別='unintended_reverse_acceleration') for row in make_rows()[:3]]
+        outputs = BatchSimulationEngine(CONFIG).evaluate_rows(rows)
+        self.assertTrue(all(output['進行方向'] == '後進' for output in outputs))
+
+    def test_platoon_rows(self):
+        rows = [dict(row, シナリオ種別='platoon', 隊列台数=size, **{'先行車減速度[G]': 0.8})
+                for row in make_rows()[-4:] for size in (3, 5)]
+        outputs = BatchSimulationEngine(CONFIG).run_rows(rows)
+        for output in outputs:
+            self.assertEqual(set(output), set(functions.SCENARIO_NAMES))
+            self.assertIn('衝突台数', output['回避無し'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.visualization.asil_cube import ASILCube, cube_path
+from src.visualization.batch_export import INDEX_NAME, export_maps, map_jobs
+
+SPEED, TIME, ACC, MASS = '後続車速度[km/h]', '車間時間[sec]', '後続車加速度[G]', '先行車質量[kg]'
+
+
+def make_frame():
+    v, t, acc, kg = (axis.ravel() for axis in np.meshgrid([20.0, 40.0, 60.0], [1.0, 1.5], [0.1, 0.3], [50.0, 2500.0],
+                                                          indexing='ij'))
+    asil = np.array(['QM', 'A', 'B', 'C', 'D'], dtype=object)[(v / 20 + t * 2 + (kg > 100)).astype(int) % 5]
+    return pd.DataFrame({SPEED: v, TIME: t, ACC: acc, MASS: kg, 'ASIL': asil})
+
+
+class TestBatchExport(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.results = os.path.join(self.directory, 'results_with_asil.csv')
+        make_frame().to_csv(self.results, index=False, encoding='utf-8-sig')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_map_jobs(self):
+        cube = ASILCube.from_frame(make_frame())
+        self.assertEqual(len(map_jobs(cube)), 6)  # 4軸から2軸を選ぶ組
+        jobs = map_jobs(cube, facets=[MASS])
+        self.assertEqual(len(jobs), 3 * 2)  # 質量以外の3軸の組 × 質量2通り
+        self.assertEqual([job['No'] for job in jobs], list(range(1, 7)))
+        self.assertEqual(jobs[0]['fixed'], {MASS: 50.0})
+        with self.assertRaises(ValueError):
+            map_jobs(cube, pairs=[(SPEED, '存在しない列')])
+
+    def test_export_writes_unique_files_and_index(self):
+        output_dir = os.path.join(self.directory, 'maps')
+        for workers in (1, 2):
+            result = export_maps(self.results, output_dir, pairs=[(SPEED, TIME), (SPEED, ACC)], facets=[MASS],
+                                 workers=workers)
+            self.assertEqual(len(result['maps']), 4)
+            with open(result['index'], encoding='utf-8-sig') as f:
+                index = list(csv.DictReader(f))
+            self.assertEqual(result['index'], os.path.join(output_dir, INDEX_NAME))
+            self.assertEqual(len({row['画像'] for row in index}), 4)
+            for row in index:
+                self.assertTrue(os.path.exists(os.path.join(output_dir, row['画像'])))
+                self.assertTrue(os.path.exists(os.path.join(output_dir, row['データ'])))
+            self.assertEqual([row[MASS] for row in index], ['50.0', '2500.0', '50.0', '2500.0'])
+
+        with open(os.path.join(output_dir, index[0]['データ'])) as f:
+            self.assertEqual(f.read().splitlines()[-1], f'{TIME},20.0,40.0,60.0')
+
+
+    def test_text_facet(self):
+        # 文字列の軸（シナリオ種別など）でもファセットにできる
+        frame = make_frame()
+        frame['シナリオ種別'] = np.where(frame[ACC] > 0.2, 'platoon', 'unintended_acceleration')
+        frame.to_csv(self.results, index=False, encoding='utf-8-sig')
+        ASILCube.from_frame(frame, [SPEED, TIME, 'シナリオ種別']).save(cube_path(self.results))
+        output_dir = os.path.join(self.directory, 'maps')
+        result = export_maps(self.results, output_dir, pairs=[(SPEED, TIME)], facets=['シナリオ種別'], workers=1)
+        self.assertEqual([row['シナリオ種別'] for row in result['maps']], ['platoon', 'unintended_acceleration'])
+        for row in result['maps']:
+            self.assertTrue(os.path.exists(os.path.join(output_dir, row['画像'])))
+
+if __name__ == '__main__':
+    unittest.main()
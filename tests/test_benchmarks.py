@@ -0,0 +1,50 @@
+import logging
+import os
+import time
+import unittest
+from src.scripts import run_benchmarks
+
+# ベンチマークは時間がかかるので ADAS_BENCHMARK=1 のときだけ実行する
+# （名前をカンマ区切りで指定すればそれだけ実行、ADAS_BENCHMARK_THRESHOLD で許容倍率を変更）
+ENABLED = os.environ.get('ADAS_BENCHMARK', '')
+
+
+@unittest.skipUnless(ENABLED, 'ADAS_BENCHMARK が設定されていないのでベンチマークはスキップ')
+class TestBenchmarks(unittest.TestCase):
+    def test_no_regressions(self):
+        names = None if ENABLED in ('1', 'all') else ENABLED.split(',')
+        threshold = float(os.environ.get('ADAS_BENCHMARK_THRESHOLD', run_benchmarks.DEFAULT_THRESHOLD))
+        results = run_benchmarks.run_benchmarks(names)
+        regressions = run_benchmarks.find_regressions(results, run_benchmarks.load_baselines(), threshold)
+        self.assertEqual(regressions, [])
+
+
+class TestRegressionCheck(unittest.TestCase):
+    def test_find_regressions(self):
+        baselines = {'benchmarks': {'a': {'cpu_seconds': 1.0}, 'b': {'cpu_seconds': 1.0}}}
+        results = {'a': {'cpu_seconds': 1.2}, 'b': {'cpu_seconds': 1.5}, 'new': {'cpu_seconds': 9.0}}
+        regressions = run_benchmarks.find_regressions(results, baselines, threshold=1.3)
+        self.assertEqual(len(regressions), 1)
+        self.assertTrue(regressions[0].startswith('b:'))
+
+    def test_short_workloads_are_repeated_per_sample(self):
+        # 短い処理は1回の計測でMIN_SAMPLE_SECONDSを超えるまで続けて実行し、1回あたりの時間にする
+        calls = []
+        original = run_benchmarks.MIN_SAMPLE_SECONDS
+        run_benchmarks.MIN_SAMPLE_SECONDS = 0.05
+        try:
+            wall, cpu = run_benchmarks.measure(lambda: calls.append(time.sleep(0.01)), 2)
+        finally:
+            run_benchmarks.MIN_SAMPLE_SECONDS = original
+        self.assertGreater(len(calls), 3)
+        self.assertLess(wall, 0.05)
+
+    def test_without_logging(self):
+        # ASILの計算で無効な行ごとに出るlogging.errorは計測に含めず、終わったらログは元に戻す
+        with self.assertNoLogs(level='WARNING'):
+            self.assertEqual(run_benchmarks.without_logging(lambda: logging.error('無効な行') or 1)(), 1)
+        with self.assertLogs(level='ERROR'):
+            logging.error('無効な行')
+
+if __name__ == '__main__':
+    unittest.main()
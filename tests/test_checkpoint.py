@@ -0,0 +1,101 @@
+import csv
+import os
+import tempfile
+import unittest
+from unittest import mock
+from src.scripts import run_simulation
+from src.utils import functions
+from src.utils.checkpoint import ShardCheckpoint
+from tests.helpers import sweep_rows
+
+
+def make_input(path):
+    rows = sweep_rows(weight=[2500], vset_start=0.0, tset_start=0.6, tset_end=3.0, tset_step=0.6,
+                      accset_start=0.05, accset_end=0.65, accset_step=0.3)
+    functions.save_data_to_csv(rows, path)
+    return rows
+
+
+class TestShardCheckpoint(unittest.TestCase):
+    def test_resume_requires_same_hash(self):
+        with tempfile.TemporaryDirectory() as directory:
+            shards = os.path.join(directory, 'out.csv.shards')
+            checkpoint = ShardCheckpoint(shards, 'a').open()
+            checkpoint.write_shard(0, 0, 2, ['x'], [{'x': 1}, {'x': 2}])
+            self.assertEqual(ShardCheckpoint(shards, 'a').open(resume=True).completed_rows, 2)
+            with self.assertRaises(ValueError):
+                ShardCheckpoint(shards, 'b').open(resume=True)
+            # resumeしなければ最初からやり直す
+            self.assertEqual(ShardCheckpoint(shards, 'b').open().completed, {})
+
+
+class TestResumableRun(unittest.TestCase):
+    def test_resume_after_crash_matches_full_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.csv')
+            rows = make_input(input_path)
+            expected_path = os.path.join(directory, 'expected.csv')
+            output_path = os.path.join(directory, 'out.csv')
+            run_simulation.run_simulations(input_path, expected_path, batch_size=5, engine='batch')
+
+            original = run_simulation.process_batch
+            calls = []
+
+            def crash_on_third_chunk(batch, config, profiler=None):
+                calls.append(len(batch))
+                if len(calls) == 3:
+                    raise KeyboardInterrupt
+                return original(batch, config, profiler)
+
+            with mock.patch.object(run_simulation, 'process_batch', side_effect=crash_on_third_chunk):
+                with self.assertRaises(KeyboardInterrupt):
+                    run_simulation.run_simulations(input_path, output_path, batch_size=5, engine='batch')
+            self.assertFalse(os.path.exists(output_path))
+
+            with mock.patch.object(run_simulation, 'process_batch', wraps=original) as resumed:
+                run_simulation.run_simulations(input_path, output_path, batch_size=5, engine='batch', resume=True)
+            # 完了済みの2チャンクは計算し直さない
+            self.assertEqual(resumed.call_count, -(-len(rows) // 5) - 2)
+            with open(expected_path, 'rb') as expected, open(output_path, 'rb') as actual:
+                self.assertEqual(expected.read(), actual.read())
+            self.assertFalse(os.path.exists(output_path + '.shards'))
+            with open(output_path, encoding='utf-8-sig') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), len(rows))
+
+    def test_resume_ignores_output_options(self):
+        # 結果ストアや軌跡アーカイブ、ログの記録方法を付け外ししても、完了済みのシャードから再開できる
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.csv')
+            rows = make_input(input_path)[:12]
+            functions.save_data_to_csv(rows, input_path)
+            output_path = os.path.join(directory, 'out.csv')
+            original = run_simulation.process_batch
+            calls = []
+
+            def crash_on_second_chunk(batch, config, profiler=None):
+                calls.append(len(batch))
+                if len(calls) == 2:
+                    raise KeyboardInterrupt
+                return original(batch, config, profiler)
+
+            with mock.patch.object(run_simulation, 'process_batch', side_effect=crash_on_second_chunk):
+                with self.assertRaises(KeyboardInterrupt):
+                    run_simulation.run_simulations(input_path, output_path, batch_size=5, log_mode='none')
+
+            with mock.patch.object(run_simulation, 'process_batch', wraps=original) as resumed:
+                run_simulation.run_simulations(input_path, output_path, batch_size=5, resume=True,
+                                               store=os.path.join(directory, 'out.sqlite'),
+                                               trajectory_archive=os.path.join(directory, 'out.traj'))
+            self.assertEqual(resumed.call_count, -(-len(rows) // 5) - 1)
+            with open(output_path, encoding='utf-8-sig') as f:
+                self.assertEqual(len(list(csv.DictReader(f))), len(rows))
+
+    def test_resume_hash_covers_result_settings(self):
+        config = run_simulation.build_config('batch')
+        outputs = dict(config, return_log=True, write_log=False, log_mode='events', log_every=10)
+        self.assertEqual(run_simulation.result_config(outputs), config)
+        self.assertNotEqual(run_simulation.result_config(dict(config, time_step=0.01)), config)
+
+
+if __name__ == '__main__':
+    unittest.main()
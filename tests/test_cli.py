@@ -0,0 +1,66 @@
+import csv
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stderr, redirect_stdout
+from src import cli
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY_MODULES = ('pandas', 'matplotlib', 'tqdm', 'tkinter')
+
+
+def loaded_heavy_modules(module):
+    """新しいインタプリタでmoduleを読み込んだときに、一緒に読み込まれた重いモジュール"""
+    code = f'import sys, {module}; print(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))'
+    output = subprocess.run([sys.executable, '-c', code], cwd=ROOT_DIR, check=True, capture_output=True, text=True)
+    return [name for name in output.stdout.strip().split(',') if name]
+
+
+class TestCLI(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_headless_stages_import_lazily(self):
+        for module in ('src.cli', 'src.scripts.run_data_generation', 'src.scripts.run_simulation',
+                       'src.scripts.run_asil_calculation', 'src.simulation.simulation_engine'):
+            with self.subTest(module=module):
+                self.assertEqual(loaded_heavy_modules(module), [])
+
+    def test_gui_module_imports_lazily(self):
+        # Windowsのプロセスプールはワーカーごとにsrc/main.pyを読み直すので、pandas・matplotlibは読み込まない
+        # （tkinterはGUIのモジュールだから読み込んでいい）
+        self.assertEqual([name for name in loaded_heavy_modules('src.main') if name != 'tkinter'], [])
+
+    def test_generate_simulate_asil(self):
+        sweep = os.path.join(self.directory, 'in.csv')
+        results = os.path.join(self.directory, 'results.csv')
+        with_asil = os.path.join(self.directory, 'results_with_asil.csv')
+        with redirect_stdout(io.StringIO()):
+            self.assertEqual(cli.main(['generate', '--output', sweep, '--weight', '50', '2500',
+                                       '--vset', '20', '40', '10', '--tset', '2', '3', '0.5',
+                                       '--accset', '0.1', '0.3', '0.1']), 0)
+            self.assertEqual(cli.main(['simulate', '--input', sweep, '--output', results, '--engine', 'batch']), 0)
+            self.assertEqual(cli.main(['asil', '--input', results, '--output', with_asil]), 0)
+
+        with open(sweep, encoding='utf-8-sig') as f:
+            rows = len(list(csv.DictReader(f)))
+        with open(with_asil, encoding='utf-8-sig') as f:
+            asil_rows = list(csv.DictReader(f))
+        self.assertGreater(rows, 0)
+        self.assertEqual(len(asil_rows), rows)
+        self.assertTrue(all(row['ASIL'] in ('QM', 'A', 'B', 'C', 'D') for row in asil_rows))
+
+    def test_unknown_command(self):
+        with self.assertRaises(SystemExit), redirect_stderr(io.StringIO()):
+            cli.main(['bogus'])
+
+
+if __name__ == '__main__':
+    unittest.main()
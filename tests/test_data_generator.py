@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from src.data_generation.data_generator import DataGenerator, DEFAULT_USER_INPUT
+
+
+class TestDataGenerator(unittest.TestCase):
+    def setUp(self):
+        self.generator = DataGenerator()
+
+    def test_missing_key_raises(self):
+        user_input = dict(DEFAULT_USER_INPUT)
+        del user_input['vset_step']
+        with self.assertRaises(ValueError):
+            self.generator.generate_data(user_input)
+
+    def test_default_sweep(self):
+        data = self.generator.generate_data(DEFAULT_USER_INPUT)
+        self.assertEqual([row['No'] for row in data[:3]], [1.0, 2.0, 3.0])
+        self.assertEqual(data[-1]['No'], float(len(data)))
+        # 歩行者は60km/h以下、先行車速度は0
+        pedestrians = [row for row in data if row['先行車質量[kg]'] < 100]
+        self.assertTrue(all(row['後続車速度[km/h]'] <= 60.0 for row in pedestrians))
+        self.assertTrue(all(row['先行車速度[km/h]'] == 0.0 for row in pedestrians))
+
+    def test_validity_rules(self):
+        self.assertFalse(self.generator._is_valid_scenario(2500, 0.0, 1.6))
+        self.assertTrue(self.generator._is_valid_scenario(2500, 0.0, 1.8))
+        self.assertFalse(self.generator._is_valid_scenario(50, 5.0, 2.4))
+        self.assertTrue(self.generator._is_valid_scenario(50, 5.0, 2.6))
+        self.assertFalse(self.generator._is_valid_scenario(2500, 20.0, 0.8))
+        # 格子のスイープでは表に無い速度の最小車間時間は比べない
+        self.assertTrue(self.generator._is_valid_scenario(50, 7.0, 2.4))
+        # QMC抽出（bracket=True）では両隣（5km/hと10km/h）の大きい方の最小車間時間
+        valid = self.generator.valid_mask(np.array([50.0, 50.0]), np.array([7.0, 7.0]), np.array([2.4, 2.6]),
+                                          bracket=True)
+        self.assertEqual(valid.tolist(), [False, True])
+
+    def test_distance_rounding(self):
+        point = self.generator.create_data_point(1, 2500, 0.0, 0.3, 1.2, 2.0, [0, 0.4, 0.8, 1.0])
+        self.assertEqual(point['車間距離[m]'], 3.33)  # 停止時は6km/hで計算
+        point = self.generator.create_data_point(1, 2500, 50.0, 0.3, 1.2, 1.3, [0, 0.4, 0.8, 1.0])
+        self.assertEqual(point['車間距離[m]'], 18.06)
+
+    def test_array_matches_scalar_rules(self):
+        user_input = dict(DEFAULT_USER_INPUT, weight=[50, 2500], vset_step=2.5, tset_step=0.1,
+                          accset_start=0.1, accset_end=0.3, accset_step=0.1)
+        sweep = self.generator.generate_array(user_input)
+        # 1行ずつのルールで作った行と、順番も値も全部一致する
+        expected = []
+        for kg in user_input['weight']:
+            for v in self.generator.generate_range(0.0, 140, 2.5):
+                if kg < 100 and v > 60.0:
+                    continue
+                for t in self.generator.generate_range(0.6, 6.0, 0.1):
+                    if self.generator._is_valid_scenario(kg, v, t):
+                        for acc in [0.1, 0.2, 0.3]:
+                            expected.append(self.generator.create_data_point(
+                                len(expected) + 1, kg, v, acc, 1.2, t, user_input['evasiveset']))
+        self.assertEqual(self.generator.generate_data(user_input), expected)
+        self.assertEqual(len(sweep), len(expected))
+        self.assertEqual(sweep['車間距離[m]'].tolist(), [row['車間距離[m]'] for row in expected])
+
+    def test_off_grid_steps_keep_baseline_rows(self):
+        # 5km/h以外の刻みでも、ベクトル化する前のgenerate_dataと同じ行数（歩行者の行を落とさない）
+        for sweep, expected in ((dict(vset_step=2.5, tset_step=0.1), 317007), (dict(vset_step=3.7), 119121)):
+            with self.subTest(**sweep):
+                data = self.generator.generate_array(dict(DEFAULT_USER_INPUT, **sweep))
+                self.assertEqual(len(data), expected)
+        data = self.generator.generate_array(dict(DEFAULT_USER_INPUT, vset_step=2.5, tset_step=0.1))
+        pedestrian = (data['先行車質量[kg]'] < 100) & (data['後続車速度[km/h]'] == 2.5) & (data['車間時間[sec]'] == 0.6)
+        self.assertTrue(pedestrian.any())
+
+    def test_exact_decimal_range(self):
+        values = self.generator.generate_range(0.0, 100.0, 0.1)
+        self.assertEqual(len(values), 1001)
+        self.assertEqual(values[-1], 100.0)
+        self.assertEqual(values[333], 33.3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from src.simulation.differential_harness import (DifferentialHarness, evaluate_batch, get_engine, register_engine,
+                                                 registered_engines, unregister_engine)
+from tests.helpers import CONFIG, sweep_rows
+
+
+def make_rows():
+    return sweep_rows(weight=[2500])
+
+
+def perturbed_batch(rows, config):
+    # 衝突時刻を少しずらし、最初の行のASILを反転させた壊れたエンジン
+    outputs = evaluate_batch(rows, config)
+    for row in outputs:
+        for key, value in row.items():
+            if key.startswith('衝突時刻[') and value != 'N/A':
+                row[key] = value + 0.05
+    outputs[0]['ASIL'] = 'D' if outputs[0]['ASIL'] != 'D' else 'QM'
+    return outputs
+
+
+class TestDifferentialHarness(unittest.TestCase):
+    def setUp(self):
+        # 壊れたエンジンはこのテストの間だけ登録する（CLIの--enginesなどに残さない）
+        register_engine('perturbed_test', perturbed_batch)
+        self.addCleanup(unregister_engine, 'perturbed_test')
+
+    def test_batch_matches_reference(self):
+        report = DifferentialHarness(CONFIG, sample_size=20).run(make_rows(), ['batch'])
+        self.assertEqual(report['sample_size'], 20)
+        result = report['engines']['batch']
+        self.assertEqual(result['flips'], [])
+        self.assertEqual(result['numeric_mismatches'], [])
+        self.assertTrue(report['passed'])
+
+    def test_perturbed_engine_is_detected(self):
+        rows = make_rows()
+        harness = DifferentialHarness(CONFIG, sample_size=20)
+        report = harness.run(rows, ['perturbed_test'])
+        result = report['engines']['perturbed_test']
+        self.assertFalse(report['passed'])
+        first_no = harness.sample_rows(rows)[0]['No']
+        self.assertIn({'No': first_no, 'field': 'ASIL'},
+                      [{'No': flip['No'], 'field': flip['field']} for flip in result['flips']])
+        self.assertTrue(result['numeric_mismatches'])
+        self.assertAlmostEqual(result['max_abs_difference']['衝突時刻'], 0.05)
+
+        # 許容誤差を広げれば数値のずれは通る（ASILの反転は残る）
+        relaxed = DifferentialHarness(CONFIG, tolerances={'衝突時刻': 0.1}, sample_size=20)
+        result = relaxed.run(rows, ['perturbed_test'])['engines']['perturbed_test']
+        self.assertEqual(result['numeric_mismatches'], [])
+        self.assertEqual(len(result['flips']), 1)
+
+    def test_unregister_engine(self):
+        self.assertIs(unregister_engine('perturbed_test'), perturbed_batch)
+        self.assertNotIn('perturbed_test', registered_engines())
+        self.assertIsNone(unregister_engine('perturbed_test'))
+        with self.assertRaises(ValueError):
+            get_engine('perturbed_test')
+
+    def test_sampling_is_reproducible(self):
+        rows = make_rows()
+        first = DifferentialHarness(CONFIG, sample_size=10, seed=3).sample_rows(rows)
+        second = DifferentialHarness(CONFIG, sample_size=10, seed=3).sample_rows(rows)
+        self.assertEqual([row['No'] for row in first], [row['No'] for row in second])
+        self.assertEqual(len(DifferentialHarness(CONFIG, sample_size=0).sample_rows(rows)), len(rows))
+
+
+if __name__ == '__main__':
+    unittest.main()
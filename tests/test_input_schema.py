@@ -0,0 +1,67 @@
+import unittest
+from src.simulation.simulation_engine import SimulationEngine
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.simulation.scenario_registry import get_scenario
+from src.utils import functions
+from src.utils.input_schema import InputField, InputSchema, SchemaValidationError
+from tests.helpers import CONFIG, sweep_rows
+
+SCHEMA = InputSchema([
+    InputField('速度[km/h]', 'velocity', functions.kph_to_mps),
+    InputField('距離[m]', 'gap'),
+    InputField('減速度[G]', 'deceleration', default=0.0),
+])
+
+
+def make_rows():
+    return sweep_rows(vset_start=0.0, vset_step=30.0, tset_step=1.0, accset_step=0.4)
+
+
+class TestInputSchema(unittest.TestCase):
+    def test_parse_columns(self):
+        compiled = SCHEMA.compile(['No', '距離[m]', '速度[km/h]'])
+        typed = compiled.parse([['1', '10.5', '36'], ['2', '20', '72']])
+        self.assertEqual(typed.columns['velocity'].tolist(), [10.0, 20.0])
+        self.assertEqual(typed.columns['gap'].tolist(), [10.5, 20.0])
+        self.assertEqual(typed.columns['deceleration'].tolist(), [0.0, 0.0])
+        self.assertTrue(typed.valid.all())
+
+    def test_bulk_errors(self):
+        compiled = SCHEMA.compile(['No', '速度[km/h]', '距離[m]'])
+        typed = compiled.parse([['1', 'abc', '1'], ['2', '36', '2'], ['3', '', 'x'], ['4', '36']])
+        self.assertEqual(typed.invalid_rows, [0, 2, 3])
+        self.assertEqual([(error.record_id, error.column) for error in typed.errors],
+                         [('1', '速度[km/h]'), ('3', '速度[km/h]'), ('3', '距離[m]'), ('4', '距離[m]')])
+        with self.assertRaises(SchemaValidationError) as context:
+            typed.raise_for_errors()
+        self.assertEqual(len(context.exception.errors), 4)
+        self.assertEqual(typed.select(typed.valid).columns['velocity'].tolist(), [10.0])
+
+    def test_missing_required_column(self):
+        with self.assertRaises(SchemaValidationError) as context:
+            SCHEMA.compile(['速度[km/h]'])
+        self.assertEqual(context.exception.missing_columns, ['距離[m]'])
+
+    def test_load_typed_matches_load_data(self):
+        rows = make_rows()
+        typed = get_scenario('unintended_acceleration').schema.parse_dicts(rows)
+        for index, row in enumerate(rows):
+            expected = SimulationEngine(CONFIG)
+            expected.load_data(row)
+            expected.run_simulation()
+            actual = SimulationEngine(CONFIG)
+            actual.load_typed(typed.columns, index, row['No'])
+            actual.run_simulation()
+            self.assertEqual(actual.get_results(), expected.get_results())
+
+    def test_batch_engine_reports_all_bad_rows(self):
+        rows = make_rows()
+        rows[1]['車間距離[m]'] = 'bad'
+        rows[3]['後続車速度[km/h]'] = ''
+        with self.assertRaises(SchemaValidationError) as context:
+            BatchSimulationEngine(CONFIG).run_rows(rows)
+        self.assertEqual([error.row for error in context.exception.errors], [1, 3])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+import numpy as np
+import pandas as pd
+from src.scripts import run_simulation
+from src.scripts.run_asil_calculation import run_asil_calculation
+from src.simulation.differential_harness import evaluate_batch
+from src.utils import functions
+from src.visualization.asil_map_generator import ASILMapGenerator
+from src.visualization.live_preview import LivePreview
+from tests.helpers import CONFIG, sweep_rows
+
+
+def make_rows():
+    return sweep_rows(vset_step=10.0, tset_start=2.0, tset_end=3.0, accset_end=0.3, accset_step=0.1)
+
+
+class TestLivePreview(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'preview.png')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_aggregates_chunks_and_throttles(self):
+        rows = make_rows()
+        expected = evaluate_batch(rows, CONFIG)
+        # シミュレーション結果だけの行（ASIL列無し）を渡してもプレビュー側でASILを計算する
+        simulated = [{key: value for key, value in row.items() if key not in ('ASIL', 'S', 'E', 'C', '衝突タイプ',
+                                                                                '進行方向')}
+                     for row in expected]
+        preview = LivePreview(self.path, total_rows=len(rows), interval=3600)
+        self.assertTrue(preview.update(simulated[:10]))  # 最初のチャンクはすぐ描く
+        self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(preview.update(simulated[10:]))  # 間隔が空くまでは描き直さない
+        self.assertEqual(preview.version, 1)
+        self.assertTrue(preview.close())  # 描いていない分は最後に描く
+        self.assertEqual(preview.version, 2)
+        self.assertFalse(preview.close())
+
+        self.assertEqual(preview.rows, len(rows))
+        self.assertEqual(int(preview.cube.counts.sum()), len(rows))
+        codes = {'QM': 0, 'A': 1, 'B': 2, 'C': 3, 'D': 4}
+        self.assertEqual(int(preview.cube.max_codes.max()), max(codes[row['ASIL']] for row in expected))
+
+    def test_reverse_scenario_context(self):
+        # 後進シナリオの行は後進の衝突タイプ・進行方向でASILを計算する（エンジンのevaluate_rowsと同じ）
+        rows = [row for row in sweep_rows(vset_end=80.0, tset_start=0.6, tset_end=3.0, tset_step=0.6)
+                if row['先行車質量[kg]'] >= 100]
+        expected = evaluate_batch(rows, dict(CONFIG, scenario_type='unintended_reverse_acceleration'))
+        simulated = [{key: value for key, value in row.items() if key not in ('ASIL', 'S', 'E', 'C', '衝突タイプ',
+                                                                                '進行方向')}
+                     for row in expected]
+        reference = LivePreview(self.path)
+        reference.add_rows(expected)  # ASIL列がある行はそのまま使う
+
+        preview = LivePreview(self.path, scenario_type='unintended_reverse_acceleration')
+        preview.add_rows(simulated)
+        self.assertEqual(preview.cube.max_codes.tolist(), reference.cube.max_codes.tolist())
+        # 行のシナリオ種別列が既定より優先される
+        preview = LivePreview(self.path)
+        preview.add_rows([dict(row, シナリオ種別='unintended_reverse_acceleration') for row in simulated])
+        self.assertEqual(preview.cube.max_codes.tolist(), reference.cube.max_codes.tolist())
+        self.assertEqual(preview.rows, len(simulated))
+
+    def test_final_preview_matches_asil_map(self):
+        # 実行中のプレビューの最後の格子は、asilステージの_with_asil.csvから作るマップと同じ
+        input_path = os.path.join(self.directory, 'in.csv')
+        output_path = os.path.join(self.directory, 'out.csv')
+        with_asil = os.path.join(self.directory, 'out_with_asil.csv')
+        functions.save_data_to_csv(make_rows(), input_path)
+        previews = []
+
+        def record_preview(*args, **kwargs):
+            previews.append(LivePreview(*args, **kwargs))
+            return previews[-1]
+
+        with mock.patch.object(run_simulation, 'LivePreview', record_preview):
+            run_simulation.run_simulations(input_path, output_path, batch_size=10, engine='batch', preview=self.path)
+        run_asil_calculation(output_path, with_asil)
+
+        x, y = previews[0].x_param, previews[0].y_param
+        expected = ASILMapGenerator().aggregate(pd.read_csv(with_asil, encoding='utf-8-sig'), x, y)
+        for actual, wanted in zip(previews[0].cube.slice(x, y), expected):
+            np.testing.assert_array_equal(actual, wanted)
+        self.assertGreater(int(expected[2].max()), 0)  # QMだけのマップではない
+
+    def test_no_rows_no_image(self):
+        preview = LivePreview(self.path)
+        preview.add_rows([])
+        self.assertFalse(preview.close())
+        self.assertFalse(os.path.exists(self.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
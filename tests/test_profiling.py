@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+from src.simulation.simulation_engine import SimulationEngine
+from src.utils.profiling import Profiler, ProfileSession
+from tests.helpers import CONFIG, sweep_rows
+
+
+class TestProfiler(unittest.TestCase):
+    def test_stage_and_merge(self):
+        profiler = Profiler()
+        with profiler.stage('a'):
+            sum(range(1000))
+        profiler.count('rows', 3)
+        other = Profiler()
+        other.merge(profiler.state())
+        other.merge(profiler.state())
+        report = other.report()
+        self.assertEqual(report['stages']['a']['calls'], 2)
+        self.assertEqual(report['counters'], {'rows': 6})
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = Profiler(enabled=False)
+        with profiler.stage('a'):
+            pass
+        profiler.count('rows')
+        self.assertEqual(profiler.state(), {'stages': {}, 'counters': {}})
+
+    def test_session_writes_report(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'report.json')
+            with ProfileSession(path, cprofile=True, trace_memory=True) as profiler:
+                with profiler.stage('work'):
+                    [str(i) for i in range(1000)]
+            with open(path, encoding='utf-8') as f:
+                report = json.load(f)
+            self.assertIn('work', report['stages'])
+            self.assertGreater(report['tracemalloc']['peak_bytes'], 0)
+            self.assertTrue(os.path.exists(report['cprofile']['stats_file']))
+
+
+class TestEngineInstrumentation(unittest.TestCase):
+    def test_steps_and_termination_reasons(self):
+        rows = sweep_rows(weight=[2500], tset_start=1.2, tset_end=2.4, tset_step=0.6,
+                          accset_start=0.05, accset_end=0.35, accset_step=0.3)
+        profiler = Profiler()
+        for row in rows:
+            plain = SimulationEngine(CONFIG)
+            plain.load_data(row)
+            plain.run_simulation()
+            engine = SimulationEngine(CONFIG, profiler)
+            engine.load_data(row)
+            engine.run_simulation()
+            # 計測しても結果は変わらない
+            self.assertEqual(engine.get_results(), plain.get_results())
+        counters = profiler.report()['counters']
+        scenarios = sum(value for key, value in counters.items() if key.startswith('scenarios['))
+        terminations = sum(value for key, value in counters.items() if key.startswith('termination['))
+        self.assertEqual(scenarios, terminations)
+        self.assertEqual(counters['scenarios[回避無し]'], len(rows))
+        self.assertEqual(profiler.stages['log_state'][2],
+                         sum(value for key, value in counters.items() if key.startswith('steps[')))
+
+
+if __name__ == '__main__':
+    unittest.main()
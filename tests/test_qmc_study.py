@@ -0,0 +1,77 @@
+import math
+import unittest
+from src.data_generation.data_generator import PEDESTRIAN_MIN_TIME, DataGenerator
+from src.data_generation.qmc_sampler import QMCSampler
+from src.simulation.qmc_study import ASILStatistics, QMCStudy, wilson_interval
+from tests.helpers import CONFIG
+
+
+class TestQMCSampler(unittest.TestCase):
+    def test_rows_are_valid_and_in_range(self):
+        generator = DataGenerator()
+        for method in ('sobol', 'lhs'):
+            sampler = QMCSampler(method=method, seed=1)
+            rows = sampler.sample(256)
+            self.assertEqual(len(rows) + sampler.rejected, 256)
+            for row in rows:
+                self.assertIn(row['先行車質量[kg]'], [50.0, 55.0, 2500.0])
+                self.assertTrue(0.0 <= row['後続車速度[km/h]'] <= 140.0)
+                self.assertTrue(0.6 <= row['車間時間[sec]'] <= 6.0)
+                self.assertTrue(generator._is_valid_scenario(row['先行車質量[kg]'], row['後続車速度[km/h]'],
+                                                             row['車間時間[sec]']))
+            # Noは抽出した点の通し番号（捨てた点の分は欠番）
+            self.assertEqual(len({row['No'] for row in rows}), len(rows))
+
+    def test_off_grid_pedestrian_speeds_keep_min_headway(self):
+        # 速度は連続値だから5km/h刻みの表とぴったり一致しない、それでも最小車間時間は守る
+        sampler = QMCSampler({'先行車質量[kg]': [50.0], '後続車速度[km/h]': (0.0, 60.0), '車間時間[sec]': (0.6, 6.0)},
+                             method='lhs', seed=2)
+        rows = sampler.sample(512)
+        self.assertTrue(rows)
+        for row in rows:
+            v, t = row['後続車速度[km/h]'], row['車間時間[sec]']
+            lower, upper = math.floor(v / 5) * 5.0, math.ceil(v / 5) * 5.0
+            self.assertGreaterEqual(t, max(PEDESTRIAN_MIN_TIME[lower], PEDESTRIAN_MIN_TIME[upper]))
+
+    def test_latin_hypercube_is_stratified(self):
+        sampler = QMCSampler({'後続車加速度[G]': (0.0, 1.0)}, method='lhs', seed=0)
+        unit = sampler._unit_samples(100)
+        self.assertEqual(sorted(int(value * 100) for value in unit[:, 0]), list(range(100)))
+
+    def test_unknown_column(self):
+        with self.assertRaises(ValueError):
+            QMCSampler({'存在しない列': (0, 1)})
+
+
+class TestQMCStudy(unittest.TestCase):
+    def test_wilson_interval(self):
+        low, high = wilson_interval(50, 100, 1.959964)
+        self.assertAlmostEqual(low, 0.4038, places=4)
+        self.assertAlmostEqual(high, 0.5962, places=4)
+
+    def test_statistics(self):
+        statistics = ASILStatistics()
+        statistics.update([{'ASIL': 'QM'}, {'ASIL': 'QM'}, {'ASIL': 'D'}, {'ASIL': 'A'}])
+        estimates = statistics.estimates()
+        self.assertEqual(estimates['QM']['proportion'], 0.5)
+        self.assertEqual(estimates['B']['count'], 0)
+        self.assertLess(estimates['QM']['low'], 0.5)
+
+    def test_stops_on_convergence(self):
+        batches = []
+        study = QMCStudy(CONFIG, QMCSampler(), batch_size=256, tolerance=0.05, min_samples=256)
+        report = study.run(on_batch=batches.append)
+        self.assertTrue(report['converged'])
+        self.assertLessEqual(report['max_half_width'], 0.05)
+        self.assertEqual(sum(len(batch) for batch in batches), report['samples'])
+        self.assertAlmostEqual(sum(estimate['proportion'] for estimate in report['estimates'].values()), 1.0)
+
+    def test_stops_at_max_samples(self):
+        study = QMCStudy(CONFIG, QMCSampler(method='lhs'), batch_size=128, tolerance=0.0001, max_samples=256)
+        report = study.run()
+        self.assertFalse(report['converged'])
+        self.assertEqual(report['samples'] + report['rejected'], 256)
+
+
+if __name__ == '__main__':
+    unittest.main()
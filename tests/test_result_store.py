@@ -0,0 +1,169 @@
+import csv
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+from src.scripts import run_simulation
+from src.scripts.run_asil_calculation import process_asil_chunk
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.simulation.simulation_engine import LOG_COLUMNS, SimulationEngine
+from src.utils import functions
+from src.utils.result_store import ResultStore
+from tests.helpers import CONFIG, sweep_rows
+
+SPEED, TIME = '後続車速度[km/h]', '車間時間[sec]'
+
+
+def make_rows():
+    return sweep_rows(vset_end=80.0, tset_start=0.6, tset_end=3.0, tset_step=0.6)
+
+
+class TestResultStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'results.sqlite')
+        self.rows = BatchSimulationEngine(run_simulation.build_config('batch')).evaluate_rows(make_rows())
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_query_uses_indexes(self):
+        with ResultStore(self.path, reset=True) as store:
+            self.assertEqual(store.insert_rows(self.rows[:10]), 10)
+            store.insert_rows(self.rows)  # 同じNoは置き換え
+        store = ResultStore(self.path)
+        self.assertEqual(store.count(), len(self.rows))
+
+        filters = {SPEED: 60, TIME: ('<', 1.2)}
+        expected = [row['No'] for row in self.rows
+                    if row[SPEED] == 60 and row[TIME] < 1.2 and row['ASIL'] in ('C', 'D')]
+        found = store.query(filters, asil_at_least='C', columns=['No', 'ASIL'], order_by=['No'])
+        self.assertEqual([row['No'] for row in found], expected)
+        self.assertTrue(all('USING INDEX' in step for step in store.explain(filters, 'C')))
+
+        self.assertEqual(store.count({SPEED: ('between', (40, 60)), 'ASIL': ('in', ['QM'])}),
+                         sum(1 for row in self.rows if 40 <= row[SPEED] <= 60 and row['ASIL'] == 'QM'))
+        # 'N/A'はNULLになるので、数値の比較に混ざらない
+        no_collision = next(row for row in self.rows if row['有効衝突速度[回避無し]'] == 'N/A')
+        self.assertIsNone(store.query({'No': no_collision['No']})[0]['有効衝突速度[回避無し]'])
+        self.assertEqual(store.count({'有効衝突速度[回避無し]': ('>=', 0)}),
+                         sum(1 for row in self.rows if row['有効衝突速度[回避無し]'] != 'N/A'))
+
+        with self.assertRaises(ValueError):
+            store.query({'存在しない列': 1})
+        with self.assertRaises(ValueError):
+            store.query({SPEED: ('like', 1)})
+        store.close(create_indexes=False)
+
+    def test_simulation_writes_store_with_trajectories(self):
+        input_path = os.path.join(self.directory.name, 'in.csv')
+        output_path = os.path.join(self.directory.name, 'out.csv')
+        functions.save_data_to_csv(make_rows()[:12], input_path)
+        run_simulation.run_simulations(input_path, output_path, batch_size=5, store=self.path)
+
+        store = ResultStore(self.path)
+        with open(output_path, encoding='utf-8-sig') as f:
+            output = list(csv.DictReader(f))
+        self.assertEqual(store.count(), len(output))
+        self.assertEqual({row['ASIL'] for row in store.query(columns=['ASIL'])} - {'QM', 'A', 'B', 'C', 'D'}, set())
+        steps = store.trajectory(output[0]['No'], '回避無し')
+        self.assertGreater(len(steps), 1)
+        self.assertEqual([step['ステップ'] for step in steps], list(range(len(steps))))
+        self.assertEqual(steps[0]['時間[s]'], 0)
+        store.close()
+
+    def test_store_uses_scenario_asil_context(self):
+        # 後進シナリオのASILは後進の衝突タイプ・進行方向で判定する（エンジンのevaluate_rowsと同じ）
+        input_path = os.path.join(self.directory.name, 'in.csv')
+        output_path = os.path.join(self.directory.name, 'out.csv')
+        rows = [row for row in make_rows() if row['先行車質量[kg]'] >= 100][:12]
+        functions.save_data_to_csv(rows, input_path)
+        run_simulation.run_simulations(input_path, output_path, batch_size=5, store=self.path, engine='batch',
+                                       scenario_type='unintended_reverse_acceleration')
+
+        expected = BatchSimulationEngine(run_simulation.build_config(
+            'batch', 'unintended_reverse_acceleration')).evaluate_rows(rows)
+        store = ResultStore(self.path)
+        stored = store.query(columns=['No', '衝突タイプ', '進行方向', 'E', 'ASIL'], order_by=['No'])
+        self.assertEqual([(row['衝突タイプ'], row['進行方向'], row['E'], row['ASIL']) for row in stored],
+                         [(row['衝突タイプ'], row['進行方向'], row['E'], row['ASIL']) for row in expected])
+        self.assertEqual({row['進行方向'] for row in stored}, {'後進'})
+        store.close()
+
+    def test_store_matches_asil_stage(self):
+        # 結果ストアのASILは、マップやキューブが読む_with_asil.csvを作るasilステージと同じ
+        input_path = os.path.join(self.directory.name, 'in.csv')
+        output_path = os.path.join(self.directory.name, 'out.csv')
+        functions.save_data_to_csv(make_rows()[:30], input_path)
+        run_simulation.run_simulations(input_path, output_path, batch_size=10, engine='batch', store=self.path)
+
+        with open(output_path, encoding='utf-8-sig') as f:
+            output = list(csv.DictReader(f))
+        staged = [row for row, error in process_asil_chunk(output) if error is None]
+        self.assertEqual(len(staged), len(output))
+        store = ResultStore(self.path)
+        stored = store.query(columns=['No', 'ASIL', 'S', 'E', 'C'], order_by=['No'])
+        self.assertEqual([(row['ASIL'], row['S'], row['E'], row['C']) for row in stored],
+                         [(row['ASIL'], row['S'], row['E'], row['C']) for row in staged])
+        self.assertGreater(len({row['ASIL'] for row in staged}), 1)
+        store.close()
+
+    def test_adds_event_column_to_old_trajectories_table(self):
+        # イベント列が無かった頃のストアに続きを書くと、列を追加して'full'と'events'の軌跡を両方入れられる
+        connection = sqlite3.connect(self.path)
+        connection.execute('CREATE TABLE trajectories ("No" NUMERIC, "ステップ" INTEGER, '
+                           + ', '.join(f'"{column}" NUMERIC' for column in LOG_COLUMNS)
+                           + ', PRIMARY KEY ("No", "シナリオ", "ステップ")) WITHOUT ROWID')
+        connection.commit()
+        connection.close()
+        logs = {}
+        for record_id, log_mode in enumerate(('full', 'events'), 1):
+            engine = SimulationEngine(dict(CONFIG, log_mode=log_mode))
+            engine.load_data(dict(make_rows()[0], No=record_id))
+            engine.run_simulation()
+            logs[log_mode] = engine.log_data
+        with ResultStore(self.path) as store:
+            store.insert_trajectories([(1, logs['full']), (2, logs['events'])])
+            full = store.trajectory(1, '回避無し')
+            events = store.trajectory(2, '回避無し')
+        self.assertEqual(len(full), len(logs['full']['回避無し']))
+        self.assertEqual({step['イベント'] for step in full}, {None})
+        self.assertEqual([step['イベント'] for step in events], [int(entry[-1]) for entry in logs['events']['回避無し']])
+
+    def test_store_survives_crash_and_resume(self):
+        # シャードを書いたあと結果ストアに入れる前に止まっても、ストアは閉じられて、再開でシャードから入れ直す
+        input_path = os.path.join(self.directory.name, 'in.csv')
+        output_path = os.path.join(self.directory.name, 'out.csv')
+        functions.save_data_to_csv(make_rows()[:12], input_path)
+        original = ResultStore.insert_rows
+        closed = []
+
+        def crash_on_second_chunk(store, rows):
+            if store.count() >= 5:
+                raise KeyboardInterrupt
+            return original(store, rows)
+
+        def record_close(store, create_indexes=True):
+            closed.append(store.path)
+            store.connection.close()
+
+        with mock.patch.object(ResultStore, 'insert_rows', crash_on_second_chunk), \
+             mock.patch.object(ResultStore, 'close', record_close):
+            with self.assertRaises(KeyboardInterrupt):
+                run_simulation.run_simulations(input_path, output_path, batch_size=5, engine='batch', store=self.path)
+        self.assertEqual(closed, [self.path])
+
+        run_simulation.run_simulations(input_path, output_path, batch_size=5, engine='batch', store=self.path,
+                                       resume=True)
+        store = ResultStore(self.path)
+        with open(output_path, encoding='utf-8-sig') as f:
+            output = list(csv.DictReader(f))
+        self.assertEqual(store.count(), len(output))
+        self.assertEqual([row['No'] for row in store.query(columns=['No'], order_by=['No'])],
+                         [float(row['No']) for row in output])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import csv
+import os
+import tempfile
+import unittest
+from src.scripts import run_simulation
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.utils import functions
+from src.utils.row_errors import RowFailure, error_sidecar_path, read_error_sidecar
+from tests.helpers import CONFIG, sweep_rows
+from tests.test_checkpoint import make_input
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+def small_rows():
+    return sweep_rows(weight=[2500], tset_step=1.0, accset_start=0.3, accset_end=0.3, accset_step=0.1)
+
+
+class TestRowFaultIsolation(unittest.TestCase):
+    def test_process_row_safe_returns_failure(self):
+        row = {'No': '7', '先行車質量[kg]': 'abc'}
+        failure = run_simulation.process_row_safe(row, CONFIG)
+        self.assertIsInstance(failure, RowFailure)
+        self.assertEqual(failure.record_id, '7')
+        self.assertIn('Traceback', failure.traceback)
+
+    def test_batch_engine_isolates_rows_across_scenario_types(self):
+        # エラーの行番号はシナリオ種別のグループ内ではなくバッチの中の位置
+        config = run_simulation.build_config('batch')
+        rows = [dict(row, **{'先行車減速度[G]': 0.5}) for row in small_rows()[:4]]
+        rows[1]['シナリオ種別'] = 'lead_vehicle_braking'
+        rows[2]['後続車速度[km/h]'] = 'abc'
+        for process in (run_simulation.process_batch_engine, run_simulation.process_chunk):
+            results = process(rows, config)
+            self.assertEqual([isinstance(result, RowFailure) for result in results], [False, False, True, False])
+            self.assertEqual(results[2].record_id, rows[2]['No'])
+            engine = BatchSimulationEngine(config)
+            self.assertEqual([results[index] for index in (0, 1, 3)],
+                             [engine.run_rows([rows[index]])[0] for index in (0, 1, 3)])
+
+    def test_reference_chunk_isolates_bad_rows(self):
+        rows = small_rows()[:3]
+        rows[0] = dict(rows[0], **{'車間距離[m]': ''})
+        results = run_simulation.process_chunk(rows, CONFIG)
+        self.assertIsInstance(results[0], RowFailure)
+        self.assertEqual(results[1:], [run_simulation.process_row(row, CONFIG) for row in rows[1:]])
+
+    def test_mixed_result_schemas_in_one_sweep(self):
+        # platoonは衝突位置の代わりに衝突台数を返すから、両方の列を並べて無い方は'N/A'
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.csv')
+            output_path = os.path.join(directory, 'out.csv')
+            rows = [dict(row, シナリオ種別='unintended_acceleration', 隊列台数=2, **{'先行車減速度[G]': 0.5})
+                    for row in small_rows()[:4]]
+            rows[2]['シナリオ種別'] = 'platoon'
+            functions.save_data_to_csv(rows, input_path)
+            run_simulation.run_simulations(input_path, output_path, batch_size=2, engine='batch')
+
+            self.assertFalse(os.path.exists(error_sidecar_path(output_path)))
+            outputs = read_csv(output_path)
+            self.assertEqual(len(outputs), len(rows))
+            self.assertEqual(outputs[2]['衝突位置[回避無し]'], 'N/A')
+            self.assertNotEqual(outputs[2]['衝突台数[回避無し]'], 'N/A')
+            self.assertEqual(outputs[0]['衝突台数[C0]'], 'N/A')
+            self.assertNotEqual(outputs[0]['衝突位置[C0]'], 'N/A')
+
+    def test_bad_rows_go_to_sidecar_and_can_be_retried(self):
+        with tempfile.TemporaryDirectory() as directory:
+            input_path = os.path.join(directory, 'in.csv')
+            expected_path = os.path.join(directory, 'expected.csv')
+            output_path = os.path.join(directory, 'out.csv')
+            rows = make_input(input_path)
+            run_simulation.run_simulations(input_path, expected_path, batch_size=5, engine='batch')
+
+            broken = [dict(row) for row in rows]
+            broken[3]['後続車速度[km/h]'] = 'abc'
+            broken[12]['車間距離[m]'] = ''
+            functions.save_data_to_csv(broken, input_path)
+            run_simulation.run_simulations(input_path, output_path, batch_size=5, engine='batch')
+
+            errors = read_error_sidecar(error_sidecar_path(output_path))
+            self.assertEqual([(error['行番号'], error['No']) for error in errors],
+                             [(3, str(rows[3]['No'])), (12, str(rows[12]['No']))])
+            self.assertEqual(len(read_csv(output_path)), len(rows) - 2)
+
+            # 入力を直してから失敗した行だけやり直す
+            functions.save_data_to_csv(rows, input_path)
+            run_simulation.run_simulations(input_path, output_path, engine='batch', retry_failed=True)
+            self.assertFalse(os.path.exists(error_sidecar_path(output_path)))
+            with open(expected_path, 'rb') as expected, open(output_path, 'rb') as actual:
+                self.assertEqual(expected.read(), actual.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
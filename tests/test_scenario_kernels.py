@@ -0,0 +1,72 @@
+import math
+import unittest
+import numpy as np
+from src.models.vehicle_model import VehicleBatch
+from src.simulation.simulation_engine import SimulationEngine
+from src.simulation.scenario_kernels import solve_following_scenarios, build_platoon, run_platoon_kernel
+from tests.helpers import CONFIG, sweep_rows
+
+
+def make_rows(lead_decelerations):
+    rows = sweep_rows(vset_start=0.0, vset_end=100.0, tset_start=0.6, tset_end=3.0, tset_step=0.6,
+                      accset_start=0.05, accset_end=0.65, accset_step=0.3)
+    for i, row in enumerate(rows):
+        row['先行車減速度[G]'] = lead_decelerations[i % len(lead_decelerations)]
+    return rows
+
+
+def run_kernel(rows):
+    column = lambda key: np.array([float(row[key]) for row in rows])
+    leading = VehicleBatch(column('先行車質量[kg]'), column('車間距離[m]'), column('先行車速度[km/h]') / 3.6)
+    following = VehicleBatch(column('後続車質量[kg]'), 0.0, column('後続車速度[km/h]') / 3.6,
+                             column('後続車加速度[G]') * 9.81)
+    evasive = {name: column(f'回避行動パラメータ[{name}]') * 9.81 for name in ['回避無し', 'C0', 'C1', 'C2']}
+    return solve_following_scenarios(leading, following, column('後続車反応時間[sec]'), evasive, CONFIG,
+                                     lead_deceleration=column('先行車減速度[G]') * 9.81)
+
+
+class TestFollowingKernel(unittest.TestCase):
+    def assert_matches_engine(self, rows):
+        results = run_kernel(rows)
+        for i, row in enumerate(rows):
+            engine = SimulationEngine(CONFIG)
+            engine.load_data(row)
+            engine.run_simulation()
+            for scenario, expected in engine.get_results().items():
+                for key, value in expected.items():
+                    actual = results[scenario][key][i]
+                    if key != '衝突有無' and value == 'N/A':
+                        self.assertTrue(math.isnan(actual))
+                    else:
+                        self.assertEqual(actual, value, (row['No'], scenario, key))
+
+    def test_unintended_acceleration_matches_engine(self):
+        self.assert_matches_engine(make_rows([0.0]))
+
+    def test_lead_vehicle_braking_matches_engine(self):
+        self.assert_matches_engine(make_rows([0.0, 0.3, 0.8]))
+
+
+class TestPlatoonKernel(unittest.TestCase):
+    config = {'time_step': 0.01, 'max_simulation_time': 15.0, 'deceleration_jerk': 2.5 * 9.81}
+
+    def test_large_gap_has_no_collision(self):
+        platoon = build_platoon([20.0], [80.0], 5)
+        result = run_platoon_kernel(platoon, 5, 1.0, 0.8 * 9.81, 0.8 * 9.81, self.config)
+        self.assertEqual(result['collision_count'].tolist(), [0])
+        self.assertTrue(np.isnan(result['time']).all())
+        # 全車停止で打ち切られる
+        self.assertTrue((platoon.velocity <= 1e-9).all())
+
+    def test_chain_collision(self):
+        platoon = build_platoon([20.0, 20.0], [5.0, 80.0], 10)
+        result = run_platoon_kernel(platoon, 10, 1.0, 0.8 * 9.81, 0.8 * 9.81, self.config)
+        self.assertEqual(result['collision'].shape, (2, 9))
+        self.assertEqual(result['collision_count'].tolist(), [9, 0])
+        self.assertTrue((result['relative_velocity'][0] > 0).all())
+        # 先頭ペアの衝突が最初に起きる
+        self.assertEqual(np.nanargmin(result['time'][0]), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
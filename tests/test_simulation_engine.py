@@ -0,0 +1,86 @@
+import unittest
+from src.simulation.simulation_engine import EVENT_LOG_COLUMNS, LOG_COLUMNS, SimulationEngine, event_names
+from tests.helpers import CONFIG
+
+
+def make_row(velocity, gap, acceleration=0.3, evasive=(0, 0.4, 0.8, 1.0)):
+    return {
+        'No': 1, '先行車質量[kg]': 2500, '先行車速度[km/h]': velocity, '車間距離[m]': gap,
+        '後続車質量[kg]': 1500, '後続車速度[km/h]': velocity, '後続車加速度[G]': acceleration,
+        '後続車反応時間[sec]': 1.2,
+        '回避行動パラメータ[回避無し]': evasive[0], '回避行動パラメータ[C0]': evasive[1],
+        '回避行動パラメータ[C1]': evasive[2], '回避行動パラメータ[C2]': evasive[3],
+    }
+
+
+def simulate(row):
+    return run(row, CONFIG).get_results()
+
+
+def run(row, config):
+    engine = SimulationEngine(config)
+    engine.load_data(row)
+    engine.run_simulation()
+    return engine
+
+
+class TestSimulationEngine(unittest.TestCase):
+    def test_short_gap_collides_without_evasion(self):
+        results = simulate(make_row(40.0, 5.0))
+        self.assertEqual(results['回避無し']['衝突有無'], 'あり')
+        self.assertGreater(results['回避無し']['有効衝突速度'], 0.0)
+
+    def test_levels_after_avoidance_are_skipped(self):
+        results = simulate(make_row(40.0, 30.0, acceleration=0.1))
+        self.assertEqual(results['回避無し']['衝突有無'], 'あり')
+        self.assertGreater(results['回避無し']['衝突時刻'], 0.0)
+        levels = ['C0', 'C1', 'C2']
+        first = [results[level]['衝突有無'] for level in levels].index('なし')
+        self.assertLess(first, len(levels) - 1)  # 回避できた後のレベルが少なくとも1つある
+        # 回避できたレベルは衝突の値が無い
+        self.assertEqual([results[levels[first]][key] for key in ('衝突時刻', '衝突位置', '有効衝突速度')],
+                         ['N/A'] * 3)
+        for level in levels[first + 1:]:
+            self.assertEqual(results[level], {'衝突有無': '不要', '衝突時刻': 'N/A', '衝突位置': 'N/A',
+                                              '有効衝突速度': 'N/A'})
+
+    def test_event_log_keeps_exact_event_steps(self):
+        row = make_row(60.0, 40.0)
+        full = run(row, CONFIG)
+        events = run(row, dict(CONFIG, log_mode='events'))
+        sampled = run(row, dict(CONFIG, log_mode='events', log_every=5))
+        nothing = run(row, dict(CONFIG, log_mode='none'))
+        self.assertEqual(events.get_results(), full.get_results())
+        self.assertEqual(nothing.get_results(), full.get_results())
+        for scenario, entries in full.log_data.items():
+            # 'full'のログにはイベント列が無い（ログCSVの形式は今まで通り）
+            self.assertEqual({len(entry) for entry in entries}, {len(LOG_COLUMNS)})
+            if entries[0][0] == '不要':
+                self.assertEqual(events.log_data[scenario], [['不要'] * len(EVENT_LOG_COLUMNS)])
+                continue
+            # イベントの行は、イベント列を除けば全ステップのログの同じ時刻の行そのもの
+            steps = {entry[0]: step for step, entry in enumerate(entries)}
+            event_steps = [steps[entry[0]] for entry in events.log_data[scenario]]
+            self.assertEqual([entry[:-1] for entry in events.log_data[scenario]],
+                             [entries[step] for step in event_steps])
+            self.assertTrue(all(entry[-1] != '0' for entry in events.log_data[scenario]))
+            self.assertLess(len(events.log_data[scenario]), len(entries))
+            self.assertEqual(event_steps[-1], len(entries) - 1)
+            self.assertEqual(event_names(events.log_data[scenario][0][-1])[0], '開始')
+            names = [name for entry in events.log_data[scenario] for name in event_names(entry[-1])]
+            self.assertIn('反応時間経過', names)
+            self.assertIn('衝突' if full.get_results()[scenario]['衝突有無'] == 'あり' else '安全状態', names[-1:])
+            self.assertTrue(set(map(tuple, events.log_data[scenario])) <= set(map(tuple, sampled.log_data[scenario])))
+            self.assertEqual([steps[entry[0]] for entry in sampled.log_data[scenario]],
+                             sorted(set(event_steps) | set(range(0, len(entries), 5))))
+        self.assertEqual(nothing.log_data, {scenario: [] for scenario in full.log_data})
+        with self.assertRaises(ValueError):
+            SimulationEngine(dict(CONFIG, log_mode='sparse'))
+
+    def test_load_data_rejects_bad_value(self):
+        with self.assertRaises(ValueError):
+            SimulationEngine(CONFIG).load_data(make_row('abc', 5.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import http.client
+import json
+import threading
+import unittest
+from unittest import mock
+from src.scripts.run_server import make_server
+from src.scripts.run_simulation import build_config
+from src.simulation.batch_engine import BatchSimulationEngine
+from src.simulation import simulation_service
+from src.simulation.simulation_service import ServiceError, SimulationService, cache_key
+from tests.helpers import sweep_rows
+
+CONFIG = build_config('batch')
+
+
+def make_rows():
+    return sweep_rows(vset_step=10.0, tset_start=2.0, tset_end=3.0, accset_end=0.3, accset_step=0.1)
+
+
+class TestSimulationService(unittest.TestCase):
+    def setUp(self):
+        self.rows = make_rows()
+        self.expected = BatchSimulationEngine(CONFIG).evaluate_rows(self.rows)
+        self.service = SimulationService(CONFIG, max_wait=0.05)
+
+    def tearDown(self):
+        self.service.close()
+
+    def test_results_match_engine_and_are_cached(self):
+        self.assertEqual(self.service.evaluate(self.rows), self.expected)
+        # 同じシナリオは記録Noや値の書き方が違ってもキャッシュから返す
+        row = dict(self.rows[3], No=999, **{'後続車速度[km/h]': str(self.rows[3]['後続車速度[km/h]'])})
+        self.assertEqual(cache_key(row), cache_key(self.rows[3]))
+        self.assertEqual(self.service.evaluate([row]), [dict(self.expected[3], No=999)])
+        stats = self.service.stats()
+        self.assertEqual(stats['cache_hits'], 1)
+        self.assertEqual(stats['simulated_rows'], len(self.rows))
+
+    def test_concurrent_requests_are_batched(self):
+        outputs = [None] * len(self.rows)
+
+        def request(index):
+            outputs[index] = self.service.evaluate([self.rows[index]])[0]
+
+        threads = [threading.Thread(target=request, args=(index,)) for index in range(len(self.rows))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(outputs, self.expected)
+        self.assertLess(self.service.stats()['batches'], len(self.rows))
+
+    def test_invalid_rows_do_not_fail_the_batch(self):
+        bad = dict(self.rows[0], No=-1, **{'後続車速度[km/h]': 'fast'})
+        results = self.service.evaluate([self.rows[1], bad, self.rows[2]])
+        self.assertEqual(results[0], self.expected[1])
+        self.assertEqual(results[2], self.expected[2])
+        self.assertEqual(results[1]['No'], -1)
+        self.assertIn('後続車速度[km/h]', results[1]['error'])
+        missing = {key: value for key, value in self.rows[0].items() if key != '車間距離[m]'}
+        self.assertIn('error', self.service.evaluate([missing])[0])
+
+    def test_invalid_row_in_mixed_scenario_types(self):
+        rows = [dict(row, **{'先行車減速度[G]': 0.5}) for row in self.rows[:4]]
+        rows[1]['シナリオ種別'] = 'lead_vehicle_braking'
+        rows[2]['後続車速度[km/h]'] = 'abc'
+        results = self.service.evaluate(rows)
+        self.assertEqual(['error' in result for result in results], [False, False, True, False])
+        engine = BatchSimulationEngine(CONFIG)
+        self.assertEqual([results[index] for index in (0, 1, 3)],
+                         [engine.evaluate_rows([rows[index]])[0] for index in (0, 1, 3)])
+
+    def test_close_during_evaluate_does_not_hang(self):
+        # 停止の確認を通った後、キューに入れる前に止められたら、待たずにエラーにする
+        def close_then_key(row):
+            self.service.close()
+            return cache_key(row)
+
+        with mock.patch.object(simulation_service, 'cache_key', side_effect=close_then_key):
+            with self.assertRaisesRegex(ServiceError, '停止'):
+                self.service.evaluate(self.rows[:1], timeout=5)
+
+    def test_http_server(self):
+        server = make_server(self.service, port=0)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            connection = http.client.HTTPConnection(*server.server_address[:2])
+            for payload, expected in ((self.rows[0], self.expected[0]), (self.rows[:3], self.expected[:3])):
+                connection.request('POST', '/evaluate', json.dumps(payload))
+                response = connection.getresponse()
+                self.assertEqual(response.status, 200)
+                self.assertEqual(json.loads(response.read()), expected)
+            connection.request('POST', '/evaluate', 'not json')
+            response = connection.getresponse()
+            self.assertEqual(response.status, 400)
+            response.read()
+            connection.request('GET', '/stats')
+            self.assertEqual(json.loads(connection.getresponse().read())['requests'], 2)
+            connection.close()
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
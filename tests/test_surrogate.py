@@ -0,0 +1,53 @@
+import unittest
+from src.simulation.adaptive_sweep import METHOD_COLUMN, SIMULATED
+from src.simulation.differential_harness import evaluate_batch
+from src.simulation.surrogate import (NearestNeighbourSurrogate, SurrogateSweep, LABEL_FIELDS, PREDICTED,
+                                      CONFIDENCE_COLUMN)
+from tests.helpers import CONFIG, sweep_rows
+
+
+def make_rows():
+    return sweep_rows(weight=[2500], vset_end=80.0, vset_step=5.0, tset_end=4.0, tset_step=0.2,
+                      accset_start=0.05, accset_end=0.65, accset_step=0.05)
+
+
+class TestNearestNeighbourSurrogate(unittest.TestCase):
+    def test_predicts_training_points_exactly(self):
+        rows = make_rows()[:50]
+        outputs = evaluate_batch(rows, CONFIG)
+        surrogate = NearestNeighbourSurrogate(k=4)
+        surrogate.add(rows, outputs)
+        predictions, confidence = surrogate.predict(rows)
+        self.assertEqual(predictions, [tuple(output[field] for field in LABEL_FIELDS) for output in outputs])
+        self.assertTrue((confidence == 1.0).all())
+
+    def test_predict_without_training(self):
+        with self.assertRaises(ValueError):
+            NearestNeighbourSurrogate().predict(make_rows()[:1])
+
+
+class TestSurrogateSweep(unittest.TestCase):
+    def test_predictions_are_marked_and_match_simulation(self):
+        rows = make_rows()
+        result = SurrogateSweep(CONFIG, initial_fraction=0.2, batch_size=200, evaluate=evaluate_batch).run(rows)
+        output_rows, stats = result['rows'], result['stats']
+        self.assertEqual([row['No'] for row in output_rows], [row['No'] for row in rows])
+        self.assertEqual(stats['simulated'] + stats['predicted'], len(rows))
+        self.assertGreater(stats['predicted'], 0)
+        self.assertEqual(stats['uncertain_predicted'], 0)
+
+        truth = evaluate_batch(rows, CONFIG)
+        for row, expected in zip(output_rows, truth):
+            self.assertIn(row[METHOD_COLUMN], (SIMULATED, PREDICTED))
+            if row[METHOD_COLUMN] == PREDICTED:
+                self.assertEqual(row[CONFIDENCE_COLUMN], 1.0)
+                self.assertEqual(row['ASIL'], expected['ASIL'])
+
+    def test_max_rounds_leaves_uncertain_predictions(self):
+        result = SurrogateSweep(CONFIG, initial_fraction=0.05, max_rounds=0, evaluate=evaluate_batch).run(make_rows())
+        self.assertEqual(result['stats']['rounds'], 0)
+        self.assertGreater(result['stats']['uncertain_predicted'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+from src.simulation.time_step_study import TimeStepStudy
+from tests.helpers import CONFIG, sweep_rows
+
+
+def make_rows():
+    return sweep_rows(weight=[2500])
+
+
+class TestTimeStepStudy(unittest.TestCase):
+    def test_report_structure(self):
+        rows = make_rows()
+        study = TimeStepStudy(CONFIG, time_steps=[0.1, 0.05, 0.01], sample_size=10)
+        report = study.run(rows, total_rows=1000)
+
+        self.assertEqual(report['sample_size'], 10)
+        self.assertEqual(report['reference_time_step'], 0.01)
+        self.assertEqual([step['time_step'] for step in report['steps']], [0.1, 0.05, 0.01])
+        # 基準解自身は必ず一致する
+        self.assertEqual(report['steps'][-1]['mismatches'], {'collision': 0, 'C': 0, 'ASIL': 0})
+        self.assertIn(report['recommended_time_step'], [0.1, 0.05, 0.01])
+        self.assertIsNotNone(report['estimated_savings_seconds'])
+
+    def test_recommended_step_stops_at_asil_flip(self):
+        # No 5と6は0.1秒刻みだと衝突の有無が変わってASILとCがずれる（No 6は0.05秒刻みでもずれる）
+        rows = make_rows()
+        study = TimeStepStudy(CONFIG, time_steps=[0.1, 0.05, 0.01], sample_size=len(rows))
+        report = study.run(rows)
+        coarse = report['steps'][0]
+        self.assertEqual(coarse['time_step'], 0.1)
+        self.assertEqual(coarse['mismatches'], {'collision': 2, 'C': 2, 'ASIL': 2})
+        self.assertEqual([flip['No'] for flip in coarse['asil_flips']], [5.0, 6.0])
+        self.assertEqual([flip['No'] for flip in report['steps'][1]['asil_flips']], [6.0])
+        self.assertEqual(report['recommended_time_step'], 0.01)
+
+        # ずれる行を除けば、いちばん粗い刻みで十分
+        stable = [row for row in rows if row['No'] not in (5.0, 6.0)]
+        report = TimeStepStudy(CONFIG, time_steps=[0.1, 0.05, 0.01], sample_size=len(stable)).run(stable)
+        self.assertEqual(report['recommended_time_step'], 0.1)
+
+    def test_empty_rows(self):
+        with self.assertRaises(ValueError):
+            TimeStepStudy(CONFIG).run([])
+
+
+if __name__ == '__main__':
+    unittest.main()
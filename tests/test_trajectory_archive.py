@@ -0,0 +1,227 @@
+import csv
+import io
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from unittest import mock
+import numpy as np
+from src.scripts import run_simulation, run_trajectory_archive
+from src.simulation.simulation_engine import EVENT_LOG_COLUMNS, LOG_COLUMNS, SimulationEngine
+from src.utils import functions
+from src.utils.checkpoint import ShardCheckpoint
+from src.utils.result_store import ResultStore
+from src.utils.trajectory_archive import (ARCHIVE_COLUMNS, BLOCK_HEADER, TrajectoryArchive, index_path,
+                                          pack_log_directory)
+from tests.helpers import CONFIG, sweep_rows
+
+
+def make_rows():
+    return sweep_rows(tset_start=0.6, tset_end=1.8, tset_step=0.6, accset_start=0.3, accset_end=0.3,
+                      accset_step=0.1)[:6]
+
+
+class TestTrajectoryArchive(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'trajectories.traj')
+        self.logs = {}
+        for row in make_rows():
+            engine = SimulationEngine(CONFIG)
+            engine.load_data(row)
+            engine.run_simulation()
+            self.logs[row['No']] = engine.log_data
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def expected(self, record_id, scenario):
+        position = LOG_COLUMNS.index('シナリオ')
+        return np.array([entry[:position] + entry[position + 1:] for entry in self.logs[record_id][scenario]
+                         if entry[0] != '不要'], dtype=np.float32)
+
+    def test_round_trip_is_lossless(self):
+        for compress in (True, False):
+            with TrajectoryArchive(self.path, 'w', compress=compress) as archive:
+                archive.extend(self.logs.items())
+            with TrajectoryArchive(self.path) as archive:
+                for record_id, log_data in self.logs.items():
+                    for scenario in archive.scenarios(record_id):
+                        np.testing.assert_array_equal(archive.read(record_id, scenario),
+                                                      self.expected(record_id, scenario))
+                first = next(iter(self.logs))
+                self.assertIn((first, '回避無し'), archive)
+                # 'full'のログにはイベント列が無い
+                self.assertEqual(list(archive.read_columns(first, '回避無し')), ARCHIVE_COLUMNS[:-1])
+                with self.assertRaises(KeyError):
+                    archive.read(-1, '回避無し')
+                with self.assertRaises(ValueError):
+                    archive.append(first, '回避無し', self.expected(first, '回避無し'))
+
+    def test_event_log_keeps_event_column(self):
+        row = make_rows()[0]
+        engine = SimulationEngine(dict(CONFIG, log_mode='events'))
+        engine.load_data(row)
+        engine.run_simulation()
+        with TrajectoryArchive(self.path, 'w') as archive:
+            archive.append_log(row['No'], engine.log_data)
+        with TrajectoryArchive(self.path) as archive:
+            columns = archive.read_columns(row['No'], '回避無し')
+        self.assertEqual(list(columns), ARCHIVE_COLUMNS)
+        self.assertEqual(columns['イベント'].tolist(), [float(entry[-1]) for entry in engine.log_data['回避無し']])
+
+    def test_show_writes_log_csv_values(self):
+        # --showの整数の列（反応時間経過・イベント）はログCSVと同じ整数で書く
+        row = make_rows()[0]
+        engine = SimulationEngine(dict(CONFIG, log_mode='events'))
+        engine.load_data(row)
+        engine.run_simulation()
+        with TrajectoryArchive(self.path, 'w') as archive:
+            archive.append_log(row['No'], engine.log_data)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            self.assertEqual(run_trajectory_archive.main([self.path, '--show', str(row['No']),
+                                                          '--scenario', '回避無し']), 0)
+        shown = list(csv.DictReader(io.StringIO(output.getvalue())))
+        expected = [dict(zip(EVENT_LOG_COLUMNS, map(str, entry))) for entry in engine.log_data['回避無し']]
+        for column in ('シナリオ', '反応時間経過', 'イベント'):
+            self.assertEqual([step[column] for step in shown], [step[column] for step in expected])
+
+    def test_show_stops_quietly_when_pipe_closes(self):
+        # `--show NO | head` のように読む側が先に閉じてもトレースバックを出さない
+        with TrajectoryArchive(self.path, 'w') as archive:
+            archive.extend(self.logs.items())
+        record_id = next(iter(self.logs))
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        process = subprocess.Popen([sys.executable, '-m', 'src.scripts.run_trajectory_archive', self.path,
+                                    '--show', str(record_id)], cwd=root, stdout=subprocess.PIPE,
+                                   stderr=subprocess.PIPE)
+        process.stdout.readline()
+        process.stdout.close()
+        stderr = process.stderr.read().decode('utf-8', 'replace')
+        process.stderr.close()
+        self.assertEqual(process.wait(), 0, stderr)
+        self.assertNotIn('Traceback', stderr)
+
+    def test_index_is_rebuilt_from_block_headers(self):
+        records = list(self.logs.items())
+        with TrajectoryArchive(self.path, 'w') as archive:
+            archive.extend(records[:3])
+        # 索引を保存した後に追記して、索引を保存せずに止まった（＋最後のブロックが書きかけ）
+        archive = TrajectoryArchive(self.path, 'a')
+        archive.extend(records[3:])
+        archive.file.write(b'\x00' * 5)
+        archive.file.close()
+        with TrajectoryArchive(self.path) as archive:
+            self.assertEqual({record_id for record_id, _ in archive.index}, {float(no) for no, _ in records})
+            no, log_data = records[-1]
+            np.testing.assert_array_equal(archive.read(no, '回避無し'), self.expected(no, '回避無し'))
+        os.remove(index_path(self.path))
+        with TrajectoryArchive(self.path) as archive:
+            self.assertEqual(len(archive), sum(len(archive.scenarios(no)) for no, _ in records))
+
+    def test_append_truncates_torn_block(self):
+        records = list(self.logs.items())
+        with TrajectoryArchive(self.path, 'w') as archive:
+            archive.extend(records[:3])
+            size = archive._end
+        # 大きいブロックを書きかけで止まった後に追記し直すと、書きかけの分は切り捨てられる
+        with open(self.path, 'ab') as f:
+            f.write(BLOCK_HEADER.pack(99.0, 0, 0, len(ARCHIVE_COLUMNS), 1000, 1 << 20) + b'\x01' * 4096)
+        with TrajectoryArchive(self.path, 'a') as archive:
+            self.assertEqual(os.path.getsize(self.path), size)
+            archive.append(records[3][0], '回避無し', self.expected(records[3][0], '回避無し'))
+        os.remove(index_path(self.path))
+        with TrajectoryArchive(self.path) as archive:
+            self.assertEqual(archive._end, os.path.getsize(self.path))
+            self.assertNotIn((99, '回避無し'), archive)
+            no = records[3][0]
+            np.testing.assert_array_equal(archive.read(no, '回避無し'), self.expected(no, '回避無し'))
+
+    def test_pack_log_directory_is_smaller_than_csv(self):
+        log_dir = os.path.join(self.directory.name, 'logs')
+        os.makedirs(log_dir)
+        position = LOG_COLUMNS.index('シナリオ')
+        for record_id, log_data in self.logs.items():
+            with open(os.path.join(log_dir, f'simulation_log_record{record_id}.csv'), 'w',
+                      newline='', encoding='utf-8-sig') as f:
+                writer = csv.writer(f)
+                writer.writerow(LOG_COLUMNS)
+                for scenario, entries in log_data.items():
+                    writer.writerows(entry for entry in entries if entry[position] == scenario)
+        result = pack_log_directory(log_dir, self.path)
+        self.assertEqual(result['records'], len(self.logs))
+        self.assertLess(result['archive_bytes'], result['csv_bytes'] / 2)
+        with TrajectoryArchive(self.path) as archive:
+            record_id = next(iter(self.logs))
+            np.testing.assert_allclose(archive.read(record_id, 'C0'), self.expected(record_id, 'C0'))
+
+    def test_simulation_writes_archive_instead_of_csv_logs(self):
+        input_path = os.path.join(self.directory.name, 'in.csv')
+        output_path = os.path.join(self.directory.name, 'out.csv')
+        functions.save_data_to_csv(make_rows(), input_path)
+        run_simulation.run_simulations(input_path, output_path, batch_size=4, trajectory_archive=self.path)
+        with TrajectoryArchive(self.path) as archive:
+            for record_id in self.logs:
+                # スキップした（'不要'だけの）シナリオは入らない
+                scenarios = [scenario for scenario, entries in self.logs[record_id].items()
+                             if entries and entries[0][0] != '不要']
+                self.assertEqual(archive.scenarios(record_id), scenarios)
+                for scenario in scenarios:
+                    np.testing.assert_array_equal(archive.read(record_id, scenario), self.expected(record_id, scenario))
+
+    def test_interrupted_sweep_saves_archive_index(self):
+        # 途中で止まってもアーカイブは閉じて索引を保存し、--resumeで残りを書き足す
+        input_path = os.path.join(self.directory.name, 'in.csv')
+        output_path = os.path.join(self.directory.name, 'out.csv')
+        functions.save_data_to_csv(make_rows(), input_path)
+        original = run_simulation.process_batch
+
+        def crash_on_second_chunk(batch, config, profiler=None):
+            if crash_on_second_chunk.calls == 1:
+                raise KeyboardInterrupt
+            crash_on_second_chunk.calls += 1
+            return original(batch, config, profiler)
+        crash_on_second_chunk.calls = 0
+
+        with mock.patch.object(run_simulation, 'process_batch', side_effect=crash_on_second_chunk):
+            with self.assertRaises(KeyboardInterrupt):
+                run_simulation.run_simulations(input_path, output_path, batch_size=4, trajectory_archive=self.path)
+        self.assertTrue(os.path.exists(index_path(self.path)))
+        with TrajectoryArchive(self.path) as archive:
+            self.assertEqual({no for no, _ in archive.index}, {float(no) for no in list(self.logs)[:4]})
+
+        run_simulation.run_simulations(input_path, output_path, batch_size=4, trajectory_archive=self.path,
+                                       resume=True)
+        with TrajectoryArchive(self.path) as archive:
+            self.assertEqual({no for no, _ in archive.index}, {float(no) for no in self.logs})
+
+    def test_crash_after_shard_keeps_trajectories(self):
+        # シャードが完了になった直後に止まっても、そのチャンクの軌跡はアーカイブと結果ストアに残っている
+        input_path = os.path.join(self.directory.name, 'in.csv')
+        output_path = os.path.join(self.directory.name, 'out.csv')
+        store_path = os.path.join(self.directory.name, 'results.sqlite')
+        functions.save_data_to_csv(make_rows(), input_path)
+        original = ShardCheckpoint.write_shard
+
+        def crash_after_first_shard(checkpoint, *args, **kwargs):
+            original(checkpoint, *args, **kwargs)
+            raise KeyboardInterrupt
+
+        with mock.patch.object(ShardCheckpoint, 'write_shard', crash_after_first_shard):
+            with self.assertRaises(KeyboardInterrupt):
+                run_simulation.run_simulations(input_path, output_path, batch_size=4, trajectory_archive=self.path,
+                                               store=store_path)
+        run_simulation.run_simulations(input_path, output_path, batch_size=4, trajectory_archive=self.path,
+                                       store=store_path, resume=True)
+        with TrajectoryArchive(self.path) as archive:
+            self.assertEqual({no for no, _ in archive.index}, {float(no) for no in self.logs})
+        with ResultStore(store_path) as store:
+            for record_id in self.logs:
+                self.assertTrue(store.trajectory(record_id), record_id)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import unittest
+import numpy as np
+from src.models.vehicle_model import Vehicle, VehicleBatch
+
+
+class TestVehicle(unittest.TestCase):
+    def test_slots(self):
+        vehicle = Vehicle({'mass': 1500.0, 'initial_position': 0.0, 'initial_velocity': 10.0})
+        self.assertFalse(hasattr(vehicle, '__dict__'))
+        with self.assertRaises(AttributeError):
+            vehicle.unknown = 1.0
+
+    def test_update_and_reset(self):
+        vehicle = Vehicle({'mass': 1500.0, 'initial_position': 5.0, 'initial_velocity': 10.0})
+        vehicle.acceleration = 2.0
+        vehicle.update_state(0.1)
+        self.assertAlmostEqual(vehicle.velocity, 10.2)
+        self.assertAlmostEqual(vehicle.position, 5.0 + 10.2 * 0.1)
+        vehicle.reset()
+        self.assertEqual((vehicle.velocity, vehicle.position, vehicle.acceleration), (10.0, 5.0, 0.0))
+
+
+class TestVehicleBatch(unittest.TestCase):
+    def test_matches_scalar_vehicle(self):
+        configs = [
+            {'mass': 1500.0, 'initial_position': 0.0, 'initial_velocity': 8.0, 'max_acceleration': 3.0},
+            {'mass': 2500.0, 'initial_position': 12.5, 'initial_velocity': 16.7},
+        ]
+        vehicles = [Vehicle(config) for config in configs]
+        batch = VehicleBatch.from_vehicles(vehicles)
+        for vehicle, acc, dec in zip(vehicles, [1.5, 0.0], [0.0, 4.0]):
+            vehicle.acceleration, vehicle.deceleration = acc, dec
+        batch.acceleration[:] = [1.5, 0.0]
+        batch.deceleration[:] = [0.0, 4.0]
+        for _ in range(20):
+            for vehicle in vehicles:
+                vehicle.update_state(0.1)
+            batch.update_state(0.1)
+        self.assertEqual(batch.velocity.tolist(), [vehicle.velocity for vehicle in vehicles])
+        self.assertEqual(batch.position.tolist(), [vehicle.position for vehicle in vehicles])
+
+    def test_masked_update_and_reset(self):
+        batch = VehicleBatch(mass=1500.0, initial_position=[0.0, 10.0], initial_velocity=[5.0, 5.0])
+        batch.acceleration[:] = 1.0
+        batch.update_state(1.0, mask=np.array([True, False]))
+        self.assertEqual(batch.velocity.tolist(), [6.0, 5.0])
+        self.assertEqual(batch.position.tolist(), [6.0, 10.0])
+        batch.reset()
+        self.assertEqual(batch.velocity.tolist(), [5.0, 5.0])
+        self.assertEqual(batch.position.tolist(), [0.0, 10.0])
+        self.assertEqual(batch.acceleration.tolist(), [0.0, 0.0])
+        self.assertEqual(len(batch), 2)
+        self.assertEqual(batch.mass.tolist(), [1500.0, 1500.0])
+
+
+if __name__ == '__main__':
+    unittest.main()